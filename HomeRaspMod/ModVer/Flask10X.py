@@ -8,8 +8,19 @@ import time
 from logging.handlers import RotatingFileHandler
 from collections import deque, defaultdict
 from queue import Queue, Empty
-import re
+import io
 import json
+import atexit
+import sqlite3
+import argparse
+from collections import OrderedDict
+try:
+    import fcntl  # POSIX only; cross-process CSV locking is skipped elsewhere
+except ImportError:
+    fcntl = None
+
+from wsgi_serving import ConcurrencyLimit, serve
+from schema_validation import ValidationError, compile_schema, compile_extractor
 
 # =====================
 # Centralized Config
@@ -21,10 +32,11 @@ LOG_MAX_BYTES = 1 * 1024 * 1024  # 1 MB
 LOG_BACKUP_COUNT = 5
 HISTORY_MAX = 1000
 
-CSV_PICODATA = os.path.join(os.path.dirname(__file__), 'PicodataX.csv')
-CSV_BEDROOM = os.path.join(os.path.dirname(__file__), 'BedRoomEnv.csv')
-CSV_OUTSIDE = os.path.join(os.path.dirname(__file__), 'OutsideEnv.csv')
-CSV_LR = os.path.join(os.path.dirname(__file__), 'LR_env.csv')
+DATA_DIR = os.environ.get('FLASK10X_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+CSV_PICODATA = os.path.join(DATA_DIR, 'PicodataX.csv')
+CSV_BEDROOM = os.path.join(DATA_DIR, 'BedRoomEnv.csv')
+CSV_OUTSIDE = os.path.join(DATA_DIR, 'OutsideEnv.csv')
+CSV_LR = os.path.join(DATA_DIR, 'LR_env.csv')
 
 # Fixed CSV column orders (Step 6)
 COLUMNS_PICODATA = ["current_time", "Pressure", "Tempereture"]
@@ -44,11 +56,24 @@ COLUMNS_LR = [
 WRITE_QUEUE_MAXSIZE = 5000
 WRITE_RETRIES = 3
 WRITE_BACKOFF_BASE_SEC = 0.05
+WRITE_BATCH_MAX = 500        # max jobs drained from the queue per batch
+CSV_HANDLE_CACHE_MAX = 8     # open CSV handles kept by the writer (LRU)
+
+# Histogram bucket upper bounds for /metrics
+BATCH_SIZE_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500]
+FSYNC_LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
 
 # Metrics & thresholds (Steps 8/9)
 QUEUE_WARN_THRESHOLD = int(WRITE_QUEUE_MAXSIZE * 0.8)  # warn at 80% full
 INACTIVITY_WARN_SEC = 120  # warn if endpoint inactive for 2 minutes
 
+# Serving (production mode / multi-worker)
+MAX_INFLIGHT_REQUESTS = 64  # per process; beyond this requests get 503 + Retry-After
+# SQLite file for history/last_received/metrics shared by all workers; unset = in-process state
+STATE_DB = os.environ.get('FLASK10X_STATE_DB')
+WORKER_METRICS_STALE_SEC = 30  # ignore metrics from workers that stopped publishing
+METRICS_PUBLISH_SEC = 1.0      # min interval between a worker's metric snapshots
+
 # =====================
 # Logger Setup
 # =====================
@@ -62,6 +87,7 @@ if not logger.handlers:
     logger.addHandler(handler)
 
 app = Flask(__name__)
+app.wsgi_app = ConcurrencyLimit(app.wsgi_app, MAX_INFLIGHT_REQUESTS)
 
 # bounded request history
 request_history = deque(maxlen=HISTORY_MAX)
@@ -70,9 +96,40 @@ request_history = deque(maxlen=HISTORY_MAX)
 write_queue: "Queue[dict]" = Queue(maxsize=WRITE_QUEUE_MAXSIZE)
 file_locks = defaultdict(threading.Lock)
 
+class Histogram:
+    """Fixed-bucket histogram; snapshot() reports cumulative counts per upper bound (Prometheus 'le')."""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        # list of [le, cumulative_count] keeps bucket order in the JSON output
+        buckets = []
+        running = 0
+        for bound, n in zip(self.bounds + ['+Inf'], self.counts):
+            running += n
+            buckets.append([str(bound), running])
+        return {'buckets': buckets, 'count': self.count, 'sum': round(self.sum, 3)}
+
+
 # metrics state
 write_success_total = 0
 write_error_total = 0
+write_batch_size_hist = Histogram(BATCH_SIZE_BUCKETS)
+fsync_latency_ms_hist = Histogram(FSYNC_LATENCY_BUCKETS_MS)
 metrics_lock = threading.Lock()
 last_received = {
     'data': None,
@@ -81,7 +138,8 @@ last_received = {
     'data4': None,
 }
 
-_worker_started = False
+# pid of the process that owns the writer threads (threads do not survive a fork)
+_worker_started_pid = None
 
 
 def _ensure_parent_dir(path: str):
@@ -90,63 +148,285 @@ def _ensure_parent_dir(path: str):
         os.makedirs(parent, exist_ok=True)
 
 
-def _needs_header(path: str) -> bool:
-    try:
-        return not os.path.exists(path) or os.path.getsize(path) == 0
-    except Exception:
-        # If we cannot stat the file, try to write header to be safe once
-        return True
+# Writer-thread-only state: file_path -> open append handle, least recently used first
+_csv_handles: "OrderedDict[str, object]" = OrderedDict()
+
+
+def _close_handle(file_path: str):
+    f = _csv_handles.pop(file_path, None)
+    if f is not None:
+        try:
+            f.close()
+        except Exception:
+            pass
 
 
-def _write_csv_row(file_path: str, columns: list, row: dict):
-    """Write a single row to CSV with retries, exclusive per-file lock, flush+fsync.
+def _close_all_handles():
+    for file_path in list(_csv_handles):
+        _close_handle(file_path)
+
+
+atexit.register(_close_all_handles)
+
+
+def _get_handle(file_path: str, columns: list):
+    """Cached append handle for file_path.
+    Reopens if the file was removed or replaced (e.g. rotated by an operator)."""
+    f = _csv_handles.get(file_path)
+    if f is not None:
+        try:
+            if os.stat(file_path).st_ino == os.fstat(f.fileno()).st_ino:
+                _csv_handles.move_to_end(file_path)
+                return f
+        except OSError:
+            pass
+        _close_handle(file_path)
+    while len(_csv_handles) >= CSV_HANDLE_CACHE_MAX:
+        _close_handle(next(iter(_csv_handles)))
+    _ensure_parent_dir(file_path)
+    f = open(file_path, 'a', newline='')
+    _csv_handles[file_path] = f
+    return f
+
+
+def _lock_file(f):
+    # Other Gunicorn workers append to the same files
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _format_rows(columns: list, rows: list, header: bool = False) -> str:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columns)
+    if header:
+        writer.writeheader()
+    for row in rows:
+        # fill missing values consistently
+        writer.writerow({col: row.get(col, "") for col in columns})
+    return buf.getvalue()
+
+
+def _write_csv_rows(file_path: str, columns: list, rows: list) -> bool:
+    """Append rows to CSV with retries, exclusive per-file lock and a single flush+fsync.
+    The header is written (under the lock) only when the file is new/empty.
     Assumes row keys match columns; fills missing with empty string when writing."""
     lock = file_locks[file_path]
+    text = _format_rows(columns, rows)
     attempt = 0
     last_exc = None
     while attempt < WRITE_RETRIES:
         try:
             with lock:
-                _ensure_parent_dir(file_path)
-                header_needed = _needs_header(file_path)
-                with open(file_path, 'a', newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=columns)
-                    if header_needed:
-                        writer.writeheader()
-                    # fill missing values consistently
-                    safe_row = {col: row.get(col, "") for col in columns}
-                    writer.writerow(safe_row)
+                f = _get_handle(file_path, columns)
+                _lock_file(f)
+                try:
+                    # Append mode writes at EOF, so the end position tells whether a header is needed
+                    if f.seek(0, os.SEEK_END) == 0:
+                        f.write(_format_rows(columns, [], header=True))
+                    f.write(text)
                     f.flush()
+                    t0 = time.perf_counter()
                     os.fsync(f.fileno())
+                    fsync_ms = (time.perf_counter() - t0) * 1000.0
+                finally:
+                    _unlock_file(f)
+            with metrics_lock:
+                fsync_latency_ms_hist.observe(fsync_ms)
             return True
         except Exception as e:
             last_exc = e
             attempt += 1
+            _close_handle(file_path)
             sleep_dur = WRITE_BACKOFF_BASE_SEC * (2 ** (attempt - 1))
             logger.warning(f"CSV write failed for {file_path} (attempt {attempt}/{WRITE_RETRIES}): {e}. Retrying in {sleep_dur:.2f}s")
             time.sleep(sleep_dur)
-    logger.error(f"CSV write permanently failed for {file_path}: {last_exc}")
+    logger.error(f"CSV write permanently failed for {file_path} ({len(rows)} rows): {last_exc}")
     return False
 
 
+def _drain_batch(first_job: dict) -> list:
+    batch = [first_job]
+    while len(batch) < WRITE_BATCH_MAX:
+        try:
+            batch.append(write_queue.get_nowait())
+        except Empty:
+            break
+    return batch
+
+
 def _writer_worker():
+    """Drain the queue in batches; rows are grouped per file (arrival order kept) and
+    written with one fsync per file per batch."""
     global write_success_total, write_error_total
     logger.info("CSV writer worker started")
+    last_publish = 0.0
+    unpublished = False
     while True:
+        now = time.monotonic()
+        if unpublished and now - last_publish >= METRICS_PUBLISH_SEC:
+            # Keep this worker's counters fresh for /metrics served by other workers
+            try:
+                state.publish_metrics(_local_metrics())
+            except Exception as e:
+                logger.warning(f"Metrics publish failed: {e}")
+            last_publish, unpublished = now, False
         try:
-            job = write_queue.get(timeout=1.0)
+            job = write_queue.get(timeout=METRICS_PUBLISH_SEC if unpublished else 1.0)
         except Empty:
             # periodic idle loop; could add housekeeping
             continue
+        unpublished = True
+        batch = _drain_batch(job)
         try:
-            ok = _write_csv_row(job['file_path'], job['columns'], job['row'])
+            groups = OrderedDict()
+            for j in batch:
+                key = (j['file_path'], tuple(j['columns']))
+                groups.setdefault(key, []).append(j['row'])
+            for (file_path, columns), rows in groups.items():
+                ok = _write_csv_rows(file_path, list(columns), rows)
+                with metrics_lock:
+                    if ok:
+                        write_success_total += len(rows)
+                    else:
+                        write_error_total += len(rows)
             with metrics_lock:
-                if ok:
-                    write_success_total += 1
-                else:
-                    write_error_total += 1
+                write_batch_size_hist.observe(len(batch))
+        except Exception:
+            logger.exception("CSV writer batch error")
         finally:
-            write_queue.task_done()
+            for _ in batch:
+                write_queue.task_done()
+
+
+# =====================
+# Request state (history, last received, per-worker metrics)
+# =====================
+class LocalState:
+    """In-process state: dev server or a single worker."""
+
+    def __init__(self):
+        self._metrics = None
+
+    def record(self, endpoint: str, entry: dict):
+        request_history.append(entry)
+        last_received[endpoint] = datetime.now()
+
+    def history(self) -> list:
+        return list(request_history)
+
+    def last_received(self) -> dict:
+        return dict(last_received)
+
+    def publish_metrics(self, snapshot: dict):
+        self._metrics = snapshot
+
+    def worker_metrics(self) -> list:
+        return [self._metrics] if self._metrics else []
+
+
+class SQLiteState:
+    """State shared by all worker processes through one SQLite file (WAL mode).
+    History is trimmed to HISTORY_MAX; each worker publishes its metrics snapshot."""
+
+    TRIM_EVERY = 100  # trim history every N inserts
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, entry TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS last_received (endpoint TEXT PRIMARY KEY, ts TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS worker_metrics (pid INTEGER PRIMARY KEY, updated REAL NOT NULL, snapshot TEXT NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and process (connections must not cross a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            _ensure_parent_dir(self.path)
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, endpoint: str, entry: dict):
+        conn = self._conn()
+        with conn:
+            cur = conn.execute("INSERT INTO history (entry) VALUES (?)", (json.dumps(entry, default=str),))
+            conn.execute("INSERT OR REPLACE INTO last_received (endpoint, ts) VALUES (?, ?)",
+                         (endpoint, datetime.now().isoformat()))
+            if cur.lastrowid % self.TRIM_EVERY == 0:
+                conn.execute("DELETE FROM history WHERE id <= ?", (cur.lastrowid - HISTORY_MAX,))
+
+    def history(self) -> list:
+        rows = self._conn().execute("SELECT entry FROM history ORDER BY id DESC LIMIT ?", (HISTORY_MAX,)).fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    def last_received(self) -> dict:
+        result = {ep: None for ep in last_received}
+        for ep, ts in self._conn().execute("SELECT endpoint, ts FROM last_received"):
+            result[ep] = datetime.fromisoformat(ts)
+        return result
+
+    def publish_metrics(self, snapshot: dict):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO worker_metrics (pid, updated, snapshot) VALUES (?, ?, ?)",
+                         (os.getpid(), time.time(), json.dumps(snapshot)))
+
+    def worker_metrics(self) -> list:
+        cutoff = time.time() - WORKER_METRICS_STALE_SEC
+        rows = self._conn().execute("SELECT snapshot FROM worker_metrics WHERE updated >= ?", (cutoff,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+
+state = SQLiteState(STATE_DB) if STATE_DB else LocalState()
+
+
+def _record_request(endpoint: str, timestamp: str, data, note: str = None):
+    entry = {'endpoint': endpoint, 'timestamp': timestamp, 'data': data}
+    if note:
+        entry['note'] = note
+    state.record(endpoint, entry)
+
+
+def _local_metrics() -> dict:
+    with metrics_lock:
+        return {
+            'queue_length': write_queue.qsize(),
+            'write_success_total': write_success_total,
+            'write_error_total': write_error_total,
+            'write_batch_size': write_batch_size_hist.snapshot(),
+            'fsync_latency_ms': fsync_latency_ms_hist.snapshot(),
+            'open_csv_handles': len(_csv_handles),
+        }
+
+
+def _merge_histograms(snaps: list) -> dict:
+    buckets = [[le, 0] for le, _ in snaps[0]['buckets']]
+    for snap in snaps:
+        for pair, (_, n) in zip(buckets, snap['buckets']):
+            pair[1] += n
+    return {'buckets': buckets, 'count': sum(sn['count'] for sn in snaps),
+            'sum': round(sum(sn['sum'] for sn in snaps), 3)}
+
+
+def _aggregate_metrics(snapshots: list) -> dict:
+    """Sum per-worker counters and histograms."""
+    total = {}
+    for key in ('queue_length', 'write_success_total', 'write_error_total', 'open_csv_handles'):
+        total[key] = sum(sn.get(key, 0) for sn in snapshots)
+    for key in ('write_batch_size', 'fsync_latency_ms'):
+        total[key] = _merge_histograms([sn[key] for sn in snapshots])
+    total['workers'] = len(snapshots)
+    return total
 
 
 def _metrics_monitor():
@@ -154,6 +434,7 @@ def _metrics_monitor():
     last_queue_warned = False
     while True:
         try:
+            state.publish_metrics(_local_metrics())
             qlen = write_queue.qsize()
             if qlen >= QUEUE_WARN_THRESHOLD:
                 if not last_queue_warned:
@@ -164,7 +445,7 @@ def _metrics_monitor():
 
             # inactivity checks
             now = datetime.now()
-            for ep, ts in list(last_received.items()):
+            for ep, ts in state.last_received().items():
                 if ts is None:
                     continue
                 idle = (now - ts).total_seconds()
@@ -175,97 +456,29 @@ def _metrics_monitor():
         time.sleep(5)
 
 
+_start_lock = threading.Lock()
+
+
 def _start_writer_once():
-    global _worker_started
-    if not _worker_started:
+    """Start the writer/monitor threads once per process (also after a Gunicorn fork)."""
+    global _worker_started_pid
+    if _worker_started_pid == os.getpid():
+        return
+    with _start_lock:
+        if _worker_started_pid == os.getpid():
+            return
+        # Handles inherited from a parent process belong to its writer
+        _csv_handles.clear()
         t = threading.Thread(target=_writer_worker, name="csv-writer", daemon=True)
         t.start()
         m = threading.Thread(target=_metrics_monitor, name="metrics-monitor", daemon=True)
         m.start()
-        _worker_started = True
+        _worker_started_pid = os.getpid()
 
 
-# start the worker immediately (safe with daemon thread)
-_start_writer_once()
-
 # =====================
 # Validation Utilities
 # =====================
-class ValidationError(Exception):
-    def __init__(self, message, details=None):
-        super().__init__(message)
-        self.message = message
-        self.details = details or {}
-
-
-def _to_number(value):
-    """Convert value that may include units to float. Accepts int/float or strings like '1013hPa', '25C'."""
-    if value is None:
-        raise ValueError('missing value')
-    if isinstance(value, (int, float)):
-        return float(value)
-    if isinstance(value, str):
-        # Replace comma decimal, strip non numeric except . -
-        cleaned = re.sub(r'[^0-9+\-\.eE]', '', value.replace(',', '.'))
-        if cleaned.strip() == '':
-            raise ValueError(f'invalid numeric string: {value!r}')
-        return float(cleaned)
-    raise ValueError(f'unsupported type: {type(value).__name__}')
-
-
-def validate_and_normalize(payload, schema):
-    """
-    Validate payload against schema. Schema example:
-    {
-        'pressure': {'type': 'number', 'min': 0, 'max': 2000},
-        'temperature': {'type': 'number', 'min': -50, 'max': 150},
-        'nested': {'type': 'object', 'schema': { 'co2': {'type': 'number', 'min': 0} }}
-    }
-    Returns normalized dict with numbers converted.
-    """
-    errors = {}
-    out = {}
-
-    def _validate(obj, sch, out_dict, path=''):
-        nonlocal errors
-        for key, rule in sch.items():
-            full_key = f"{path}.{key}" if path else key
-            if rule.get('type') == 'object':
-                sub_schema = rule.get('schema', {})
-                value = (obj or {}).get(key)
-                if value is None:
-                    errors[full_key] = 'required field missing'
-                    continue
-                if not isinstance(value, dict):
-                    errors[full_key] = 'must be an object'
-                    continue
-                out_dict[key] = {}
-                _validate(value, sub_schema, out_dict[key], full_key)
-            else:
-                value = (obj or {}).get(key)
-                if value is None:
-                    errors[full_key] = 'required field missing'
-                    continue
-                try:
-                    if rule.get('type') == 'number':
-                        num = _to_number(value)
-                        if 'min' in rule and num < rule['min']:
-                            raise ValueError(f'below minimum {rule["min"]}')
-                        if 'max' in rule and num > rule['max']:
-                            raise ValueError(f'above maximum {rule["max"]}')
-                        out_dict[key] = num
-                    elif rule.get('type') == 'string':
-                        out_dict[key] = str(value)
-                    else:
-                        out_dict[key] = value
-                except ValueError as e:
-                    errors[full_key] = str(e)
-
-    _validate(payload, schema, out)
-    if errors:
-        raise ValidationError('validation failed', errors)
-    return out
-
 # Schemas per endpoint
 SCHEMA_DATA = {
     'pressure': {'type': 'number', 'min': 0, 'max': 2000},   # hPa
@@ -304,73 +517,28 @@ SCHEMA_DATA4 = {
     }},
 }
 
-# Tolerant extractor for /data4 that accepts nested or flat payloads and partial data
-def _tolerant_extract_data4(payload: dict) -> dict:
-    def getp(d, keys, default=None):
-        cur = d
-        for k in keys:
-            if not isinstance(cur, dict):
-                return default
-            cur = cur.get(k)
-        return cur if cur is not None else default
-
-    def first_of(*candidates):
-        for c in candidates:
-            if c is not None and c != "":
-                return c
-        return None
-
-    # Try both nested and flat keys
-    co2_raw = first_of(
-        getp(payload, ['mh_z19', 'co2']),
-        payload.get('co2'),
-        payload.get('co2_ppm')
-    )
-    analog_raw = first_of(
-        getp(payload, ['mq_2', 'analog_value']),
-        payload.get('analog_value'),
-        payload.get('mq2_analog')
-    )
-    voltage_raw = first_of(
-        getp(payload, ['mq_2', 'voltage']),
-        payload.get('voltage'),
-        payload.get('mq2_voltage')
-    )
-    ds18_raw = first_of(
-        getp(payload, ['ds18b20', 'temperature']),
-        payload.get('ds18b20_temperature'),
-        payload.get('temperature_ds18b20')
-    )
-    dht_t_raw = first_of(
-        getp(payload, ['dht11', 'temperature']),
-        payload.get('dht11_temperature'),
-        payload.get('temperature_dht11')
-    )
-    dht_h_raw = first_of(
-        getp(payload, ['dht11', 'humidity']),
-        payload.get('dht11_humidity'),
-        payload.get('humidity_dht11')
-    )
-
-    # Normalize numbers but stay tolerant
-    def norm(v):
-        try:
-            return _to_number(v)
-        except Exception:
-            return None
-
-    result = {
-        'co2': norm(co2_raw),
-        'analog_value': norm(analog_raw),
-        'voltage': norm(voltage_raw),
-        'temperature_ds18b20': norm(ds18_raw),
-        'temperature_dht11': norm(dht_t_raw),
-        'humidity_dht11': norm(dht_h_raw),
-    }
-    return result
+# Compiled once at import; routes call these directly
+VALIDATORS = {
+    'data': compile_schema(SCHEMA_DATA),
+    'data2': compile_schema(SCHEMA_DATA2),
+    'data3': compile_schema(SCHEMA_DATA3),
+    'data4': compile_schema(SCHEMA_DATA4),
+}
+
+# Tolerant extractor for /data4 that accepts nested or flat payloads and partial data;
+# only used when the strict validator rejects a payload
+_tolerant_extract_data4 = compile_extractor({
+    'co2': (('mh_z19', 'co2'), ('co2',), ('co2_ppm',)),
+    'analog_value': (('mq_2', 'analog_value'), ('analog_value',), ('mq2_analog',)),
+    'voltage': (('mq_2', 'voltage'), ('voltage',), ('mq2_voltage',)),
+    'temperature_ds18b20': (('ds18b20', 'temperature'), ('ds18b20_temperature',), ('temperature_ds18b20',)),
+    'temperature_dht11': (('dht11', 'temperature'), ('dht11_temperature',), ('temperature_dht11',)),
+    'humidity_dht11': (('dht11', 'humidity'), ('dht11_humidity',), ('humidity_dht11',)),
+})
 
 def enqueue_csv(file_path: str, columns: list, row: dict) -> bool:
     """Enqueue a CSV write job. Returns True if enqueued, False if queue is full."""
+    _start_writer_once()
     job = {
         'file_path': file_path,
         'columns': columns,
@@ -406,7 +574,7 @@ def handle_data():
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     payload = request.get_json(silent=True) or {}
     try:
-        normalized = validate_and_normalize(payload, SCHEMA_DATA)
+        normalized = VALIDATORS['data'](payload)
         # Build row with fixed columns
         row_data = {
             "current_time": timestamp,
@@ -414,8 +582,7 @@ def handle_data():
             "Tempereture": f"{normalized['temperature']}",
         }
         enq_ok = enqueue_csv(CSV_PICODATA, COLUMNS_PICODATA, row_data)
-        request_history.append({'endpoint': 'data', 'timestamp': timestamp, 'data': normalized})
-        last_received['data'] = datetime.now()
+        _record_request('data', timestamp, normalized)
         if not enq_ok:
             return jsonify({"status": "queued_failed"}), 503
         logger.info(f"/data OK enqueued pressure={normalized['pressure']} temperature={normalized['temperature']} queue_size={write_queue.qsize()}")
@@ -433,7 +600,7 @@ def handle_data2():
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     payload = request.get_json(silent=True) or {}
     try:
-        normalized = validate_and_normalize(payload, SCHEMA_DATA2)
+        normalized = VALIDATORS['data2'](payload)
         row_data = {
             "current_time": timestamp,
             "CO2": f"{normalized['co2']}",
@@ -443,8 +610,7 @@ def handle_data2():
             "GasResistance": f"{normalized['gas_res']}",
         }
         enq_ok = enqueue_csv(CSV_BEDROOM, COLUMNS_BEDROOM, row_data)
-        request_history.append({'endpoint': 'data2', 'timestamp': timestamp, 'data': normalized})
-        last_received['data2'] = datetime.now()
+        _record_request('data2', timestamp, normalized)
         if not enq_ok:
             return jsonify({"status": "queued_failed"}), 503
         logger.info(f"/data2 OK enqueued co2={normalized['co2']} temp={normalized['temperature']} hum={normalized['humidity']} queue_size={write_queue.qsize()}")
@@ -462,7 +628,7 @@ def handle_data3():
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     payload = request.get_json(silent=True) or {}
     try:
-        normalized = validate_and_normalize(payload, SCHEMA_DATA3)
+        normalized = VALIDATORS['data3'](payload)
         row_data = {
             "current_time": timestamp,
             "Temperature-outside": f"{normalized['temperature']}",
@@ -471,8 +637,7 @@ def handle_data3():
             "GasResistance-outside": f"{normalized['gas_res']}",
         }
         enq_ok = enqueue_csv(CSV_OUTSIDE, COLUMNS_OUTSIDE, row_data)
-        request_history.append({'endpoint': 'data3', 'timestamp': timestamp, 'data': normalized})
-        last_received['data3'] = datetime.now()
+        _record_request('data3', timestamp, normalized)
         if not enq_ok:
             return jsonify({"status": "queued_failed"}), 503
         logger.info(f"/data3 OK enqueued temp={normalized['temperature']} hum={normalized['humidity']} queue_size={write_queue.qsize()}")
@@ -501,7 +666,7 @@ def handle_data4():
             payload = {}
     try:
         # Strict path first
-        normalized = validate_and_normalize(payload, SCHEMA_DATA4)
+        normalized = VALIDATORS['data4'](payload)
         row_data = {
             "current_time": timestamp,
             "CO2": f"{normalized['mh_z19']['co2']}",
@@ -512,8 +677,7 @@ def handle_data4():
             "Humidity_DHT11": f"{normalized['dht11']['humidity']}"
         }
         enq_ok = enqueue_csv(CSV_LR, COLUMNS_LR, row_data)
-        request_history.append({'endpoint': 'data4', 'timestamp': timestamp, 'data': normalized})
-        last_received['data4'] = datetime.now()
+        _record_request('data4', timestamp, normalized)
         if not enq_ok:
             return jsonify({"status": "queued_failed"}), 503
         logger.info(f"/data4 OK enqueued co2={normalized['mh_z19']['co2']} analog={normalized['mq_2']['analog_value']} V={normalized['mq_2']['voltage']} queue_size={write_queue.qsize()}")
@@ -531,8 +695,7 @@ def handle_data4():
             "Humidity_DHT11": "" if tolerant['humidity_dht11'] is None else f"{tolerant['humidity_dht11']}"
         }
         enq_ok = enqueue_csv(CSV_LR, COLUMNS_LR, row_data)
-        request_history.append({'endpoint': 'data4', 'timestamp': timestamp, 'data': payload, 'note': 'tolerant_fallback'})
-        last_received['data4'] = datetime.now()
+        _record_request('data4', timestamp, payload, note='tolerant_fallback')
         logger.warning(f"/data4 tolerant accept due to validation error: {ve.details}")
         if not enq_ok:
             return jsonify({"status": "queued_failed"}), 503
@@ -584,42 +747,70 @@ def history():
         </table>
     </body>
     </html>
-    """, history=list(request_history), maxlen=HISTORY_MAX)
+    """, history=state.history(), maxlen=HISTORY_MAX)
 
 
 # API to get request history as JSON
 @app.route('/history/json')
 def history_json():
-    return jsonify(list(request_history))
+    return jsonify(state.history())
 
 
 @app.route('/metrics')
 def metrics():
-    """Expose runtime metrics for operators and monitoring."""
-    with metrics_lock:
-        ws = write_success_total
-        we = write_error_total
-    qlen = write_queue.qsize()
+    """Expose runtime metrics for operators and monitoring (summed over all workers)."""
+    _start_writer_once()
+    state.publish_metrics(_local_metrics())
+    snapshots = state.worker_metrics() or [_local_metrics()]
+    totals = _aggregate_metrics(snapshots)
+    received = state.last_received()
     now = datetime.now()
     # compute inactivity seconds per endpoint
     inactivity = {}
-    for ep, ts in last_received.items():
+    for ep, ts in received.items():
         if ts is None:
             inactivity[ep] = None
         else:
             inactivity[ep] = int((now - ts).total_seconds())
     return jsonify({
-        'queue_length': qlen,
+        'queue_length': totals['queue_length'],
         'queue_warn_threshold': QUEUE_WARN_THRESHOLD,
-        'write_success_total': ws,
-        'write_error_total': we,
-        'last_received': {k: (v.strftime('%Y-%m-%d %H:%M:%S') if v else None) for k, v in last_received.items()},
+        'write_success_total': totals['write_success_total'],
+        'write_error_total': totals['write_error_total'],
+        'write_batch_size': totals['write_batch_size'],
+        'fsync_latency_ms': totals['fsync_latency_ms'],
+        'open_csv_handles': totals['open_csv_handles'],
+        'workers': totals['workers'],
+        'last_received': {k: (v.strftime('%Y-%m-%d %H:%M:%S') if v else None) for k, v in received.items()},
         'inactivity_seconds': inactivity,
         'inactivity_warn_threshold_sec': INACTIVITY_WARN_SEC,
     })
 
 
+def _post_fork(server, worker):
+    # Each worker runs its own writer/monitor threads (also started lazily on first request)
+    _start_writer_once()
+
+
 if __name__ == "__main__":
-    logger.info('Starting Flask10X application (threaded dev server)')
-    # Use threaded=True to allow concurrent request handling in development.
-    app.run(host="0.0.0.0", port=PORT, threaded=True)
+    parser = argparse.ArgumentParser(description='Flask10X sensor ingest server')
+    parser.add_argument('--mode', choices=['dev', 'prod'], default='dev',
+                        help='dev: Flask threaded dev server; prod: Gunicorn gthread workers (Waitress fallback)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=2, help='prod: worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='prod: threads per worker')
+    parser.add_argument('--keepalive', type=int, default=5, help='prod: keep-alive seconds')
+    parser.add_argument('--max-connections', type=int, default=100, help='prod: connections per worker')
+    parser.add_argument('--state-db', default=STATE_DB or os.path.join(LOG_DIR, 'flask10x_state.db'),
+                        help='prod with workers>1: SQLite file shared by the workers')
+    args = parser.parse_args()
+
+    if args.mode == 'prod' and args.workers > 1 and not isinstance(state, SQLiteState):
+        state = SQLiteState(args.state_db)
+    logger.info(f'Starting Flask10X application ({args.mode} mode)')
+    if args.mode == 'dev':
+        _start_writer_once()
+    # dev: threaded=True to allow concurrent request handling in development.
+    serve(app, args.host, args.port, mode=args.mode, workers=args.workers, threads=args.threads,
+          keepalive=args.keepalive, max_connections=args.max_connections, post_fork=_post_fork)
@@ -0,0 +1,199 @@
+"""
+Micro-benchmark for Flask10X payload validation
+
+1) Validator only: the previous recursive validator (kept below as a reference) vs the
+   compiled validators in schema_validation.py, per endpoint, for well-formed JSON numbers,
+   strings with units, and the /data4 tolerant fallback. Outputs are checked for equality first.
+2) End to end: POSTs per second per endpoint through the Flask test client (no sockets),
+   with CSV output going to a temporary FLASK10X_DATA_DIR.
+
+Usage:
+  python3 bench_validation_flask10x.py --seconds 1.0
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+
+PAYLOADS = {
+    'data': {'pressure': 1013.2, 'temperature': 24.8},
+    'data2': {'co2': 612, 'temperature': 24.1, 'humidity': 48.5, 'pressure': 1012.9, 'gas_res': 152000},
+    'data3': {'temperature': 18.4, 'humidity': 71.0, 'pressure': 1012.5, 'gas_res': 98000},
+    'data4': {'mh_z19': {'co2': 655}, 'mq_2': {'analog_value': 21000, 'voltage': 1.05},
+              'ds18b20': {'temperature': 23.9}, 'dht11': {'temperature': 24.0, 'humidity': 50.0}},
+}
+UNIT_PAYLOADS = {
+    'data': {'pressure': '1013.2hPa', 'temperature': '24,8C'},
+    'data2': {'co2': '612ppm', 'temperature': '24.1', 'humidity': '48.5%', 'pressure': '1012.9', 'gas_res': '152000'},
+}
+TOLERANT_PAYLOAD = {'co2_ppm': '655', 'mq2_analog': 21000, 'voltage': '1.05V', 'dht11_temperature': 24.0}
+
+
+# ---- reference: previous per-request recursive validator ----
+def _legacy_to_number(value):
+    if value is None:
+        raise ValueError('missing value')
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        cleaned = re.sub(r'[^0-9+\-\.eE]', '', value.replace(',', '.'))
+        if cleaned.strip() == '':
+            raise ValueError(f'invalid numeric string: {value!r}')
+        return float(cleaned)
+    raise ValueError(f'unsupported type: {type(value).__name__}')
+
+
+def _legacy_validate(payload, schema):
+    errors = {}
+    out = {}
+
+    def _validate(obj, sch, out_dict, path=''):
+        for key, rule in sch.items():
+            full_key = f"{path}.{key}" if path else key
+            value = (obj or {}).get(key)
+            if rule.get('type') == 'object':
+                if value is None:
+                    errors[full_key] = 'required field missing'
+                    continue
+                if not isinstance(value, dict):
+                    errors[full_key] = 'must be an object'
+                    continue
+                out_dict[key] = {}
+                _validate(value, rule.get('schema', {}), out_dict[key], full_key)
+            else:
+                if value is None:
+                    errors[full_key] = 'required field missing'
+                    continue
+                try:
+                    num = _legacy_to_number(value)
+                    if 'min' in rule and num < rule['min']:
+                        raise ValueError(f'below minimum {rule["min"]}')
+                    if 'max' in rule and num > rule['max']:
+                        raise ValueError(f'above maximum {rule["max"]}')
+                    out_dict[key] = num
+                except ValueError as e:
+                    errors[full_key] = str(e)
+
+    _validate(payload, schema, out)
+    if errors:
+        raise ValueError(errors)
+    return out
+
+
+def _legacy_tolerant_data4(payload):
+    def getp(d, keys):
+        cur = d
+        for k in keys:
+            if not isinstance(cur, dict):
+                return None
+            cur = cur.get(k)
+        return cur
+
+    def first_of(*candidates):
+        for c in candidates:
+            if c is not None and c != "":
+                return c
+        return None
+
+    def norm(v):
+        try:
+            return _legacy_to_number(v)
+        except Exception:
+            return None
+
+    return {
+        'co2': norm(first_of(getp(payload, ['mh_z19', 'co2']), payload.get('co2'), payload.get('co2_ppm'))),
+        'analog_value': norm(first_of(getp(payload, ['mq_2', 'analog_value']), payload.get('analog_value'),
+                                      payload.get('mq2_analog'))),
+        'voltage': norm(first_of(getp(payload, ['mq_2', 'voltage']), payload.get('voltage'),
+                                 payload.get('mq2_voltage'))),
+        'temperature_ds18b20': norm(first_of(getp(payload, ['ds18b20', 'temperature']),
+                                             payload.get('ds18b20_temperature'),
+                                             payload.get('temperature_ds18b20'))),
+        'temperature_dht11': norm(first_of(getp(payload, ['dht11', 'temperature']), payload.get('dht11_temperature'),
+                                           payload.get('temperature_dht11'))),
+        'humidity_dht11': norm(first_of(getp(payload, ['dht11', 'humidity']), payload.get('dht11_humidity'),
+                                        payload.get('humidity_dht11'))),
+    }
+
+
+def _rate(fn, seconds: float) -> float:
+    n, batch = 0, 200
+    t_end = time.perf_counter() + seconds
+    t0 = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            fn()
+        n += batch
+        if time.perf_counter() >= t_end:
+            return n / (time.perf_counter() - t0)
+
+
+def bench_validators(f10, seconds: float):
+    schemas = {'data': f10.SCHEMA_DATA, 'data2': f10.SCHEMA_DATA2,
+               'data3': f10.SCHEMA_DATA3, 'data4': f10.SCHEMA_DATA4}
+    cases = [(ep, 'numbers', p) for ep, p in PAYLOADS.items()] + [(ep, 'units', p) for ep, p in UNIT_PAYLOADS.items()]
+    print(f"{'endpoint':<8} {'payload':<9} {'legacy/s':>12} {'compiled/s':>12} {'speedup':>8}")
+    for ep, label, payload in cases:
+        assert f10.VALIDATORS[ep](payload) == _legacy_validate(payload, schemas[ep]), (ep, label)
+        old = _rate(lambda: _legacy_validate(payload, schemas[ep]), seconds)
+        new = _rate(lambda: f10.VALIDATORS[ep](payload), seconds)
+        print(f"{ep:<8} {label:<9} {old:>12,.0f} {new:>12,.0f} {new / old:>7.2f}x")
+
+    assert f10._tolerant_extract_data4(TOLERANT_PAYLOAD) == _legacy_tolerant_data4(TOLERANT_PAYLOAD)
+
+    def old_miss():
+        try:
+            _legacy_validate(TOLERANT_PAYLOAD, f10.SCHEMA_DATA4)
+        except ValueError:
+            _legacy_tolerant_data4(TOLERANT_PAYLOAD)
+
+    def new_miss():
+        try:
+            f10.VALIDATORS['data4'](TOLERANT_PAYLOAD)
+        except f10.ValidationError:
+            f10._tolerant_extract_data4(TOLERANT_PAYLOAD)
+
+    old, new = _rate(old_miss, seconds), _rate(new_miss, seconds)
+    print(f"{'data4':<8} {'tolerant':<9} {old:>12,.0f} {new:>12,.0f} {new / old:>7.2f}x")
+
+
+def bench_endpoints(f10, seconds: float):
+    client = f10.app.test_client()
+    print(f"\n{'endpoint':<8} {'requests/s':>12}")
+    for ep, payload in PAYLOADS.items():
+        with client.post(f'/{ep}', json=payload) as resp:
+            assert resp.status_code == 200, (ep, resp.status_code, resp.get_json())
+
+        def post():
+            # close() releases the ConcurrencyLimit slot, as a real server does
+            client.post(f'/{ep}', json=payload).close()
+
+        rate = _rate(post, seconds)
+        print(f"/{ep:<7} {rate:>12,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flask10X validation micro-benchmark')
+    parser.add_argument('--seconds', type=float, default=1.0, help='time per measurement')
+    parser.add_argument('--skip-endpoints', action='store_true', help='validator timings only')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ['FLASK10X_DATA_DIR'] = data_dir
+        os.environ.pop('FLASK10X_STATE_DB', None)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import Flask10X as f10
+        f10.logger.setLevel(logging.WARNING)  # per-request INFO lines would dominate the timings
+
+        bench_validators(f10, args.seconds)
+        if not args.skip_endpoints:
+            bench_endpoints(f10, args.seconds)
+        f10.write_queue.join()  # let the writer finish before the temp dir goes away
+
+
+if __name__ == '__main__':
+    main()
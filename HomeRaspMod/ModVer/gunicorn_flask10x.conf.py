@@ -0,0 +1,18 @@
+# Gunicorn settings for Flask10X (used by flask10x.service)
+#   gunicorn -c gunicorn_flask10x.conf.py Flask10X:app
+import os
+
+_here = os.path.dirname(os.path.abspath(__file__))
+
+bind = "0.0.0.0:8888"
+workers = 2                 # processes; Pi 4/5: 2-4
+worker_class = "gthread"
+threads = 4                 # threads per worker
+worker_connections = 100    # open connections per worker (keep-alive included)
+keepalive = 5               # seconds an idle keep-alive connection is held
+backlog = 64
+timeout = 30
+graceful_timeout = 30
+
+# History / last-received / metrics shared by the workers (see SQLiteState in Flask10X.py)
+raw_env = [f"FLASK10X_STATE_DB={os.path.join(_here, 'logs', 'flask10x_state.db')}"]
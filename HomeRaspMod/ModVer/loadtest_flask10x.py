@@ -0,0 +1,181 @@
+"""
+Load test for Flask10X ingest endpoints (standard library only)
+
+- Each client thread keeps one HTTP/1.1 keep-alive connection and POSTs valid payloads
+  round-robin to /data, /data2, /data3 and /data4
+- Reports throughput, p50/p95/p99 latency, 503 (busy/queue full) and error counts
+
+Usage:
+  # against a running server
+  python3 loadtest_flask10x.py --url http://localhost:8888 --concurrency 16 --requests 4000
+  # start dev and prod servers on spare ports (CSV output to a temp dir) and compare
+  python3 loadtest_flask10x.py --compare --workers 2 --threads 4
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from urllib.parse import urlparse
+
+PAYLOADS = [
+    ('/data', {'pressure': 1013.2, 'temperature': 24.8}),
+    ('/data2', {'co2': 612, 'temperature': 24.1, 'humidity': 48.5, 'pressure': 1012.9, 'gas_res': 152000}),
+    ('/data3', {'temperature': 18.4, 'humidity': 71.0, 'pressure': 1012.5, 'gas_res': 98000}),
+    ('/data4', {'mh_z19': {'co2': 655}, 'mq_2': {'analog_value': 21000, 'voltage': 1.05},
+                'ds18b20': {'temperature': 23.9}, 'dht11': {'temperature': 24.0, 'humidity': 50.0}}),
+]
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    k = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run_load(url: str, concurrency: int, total_requests: int) -> dict:
+    parsed = urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+    bodies = [(path, json.dumps(body).encode()) for path, body in PAYLOADS]
+    headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+    latencies = []
+    counts = {'ok': 0, 'busy': 0, 'error': 0}
+    lock = threading.Lock()
+    per_client = total_requests // concurrency
+
+    def client(idx):
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        local_lat = []
+        local = {'ok': 0, 'busy': 0, 'error': 0}
+        for i in range(per_client):
+            path, body = bodies[(idx + i) % len(bodies)]
+            for attempt in range(2):
+                t0 = time.perf_counter()
+                try:
+                    conn.request('POST', path, body=body, headers=headers)
+                    resp = conn.getresponse()
+                    resp.read()
+                    local_lat.append(time.perf_counter() - t0)
+                    if resp.status == 200:
+                        local['ok'] += 1
+                    elif resp.status == 503:
+                        local['busy'] += 1
+                    else:
+                        local['error'] += 1
+                    if resp.getheader('Connection', '').lower() == 'close':
+                        conn.close()
+                    break
+                except (http.client.HTTPException, OSError):
+                    # Server closed an idle keep-alive connection: reconnect once
+                    conn.close()
+                    conn = http.client.HTTPConnection(host, port, timeout=10)
+                    if attempt == 1:
+                        local['error'] += 1
+        conn.close()
+        with lock:
+            latencies.extend(local_lat)
+            for k, v in local.items():
+                counts[k] += v
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    t_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t_start
+    latencies.sort()
+    done = counts['ok'] + counts['busy'] + counts['error']
+    return {
+        'requests': done,
+        'elapsed_s': elapsed,
+        'throughput_rps': done / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        **counts,
+    }
+
+
+def _wait_healthy(url: str, timeout: float = 20.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/healthz', timeout=1) as r:
+                if r.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def _start_server(mode: str, port: int, data_dir: str, workers: int, threads: int) -> subprocess.Popen:
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, FLASK10X_DATA_DIR=data_dir)
+    env.pop('FLASK10X_STATE_DB', None)
+    cmd = [sys.executable, os.path.join(here, 'Flask10X.py'), '--mode', mode, '--host', '127.0.0.1',
+           '--port', str(port), '--workers', str(workers), '--threads', str(threads),
+           '--state-db', os.path.join(data_dir, f'state_{mode}.db')]
+    return subprocess.Popen(cmd, cwd=here, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _print_result(label: str, r: dict):
+    print(f"{label:<6} {r['requests']:>7} req  {r['throughput_rps']:>8.1f} req/s  "
+          f"p50 {r['p50_ms']:>7.2f} ms  p95 {r['p95_ms']:>7.2f} ms  p99 {r['p99_ms']:>7.2f} ms  "
+          f"503 {r['busy']}  err {r['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flask10X load test')
+    parser.add_argument('--url', default='http://localhost:8888')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--compare', action='store_true', help='start dev and prod servers and compare them')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--base-port', type=int, default=18888)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    if not args.compare:
+        result = run_load(args.url, args.concurrency, args.requests)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            _print_result('target', result)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        for offset, mode in enumerate(('dev', 'prod')):
+            port = args.base_port + offset
+            url = f'http://127.0.0.1:{port}'
+            proc = _start_server(mode, port, data_dir, args.workers, args.threads)
+            try:
+                if not _wait_healthy(url):
+                    print(f"{mode}: server did not become healthy", file=sys.stderr)
+                    continue
+                run_load(url, args.concurrency, min(200, args.requests))  # warm-up
+                results[mode] = run_load(url, args.concurrency, args.requests)
+            finally:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"concurrency={args.concurrency} requests={args.requests} workers={args.workers} threads={args.threads}")
+    for mode, r in results.items():
+        _print_result(mode, r)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Schema validation compiled once at import time
+
+- compile_schema(): turns a schema dict into a validator function; rules (bounds, error labels,
+                    dotted keys) are resolved up front into a flat field table, and plain int/float
+                    values skip string cleaning entirely
+- compile_extractor(): tolerant lookup table (alternative key paths per field) for partial payloads
+- to_number(): plain float() for numeric strings, unit/comma cleaning for the rest ('1013hPa', '25,1C')
+
+Schema example:
+    {
+        'pressure': {'type': 'number', 'min': 0, 'max': 2000},
+        'device_id': {'type': 'string', 'choices': ['P2', 'P3']},
+        'nested': {'type': 'object', 'schema': {'co2': {'type': 'number', 'min': 0}}}
+    }
+
+RPi_Development01/ForZero/Ver2.20zeroOne/p1_softwareV4/schema_validation.py is a copy of this file
+for the P1 tree, which is deployed on its own; change this file and copy it over.
+"""
+import math
+import re
+
+_NON_NUMERIC = re.compile(r'[^0-9+\-\.eE]')
+
+_NUMBER, _STRING, _OBJECT, _ANY = range(4)
+_KINDS = {'number': _NUMBER, 'string': _STRING, 'object': _OBJECT}
+
+
+class ValidationError(Exception):
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.message = message
+        self.details = details or {}
+
+
+def to_number(value):
+    """Convert value that may include units to float. Accepts int/float or strings like '1013hPa', '25C'."""
+    if value is None:
+        raise ValueError('missing value')
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        if value[-1:].isdigit():  # '1013.2' parses as-is; '1013hPa', '25C' go straight to cleaning
+            try:
+                num = float(value)
+                if math.isfinite(num):
+                    return num
+            except ValueError:
+                pass
+        # Replace comma decimal, strip non numeric except . -
+        cleaned = _NON_NUMERIC.sub('', value.replace(',', '.'))
+        if cleaned.strip() == '':
+            raise ValueError(f'invalid numeric string: {value!r}')
+        return float(cleaned)
+    raise ValueError(f'unsupported type: {type(value).__name__}')
+
+
+def _strict_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'invalid number: {value!r}')
+
+
+def _compile_fields(schema: dict, path: str, convert) -> tuple:
+    fields = []
+    for key, rule in schema.items():
+        full_key = f"{path}.{key}" if path else key
+        kind = _KINDS.get(rule.get('type'), _ANY)
+        if kind == _OBJECT:
+            extra = _compile_fields(rule.get('schema', {}), full_key, convert)
+        elif kind == _NUMBER:
+            extra = (rule.get('min'), rule.get('max'), convert)
+        elif kind == _STRING and 'choices' in rule:
+            extra = frozenset(rule['choices'])
+        else:
+            extra = None
+        fields.append((key, full_key, kind, extra))
+    return tuple(fields)
+
+
+def _run_fields(fields: tuple, obj: dict, out: dict, errors: dict):
+    for key, full_key, kind, extra in fields:
+        value = obj.get(key)
+        if value is None:
+            errors[full_key] = 'required field missing'
+            continue
+        if kind == _NUMBER:
+            lo, hi, convert = extra
+            # Fast path: JSON numbers need no conversion beyond float()
+            if type(value) is float or type(value) is int:
+                num = float(value)
+            else:
+                try:
+                    num = convert(value)
+                except ValueError as e:
+                    errors[full_key] = str(e)
+                    continue
+            # Negated comparisons so NaN fails bounded fields
+            if lo is not None and not num >= lo:
+                errors[full_key] = f'below minimum {lo}'
+            elif hi is not None and not num <= hi:
+                errors[full_key] = f'above maximum {hi}'
+            else:
+                out[key] = num
+        elif kind == _OBJECT:
+            if not isinstance(value, dict):
+                errors[full_key] = 'must be an object'
+                continue
+            sub = out[key] = {}
+            _run_fields(extra, value, sub, errors)
+        elif kind == _STRING:
+            text = str(value)
+            if extra is not None and text not in extra:
+                errors[full_key] = f'not one of {sorted(extra)}'
+            else:
+                out[key] = text
+        else:
+            out[key] = value
+
+
+def compile_schema(schema: dict, units: bool = True):
+    """Compile `schema` into validator(payload) -> normalized dict, raising ValidationError on failure.
+
+    units=False converts numbers with plain float() (no '25C' style unit stripping).
+    """
+    fields = _compile_fields(schema, '', to_number if units else _strict_number)
+
+    def validator(payload):
+        out = {}
+        errors = {}
+        _run_fields(fields, payload if isinstance(payload, dict) else {}, out, errors)
+        if errors:
+            raise ValidationError('validation failed', errors)
+        return out
+
+    return validator
+
+
+def compile_extractor(paths: dict):
+    """Compile {'field': (('nested', 'key'), ('flat_key',), ...)} into extract(payload) -> {'field': float|None}.
+
+    The first non-empty candidate wins; values that do not convert become None.
+    """
+    table = tuple((field, tuple(tuple(p) for p in candidates)) for field, candidates in paths.items())
+
+    def extract(payload):
+        if not isinstance(payload, dict):
+            payload = {}
+        result = {}
+        for field, candidates in table:
+            raw = None
+            for path in candidates:
+                cur = payload
+                for k in path:
+                    cur = cur.get(k) if isinstance(cur, dict) else None
+                if cur is not None and cur != "":
+                    raw = cur
+                    break
+            try:
+                result[field] = to_number(raw)
+            except (ValueError, TypeError):
+                result[field] = None
+        return result
+
+    return extract
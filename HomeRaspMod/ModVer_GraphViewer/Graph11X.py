@@ -1,5 +1,10 @@
+import io
+import itertools
 import os
 import re
+import csv
+import shutil
+import threading
 import time
 import logging
 from typing import Dict, List, Optional, Tuple
@@ -20,9 +25,12 @@ Highlights vs Graph10X:
 - Expanded alias sets and suffix variants (_outside, _ds18b20, _inside).
 - Absolute humidity auto-derivation from prioritized temp/RH column pairs.
 - Duplicate header and blank row removal strengthened.
-- Incremental read cache; normalization reapplied after merges.
+- Incremental read cache: only bytes appended since the last complete line are parsed and normalized.
 - Resampling rules use lower-case ("s", "min", "h").
 - Detailed logging with drop-rate threshold emphasis.
+- Live view keeps one figure: lines are updated with set_data and only changed axes are blitted.
+- Downsampling and gas normalization (expanding mean) are maintained incrementally per dataset,
+  so a refresh costs O(new rows) instead of O(history).
 
 Usage:
   python Graph11X.py
@@ -51,6 +59,7 @@ MAX_POINTS = 2000         # target max points per line for plotting (auto downsa
 AGG_METHOD = 'mean'       # 'mean'|'median'|'min'|'max'
 USE_PARQUET = False       # optional fast IO sidecar
 USE_FEATHER = False       # optional fast IO sidecar (exclusive with parquet)
+SIDECAR_MAX_PARTS = 64    # compact sidecar parts into one beyond this count
 PLOT_REFRESH_SEC = 80
 DROP_WARN_THRESHOLD = 0.10  # 10%
 
@@ -133,6 +142,18 @@ NUMERIC_COLS = {
 
 # Cache for incremental reads
 _FILE_CACHE: Dict[str, Dict] = {}
+# One lock per file: an incremental read (offset -> read -> append) must not interleave with another
+# on the same cache entry (Graph11X_Web serves requests from several threads)
+_FILE_LOCKS: Dict[str, threading.RLock] = {}
+_FILE_LOCKS_GUARD = threading.Lock()
+
+
+def _file_lock(file_path: str) -> threading.RLock:
+    with _FILE_LOCKS_GUARD:
+        lock = _FILE_LOCKS.get(file_path)
+        if lock is None:
+            lock = _FILE_LOCKS[file_path] = threading.RLock()
+        return lock
 
 # =========================
 # Helpers: normalization & parsing
@@ -351,13 +372,80 @@ def range_check(df: pd.DataFrame) -> Dict[str, int]:
 # =========================
 
 def _sidecar_path(csv_path: str) -> str:
+    """Sidecar directory of normalized parts (one part appended per incremental read)."""
     if USE_PARQUET:
-        return os.path.splitext(csv_path)[0] + '.parquet'
+        return os.path.splitext(csv_path)[0] + '.parquet.d'
     if USE_FEATHER:
-        return os.path.splitext(csv_path)[0] + '.feather'
+        return os.path.splitext(csv_path)[0] + '.feather.d'
     return ''
 
 
+def _sidecar_parts(sidecar: str) -> List[Tuple[int, str]]:
+    """Sorted (end_offset, path) of the sidecar parts; each part covers the CSV bytes up to end_offset."""
+    parts: List[Tuple[int, str]] = []
+    if not os.path.isdir(sidecar):
+        return parts
+    for name in os.listdir(sidecar):
+        m = re.match(r'part-(\d+)\.(parquet|feather)$', name)
+        if m:
+            parts.append((int(m.group(1)), os.path.join(sidecar, name)))
+    return sorted(parts)
+
+
+def _sidecar_load(sidecar: str, size: int) -> Tuple[Optional[pd.DataFrame], int]:
+    """Return (normalized frame, CSV byte offset it covers), or (None, 0) if missing/stale."""
+    parts = _sidecar_parts(sidecar)
+    if not parts:
+        return None, 0
+    end = parts[-1][0]
+    if end > size:
+        # CSV was truncated or replaced since the sidecar was written
+        shutil.rmtree(sidecar, ignore_errors=True)
+        return None, 0
+    frames = [pd.read_parquet(p) if USE_PARQUET else pd.read_feather(p) for _, p in parts]
+    df = pd.concat(frames, ignore_index=True)
+    return df.set_index(df.columns[0]), end
+
+
+def _sidecar_write(sidecar: str, df: pd.DataFrame, end: int, replace: bool = False) -> None:
+    """Write df as the part ending at byte `end`; replace=True drops the other parts (compaction)."""
+    old_parts = _sidecar_parts(sidecar) if replace else []
+    os.makedirs(sidecar, exist_ok=True)
+    ext = 'parquet' if USE_PARQUET else 'feather'
+    path = os.path.join(sidecar, f"part-{end:012d}.{ext}")
+    tmp = path + '.tmp'
+    if USE_PARQUET:
+        df.reset_index().to_parquet(tmp, index=False)
+    else:
+        df.reset_index().to_feather(tmp)
+    os.replace(tmp, path)
+    for _, p in old_parts:
+        if p != path:
+            os.remove(p)
+
+
+def _read_header(file_path: str) -> Tuple[bytes, List[str]]:
+    """Raw header line and its column names (empty while the header line is incomplete)."""
+    with open(file_path, 'rb') as f:
+        line = f.readline()
+    if not line.endswith(b'\n'):
+        return b'', []
+    columns = next(csv.reader([line.decode('utf-8-sig').rstrip('\r\n')]), [])
+    return line, columns
+
+
+def _read_complete_lines(file_path: str, offset: int) -> Tuple[bytes, int]:
+    """Bytes from offset up to the last newline, and the offset after it.
+    A partial trailing line (writer mid-append) is left for the next read."""
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n')
+    if end < 0:
+        return b'', offset
+    return data[:end + 1], offset + end + 1
+
+
 def _drop_duplicate_headers_and_blank(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
     """Drop duplicate header rows and all-blank rows."""
     before = len(df)
@@ -437,88 +525,160 @@ def _normalize_pipeline(df: pd.DataFrame, date_column_original: str, file_path:
     return df
 
 
-def _read_csv_incremental(file_path: str, date_column: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+_GENERATIONS = itertools.count(1)
+
+
+class FrameChunks:
+    """Normalized rows of one CSV as a list of appended chunks.
+    - Appending does not copy the history; adjacent chunks are merged only when the newer one has
+      grown as large as the one before it, so each row is copied O(log n) times overall
+    - frame() concatenates everything once and keeps the result as the single chunk
+    - generation changes when existing rows change position (reload, late rows re-sorted), so
+      readers that remember a row count know to start over
+    """
+
+    def __init__(self, df: Optional[pd.DataFrame] = None):
+        self.chunks: List[pd.DataFrame] = [df] if df is not None and not df.empty else []
+        self.rows = sum(len(c) for c in self.chunks)
+        self.generation = next(_GENERATIONS)
+
+    @property
+    def empty(self) -> bool:
+        return self.rows == 0
+
+    @property
+    def last_ts(self) -> pd.Timestamp:
+        return self.chunks[-1].index[-1]
+
+    def append(self, df_new: pd.DataFrame) -> None:
+        if df_new.empty:
+            return
+        if self.chunks and df_new.index[0] < self.last_ts:
+            # Late rows (clock adjustments, back-filled data)
+            self.chunks = [pd.concat(self.chunks + [df_new]).sort_index(kind='mergesort')]
+            self.generation = next(_GENERATIONS)
+        else:
+            self.chunks.append(df_new)
+            while len(self.chunks) > 1 and len(self.chunks[-2]) <= len(self.chunks[-1]):
+                self.chunks[-2:] = [pd.concat(self.chunks[-2:])]
+        self.rows += len(df_new)
+
+    def frame(self) -> pd.DataFrame:
+        if not self.chunks:
+            return pd.DataFrame()
+        if len(self.chunks) > 1:
+            self.chunks = [pd.concat(self.chunks)]
+        return self.chunks[0]
+
+    def since(self, start: int) -> pd.DataFrame:
+        """Rows from position start on; only the chunks holding them are concatenated."""
+        parts: List[pd.DataFrame] = []
+        end = self.rows
+        for chunk in reversed(self.chunks):
+            if end <= start:
+                break
+            begin = end - len(chunk)
+            parts.append(chunk.iloc[max(0, start - begin):])
+            end = begin
+        if not parts:
+            return self.chunks[-1].iloc[:0] if self.chunks else pd.DataFrame()
+        return parts[0] if len(parts) == 1 else pd.concat(parts[::-1])
+
+
+def _read_csv_incremental(file_path: str, date_column: str, usecols: Optional[List[str]] = None,
+                          ah_label: Optional[str] = None) -> pd.DataFrame:
+    """Whole normalized frame of a CSV (see _read_csv_chunks)."""
+    # frame() consolidates the shared chunks, so it runs under the same per-file lock
+    with _file_lock(file_path):
+        return _read_csv_chunks(file_path, date_column, usecols, ah_label).frame()
+
+
+def _read_csv_chunks(file_path: str, date_column: str, usecols: Optional[List[str]] = None,
+                     ah_label: Optional[str] = None) -> FrameChunks:
     """Incremental CSV reader with caching and robust normalization.
-    - Uses file size/mtime and previous row count to only read appended rows when possible.
-    - Always applies normalization pipeline after loading/merging.
-    - Uses optional parquet/feather sidecar on full reloads.
+    - Remembers the byte offset after the last complete line and parses only bytes appended since;
+      a partial trailing line is picked up on the next call once it is complete.
+    - Only the new slice goes through the normalization pipeline (and, with ah_label, absolute
+      humidity derivation) and is appended to the cached FrameChunks; history is not copied.
+    - A changed header or a file shorter than the cached offset (rotation) triggers a full reload.
+    - Optional parquet/feather sidecar: one part is appended per read and parts are compacted
+      into one when they exceed SIDECAR_MAX_PARTS; a full reload resumes from the sidecar's offset.
+    - Serialized per file (_file_lock), so concurrent callers never append the same slice twice.
     """
+    with _file_lock(file_path):
+        return _read_csv_chunks_locked(file_path, date_column, usecols, ah_label)
+
+
+def _read_csv_chunks_locked(file_path: str, date_column: str, usecols: Optional[List[str]],
+                            ah_label: Optional[str]) -> FrameChunks:
     st = os.stat(file_path)
     size, mtime = st.st_size, st.st_mtime
     cache = _FILE_CACHE.get(file_path)
 
-    # unchanged -> return cached df
+    # unchanged -> return cached chunks
     if cache and cache.get('mtime') == mtime and cache.get('size') == size:
-        return cache['df']
-
-    sidecar = _sidecar_path(file_path)
-    full_reload = True
-    prev_rows = 0
-    if cache:
-        prev_rows = cache.get('rows', 0)
-        if size > cache.get('size', 0) and prev_rows > 0:
-            full_reload = False
+        return cache['chunks']
 
     # Build usecols (ensure date column included)
     cols = list(usecols) if usecols else None
     if cols and date_column not in cols:
         cols = [date_column] + cols
 
-    if not full_reload:
-        try:
-            df_new = pd.read_csv(
-                file_path,
-                usecols=cols,
-                skiprows=range(1, prev_rows + 1),
-                low_memory=False,
-            )
-        except Exception:
-            df_new = None
-            full_reload = True
-        if df_new is not None and len(df_new) > 0:
-            df_all = pd.concat([cache['raw'].reset_index(drop=True), df_new], ignore_index=True)
-        else:
-            # nothing appended
-            _FILE_CACHE[file_path] = {
-                'df': cache['df'], 'raw': cache['raw'], 'rows': cache['rows'], 'size': size, 'mtime': mtime
-            }
-            return cache['df']
-    if full_reload:
-        if sidecar and os.path.exists(sidecar):
+    sidecar = _sidecar_path(file_path)
+    header, columns = _read_header(file_path)
+
+    if cache and header == cache['header'] and size >= cache['offset']:
+        chunks, offset = cache['chunks'], cache['offset']
+    else:
+        df, offset = None, 0
+        if sidecar and cache:
+            # Rotated/rewritten CSV: the sidecar describes the old file
+            shutil.rmtree(sidecar, ignore_errors=True)
+        elif sidecar and header:
             try:
-                if USE_PARQUET:
-                    df_all = pd.read_parquet(sidecar)
-                elif USE_FEATHER:
-                    df_all = pd.read_feather(sidecar)
+                df, offset = _sidecar_load(sidecar, size)
+            except Exception as e:
+                logger.warning(f"{os.path.basename(file_path)}: sidecar unreadable, rebuilding: {e}")
+                shutil.rmtree(sidecar, ignore_errors=True)
+                df, offset = None, 0
+        if df is None:
+            offset = len(header)
+        elif ah_label:
+            # Sidecars written before the column was derived per slice
+            ensure_absolute_humidity(df, ah_label)
+        chunks = FrameChunks(df)
+
+    start = offset
+    chunk, offset = _read_complete_lines(file_path, offset) if header else (b'', offset)
+    if chunk:
+        df_new = pd.read_csv(io.BytesIO(chunk), header=None, names=columns, usecols=cols, low_memory=False)
+        # Apply normalization pipeline (covers header duplicates, datetime, numeric cleansing, range checks)
+        df_new = _normalize_pipeline(df_new, date_column, file_path)
+        if ah_label:
+            ensure_absolute_humidity(df_new, ah_label)
+        chunks.append(df_new)
+
+        if sidecar and not df_new.empty:
+            try:
+                parts = len(_sidecar_parts(sidecar))
+                if start == len(header) or parts >= SIDECAR_MAX_PARTS:
+                    _sidecar_write(sidecar, chunks.frame(), offset, replace=True)
                 else:
-                    df_all = pd.read_csv(file_path, usecols=cols, low_memory=False)
-            except Exception:
-                df_all = pd.read_csv(file_path, usecols=cols, low_memory=False)
-        else:
-            df_all = pd.read_csv(file_path, usecols=cols, low_memory=False)
-
-    # Apply normalization pipeline (covers header duplicates, datetime, numeric cleansing, range checks)
-    df_norm = _normalize_pipeline(df_all, date_column, file_path)
-
-    # Update sidecar on full reload for faster subsequent loads
-    if full_reload and sidecar:
-        try:
-            if USE_PARQUET:
-                df_norm.reset_index().to_parquet(sidecar, index=False)
-            elif USE_FEATHER:
-                df_norm.reset_index().to_feather(sidecar)
-        except Exception:
-            pass
+                    _sidecar_write(sidecar, df_new, offset)
+            except Exception as e:
+                # A missing part would leave a gap, so drop the sidecar and rebuild on the next full load
+                logger.warning(f"{os.path.basename(file_path)}: sidecar update failed: {e}")
+                shutil.rmtree(sidecar, ignore_errors=True)
 
     # Update cache
     _FILE_CACHE[file_path] = {
-        'df': df_norm,
-        'raw': df_all,
-        'rows': len(df_all),
+        'chunks': chunks,
+        'header': header,
+        'offset': offset,
         'size': size,
         'mtime': mtime,
     }
-    return df_norm
+    return chunks
 
 # =========================
 # Analytics
@@ -562,6 +722,16 @@ def _auto_resample_rule(index: pd.DatetimeIndex, max_points: int) -> Optional[st
     return f"{sec_per_point}s"  # lower-case as requested
 
 
+def _aggregate(resampler, agg: str) -> pd.DataFrame:
+    if agg == 'median':
+        return resampler.median()
+    if agg == 'min':
+        return resampler.min()
+    if agg == 'max':
+        return resampler.max()
+    return resampler.mean()
+
+
 def resample_downsample(df: pd.DataFrame, max_points: int = MAX_POINTS, agg: str = AGG_METHOD,
                         reference_index: Optional[pd.DatetimeIndex] = None) -> Tuple[pd.DataFrame, float]:
     original_points = len(df)
@@ -571,142 +741,311 @@ def resample_downsample(df: pd.DataFrame, max_points: int = MAX_POINTS, agg: str
     if rule is None:
         df_ds = df
     else:
-        if agg == 'median':
-            df_ds = df.resample(rule).median()
-        elif agg == 'min':
-            df_ds = df.resample(rule).min()
-        elif agg == 'max':
-            df_ds = df.resample(rule).max()
-        else:
-            df_ds = df.resample(rule).mean()
+        df_ds = _aggregate(df.resample(rule), agg)
     if reference_index is not None and len(reference_index) > 0:
         df_ds = df_ds.reindex(reference_index, method='nearest')
     compression = (original_points / max(1, len(df_ds))) if len(df_ds) else 1.0
     return df_ds, compression
 
+# =========================
+# Incremental per-dataset state
+# =========================
+
+class StreamState:
+    """Downsampled view of one dataset, updated from appended rows only.
+    - Gas normalization keeps a running sum/count per column instead of expanding() over history
+    - Bins are epoch-anchored with a fixed width, so only the last (open) bin is re-aggregated;
+      the width is doubled (full rebuild) when the bin count would exceed max_points
+    - Only rows past the consumed count are read from the FrameChunks; a new generation (reload,
+      late rows) rebuilds the state
+    """
+
+    def __init__(self, gas_columns: List[str], max_points: int = MAX_POINTS, agg: str = AGG_METHOD):
+        self.gas_columns = list(gas_columns)
+        self.max_points = max_points
+        self.agg = agg
+        self._reset()
+
+    def _reset(self) -> None:
+        self.generation = None
+        self.rows = 0
+        self.bin_seconds = 0      # 0: not binned yet (few rows)
+        self.ds: Optional[pd.DataFrame] = None
+        self.tail: Optional[pd.DataFrame] = None  # source rows of the last (open) bin
+        self.gas_sum: Dict[str, float] = {}
+        self.gas_count: Dict[str, int] = {}
+        self.gas_last_avg: Dict[str, float] = {}
+
+    @property
+    def compression(self) -> float:
+        return self.rows / max(1, len(self.ds)) if self.ds is not None and len(self.ds) else 1.0
+
+    def _normalize_gas(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Append '<col>_norm' = value / mean of all previous values (same as expanding().mean().shift(1))."""
+        rows = rows.copy()
+        for col in self.gas_columns:
+            if col not in rows.columns:
+                continue
+            vals = rows[col].astype(float)
+            csum = self.gas_sum.get(col, 0.0) + vals.fillna(0.0).cumsum()
+            ccount = self.gas_count.get(col, 0) + vals.notna().cumsum()
+            avg = csum / ccount.where(ccount > 0)
+            prev_avg = avg.shift(1)
+            prev_avg.iloc[0] = self.gas_last_avg.get(col, np.nan)
+            rows[col + '_norm'] = vals / prev_avg.fillna(1)
+            self.gas_sum[col] = float(csum.iloc[-1])
+            self.gas_count[col] = int(ccount.iloc[-1])
+            self.gas_last_avg[col] = float(avg.iloc[-1])
+        return rows
+
+    def _bin(self, rows: pd.DataFrame) -> pd.DataFrame:
+        resampler = rows.select_dtypes('number').resample(f"{self.bin_seconds}s", origin='epoch')
+        return _aggregate(resampler, self.agg)
+
+    def _rebuild(self, df: pd.DataFrame) -> None:
+        self.gas_sum, self.gas_count, self.gas_last_avg = {}, {}, {}
+        frame = self._normalize_gas(df)
+        span = (df.index[-1] - df.index[0]).total_seconds()
+        if len(df) <= self.max_points or span <= 0:
+            self.bin_seconds = 0
+            self.ds, self.tail = frame, None
+            return
+        # Start at ~max_points/2 bins so the width only doubles as history doubles
+        self.bin_seconds = max(1, int(2 * span / self.max_points))
+        self.ds = self._bin(frame)
+        self.tail = frame[frame.index >= self.ds.index[-1]]
+
+    def update(self, data: FrameChunks) -> pd.DataFrame:
+        if data.empty:
+            self._reset()
+            return data.frame()
+        if data.generation != self.generation or data.rows < self.rows:
+            self._reset()
+            self.generation = data.generation
+        new = data.since(self.rows)
+        if len(new) == 0:
+            return self.ds
+
+        if self.ds is None:
+            rebuild = True
+        elif self.bin_seconds == 0:
+            rebuild = data.rows > self.max_points
+        else:
+            span = (data.last_ts - self.ds.index[0]).total_seconds()
+            rebuild = span / self.bin_seconds >= self.max_points
+        if rebuild:
+            self._rebuild(data.frame())
+        elif self.bin_seconds == 0:
+            self.ds = pd.concat([self.ds, self._normalize_gas(new)])
+        else:
+            rows = pd.concat([self.tail, self._normalize_gas(new)])
+            binned = self._bin(rows)
+            self.ds = pd.concat([self.ds.iloc[:-1], binned])
+            self.tail = rows[rows.index >= binned.index[-1]]
+        self.rows = data.rows
+        return self.ds
+
 # =========================
 # Plotting
 # =========================
 
-def plot_lines(ax, x_data, y_data_dict, labels, colors, linestyles, ylabel, y_scale=None):
-    for y_key, label, color, linestyle in zip(y_data_dict, labels, colors, linestyles):
-        ax.plot(x_data, y_data_dict[y_key], label=label, color=color, linestyle=linestyle)
-    ax.set_ylabel(ylabel)
-    if y_scale:
-        ax.set_ylim(y_scale)
-    ax.grid(True)
-    ax.legend(loc='best')
+# Datasets in DATA_FILES order
+DATASET_KEYS = ['bed', 'out', 'pico', 'lr', 'bme']
+AH_LABELS = {'bed': 'BedRoom', 'out': 'Outside', 'lr': 'DiningRoom', 'bme': 'Desk'}
+GAS_COLUMNS = {
+    'bed': ['gas_resistance'],
+    'out': ['gas_resistance_outside'],
+    'lr': ['analog_value'],
+    'bme': ['gas_resistance'],
+}
+
+# Subplots: (y_scales key, ylabel, [(dataset, candidate columns, label, color, linestyle), ...])
+PANELS = [
+    ('CO2', 'CO2', [
+        ('bed', ('co2',), 'BedRoom', 'c', 'solid'),
+        ('lr', ('co2',), 'DiningRoom', 'k', 'solid'),
+    ]),
+    ('Temperature', 'Temperature', [
+        ('bed', ('temperature', 'tempereture'), 'BedRoom', 'c', 'solid'),
+        ('out', ('temperature_outside',), 'Outside1', 'r', 'dashed'),
+        ('pico', ('tempereture', 'temperature'), 'Outside2', 'blue', 'solid'),
+        ('lr', ('temperature_ds18b20',), 'DiningRoom Temp.', 'k', 'dotted'),
+        ('bme', ('temperature',), 'Desk', 'blue', 'dashdot'),
+    ]),
+    ('Humidity', 'Humidity', [
+        ('bed', ('humidity',), 'BedRoom', 'c', 'solid'),
+        ('out', ('humidity_outside',), 'Outside', 'r', 'dashed'),
+        ('lr', ('humidity_dht11',), 'Dining', 'k', 'dashdot'),
+        ('bme', ('humidity',), 'Desk', 'blue', 'solid'),
+    ]),
+    ('Pressure', 'Pressure', [
+        ('bed', ('pressure',), 'BedRoom', 'c', 'solid'),
+        ('out', ('pressure_outside',), 'Outside', 'r', 'dashed'),
+        ('bme', ('pressure',), 'Desk', 'blue', 'solid'),
+    ]),
+    ('Absolute Humidity', 'Absolute Humidity (g/m³)', [
+        ('bed', ('absolute_humidity',), 'BedRoom', 'c', 'solid'),
+        ('out', ('absolute_humidity',), 'Outside', 'r', 'dashed'),
+        ('lr', ('absolute_humidity',), 'DiningRoom', 'k', '-.'),
+        ('bme', ('absolute_humidity',), 'Desk', 'blue', 'solid'),
+    ]),
+    ('GasResistance Normalized', 'GasResistance Normalized', [
+        ('bed', ('gas_resistance_norm',), 'BedRoom', 'c', 'solid'),
+        ('out', ('gas_resistance_outside_norm',), 'Outside', 'r', 'dashed'),
+        ('lr', ('analog_value_norm',), 'DiningRoom', 'k', 'solid'),
+        ('bme', ('gas_resistance_norm',), 'Desk', 'blue', 'dotted'),
+    ]),
+]
+
+# Right x-limit headroom (fraction of the visible span) so appends rarely move the axis
+XLIM_HEADROOM = 0.05
+
+
+class LiveRenderer:
+    """Persistent 3x2 figure updated in place.
+    - Axes and lines are created once; each refresh only calls set_data
+    - Lines are animated: static parts (grid, ticks, legend) are cached per axes and only
+      axes whose data changed are restored, redrawn and blitted
+    - Full redraws happen only when limits change (data past the right edge,
+      autoscaled y out of range) or the window is resized
+    """
+
+    def __init__(self, panels, y_scales: Optional[Dict[str, Tuple[float, float]]] = None,
+                 start_time: Optional[str] = None):
+        self.fig, axes = plt.subplots(3, 2, sharex=True)
+        self.axes = list(axes.flat)
+        self.start = mdates.date2num(pd.to_datetime(start_time)) if start_time else None
+        self.autoscale_y: Dict = {}
+        self.lines: Dict = {}  # ax -> [(dataset, columns, Line2D)]
+        self.blit = self.fig.canvas.supports_blit
+        for ax, (scale_key, ylabel, series) in zip(self.axes, panels):
+            entries = []
+            for dataset, columns, label, color, linestyle in series:
+                line, = ax.plot([], [], label=label, color=color, linestyle=linestyle, animated=self.blit)
+                entries.append((dataset, columns, line))
+            self.lines[ax] = entries
+            y_scale = y_scales.get(scale_key) if y_scales else None
+            if y_scale:
+                ax.set_ylim(y_scale)
+            self.autoscale_y[ax] = not y_scale
+            ax.set_ylabel(ylabel)
+            ax.grid(True)
+            ax.legend(loc='best')
+        for ax in self.axes[4:]:
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M:%S'))
+        self.x_left = None
+        self.x_right = None
+        self._backgrounds: Dict = {}
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        plt.show(block=False)
+
+    def _on_draw(self, event) -> None:
+        # Cache each axes without its lines, then put the lines back on the fresh frame
+        canvas = self.fig.canvas
+        if self.blit:
+            self._backgrounds = {ax: canvas.copy_from_bbox(ax.bbox) for ax in self.axes}
+            for ax in self.axes:
+                self._draw_lines(ax)
+
+    def _draw_lines(self, ax) -> None:
+        for _dataset, _columns, line in self.lines[ax]:
+            ax.draw_artist(line)
+
+    def _fit_y(self, ax) -> bool:
+        """Widen an autoscaled y-range to cover the data; returns True if limits changed."""
+        ys = [line.get_ydata() for _d, _c, line in self.lines[ax] if len(line.get_ydata())]
+        if not ys:
+            return False
+        data = np.concatenate(ys)
+        if not np.isfinite(data).any():
+            return False
+        lo, hi = np.nanmin(data), np.nanmax(data)
+        cur_lo, cur_hi = ax.get_ylim()
+        if lo >= cur_lo and hi <= cur_hi:
+            return False
+        margin = (hi - lo) * 0.05 or 1.0
+        ax.set_ylim(lo - margin, hi + margin)
+        return True
+
+    def update(self, x_index: pd.DatetimeIndex, frames: Dict[str, pd.DataFrame]) -> None:
+        if len(x_index) == 0:
+            return
+        x = mdates.date2num(x_index.values)
+        changed = []
+        for ax in self.axes:
+            ax_changed = False
+            for dataset, columns, line in self.lines[ax]:
+                frame = frames.get(dataset)
+                col = next((c for c in columns if frame is not None and c in frame.columns), None)
+                y = frame[col].to_numpy(dtype=float) if col else np.full(len(x), np.nan)
+                old_x, old_y = line.get_xdata(), line.get_ydata()
+                if len(old_x) == len(x) and np.array_equal(old_x, x) and np.array_equal(old_y, y, equal_nan=True):
+                    continue
+                line.set_data(x, y)
+                ax_changed = True
+            if ax_changed:
+                changed.append(ax)
+        if not changed:
+            return
+
+        full = False
+        x_left = self.start if self.start is not None else x[0]
+        if self.x_right is None or x_left != self.x_left or x[-1] > self.x_right:
+            self.x_left = x_left
+            self.x_right = x[-1] + XLIM_HEADROOM * max(x[-1] - x_left, 1.0 / 24)
+            self.axes[0].set_xlim(self.x_left, self.x_right)
+            full = True
+        for ax in changed:
+            if self.autoscale_y[ax] and self._fit_y(ax):
+                full = True
+
+        canvas = self.fig.canvas
+        if full or not self.blit or not self._backgrounds:
+            self.fig.tight_layout()
+            canvas.draw()
+        else:
+            for ax in changed:
+                canvas.restore_region(self._backgrounds[ax])
+                self._draw_lines(ax)
+                canvas.blit(ax.bbox)
+        canvas.flush_events()
 
+    def wait(self, seconds: float) -> None:
+        # Keeps the GUI responsive without plt.pause(), which would force a full redraw
+        self.fig.canvas.start_event_loop(seconds)
 
-def create_subplot(index, row, x_data, y_data_dict, labels, colors, linestyles, ylabel, y_scale=None, sharex=None):
-    ax = plt.subplot(3, 2, index, sharex=sharex)
-    plot_lines(ax, x_data, y_data_dict, labels, colors, linestyles, ylabel, y_scale)
-    if index >= 5:
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M:%S'))
-    return ax
+    def is_open(self) -> bool:
+        return plt.fignum_exists(self.fig.number)
 
 # =========================
 # Main loop
 # =========================
 
 def plot_data(start_time: Optional[str] = None, y_scales: Optional[Dict[str, Tuple[float, float]]] = None):
-    plt.figure()
+    renderer = LiveRenderer(PANELS, y_scales=y_scales, start_time=start_time)
+    states = {key: StreamState(GAS_COLUMNS.get(key, [])) for key in DATASET_KEYS}
 
-    while True:
-        datasets = []
-        for file, date_col in DATA_FILES:
+    while renderer.is_open():
+        t0 = time.perf_counter()
+        frames: Dict[str, pd.DataFrame] = {}
+        for key, (file, date_col) in zip(DATASET_KEYS, DATA_FILES):
             usecols = REQUIRED_COLS.get(file)
-            df = _read_csv_incremental(file, date_col, usecols=usecols)
-            datasets.append(df)
-
-        # Unpack
-        bed_data, out_data, pico_data, lr_data, bme680_data = datasets
-
-        # Absolute humidity per dataset using priority pairs
-        ensure_absolute_humidity(bed_data, 'BedRoom')
-        ensure_absolute_humidity(out_data, 'Outside')
-        ensure_absolute_humidity(lr_data, 'DiningRoom')
-        ensure_absolute_humidity(bme680_data, 'Desk')
-
-        # Downsample and align
-        bed_ds, comp_bed = resample_downsample(bed_data)
-        ref_index = bed_ds.index
-        out_ds, comp_out = resample_downsample(out_data, reference_index=ref_index)
-        pico_ds, comp_pico = resample_downsample(pico_data, reference_index=ref_index)
-        lr_ds, comp_lr = resample_downsample(lr_data, reference_index=ref_index)
-        bme_ds, comp_bme = resample_downsample(bme680_data, reference_index=ref_index)
-
-        logger.info(f"Compression ratios - Bed:{comp_bed:.2f}x Out:{comp_out:.2f}x Pico:{comp_pico:.2f}x LR:{comp_lr:.2f}x BME:{comp_bme:.2f}x")
-
-        plt.clf()
-        x_start = pd.to_datetime(start_time) if start_time else bed_ds.index.min()
-        x_end = bed_ds.index.max()
-
-        # Gas normalization (expanding mean)
-        if 'gas_resistance' in bed_ds.columns:
-            bed_ds['gas_resistance_avg'] = bed_ds['gas_resistance'].expanding().mean()
-            bed_ds['gas_resistance_norm'] = bed_ds['gas_resistance'] / bed_ds['gas_resistance_avg'].shift(1).fillna(1)
-        if 'gas_resistance_outside' in out_ds.columns:
-            out_ds['gas_resistance_avg'] = out_ds['gas_resistance_outside'].expanding().mean()
-            out_ds['gas_resistance_norm'] = out_ds['gas_resistance_outside'] / out_ds['gas_resistance_avg'].shift(1).fillna(1)
-        if 'analog_value' in lr_ds.columns:
-            lr_ds['analog_value_avg'] = lr_ds['analog_value'].expanding().mean()
-            lr_ds['analog_value_norm'] = lr_ds['analog_value'] / lr_ds['analog_value_avg'].shift(1).fillna(1)
-        if 'gas_resistance' in bme_ds.columns:
-            bme_ds['gas_resistance_avg'] = bme_ds['gas_resistance'].expanding().mean()
-            bme_ds['gas_resistance_norm'] = bme_ds['gas_resistance'] / bme_ds['gas_resistance_avg'].shift(1).fillna(1)
-
-        # Subplots
-        ax1 = create_subplot(1, 6, ref_index, {
-            'CO2': bed_ds['co2'] if 'co2' in bed_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'CO2_LR': lr_ds['co2'] if 'co2' in lr_ds.columns else pd.Series(index=ref_index, dtype=float)
-        }, ['BedRoom', 'DiningRoom'], ['c', 'k'], ['solid', 'solid'], 'CO2',
-           y_scales.get('CO2') if y_scales else None)
-
-        ax2 = create_subplot(2, 6, ref_index, {
-            'BedRoom Temperature': (bed_ds['temperature'] if 'temperature' in bed_ds.columns else (bed_ds['tempereture'] if 'tempereture' in bed_ds.columns else pd.Series(index=ref_index, dtype=float))),
-            'Outside Temperature': out_ds['temperature_outside'] if 'temperature_outside' in out_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Outside Temperature-2': pico_ds['tempereture'] if 'tempereture' in pico_ds.columns else (pico_ds['temperature'] if 'temperature' in pico_ds.columns else pd.Series(index=ref_index, dtype=float)),
-            'temp_C_Sensor2': lr_ds['temperature_ds18b20'] if 'temperature_ds18b20' in lr_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Desk_temp': bme_ds['temperature'] if 'temperature' in bme_ds.columns else pd.Series(index=ref_index, dtype=float)
-        }, ['BedRoom', 'Outside1', 'Outside2', 'DiningRoom Temp.', 'Desk'], ['c', 'r', 'blue', 'k', 'blue'],
-           ['solid', 'dashed', 'solid', 'dotted', 'dashdot'], 'Temperature', y_scales.get('Temperature') if y_scales else None, sharex=ax1)
-
-        ax3 = create_subplot(3, 6, ref_index, {
-            'BedRoom Humidity': bed_ds['humidity'] if 'humidity' in bed_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Outside Humidity': out_ds['humidity_outside'] if 'humidity_outside' in out_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Humid_LR': lr_ds['humidity_dht11'] if 'humidity_dht11' in lr_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Desk_humidity': bme_ds['humidity'] if 'humidity' in bme_ds.columns else pd.Series(index=ref_index, dtype=float)
-        }, ['BedRoom', 'Outside', 'Dining', 'Desk'], ['c', 'r', 'k', 'blue'], ['solid', 'dashed', 'dashdot', 'solid'],
-           'Humidity', y_scales.get('Humidity') if y_scales else None, sharex=ax1)
-
-        ax4 = create_subplot(4, 6, ref_index, {
-            'BedRoom Pressure': bed_ds['pressure'] if 'pressure' in bed_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Outside Pressure': out_ds['pressure_outside'] if 'pressure_outside' in out_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Desk_pressure': bme_ds['pressure'] if 'pressure' in bme_ds.columns else pd.Series(index=ref_index, dtype=float)
-        }, ['BedRoom', 'Outside', 'Desk'], ['c', 'r', 'blue'], ['solid', 'dashed', 'solid'], 'Pressure',
-           y_scales.get('Pressure') if y_scales else None, sharex=ax1)
-
-        ax5 = create_subplot(5, 6, ref_index, {
-            'Absolute Humidity - BedRoom': bed_ds['absolute_humidity'] if 'absolute_humidity' in bed_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Absolute Humidity - Outside': out_ds['absolute_humidity'] if 'absolute_humidity' in out_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Absolute Humidity - DiningRoom': lr_ds['absolute_humidity'] if 'absolute_humidity' in lr_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Desk Absolute Humidity': bme_ds['absolute_humidity'] if 'absolute_humidity' in bme_ds.columns else pd.Series(index=ref_index, dtype=float)
-        }, ['BedRoom', 'Outside', 'DiningRoom', 'Desk'], ['c', 'r', 'k', 'blue'], ['solid', 'dashed', '-.', 'solid'],
-           'Absolute Humidity (g/m³)', y_scales.get('Absolute Humidity') if y_scales else None, sharex=ax1)
-
-        ax6 = create_subplot(6, 6, ref_index, {
-            'BedRoom GasResistance Normalized': bed_ds['gas_resistance_norm'] if 'gas_resistance_norm' in bed_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Outside GasResistance Normalized': out_ds['gas_resistance_norm'] if 'gas_resistance_norm' in out_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Gas_LR Normalized': lr_ds['analog_value_norm'] if 'analog_value_norm' in lr_ds.columns else pd.Series(index=ref_index, dtype=float),
-            'Desk_gas Normalized': bme_ds['gas_resistance_norm'] if 'gas_resistance_norm' in bme_ds.columns else pd.Series(index=ref_index, dtype=float)
-        }, ['BedRoom', 'Outside', 'DiningRoom', 'Desk'], ['c', 'r', 'k', 'blue'], ['solid', 'dashed', 'solid', 'dotted'],
-           'GasResistance Normalized', y_scales.get('GasResistance Normalized') if y_scales else None, sharex=ax1)
-
-        plt.xlim(x_start, x_end)
-        plt.tight_layout()
-        plt.draw()
-        plt.pause(PLOT_REFRESH_SEC)
+            # Absolute humidity per dataset using priority pairs (derived on each new slice)
+            chunks = _read_csv_chunks(file, date_col, usecols=usecols, ah_label=AH_LABELS.get(key))
+            frames[key] = states[key].update(chunks)
+
+        # Align every dataset to the BedRoom bins
+        ref_index = frames['bed'].index
+        for key in DATASET_KEYS[1:]:
+            if len(frames[key]) and len(ref_index):
+                frames[key] = frames[key].reindex(ref_index, method='nearest')
+
+        logger.info(
+            "Compression ratios - " + " ".join(f"{k}:{states[k].compression:.2f}x" for k in DATASET_KEYS)
+        )
+        renderer.update(ref_index, frames)
+        logger.debug(f"Refresh took {time.perf_counter() - t0:.3f}s")
+        renderer.wait(PLOT_REFRESH_SEC)
 
 # =========================
 # Smoke tests (minimal regression tests)
@@ -162,12 +162,16 @@ def _jsonify_numpy(obj):
     return obj
 
 
+DATASET_LABELS = ['BedRoom', 'Outside', 'Pico', 'DiningRoom', 'Desk']
+
+
 def _load_all_datasets() -> List[pd.DataFrame]:
-    """Load all CSV datasets using Graph11X robust reader and required columns."""
+    """Load all CSV datasets using Graph11X robust reader and required columns.
+    Absolute humidity is derived by the reader on each newly appended slice where possible."""
     datasets = []
-    for file, date_col in G11.DATA_FILES:
+    for (file, date_col), lbl in zip(G11.DATA_FILES, DATASET_LABELS):
         usecols = G11.REQUIRED_COLS.get(file)
-        df = G11._read_csv_incremental(file, date_col, usecols=usecols)
+        df = G11._read_csv_incremental(file, date_col, usecols=usecols, ah_label=lbl)
         datasets.append(df)
     return datasets
 
@@ -199,10 +203,6 @@ def index():
 def api_parameters():
     try:
         dfs = _load_all_datasets()
-        # Ensure absolute humidity is available where possible
-        labels = ['BedRoom', 'Outside', 'Pico', 'DiningRoom', 'Desk']
-        for df, lbl in zip(dfs, labels):
-            G11.ensure_absolute_humidity(df, lbl)
         # Aggregate available numeric columns across datasets
         params = set()
         for df in dfs:
@@ -235,8 +235,6 @@ def api_graph():
 
         dfs = _load_all_datasets()
         bed, out, pico, lr, bme = dfs
-        for df, lbl in zip(dfs, ['BedRoom', 'Outside', 'Pico', 'DiningRoom', 'Desk']):
-            G11.ensure_absolute_humidity(df, lbl)
 
         # Filter by days
         bed = _filter_days(bed, days)
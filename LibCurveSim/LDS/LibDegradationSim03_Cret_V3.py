@@ -5,6 +5,8 @@ import os
 import csv
 from datetime import datetime
 
+import results_store
+
 # OCV-SOC table from literature
 soc_pts = np.linspace(0, 1, 11)
 ocv_pts = np.array([3.0519,3.6594,3.7167,3.7611,3.7915,3.8275,
@@ -441,6 +443,28 @@ def export_to_csv(results, filename_prefix):
     print(f"CV相データを保存しました: {cv_filename}")
     print(f"各サイクルの詳細データを保存しました (results/{filename_prefix}_cycle*_{timestamp}.csv)")
 
+def export_to_store(results, filename_prefix, params=None):
+    """Export all cycles to one results store file (results/{prefix}_{timestamp}.npz)"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('results', exist_ok=True)
+    filename = f"results/{filename_prefix}_{timestamp}.npz"
+    
+    charge_cols = ('soc', 'capacity', 'voltage', 'current', 'time', 'phase')
+    discharge_cols = ('soc', 'capacity', 'voltage', 'time')
+    curves = {
+        'charge': {col: [r[8 + j] for r in results] for j, col in enumerate(charge_cols)},
+        'discharge': {col: [r[17 + j] for r in results] for j, col in enumerate(discharge_cols)},
+    }
+    scalar_names = ('capacity', 'resistance', 'discharged_capacity', 'retention', 'capacity_degradation_rate',
+                    'resistance_increase_rate', 'retention_degradation_rate')
+    scalars = {name: [r[1 + j] for r in results] for j, name in enumerate(scalar_names)}
+    for j, name in enumerate(('cv_start_time', 'cv_start_capacity', 'cv_start_soc')):
+        scalars[name] = [r[14 + j] for r in results]
+    
+    results_store.save_store(filename, [r[0] for r in results], curves, scalars, params)
+    print(f"全{len(results)}サイクルの結果を保存しました: {filename}")
+    return filename
+
 def get_float_input(prompt, default, min_val=None, max_val=None):
     """Get float input from user with validation"""
     while True:
@@ -549,12 +573,16 @@ def interactive_mode():
     if get_yes_no_input("\nCV充電時の電流プロファイルを表示しますか？", True):
         plot_current_profiles(results)
     
-    # Ask if user wants to export results to CSV
-    if get_yes_no_input("\nシミュレーション結果をCSVファイルに保存しますか？"):
+    # Ask if user wants to save results (one results store file, per-cycle CSVs optional)
+    if get_yes_no_input("\nシミュレーション結果を保存しますか？"):
         filename_prefix = input("ファイル名のプレフィックスを入力してください [sim]: ").strip()
         if filename_prefix == "":
             filename_prefix = "sim"
-        export_to_csv(results, filename_prefix)
+        params = {'Q0': Q0, 'R0': R0, 'A': A, 'B': B, 'C': C, 'D': D, 'c_rate': c_rate,
+                  'v_max': v_max, 'v_min': v_min, 'end_current_ratio': end_current_ratio, 'dt': dt}
+        export_to_store(results, filename_prefix, params)
+        if get_yes_no_input("サイクルごとのCSVファイルにも保存しますか？", False):
+            export_to_csv(results, filename_prefix)
     
     print("\nシミュレーションが完了しました。")
 
@@ -7,6 +7,8 @@ import csv
 import glob
 from datetime import datetime
 
+import results_store
+
 # Note: This program can use pandas for easier data handling if available
 try:
     import pandas as pd
@@ -165,6 +167,53 @@ def load_csv_file(file_path):
             print(f"エラー: ファイル {file_path} の読み込みに失敗しました: {e}")
             return None
 
+def find_store_files(kind='dqdv'):
+    """Find results stores (results/*.npz) that hold curves of the given kind"""
+    stores = []
+    for path in results_store.find_store_files():
+        try:
+            store = results_store.load_store(path)
+        except (OSError, ValueError) as e:
+            print(f"警告: 結果ストア {path} を読み込めません: {e}")
+            continue
+        if results_store.curve_rows(store, kind):
+            stores.append(store)
+    return stores
+
+def load_store_curve(store, row, kind='dqdv'):
+    """Load one dQ/dV curve of a results store in the same form as load_csv_file()"""
+    data = results_store.curve_frame(store, kind, row)
+    if 'Voltage (V)' not in data or 'dQ/dV (Ah/V)' not in data:
+        print(f"警告: {os.path.basename(store.path)} の {kind} 曲線に必要な列がありません。")
+        return None
+    has_current = 'Current (A)' in data
+    has_phase = 'Phase' in data
+    if PANDAS_AVAILABLE:
+        df = pd.DataFrame(data)
+        df['has_current'] = has_current
+        df['has_phase'] = has_phase
+        return df
+    data.update({'columns': list(data), 'has_current': has_current, 'has_phase': has_phase})
+    return data
+
+def select_store_curves(store, kind='dqdv'):
+    """Let the user select cycles of a results store; returns (store, row) sources"""
+    rows = results_store.curve_rows(store, kind)
+    cycles = sorted({int(store.cycles[row]) for row in rows})
+    print(f"\n{os.path.basename(store.path)}: {len(rows)}曲線 (サイクル {cycles[0]}-{cycles[-1]})")
+    text = input("解析するサイクル番号をカンマ区切りで入力してください (空欄: すべて): ").strip()
+    if not text:
+        return [(store, row) for row in rows]
+    try:
+        selected = [int(c.strip()) for c in text.split(',')]
+    except ValueError as e:
+        print(f"サイクル選択エラー: {e}")
+        return []
+    missing = sorted(set(selected) - set(cycles))
+    if missing:
+        print(f"警告: サイクル {', '.join(map(str, missing))} はストアにありません。")
+    return [(store, row) for row in results_store.curve_rows(store, kind, selected)]
+
 def detect_peaks(voltage, dqdv, prominence=0.1, width=None, height=None, distance=None, v_min=None, v_max=None, current=None, phase=None):
     """
     Detect peaks in dQ/dV curve with adjustable parameters, optionally separating by phase
@@ -260,7 +309,7 @@ def detect_peaks(voltage, dqdv, prominence=0.1, width=None, height=None, distanc
     return peak_data, voltage_filtered, dqdv_filtered, current_filtered, phase_filtered
 
 def plot_dqdv_with_peaks(file_paths, prominence=0.1, width=None, height=None, distance=None, v_min=None, v_max=None, show_current=False):
-    """Plot dQ/dV curves with detected peaks, optionally showing current"""
+    """Plot dQ/dV curves of CSV files or (store, row) sources with detected peaks, optionally showing current"""
     if show_current:
         # Two subplots: dQ/dV and current
         fig, axs = plt.subplots(2, 1, figsize=(12, 10))
@@ -272,11 +321,18 @@ def plot_dqdv_with_peaks(file_paths, prominence=0.1, width=None, height=None, di
     all_peak_data = []
     
     for file_path in file_paths:
-        # Extract file info from filename
-        file_name = os.path.basename(file_path)
-        
-        # Load data
-        data = load_csv_file(file_path)
+        if isinstance(file_path, tuple):
+            # Curve of a results store, labelled like the per-curve CSV files
+            store, row = file_path
+            cycle_type = store.scalars['cycle_type'][row] if 'cycle_type' in store.scalars else 'dqdv'
+            file_name = f"{os.path.basename(store.path)}:{cycle_type}_{int(store.cycles[row])}"
+            data = load_store_curve(store, row)
+        else:
+            # Extract file info from filename
+            file_name = os.path.basename(file_path)
+            
+            # Load data
+            data = load_csv_file(file_path)
         if data is None:
             continue
         
@@ -286,8 +342,8 @@ def plot_dqdv_with_peaks(file_paths, prominence=0.1, width=None, height=None, di
             dqdv = data['dQ/dV (Ah/V)'].values
             
             # Check if current and phase data are available
-            has_current = data.get('has_current', False)
-            has_phase = data.get('has_phase', False)
+            has_current = 'Current (A)' in data.columns
+            has_phase = 'Phase' in data.columns
             current = data['Current (A)'].values if has_current else None
             phase = data['Phase'].values if has_phase else None
         else:
@@ -579,19 +635,20 @@ def export_peaks_to_csv(peak_data):
     print(f"ピークデータを保存しました: {output_file}")
 
 def select_files_for_analysis():
-    """Let the user select files for analysis"""
-    # Find dQ/dV files
-    dqdv_files = find_csv_files(pattern="*dqdv*.csv")
+    """Let the user select files (CSV files or results stores) for analysis"""
+    # Find dQ/dV files and dQ/dV results stores
+    dqdv_files = find_csv_files(pattern="*dqdv*.csv") + find_store_files()
     
     # If no dQ/dV files, look for charge/discharge files
     if not dqdv_files:
         print("dQ/dV ファイルが見つかりません。充放電ファイルを検索します。")
         charge_files = find_csv_files(pattern="*charge*.csv")
         discharge_files = find_csv_files(pattern="*discharge*.csv")
+        curve_stores = [os.path.basename(store.path) for store in find_store_files('charge')]
         
-        if not charge_files and not discharge_files:
-            print("解析するCSVファイルが見つかりません。")
-            print("先にシミュレーションを実行してCSVファイルを生成してください。")
+        if not charge_files and not discharge_files and not curve_stores:
+            print("解析するCSVファイルまたは結果ストアが見つかりません。")
+            print("先にシミュレーションを実行して結果を生成してください。")
             print("または LibDegradationSim03_DD_V3.py を実行して dQ/dV データを生成してください。")
             return []
         
@@ -599,6 +656,8 @@ def select_files_for_analysis():
         all_files = charge_files + discharge_files
         for i, file in enumerate(all_files):
             print(f"{i+1}. {os.path.basename(file)}")
+        for name in curve_stores:
+            print(f"- {name} (結果ストア)")
         
         print("\n注意: 充放電ファイルを選択した場合、先に dQ/dV 計算を実行する必要があります。")
         print("このプログラムは dQ/dV データを直接解析することを推奨します。")
@@ -609,7 +668,10 @@ def select_files_for_analysis():
     else:
         print("\n利用可能な dQ/dV ファイル:")
         for i, file in enumerate(dqdv_files):
-            print(f"{i+1}. {os.path.basename(file)}")
+            if isinstance(file, results_store.ResultsStore):
+                print(f"{i+1}. {os.path.basename(file.path)} (結果ストア: {len(file)}曲線)")
+            else:
+                print(f"{i+1}. {os.path.basename(file)}")
     
         # Ask user to select files
         selected_indices = input("\n解析するファイルの番号をカンマ区切りで入力してください (例: 1,3,5): ").strip()
@@ -618,7 +680,14 @@ def select_files_for_analysis():
         
         try:
             indices = [int(idx.strip()) - 1 for idx in selected_indices.split(',')]
-            selected_files = [dqdv_files[idx] for idx in indices if 0 <= idx < len(dqdv_files)]
+            selected_files = []
+            for idx in indices:
+                if not 0 <= idx < len(dqdv_files):
+                    continue
+                if isinstance(dqdv_files[idx], results_store.ResultsStore):
+                    selected_files.extend(select_store_curves(dqdv_files[idx]))
+                else:
+                    selected_files.append(dqdv_files[idx])
             return selected_files
         except Exception as e:
             print(f"ファイル選択エラー: {e}")
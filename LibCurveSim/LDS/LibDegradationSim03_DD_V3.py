@@ -6,6 +6,8 @@ import csv
 import glob
 from datetime import datetime
 
+import results_store
+
 # Note: This program can use pandas for easier data handling if available
 try:
     import pandas as pd
@@ -171,6 +173,52 @@ def load_csv_file(file_path):
             print(f"エラー: ファイル {file_path} の読み込みに失敗しました: {e}")
             return None, False, False, False
 
+def find_store_files(kinds=('charge', 'discharge')):
+    """Find results stores (results/*.npz) that hold at least one of the given curve kinds"""
+    stores = []
+    for path in results_store.find_store_files():
+        try:
+            store = results_store.load_store(path)
+        except (OSError, ValueError) as e:
+            print(f"警告: 結果ストア {path} を読み込めません: {e}")
+            continue
+        if any(kind in store.kinds for kind in kinds):
+            stores.append(store)
+    return stores
+
+def load_store_curve(store, kind, row):
+    """Load one curve of a results store in the same form as load_csv_file()"""
+    data = results_store.curve_frame(store, kind, row)
+    if 'Capacity (Ah)' not in data or 'Voltage (V)' not in data:
+        print(f"警告: {os.path.basename(store.path)} の {kind} 曲線に必要な列がありません。")
+        return None, False, False, False
+    has_current = 'Current (A)' in data
+    has_phase = 'Phase' in data
+    has_time = 'Time (s)' in data
+    if PANDAS_AVAILABLE:
+        return pd.DataFrame(data), has_current, has_phase, has_time
+    data['columns'] = list(data)
+    return data, has_current, has_phase, has_time
+
+def select_store_curves(store):
+    """Let the user select cycles (and charge/discharge) of a results store; returns (store, kind, row) sources"""
+    cycles = sorted({int(c) for c in store.cycles})
+    print(f"\n{os.path.basename(store.path)}: {len(cycles)}サイクル (サイクル {cycles[0]}-{cycles[-1]})")
+    kinds = [kind for kind in ('charge', 'discharge') if kind in store.kinds]
+    if len(kinds) == 2:
+        choice = get_int_input("曲線の種類 (1: 充電, 2: 放電, 3: 両方)", 1, min_val=1, max_val=3)
+        kinds = kinds if choice == 3 else [kinds[choice - 1]]
+    text = input("解析するサイクル番号をカンマ区切りで入力してください (空欄: 最初と最後のサイクル): ").strip()
+    try:
+        selected = [int(c.strip()) for c in text.split(',')] if text else [cycles[0], cycles[-1]]
+    except ValueError as e:
+        print(f"サイクル選択エラー: {e}")
+        return []
+    missing = sorted(set(selected) - set(cycles))
+    if missing:
+        print(f"警告: サイクル {', '.join(map(str, missing))} はストアにありません。")
+    return [(store, kind, row) for kind in kinds for row in results_store.curve_rows(store, kind, selected)]
+
 def calculate_dqdv(capacity, voltage, smoothing_factor=0.01):
     """Calculate dQ/dV using spline interpolation for smoothing"""
     # Sort data by voltage (important for monotonic interpolation)
@@ -199,7 +247,7 @@ def calculate_dqdv(capacity, voltage, smoothing_factor=0.01):
     return v_fine, dqdv
 
 def plot_dqdv_curves(file_paths, smoothing_factor=0.01, show_capacity=False, show_current=False):
-    """Plot dQ/dV curves for the given files, optionally showing current profiles"""
+    """Plot dQ/dV curves for the given CSV files or (store, kind, row) sources, optionally showing current profiles"""
     if show_capacity and show_current:
         # Three subplots: capacity vs voltage, dQ/dV, and current vs voltage
         fig, axs = plt.subplots(3, 1, figsize=(12, 15))
@@ -214,23 +262,31 @@ def plot_dqdv_curves(file_paths, smoothing_factor=0.01, show_capacity=False, sho
     dqdv_data = []
     
     for file_path in file_paths:
-        # Extract cycle number and charge/discharge info from filename
-        file_name = os.path.basename(file_path)
-        cycle_info = file_name.split('_')
-        cycle_type = "Unknown"
-        cycle_num = "Unknown"
-        
-        for i, part in enumerate(cycle_info):
-            if part.startswith("cycle"):
-                cycle_num = part.replace("cycle", "")
-                if i+1 < len(cycle_info):
-                    if "charge" in cycle_info[i+1]:
-                        cycle_type = "Charge"
-                    elif "discharge" in cycle_info[i+1]:
-                        cycle_type = "Discharge"
-        
-        # Load data
-        data, has_current, has_phase, has_time = load_csv_file(file_path)
+        if isinstance(file_path, tuple):
+            # Curve of a results store
+            store, kind, row = file_path
+            file_name = os.path.basename(store.path)
+            cycle_type = "Charge" if kind == 'charge' else "Discharge"
+            cycle_num = str(int(store.cycles[row]))
+            data, has_current, has_phase, has_time = load_store_curve(store, kind, row)
+        else:
+            # Extract cycle number and charge/discharge info from filename
+            file_name = os.path.basename(file_path)
+            cycle_info = file_name.split('_')
+            cycle_type = "Unknown"
+            cycle_num = "Unknown"
+            
+            for i, part in enumerate(cycle_info):
+                if part.startswith("cycle"):
+                    cycle_num = part.replace("cycle", "")
+                    if i+1 < len(cycle_info):
+                        if "charge" in cycle_info[i+1]:
+                            cycle_type = "Charge"
+                        elif "discharge" in cycle_info[i+1]:
+                            cycle_type = "Discharge"
+            
+            # Load data
+            data, has_current, has_phase, has_time = load_csv_file(file_path)
         if data is None:
             continue
         
@@ -452,21 +508,47 @@ def export_dqdv_to_csv(dqdv_data):
         
         print(f"dQ/dVデータを保存しました: {output_file}")
 
+def export_dqdv_to_store(dqdv_data, smoothing_factor=None):
+    """Export all dQ/dV curves to one results store file (results/dqdv_{timestamp}.npz)"""
+    if not dqdv_data:
+        print("エクスポートするデータがありません。")
+        return None
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('results', exist_ok=True)
+    output_file = f"results/dqdv_{timestamp}.npz"
+    
+    # Curves without a cycle number in their file name are numbered in order
+    cycles = [int(d['cycle_num']) if str(d['cycle_num']).isdigit() else i + 1
+              for i, d in enumerate(dqdv_data)]
+    curves = {'dqdv': {'voltage': [d['voltage'] for d in dqdv_data],
+                       'dqdv': [d['dqdv'] for d in dqdv_data]}}
+    scalars = {'cycle_type': [d['cycle_type'] for d in dqdv_data]}
+    meta = {'source_files': [os.path.basename(d['file']) for d in dqdv_data],
+            'smoothing_factor': smoothing_factor}
+    results_store.save_store(output_file, cycles, curves, scalars, meta)
+    print(f"dQ/dVデータを保存しました: {output_file} ({len(dqdv_data)}曲線)")
+    return output_file
+
 def select_files_for_analysis():
-    """Let the user select files for analysis"""
+    """Let the user select files (CSV files or results stores) for analysis"""
     # Find charge and discharge files
     charge_files = find_csv_files(pattern="*charge*.csv")
     discharge_files = find_csv_files(pattern="*discharge*.csv")
+    stores = find_store_files()
     
-    if not charge_files and not discharge_files:
-        print("解析するCSVファイルが見つかりません。")
-        print("先にシミュレーションを実行してCSVファイルを生成してください。")
+    if not charge_files and not discharge_files and not stores:
+        print("解析するCSVファイルまたは結果ストアが見つかりません。")
+        print("先にシミュレーションを実行して結果を生成してください。")
         return []
     
     print("\n利用可能なファイル:")
-    all_files = charge_files + discharge_files
+    all_files = charge_files + discharge_files + stores
     for i, file in enumerate(all_files):
-        print(f"{i+1}. {os.path.basename(file)}")
+        if isinstance(file, results_store.ResultsStore):
+            print(f"{i+1}. {os.path.basename(file.path)} (結果ストア: {len(file)}サイクル)")
+        else:
+            print(f"{i+1}. {os.path.basename(file)}")
     
     # Ask user to select files
     selected_indices = input("\n解析するファイルの番号をカンマ区切りで入力してください (例: 1,3,5): ").strip()
@@ -475,7 +557,14 @@ def select_files_for_analysis():
     
     try:
         indices = [int(idx.strip()) - 1 for idx in selected_indices.split(',')]
-        selected_files = [all_files[idx] for idx in indices if 0 <= idx < len(all_files)]
+        selected_files = []
+        for idx in indices:
+            if not 0 <= idx < len(all_files):
+                continue
+            if isinstance(all_files[idx], results_store.ResultsStore):
+                selected_files.extend(select_store_curves(all_files[idx]))
+            else:
+                selected_files.append(all_files[idx])
         return selected_files
     except Exception as e:
         print(f"ファイル選択エラー: {e}")
@@ -508,9 +597,11 @@ def main():
     # Calculate and plot dQ/dV curves
     dqdv_data = plot_dqdv_curves(selected_files, smoothing_factor, show_capacity, show_current)
     
-    # Ask if user wants to export dQ/dV data to CSV
-    if dqdv_data and get_yes_no_input("\ndQ/dVデータをCSVファイルに保存しますか？", True):
-        export_dqdv_to_csv(dqdv_data)
+    # Ask if user wants to save dQ/dV data (one results store file, per-curve CSVs optional)
+    if dqdv_data and get_yes_no_input("\ndQ/dVデータを保存しますか？", True):
+        export_dqdv_to_store(dqdv_data, smoothing_factor)
+        if get_yes_no_input("曲線ごとのCSVファイルにも保存しますか？", False):
+            export_dqdv_to_csv(dqdv_data)
     
     print("\n解析が完了しました。")
 
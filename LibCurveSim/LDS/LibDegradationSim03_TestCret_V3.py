@@ -1017,6 +1017,50 @@ def run_capacity_retention_simulation():
                 
                 export_to_csv(cv_profile_data, f"cv_current_profile_cycle{n}_{timestamp}.csv")
 
+def run_parameter_sweep():
+    """Run a parallel parameter sweep (sweep_runner) and save it as one columnar file"""
+    import sweep_runner
+    
+    print("\n===== パラメータスイープ（並列実行） =====")
+    print("指定した各パラメータの全組み合わせについてサイクルシミュレーションを行い、")
+    print("結果を1つのファイル（.npz または .parquet）に保存します。同一条件のシミュレーションは1回だけ実行されます。")
+    
+    axes = {}
+    labels = {
+        'A': ("容量劣化パラメータA", 0.05, 0.2, 3, 0.01, 1.0),
+        'B': ("容量劣化パラメータB", 0.05, 0.05, 1, 0.001, 1.0),
+        'C': ("抵抗増加パラメータC", 0.02, 0.1, 3, 0.001, 1.0),
+        'D': ("抵抗増加パラメータD", 1.0, 1.0, 1, 0.1, 5.0),
+        'c_rate': ("C-レート", 0.2, 1.0, 3, 0.05, None),
+        'R0': ("初期内部抵抗 (Ω)", 0.05, 0.05, 1, 0.001, None),
+    }
+    for name, (label, lo, hi, count, min_val, max_val) in labels.items():
+        if get_yes_no_input(f"{label} をスイープしますか？", count > 1):
+            axes[name] = get_parameter_range(label, lo, hi, max(count, 2), min_val=min_val, max_val=max_val)
+        else:
+            axes[name] = [get_float_input(label, lo, min_val=min_val, max_val=max_val)]
+    axes['Q0'] = [get_float_input("初期容量 (Ah)", 3.0, min_val=0.1)]
+    axes['end_current_ratio'] = [get_float_input("終止電流比率 (C-rateの割合)", 0.05, min_val=0.01, max_val=0.5)]
+    num_cycles = get_int_input("シミュレーションするサイクル数", 50, min_val=1)
+    workers = get_int_input("並列プロセス数", os.cpu_count() or 1, min_val=1)
+    fmt = 'parquet' if get_yes_no_input("Parquet形式で保存しますか？（n: NPZ形式）", False) else 'npz'
+    
+    grid = sweep_runner.build_grid(**axes)
+    print(f"\n{len(grid)} 通りの組み合わせ × {num_cycles} サイクルを実行します...")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_path = os.path.join(ensure_directory("results"), f"sweep_{timestamp}.{fmt}")
+    results = sweep_runner.run_sweep(grid, num_cycles=num_cycles, out_path=out_path, workers=workers,
+                                     cache_path=os.path.join("results", "sweep_cache.npz"))
+    
+    # Final-cycle discharge capacity per grid point (includes the resistance effect, unlike retention)
+    last = results['cycle'] == num_cycles
+    order = np.argsort(results['discharge_ah'][last])
+    print("\n最終サイクルの放電容量（低い順 上位5件）:")
+    for i in order[:5]:
+        params = ", ".join(f"{k}={results[k][last][i]:g}" for k in axes if len(axes[k]) > 1)
+        print(f"  {params}: 維持率 {results['retention'][last][i] * 100:.2f}%, "
+              f"放電容量 {results['discharge_ah'][last][i]:.4f} Ah")
+
 def main():
     """Main function to run the integrated test and capacity retention simulation"""
     print("===== リチウムイオン電池シミュレーション統合ツール (V3) =====")
@@ -1028,9 +1072,10 @@ def main():
         print("\n以下のモードから選択してください:")
         print("1. パラメータテストモード")
         print("2. サイクルシミュレーションモード")
+        print("3. パラメータスイープモード（並列実行）")
         print("0. 終了")
         
-        choice = get_int_input("選択", 0, min_val=0, max_val=2)
+        choice = get_int_input("選択", 0, min_val=0, max_val=3)
         
         if choice == 0:
             break
@@ -1059,6 +1104,9 @@ def main():
         elif choice == 2:
             # Cycle simulation mode
             run_capacity_retention_simulation()
+        elif choice == 3:
+            # Parallel parameter sweep mode
+            run_parameter_sweep()
     
     print("\nプログラムを終了します。")
 
@@ -2,11 +2,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 from scipy.interpolate import interp1d, UnivariateSpline
 
+import cccv_engine
+
 # OCV-SOC table from literature
 soc_pts = np.linspace(0, 1, 11)
 ocv_pts = np.array([3.0519,3.6594,3.7167,3.7611,3.7915,3.8275,
                     3.8772,3.9401,4.0128,4.0923,4.1797])
 ocv_interp = interp1d(soc_pts, ocv_pts, kind='linear', fill_value='extrapolate')
+OCV_TABLE = cccv_engine.OCVTable(soc_pts, ocv_pts)
 
 def ocv_from_soc(soc):
     """Get OCV from SOC using interpolation"""
@@ -15,6 +18,7 @@ def ocv_from_soc(soc):
 def simulate_charge(cap_ah, c_rate, resistance, v_max=4.1797, end_current_ratio=0.05, dt=1.0):
     """
     Simulate battery charging with CC-CV protocol, tracking current during CV phase
+    (vectorized in cccv_engine; cccv_engine.reference_charge keeps the step loop)
     
     Returns:
     - soc_hist: SOC history
@@ -27,65 +31,18 @@ def simulate_charge(cap_ah, c_rate, resistance, v_max=4.1797, end_current_ratio=
     - cv_start_cap: Capacity when CV phase starts
     - cv_start_soc: SOC when CV phase starts
     """
-    dt_h = dt / 3600.0
-    I0 = c_rate * cap_ah
-    soc = 0.0
-    charged = 0.0
-    time = 0.0
-    
-    soc_hist, cap_hist, v_hist = [soc], [0.0], [ocv_from_soc(soc)]
-    i_hist, t_hist, phase_hist = [I0], [0.0], ['CC']
-    
-    I = I0
-    
-    # CC phase
-    while soc < 1.0:
-        V_oc = ocv_from_soc(soc)
-        V_term = V_oc + I * resistance
-        if V_term >= v_max:
-            break
-        
-        soc += (I * dt_h) / cap_ah
-        charged += I * dt_h
-        time += dt
-        
-        soc_hist.append(soc)
-        cap_hist.append(charged)
-        v_hist.append(V_term)
-        i_hist.append(I)
-        t_hist.append(time)
-        phase_hist.append('CC')
-    
-    # Record CV phase start
-    cv_start_time = time
-    cv_start_cap = charged
-    cv_start_soc = soc
-    
-    # CV phase
-    while soc < 1.0:
-        V_oc = ocv_from_soc(soc)
-        I = max((v_max - V_oc) / resistance, 0.0)
-        if I <= end_current_ratio * I0:
-            break
-        
-        soc += (I * dt_h) / cap_ah
-        charged += I * dt_h
-        time += dt
-        
-        soc_hist.append(soc)
-        cap_hist.append(charged)
-        v_hist.append(v_max)
-        i_hist.append(I)
-        t_hist.append(time)
-        phase_hist.append('CV')
-    
-    return (np.array(soc_hist), np.array(cap_hist), np.array(v_hist), 
-            np.array(i_hist), np.array(t_hist), np.array(phase_hist),
-            cv_start_time, cv_start_cap, cv_start_soc)
+    res = cccv_engine.simulate_charge(cap_ah, c_rate, resistance, v_max=v_max,
+                                      end_current_ratio=end_current_ratio, dt=dt, table=OCV_TABLE)
+    return _charge_tuple(res)
+
+def _charge_tuple(res):
+    ch = res['charge']
+    return (ch['soc'], ch['capacity'], ch['voltage'], ch['current'], ch['time'], ch['phase'],
+            float(res['cv_start_time']), float(res['cv_start_capacity']), float(res['cv_start_soc']))
 
 def simulate_discharge(cap_ah, c_rate, resistance, v_min=3.0519, dt=1.0):
     """
-    Simulate battery discharging
+    Simulate battery discharging (vectorized in cccv_engine)
     
     Returns:
     - soc_hist: SOC history
@@ -93,29 +50,8 @@ def simulate_discharge(cap_ah, c_rate, resistance, v_min=3.0519, dt=1.0):
     - v_hist: Voltage history
     - i_hist: Current history
     """
-    dt_h = dt / 3600.0
-    I = c_rate * cap_ah
-    soc = 1.0
-    discharged = 0.0
-    
-    soc_hist, cap_hist, v_hist = [soc], [0.0], [ocv_from_soc(soc)]
-    i_hist = [I]
-    
-    while soc > 0.0:
-        V_oc = ocv_from_soc(soc)
-        V_term = V_oc - I * resistance
-        if V_term <= v_min:
-            break
-        
-        soc -= (I * dt_h) / cap_ah
-        discharged += I * dt_h
-        
-        soc_hist.append(soc)
-        cap_hist.append(discharged)
-        v_hist.append(V_term)
-        i_hist.append(I)
-    
-    return np.array(soc_hist), np.array(cap_hist), np.array(v_hist), np.array(i_hist)
+    d = cccv_engine.simulate_discharge(cap_ah, c_rate, resistance, v_min=v_min, dt=dt, table=OCV_TABLE)
+    return d['soc'], d['capacity'], d['voltage'], d['current']
 
 # degradation models
 def capacity_after_cycle(n, Q0=3.0, A=0.1, B=0.05):
@@ -136,20 +72,16 @@ def run_all_cycles(num_cycles=50, c_rate=0.5, end_current_ratio=0.05):
        discharge_capacity, discharge_voltage, discharge_current,
        cv_start_time, cv_start_cap, cv_start_soc)
     """
+    # All cycles are simulated together (one batched CC search, CV passes shared across cycles)
+    cycles = np.arange(1, num_cycles+1)
+    batch = cccv_engine.simulate_cycles(capacity_after_cycle(cycles), resistance_after_cycle(cycles),
+                                        c_rate, end_current_ratio=end_current_ratio, table=OCV_TABLE)
+    
     results = []
-    for n in range(1, num_cycles+1):
-        cap_n = capacity_after_cycle(n)
-        res_n = resistance_after_cycle(n)
-        
-        # Simulate charge with enhanced CV current tracking
-        soc_c, cap_c, v_c, i_c, t_c, phase_c, cv_start_time, cv_start_cap, cv_start_soc = simulate_charge(
-            cap_n, c_rate, res_n, end_current_ratio=end_current_ratio
-        )
-        
-        # Simulate discharge
-        soc_d, cap_d, v_d, i_d = simulate_discharge(cap_n, c_rate, res_n)
-        
-        results.append((n, cap_c, v_c, i_c, t_c, phase_c, cap_d, v_d, i_d, 
+    for n, res in zip(cycles, batch):
+        soc_c, cap_c, v_c, i_c, t_c, phase_c, cv_start_time, cv_start_cap, cv_start_soc = _charge_tuple(res)
+        d = res['discharge']
+        results.append((int(n), cap_c, v_c, i_c, t_c, phase_c, d['capacity'], d['voltage'], d['current'],
                         cv_start_time, cv_start_cap, cv_start_soc))
     
     return results
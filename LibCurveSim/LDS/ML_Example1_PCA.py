@@ -1,14 +1,18 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d, UnivariateSpline
+from scipy.interpolate import UnivariateSpline
 import os
 import csv
 import glob
+import argparse
 from datetime import datetime
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 import matplotlib.cm as cm
 
+import results_store
+import streaming_ml
+
 # Try to import pandas for easier data handling
 try:
     import pandas as pd
@@ -59,46 +63,32 @@ def load_dqdv_data(file_path):
             print(f"Error reading {file_path}: {e}")
             return None, None
 
+def load_dqdv_store(file_path, v_min=3.0, v_max=4.2, num_points=500):
+    """Load all cycles of a results store as dQ/dV curves on a common voltage grid"""
+    store = results_store.load_store(file_path)
+    # Stored dQ/dV curves when present, else dQ/dV derived from the charge curves
+    kind = next((k for k in store.kinds if k.startswith('dqdv')), 'charge')
+    if kind not in store.kinds:
+        print(f"Warning: {file_path} has neither dQ/dV nor charge curves.")
+        return None, None, None
+    return results_store.dqdv_on_grid(store, kind, v_min, v_max, num_points)
+
 def interpolate_to_common_grid(voltage_arrays, dqdv_arrays, v_min=3.0, v_max=4.2, num_points=500):
-    """Interpolate all dQ/dV curves to a common voltage grid"""
+    """Interpolate all dQ/dV curves to a common voltage grid (one vectorized pass)"""
     common_voltage = np.linspace(v_min, v_max, num_points)
-    interpolated_dqdvs = []
+    voltage = np.concatenate([np.asarray(v, dtype=float) for v in voltage_arrays])
+    dqdv = np.concatenate([np.asarray(d, dtype=float) for d in dqdv_arrays])
+    row = np.repeat(np.arange(len(voltage_arrays)), [len(v) for v in voltage_arrays])
     
-    for voltage, dqdv in zip(voltage_arrays, dqdv_arrays):
-        # Filter out NaN values
-        valid_indices = ~np.isnan(dqdv)
-        if sum(valid_indices) < 2:  # Need at least 2 points for interpolation
-            continue
-            
-        voltage_filtered = voltage[valid_indices]
-        dqdv_filtered = dqdv[valid_indices]
-        
-        # Sort by voltage (important for interpolation)
-        sort_idx = np.argsort(voltage_filtered)
-        voltage_filtered = voltage_filtered[sort_idx]
-        dqdv_filtered = dqdv_filtered[sort_idx]
-        
-        # Limit to the voltage range we're interested in
-        mask = (voltage_filtered >= v_min) & (voltage_filtered <= v_max)
-        if sum(mask) < 2:  # Need at least 2 points in range
-            continue
-            
-        voltage_filtered = voltage_filtered[mask]
-        dqdv_filtered = dqdv_filtered[mask]
-        
-        # Create interpolation function
-        interp_func = interp1d(voltage_filtered, dqdv_filtered, 
-                              kind='linear', bounds_error=False, fill_value=np.nan)
-        
-        # Interpolate to common grid
-        interpolated_dqdv = interp_func(common_voltage)
-        
-        # Replace any remaining NaNs with zeros
-        interpolated_dqdv = np.nan_to_num(interpolated_dqdv, nan=0.0)
-        
-        interpolated_dqdvs.append(interpolated_dqdv)
+    # Keep valid points inside the voltage range we're interested in
+    mask = ~np.isnan(voltage) & ~np.isnan(dqdv) & (voltage >= v_min) & (voltage <= v_max)
+    voltage, dqdv, row = voltage[mask], dqdv[mask], row[mask]
+    counts = np.bincount(row, minlength=len(voltage_arrays))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
     
-    return common_voltage, np.array(interpolated_dqdvs)
+    # Outside a curve's range dQ/dV is zero; curves with fewer than 2 points are skipped
+    interpolated = results_store.interp_ragged(voltage, dqdv, offsets, common_voltage, outside=0.0)
+    return common_voltage, interpolated[counts >= 2]
 
 def perform_pca_analysis(dqdv_matrix, n_components=3):
     """Perform PCA on the dQ/dV curves"""
@@ -115,16 +105,16 @@ def perform_pca_analysis(dqdv_matrix, n_components=3):
     
     return pca, principal_components, explained_variance
 
-def plot_pca_results(voltage, pca, principal_components, cycle_numbers, explained_variance):
+def plot_pca_results(voltage, components, principal_components, cycle_numbers, explained_variance):
     """Plot PCA results including components and variance explained"""
-    n_components = pca.n_components_
+    n_components = len(components)
     
     plt.figure(figsize=(15, 10))
     
     # Plot the principal components (loadings)
     plt.subplot(2, 2, 1)
     for i in range(n_components):
-        plt.plot(voltage, pca.components_[i], label=f'PC{i+1}')
+        plt.plot(voltage, components[i], label=f'PC{i+1}')
     plt.xlabel('Voltage (V)')
     plt.ylabel('Loading')
     plt.title('Principal Components (Loadings)')
@@ -181,17 +171,14 @@ def extract_cycle_number(filename):
     except:
         return 0
 
-def main():
-    print("===== dQ/dV Curve Feature Extraction using PCA =====")
-    print("This program analyzes dQ/dV curves from multiple cycles using Principal Component Analysis.")
-    
-    # Find dQ/dV files
+def load_dqdv_csv_files():
+    """Load the per-cycle dQ/dV CSV files and interpolate them to a common voltage grid"""
     print("\nSearching for dQ/dV data files...")
     dqdv_files = find_csv_files()
     
     if not dqdv_files:
         print("No dQ/dV files found. Please run LibDegradationSim03_DD.py first to generate dQ/dV data.")
-        return
+        return None, None, None
     
     print(f"Found {len(dqdv_files)} dQ/dV files.")
     
@@ -210,15 +197,30 @@ def main():
     
     if not voltage_arrays:
         print("Failed to load any valid dQ/dV data.")
-        return
+        return None, None, None
     
     # Interpolate to common voltage grid
     print("\nInterpolating dQ/dV curves to common voltage grid...")
     common_voltage, dqdv_matrix = interpolate_to_common_grid(voltage_arrays, dqdv_arrays)
+    return common_voltage, dqdv_matrix, cycle_numbers
+
+def load_and_fit(store_files):
+    """Load every cycle into one dQ/dV matrix (newest results store, else CSV files) and fit PCA"""
+    if store_files:
+        store_path = store_files[-1]
+        print(f"\nLoading results store {os.path.basename(store_path)}...")
+        common_voltage, dqdv_matrix, cycle_numbers = load_dqdv_store(store_path)
+        if dqdv_matrix is None:
+            return None, None, None, None, None
+        print(f"Loaded {dqdv_matrix.shape[0]} cycles.")
+    else:
+        common_voltage, dqdv_matrix, cycle_numbers = load_dqdv_csv_files()
+        if dqdv_matrix is None:
+            return None, None, None, None, None
     
     if dqdv_matrix.shape[0] == 0:
         print("Failed to interpolate dQ/dV curves.")
-        return
+        return None, None, None, None, None
     
     print(f"Successfully interpolated {dqdv_matrix.shape[0]} dQ/dV curves.")
     
@@ -226,6 +228,53 @@ def main():
     print("\nPerforming Principal Component Analysis...")
     n_components = min(3, dqdv_matrix.shape[0])  # Use at most 3 components
     pca, principal_components, explained_variance = perform_pca_analysis(dqdv_matrix, n_components)
+    return common_voltage, pca, principal_components, cycle_numbers, explained_variance
+
+def run_streaming_pca(store_path, n_components=3, chunk_size=streaming_ml.DEFAULT_CHUNK,
+                      save_model=None, load_model=None):
+    """Fit (or load) an IncrementalPCA model chunk by chunk and project every cycle of the store"""
+    if load_model:
+        analyzer = streaming_ml.StreamingAnalyzer.load(load_model)
+        analyzer.chunk_size = chunk_size
+        print(f"Loaded model {load_model} (fitted on {analyzer.n_samples} cycles).")
+    else:
+        analyzer = streaming_ml.StreamingAnalyzer(n_components=n_components, n_clusters=0,
+                                                  chunk_size=chunk_size).fit(store_path)
+        if save_model:
+            analyzer.save(save_model)
+            print(f"Model saved to {save_model}")
+    result = analyzer.transform(store_path)
+    return (analyzer.voltage, analyzer, result['principal_components'], result['cycles'],
+            analyzer.explained_variance_ratio)
+
+def main():
+    parser = argparse.ArgumentParser(description='dQ/dV curve feature extraction using PCA')
+    parser.add_argument('--streaming', action='store_true',
+                        help='fit chunk by chunk (IncrementalPCA) from the newest results store')
+    parser.add_argument('--chunk-size', type=int, default=streaming_ml.DEFAULT_CHUNK, help='cycles per chunk')
+    parser.add_argument('--save-model', default=None, help='save the streaming model to this .npz')
+    parser.add_argument('--load-model', default=None, help='project with a saved streaming model instead of fitting')
+    args = parser.parse_args()
+    
+    print("===== dQ/dV Curve Feature Extraction using PCA =====")
+    print("This program analyzes dQ/dV curves from multiple cycles using Principal Component Analysis.")
+    
+    # A results store holds every cycle in one file; per-cycle CSV files are the fallback
+    store_files = results_store.find_store_files()
+    if args.streaming or args.load_model:
+        if not store_files:
+            print("Streaming mode needs a results store in results/. Please save simulation results first.")
+            return
+        print(f"\nStreaming PCA over results store {os.path.basename(store_files[-1])}...")
+        common_voltage, pca, principal_components, cycle_numbers, explained_variance = run_streaming_pca(
+            store_files[-1], chunk_size=args.chunk_size, save_model=args.save_model, load_model=args.load_model)
+        components = pca.components
+    else:
+        common_voltage, pca, principal_components, cycle_numbers, explained_variance = load_and_fit(store_files)
+        if pca is None:
+            return
+        components = pca.components_
+    n_components = len(components)
     
     # Print explained variance
     print("\nExplained variance by principal component:")
@@ -235,7 +284,7 @@ def main():
     
     # Plot results
     print("\nPlotting PCA results...")
-    plot_pca_results(common_voltage, pca, cycle_numbers, explained_variance)
+    plot_pca_results(common_voltage, components, principal_components, cycle_numbers, explained_variance)
     
     # Save PCA model and results
     print("\nSaving PCA results...")
@@ -250,7 +299,7 @@ def main():
         header = ['Voltage'] + [f'PC{i+1}' for i in range(n_components)]
         writer.writerow(header)
         for i, v in enumerate(common_voltage):
-            row = [v] + [pca.components_[j][i] for j in range(n_components)]
+            row = [v] + [components[j][i] for j in range(n_components)]
             writer.writerow(row)
     
     # Save transformed data
@@ -108,10 +108,10 @@ class AnalysisTab:
     
     def setup_analysis_controls(self):
         """Set up the analysis control widgets."""
-        # Smoothing factor
-        ttk.Label(self.analysis_frame, text="スムージング係数:").grid(row=0, column=0, sticky=tk.W, pady=2)
-        self.smoothing_var = tk.DoubleVar(value=0.01)
-        ttk.Entry(self.analysis_frame, textvariable=self.smoothing_var, width=10).grid(row=0, column=1, sticky=tk.W, pady=2)
+        # Savitzky-Golay window for the batch dQ/dV engine (grid points); the only smoothing control
+        ttk.Label(self.analysis_frame, text="SG窓幅 (点):").grid(row=0, column=0, sticky=tk.W, pady=2)
+        self.sg_window_var = tk.IntVar(value=21)
+        ttk.Entry(self.analysis_frame, textvariable=self.sg_window_var, width=10).grid(row=0, column=1, sticky=tk.W, pady=2)
         
         # Recalculate button
         self.recalculate_button = ttk.Button(
@@ -316,45 +316,98 @@ class AnalysisTab:
             self.update_plot()
     
     def recalculate_dqdv(self):
-        """Recalculate dQ/dV curves with new smoothing factor."""
+        """
+        Recalculate dQ/dV curves and peak tracks for all cycles.
+        
+        The batch engine runs in a worker process; the result is picked up by polling from
+        the Tk event loop, so the UI stays responsive for hundreds of cycles.
+        """
         if self.app.simulation_results is None and self.dqdv_data is None:
             messagebox.showinfo("情報", "再計算するデータがありません。")
             return
         
         try:
-            # Get smoothing factor
-            smoothing_factor = self.smoothing_var.get()
+            # Get smoothing window
+            window = self.sg_window_var.get()
             
             # Check if we have simulation results
             if self.app.simulation_results is not None:
+                results = self.app.simulation_results
+                if isinstance(results, dict):
+                    # BatterySimulator.run_all_cycles() format
+                    results = results.get('cycle_results', [])
+                
                 # Extract charge data
                 charge_data = {}
-                for result in self.app.simulation_results:
+                for result in results:
                     cycle = result['cycle']
                     charge_data[cycle] = {
                         'capacity': result['charge']['capacity'],
                         'voltage': result['charge']['voltage']
                     }
+                if not charge_data:
+                    messagebox.showinfo("情報", "再計算するデータがありません。")
+                    return
                 
-                # Recalculate dQ/dV curves
-                self.dqdv_data = self.app.processor.process_charge_discharge_data(
-                    charge_data, smoothing_factor=smoothing_factor
+                # Recalculate dQ/dV curves and track peaks in the worker process
+                future = self.app.processor.submit_dqdv_batch(
+                    charge_data, window=window, **self._peak_options()
                 )
-                
-                # Update cycle selection
-                self._update_cycle_selection()
-                
-                # Detect peaks
-                self.detect_peaks()
-                
+                self.recalculate_button.config(state=tk.DISABLED)
+                self.app.update_status(f"dQ/dV計算中（{len(charge_data)}サイクル, ワーカープロセス）...")
+                self.frame.after(100, self._poll_dqdv_batch, future)
+                return
+            
             # Update plot
             self.update_plot()
             
         except tk.TclError:
-            messagebox.showerror("エラー", "無効なスムージング係数です。数値を入力してください。")
+            messagebox.showerror("エラー", "無効なSG窓幅です。整数を入力してください。")
         except Exception as e:
             messagebox.showerror("エラー", f"再計算中にエラーが発生しました: {str(e)}")
     
+    def _poll_dqdv_batch(self, future):
+        """Wait for the worker result without blocking the event loop."""
+        if not future.done():
+            self.frame.after(100, self._poll_dqdv_batch, future)
+            return
+        
+        self.recalculate_button.config(state=tk.NORMAL)
+        try:
+            result = future.result()
+        except Exception as e:
+            self.app.update_status("エラーが発生しました")
+            messagebox.showerror("エラー", f"再計算中にエラーが発生しました: {str(e)}")
+            return
+        
+        self.dqdv_data = {
+            cycle: {'voltage': result['voltage'], 'dqdv': result['dqdv'][i]}
+            for i, cycle in enumerate(result['cycles'])
+        }
+        self.peak_data = result['peaks']
+        self.app.processor.peak_tracks = result['tracks']
+        
+        # Update cycle selection
+        self._update_cycle_selection()
+        
+        self.app.update_status(
+            f"dQ/dV計算完了: {len(result['cycles'])}サイクル, ピークトラック {len(result['tracks'])}本"
+        )
+        self.plot_type_var.set("dqdv_peaks")
+        self.update_plot()
+    
+    def _peak_options(self):
+        """Peak detection parameters from the controls (optional ones are None when empty)."""
+        options = {'prominence': self.prominence_var.get(),
+                   'peak_range': (self.v_min_var.get(), self.v_max_var.get())}
+        for name, var in (('width', self.width_var), ('height', self.height_var),
+                          ('distance', self.distance_var)):
+            try:
+                options[name] = var.get()
+            except tk.TclError:
+                options[name] = None
+        return options
+    
     def detect_peaks(self):
         """Detect peaks in dQ/dV curves."""
         if self.dqdv_data is None:
@@ -545,15 +598,20 @@ class AnalysisTab:
         # Get cycle numbers
         cycles = sorted(self.peak_data.keys())
         
-        # Collect peak positions and heights for each peak
+        # Collect peak positions and heights for each peak (tracked peaks keep their id
+        # across cycles; otherwise peaks are matched by their order within a cycle)
         peak_positions = {}
         peak_heights = {}
         
         for cycle in cycles:
+            ids = self.peak_data[cycle].get('track_ids')
             for i, (voltage, dqdv) in enumerate(zip(
                 self.peak_data[cycle]['peak_voltages'],
                 self.peak_data[cycle]['peak_dqdvs']
             )):
+                if ids is not None:
+                    i = int(ids[i])
+                
                 # Initialize if this is a new peak
                 if i not in peak_positions:
                     peak_positions[i] = {'cycles': [], 'voltages': []}
@@ -0,0 +1,442 @@
+"""
+Benchmark suite for the LibCurveSim simulation kernels
+
+Every case runs at each (cycles, dt) size of a suite and reports the best wall time of a few
+repeats, the throughput (steps, cycles or curves per second) and the peak traced memory of one
+extra run under tracemalloc. Results are compared against stored baselines
+(benchmark_baseline.json): a case regresses when its time exceeds baseline * time_tolerance
+(plus MIN_TIME_SLACK) or its peak memory exceeds baseline * memory_tolerance (plus
+MIN_MEMORY_SLACK_MB).
+
+Cases: simulate_charge, simulate_discharge, run_all_cycles (cold and cached), calculate_dqdv
+(per-cycle spline), dqdv_batch, peak_tracking, pca, clustering, streaming_pca.
+
+Usage:
+  python benchmark.py                      # quick suite, compare with the baselines
+  python benchmark.py --suite full         # 10/100/1000 cycles x dt 0.1/1/10 s
+  python benchmark.py --update-baseline    # store the current results as baselines
+  python benchmark.py --cases run_all_cycles dqdv_batch --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# Add the parent directory to the path to import the modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation_core import SimulationCore, BatterySimulator
+from data_processor import DataProcessor, compute_dqdv_batch
+from ml_analyzer import MLAnalyzer
+import results_store
+import streaming_ml
+
+# (cycles, dt) sizes; the full suite drops sizes above MAX_STEPS
+SUITES = {
+    'quick': [(10, 1.0), (100, 10.0)],
+    'full': [(cycles, dt) for cycles in (10, 100, 1000) for dt in (0.1, 1.0, 10.0)],
+}
+# Simulated time steps (charge + discharge, all cycles) allowed for one size
+MAX_STEPS = 2_000_000
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_REPEAT = 3
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.25
+# Absolute slack so that very short cases do not fail on timer noise
+MIN_TIME_SLACK = 0.01  # s
+MIN_MEMORY_SLACK_MB = 1.0
+# Simulation parameters of every case (defaults of SimulationCore)
+CAPACITY = 3.0
+RESISTANCE = 0.05
+C_RATE = 0.5
+N_COMPONENTS = 3
+N_CLUSTERS = 3
+# Distinct voltages a curve needs for the cubic spline of calculate_dqdv()
+SPLINE_MIN_POINTS = 4
+
+
+def estimated_steps(cycles, dt, c_rate=C_RATE):
+    """Rough number of charge + discharge time steps for a size (about 1/c_rate hours each way)."""
+    return int(cycles * 2 * 3600 / c_rate / dt)
+
+
+def suite_sizes(suite, max_steps=MAX_STEPS):
+    """Sizes of a suite that fit within max_steps."""
+    return [(c, dt) for c, dt in SUITES[suite] if estimated_steps(c, dt) <= max_steps]
+
+
+def size_label(cycles, dt):
+    return f"c{cycles}-dt{dt:g}"
+
+
+class Workload:
+    """Simulation data of one size, created on first use and shared by the cases."""
+
+    def __init__(self, cycles, dt):
+        self.cycles = cycles
+        self.dt = dt
+        self._results = None
+        self._dqdv = None
+        self._store_dir = None
+        self._store_path = None
+
+    def simulator(self):
+        sim = BatterySimulator(initial_capacity=CAPACITY, initial_resistance=RESISTANCE)
+        sim.set_simulation_parameters(C_RATE, sim.v_max, sim.v_min, sim.end_current_ratio, self.dt)
+        return sim
+
+    def core(self):
+        core = SimulationCore()
+        core.set_battery_params(CAPACITY, C_RATE, RESISTANCE)
+        core.set_simulation_params(self.cycles, time_step=self.dt)
+        return core
+
+    @property
+    def results(self):
+        """run_all_cycles() results of this size."""
+        if self._results is None:
+            self._results = self.simulator().run_all_cycles(self.cycles)
+        return self._results
+
+    @property
+    def curves(self):
+        """Charge curves {cycle: {'voltage', 'capacity'}}."""
+        return {r['cycle']: {'voltage': r['charge']['voltage'], 'capacity': r['charge']['capacity']}
+                for r in self.results['cycle_results']}
+
+    @property
+    def dqdv(self):
+        """Batch dQ/dV of the charge curves (without peaks)."""
+        if self._dqdv is None:
+            curves = self.curves
+            cycles = sorted(curves)
+            self._dqdv = compute_dqdv_batch(cycles, [curves[c]['voltage'] for c in cycles],
+                                            [curves[c]['capacity'] for c in cycles], {'peaks': False})
+        return self._dqdv
+
+    @property
+    def store_path(self):
+        """Results store of this size in a temporary directory."""
+        if self._store_path is None:
+            self._store_dir = tempfile.mkdtemp(prefix="libcurvesim_bench_")
+            self._store_path = os.path.join(self._store_dir, f"bench_{size_label(self.cycles, self.dt)}.npz")
+            core = self.core()
+            core.save_results_store(self.results['cycle_results'], self._store_path)
+        return self._store_path
+
+    def close(self):
+        if self._store_dir is not None:
+            shutil.rmtree(self._store_dir, ignore_errors=True)
+            self._store_dir = self._store_path = None
+
+
+# ---- cases: setup(workload) -> state (not timed), run(state) -> items processed ----
+
+def _setup_kernel(w):
+    core = w.core()
+    cycles = np.arange(1, w.cycles + 1)
+    return core, core.capacity_after_cycle(cycles), core.resistance_after_cycle(cycles)
+
+
+def _run_charge(state):
+    core, capacities, resistances = state
+    return sum(len(core.simulate_charge(c, r)[2]) for c, r in zip(capacities, resistances))
+
+
+def _run_discharge(state):
+    core, capacities, resistances = state
+    return sum(len(core.simulate_discharge(c, r)[2]) for c, r in zip(capacities, resistances))
+
+
+def _setup_run_all(w):
+    return w.simulator(), w.cycles
+
+
+def _setup_run_all_cached(w):
+    sim = w.simulator()
+    sim.run_all_cycles(w.cycles)
+    return sim, w.cycles
+
+
+def _run_all(state):
+    sim, cycles = state
+    sim.run_all_cycles(cycles)
+    return cycles
+
+
+def _setup_dqdv(w):
+    return DataProcessor(), w.curves
+
+
+def _setup_spline_dqdv(w):
+    # Late cycles at large dt can have too few distinct voltages for a cubic spline
+    curves = {c: d for c, d in w.curves.items() if len(np.unique(d['voltage'])) >= SPLINE_MIN_POINTS}
+    return DataProcessor(), curves
+
+
+def _run_calculate_dqdv(state):
+    processor, curves = state
+    for d in curves.values():
+        processor.calculate_dqdv(np.asarray(d['voltage']), np.asarray(d['capacity']))
+    return len(curves)
+
+
+def _run_dqdv_batch(state):
+    processor, curves = state
+    processor.process_charge_discharge_data(curves)
+    return len(curves)
+
+
+def _setup_peaks(w):
+    dqdv = w.dqdv
+    data = {c: {'voltage': dqdv['voltage'], 'dqdv': dqdv['dqdv'][i]} for i, c in enumerate(dqdv['cycles'])}
+    return DataProcessor(), data
+
+
+def _run_peaks(state):
+    processor, data = state
+    processor.process_dqdv_peaks(data)
+    return len(data)
+
+
+def _setup_ml(w):
+    return MLAnalyzer(), w.dqdv['dqdv']
+
+
+def _run_pca(state):
+    analyzer, matrix = state
+    analyzer.run_pca(matrix, n_components=min(N_COMPONENTS, len(matrix)))
+    return len(matrix)
+
+
+def _run_clustering(state):
+    analyzer, matrix = state
+    analyzer.run_clustering(matrix, n_clusters=min(N_CLUSTERS, len(matrix)))
+    return len(matrix)
+
+
+def _setup_streaming(w):
+    return results_store.load_store(w.store_path), w.cycles
+
+
+def _run_streaming(state):
+    store, cycles = state
+    streaming_ml.StreamingAnalyzer(n_components=min(N_COMPONENTS, cycles),
+                                   n_clusters=min(N_CLUSTERS, cycles)).fit(store, progress=None)
+    return cycles
+
+
+# name -> (setup, run, unit)
+CASES = {
+    'simulate_charge': (_setup_kernel, _run_charge, 'steps'),
+    'simulate_discharge': (_setup_kernel, _run_discharge, 'steps'),
+    'run_all_cycles': (_setup_run_all, _run_all, 'cycles'),
+    'run_all_cycles_cached': (_setup_run_all_cached, _run_all, 'cycles'),
+    'calculate_dqdv': (_setup_spline_dqdv, _run_calculate_dqdv, 'curves'),
+    'dqdv_batch': (_setup_dqdv, _run_dqdv_batch, 'curves'),
+    'peak_tracking': (_setup_peaks, _run_peaks, 'cycles'),
+    'pca': (_setup_ml, _run_pca, 'cycles'),
+    'clustering': (_setup_ml, _run_clustering, 'cycles'),
+    'streaming_pca': (_setup_streaming, _run_streaming, 'cycles'),
+}
+
+
+def measure(setup, run, workload, repeat=DEFAULT_REPEAT):
+    """
+    Best wall time of repeat runs (fresh setup each time) and peak traced memory of one more run.
+
+    Returns:
+        Dictionary with 'seconds', 'items', 'throughput' and 'peak_mb'
+    """
+    times = []
+    items = 0
+    for _ in range(repeat):
+        state = setup(workload)
+        t0 = time.perf_counter()
+        items = run(state)
+        times.append(time.perf_counter() - t0)
+    state = setup(workload)
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    seconds = min(times)
+    return {
+        'seconds': seconds,
+        'items': int(items),
+        'throughput': items / seconds if seconds > 0 else float('inf'),
+        'peak_mb': peak / 2**20,
+    }
+
+
+def run_suite(suite='quick', cases=None, repeat=DEFAULT_REPEAT, max_steps=MAX_STEPS, progress=print):
+    """
+    Run benchmark cases at every size of a suite.
+
+    Args:
+        suite: 'quick' or 'full'
+        cases: Case names (default: all CASES)
+        repeat: Timed repeats per case (best one is reported)
+        max_steps: Skip sizes with more simulated steps than this
+        progress: Called with each result line (None: silent)
+
+    Returns:
+        Dictionary {"case[size]": measure() result plus 'unit'}; a case that raised has only
+        'unit' and 'error'
+    """
+    names = list(cases or CASES)
+    unknown = set(names) - set(CASES)
+    if unknown:
+        raise ValueError(f"不明なベンチマーク: {sorted(unknown)}")
+    results = {}
+    for cycles, dt in suite_sizes(suite, max_steps):
+        workload = Workload(cycles, dt)
+        try:
+            for name in names:
+                setup, run, unit = CASES[name]
+                key = f"{name}[{size_label(cycles, dt)}]"
+                try:
+                    results[key] = dict(measure(setup, run, workload, repeat), unit=unit)
+                except Exception as e:
+                    results[key] = {'unit': unit, 'error': f"{type(e).__name__}: {e}"}
+                if progress:
+                    progress(format_result(key, results[key]))
+        finally:
+            workload.close()
+    return results
+
+
+def format_result(key, r, baseline=None):
+    if 'error' in r:
+        return f"{key:<40} エラー: {r['error']}"
+    line = (f"{key:<40} {r['seconds'] * 1000:10.1f} ms  {r['throughput']:12.1f} {r['unit']}/s  "
+            f"{r['peak_mb']:8.1f} MB")
+    if baseline:
+        line += f"  (基準 {baseline['seconds'] * 1000:.1f} ms, {baseline['peak_mb']:.1f} MB)"
+    return line
+
+
+def machine_info():
+    """Fingerprint stored with the baselines; timings only compare on a matching machine."""
+    return {'platform': platform.platform(), 'python': platform.python_version(),
+            'numpy': np.__version__, 'cpus': os.cpu_count()}
+
+
+def load_baseline_machine(path=BASELINE_FILE):
+    """machine_info() recorded with the stored baselines (None when the file is missing)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('machine')
+
+
+def load_baseline(path=BASELINE_FILE):
+    """Stored baselines {"case[size]": {'seconds', 'peak_mb', ...}} ({} when the file is missing)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(results, path=BASELINE_FILE, merge=True):
+    """Store results as baselines (merged with the existing ones unless merge=False)."""
+    stored = load_baseline(path) if merge else {}
+    results = {k: r for k, r in results.items() if 'error' not in r}
+    stored.update({k: {'seconds': round(r['seconds'], 6), 'peak_mb': round(r['peak_mb'], 3),
+                       'throughput': round(r['throughput'], 3), 'unit': r['unit']}
+                   for k, r in results.items()})
+    data = {'machine': machine_info(),
+            'results': dict(sorted(stored.items()))}
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def find_regressions(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Compare results with baselines.
+
+    Returns:
+        List of regression messages (empty when every case is within tolerance; failed cases are
+        always reported, cases without a baseline are not checked)
+    """
+    regressions = []
+    for key, r in results.items():
+        if 'error' in r:
+            regressions.append(f"{key}: {r['error']}")
+            continue
+        base = baseline.get(key)
+        if base is None:
+            continue
+        time_limit = base['seconds'] * time_tolerance + MIN_TIME_SLACK
+        if r['seconds'] > time_limit:
+            regressions.append(f"{key}: 実行時間 {r['seconds'] * 1000:.1f} ms > 上限 {time_limit * 1000:.1f} ms "
+                               f"(基準 {base['seconds'] * 1000:.1f} ms)")
+        memory_limit = base['peak_mb'] * memory_tolerance + MIN_MEMORY_SLACK_MB
+        if r['peak_mb'] > memory_limit:
+            regressions.append(f"{key}: ピークメモリ {r['peak_mb']:.1f} MB > 上限 {memory_limit:.1f} MB "
+                               f"(基準 {base['peak_mb']:.1f} MB)")
+    return regressions
+
+
+def add_arguments(parser):
+    """Benchmark options (shared with headless.py bench)."""
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick', help='size suite')
+    parser.add_argument('--cases', nargs='+', default=None, choices=sorted(CASES), help='cases to run')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='timed repeats per case')
+    parser.add_argument('--max-steps', type=int, default=MAX_STEPS, help='skip sizes with more simulated steps')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as baselines')
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE, help='allowed time ratio')
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE, help='allowed memory ratio')
+    parser.add_argument('--json', default=None, help='also write the results to this JSON file')
+
+
+def run_from_args(args):
+    """Run the benchmarks for parsed arguments; returns the process exit code (1 on regressions)."""
+    print(f"=== LibCurveSim ベンチマーク ({args.suite}) ===")
+    results = run_suite(args.suite, args.cases, args.repeat, args.max_steps)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        failed = [k for k, r in results.items() if 'error' in r]
+        if failed:
+            print(f"エラーになったケース {len(failed)}件は基準値に登録しません: {', '.join(failed)}")
+        save_baseline(results, args.baseline)
+        print(f"基準値を {args.baseline} に保存しました（{len(results)}件）")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    missing = [k for k in results if k not in baseline]
+    if missing:
+        print(f"基準値のないケース {len(missing)}件は比較しません（--update-baseline で登録）")
+    regressions = find_regressions(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print(f"\n性能低下を検出しました（{len(regressions)}件）:")
+        for msg in regressions:
+            print(f"  {msg}")
+        return 1
+    print(f"\n{len(results) - len(missing)}件のケースが基準値以内です")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LibCurveSim simulation kernel benchmarks')
+    add_arguments(parser)
+    sys.exit(run_from_args(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
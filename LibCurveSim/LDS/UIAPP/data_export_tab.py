@@ -119,7 +119,7 @@ class DataExportTab:
         format_combo = ttk.Combobox(
             self.format_frame,
             textvariable=self.format_var,
-            values=["csv", "json", "excel"],
+            values=["csv", "json", "excel", "npz"],
             state="readonly",
             width=15
         )
@@ -503,13 +503,15 @@ class DataExportTab:
         self.data_info_var.set(f"機械学習結果: {model_type}")
         
         # Get data based on model type
-        if model_type == "pca":
+        if model_type in ["pca", "streaming"]:
             # Create DataFrame for principal components
             pc_df = pd.DataFrame(
                 ml_results['principal_components'],
                 columns=[f"PC{i+1}" for i in range(ml_results['principal_components'].shape[1])]
             )
             pc_df['Cycle'] = ml_results['cycle_numbers']
+            if ml_results.get('labels') is not None:
+                pc_df['Cluster'] = ml_results['labels']
             
             # Create DataFrame for explained variance
             ev_df = pd.DataFrame({
@@ -631,6 +633,8 @@ class DataExportTab:
         elif format_type == "excel":
             # Format as Excel (preview as CSV)
             return "Excel形式はプレビューできません。エクスポート時にExcel形式で保存されます。"
+        elif format_type == "npz":
+            return "npz形式（結果ストア）はプレビューできません。全サイクルのシミュレーション結果を1ファイルに保存します。"
         
         return "未対応の形式です"
     
@@ -644,8 +648,39 @@ class DataExportTab:
         if directory:
             self.output_dir_var.set(directory)
     
+    def export_results_store(self, output_dir, filename):
+        """
+        Export all simulated cycles to one results store (.npz).
+        
+        Args:
+            output_dir: Output directory
+            filename: File name without extension
+        """
+        results = self.app.simulation_results
+        if isinstance(results, dict):
+            results = results.get('cycle_results')
+        if not results:
+            messagebox.showinfo("情報", "エクスポートするシミュレーションデータがありません。")
+            return
+        
+        os.makedirs(output_dir, exist_ok=True)
+        file_path = os.path.join(output_dir, f"{filename}.npz")
+        try:
+            self.app.simulator.core.save_results_store(results, file_path)
+            messagebox.showinfo("完了", f"{len(results)}サイクルの結果を {file_path} にエクスポートしました。")
+        except Exception as e:
+            messagebox.showerror("エラー", f"エクスポート中にエラーが発生しました: {str(e)}")
+    
     def export_data(self):
         """Export data to file."""
+        # The results store holds every simulated cycle in one file
+        if self.format_var.get() == "npz":
+            filename = self.filename_var.get()
+            if self.add_timestamp_var.get():
+                filename = f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            self.export_results_store(self.output_dir_var.get(), filename)
+            return
+        
         # Get selected data
         data = self.get_selected_data()
         
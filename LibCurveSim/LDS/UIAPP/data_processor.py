@@ -5,9 +5,193 @@ This module provides data processing functionality for the battery simulation an
 It implements dQ/dV curve calculation and peak detection.
 """
 
+import csv
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 from scipy.interpolate import UnivariateSpline
-from scipy.signal import find_peaks, savgol_filter
+from scipy.signal import find_peaks, peak_prominences, peak_widths, savgol_filter
+
+# results_store lives in the parent directory (LDS)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import results_store
+
+# Batch dQ/dV defaults (shared voltage grid, Savitzky-Golay derivative)
+DEFAULT_GRID_POINTS = 1000
+DEFAULT_SG_WINDOW = 21
+DEFAULT_SG_POLYORDER = 3
+# Peak tracking: search window around a peak's previous position, and how many cycles a
+# track may go unseen before it is closed
+DEFAULT_MAX_SHIFT = 0.03  # V
+DEFAULT_MAX_GAP = 2
+
+
+def resample_curves(curves, n_points=DEFAULT_GRID_POINTS, voltage_range=None):
+    """
+    Resample capacity-voltage curves onto one shared voltage grid.
+    
+    Args:
+        curves: List of (voltage, capacity) array pairs
+        n_points: Number of grid points
+        voltage_range: Tuple of (min_voltage, max_voltage) (default: span of all curves)
+        
+    Returns:
+        Tuple of (voltage grid, capacity matrix of shape (len(curves), n_points)); outside a
+        curve's own voltage span its capacity is held constant (dQ/dV = 0)
+    """
+    prepared = []
+    for voltage, capacity in curves:
+        voltage = np.asarray(voltage, dtype=float)
+        capacity = np.asarray(capacity, dtype=float)
+        # Sort by voltage and drop repeated voltages (CV plateau, discharge order)
+        order = np.argsort(voltage, kind='stable')
+        v_sorted, q_sorted = voltage[order], capacity[order]
+        keep = np.concatenate(([True], np.diff(v_sorted) != 0))
+        prepared.append((v_sorted[keep], q_sorted[keep]))
+    
+    if voltage_range is None:
+        voltage_range = (min(v[0] for v, _ in prepared), max(v[-1] for v, _ in prepared))
+    grid = np.linspace(voltage_range[0], voltage_range[1], n_points)
+    matrix = np.empty((len(prepared), n_points))
+    for i, (v, q) in enumerate(prepared):
+        matrix[i] = np.interp(grid, v, q)
+    return grid, matrix
+
+
+def dqdv_matrix(grid, capacity_matrix, method='savgol', window=DEFAULT_SG_WINDOW,
+                polyorder=DEFAULT_SG_POLYORDER):
+    """
+    dQ/dV of every row of capacity_matrix in one 2-D operation.
+    
+    Args:
+        grid: Shared, evenly spaced voltage grid
+        capacity_matrix: Capacity per cycle (rows) on the grid
+        method: 'savgol' (Savitzky-Golay smoothed derivative) or 'diff' (central differences)
+        window: Savitzky-Golay window in grid points (made odd and larger than polyorder)
+        polyorder: Savitzky-Golay polynomial order
+        
+    Returns:
+        dQ/dV matrix with the same shape as capacity_matrix
+    """
+    dv = grid[1] - grid[0]
+    if method == 'diff':
+        return np.gradient(capacity_matrix, dv, axis=1)
+    window = int(window) | 1
+    window = max(window, polyorder + 2 | 1)
+    window = min(window, capacity_matrix.shape[1] - (1 - capacity_matrix.shape[1] % 2))
+    return savgol_filter(capacity_matrix, window, polyorder, deriv=1, delta=dv, axis=1)
+
+
+def track_peaks(voltage, dqdv_rows, cycles, prominence=0.1, width=None, height=None, distance=None,
+                voltage_range=None, max_shift=DEFAULT_MAX_SHIFT, max_gap=DEFAULT_MAX_GAP):
+    """
+    Detect dQ/dV peaks and follow them from cycle to cycle.
+    
+    Each open track looks for the strongest detected peak within max_shift of its previous
+    voltage; if none passes the detection thresholds it follows the local maximum in that window,
+    so a peak that shrinks below the prominence limit keeps its identity. Detected peaks not
+    claimed by a track start new tracks.
+    
+    Args:
+        voltage: Shared voltage grid
+        dqdv_rows: dQ/dV matrix (one row per cycle, in the order of cycles)
+        cycles: Cycle numbers
+        prominence, width, height, distance: find_peaks thresholds for new peaks
+        voltage_range: Tuple of (min_voltage, max_voltage) to limit peak detection
+        max_shift: Maximum peak movement between consecutive cycles (V)
+        max_gap: Number of cycles a track may be missing before it is closed
+        
+    Returns:
+        Tuple of (peak data per cycle in the detect_peaks() format plus 'track_ids',
+                  tracks {track_id: {'cycles', 'voltages', 'dqdvs'}})
+    """
+    voltage = np.asarray(voltage)
+    if voltage_range is not None:
+        mask = (voltage >= voltage_range[0]) & (voltage <= voltage_range[1])
+        voltage, dqdv_rows = voltage[mask], np.asarray(dqdv_rows)[:, mask]
+    n = len(voltage)
+    half = max(1, int(round(max_shift / (voltage[1] - voltage[0])))) if n > 1 else 1
+    
+    open_tracks = []  # [track_id, last index, last row, last height]
+    tracks = {}
+    peak_data = {}
+    for row, cycle in enumerate(cycles):
+        y = dqdv_rows[row]
+        detected, _ = find_peaks(y, prominence=prominence, width=width, height=height, distance=distance)
+        claimed = {}
+        
+        open_tracks = [t for t in open_tracks if row - t[2] <= max_gap]
+        for t in sorted(open_tracks, key=lambda t: -t[3]):
+            lo, hi = max(t[1] - half, 0), min(t[1] + half + 1, n)
+            candidates = [p for p in detected[(detected >= lo) & (detected < hi)] if p not in claimed]
+            if candidates:
+                p = max(candidates, key=lambda p: y[p])
+            else:
+                p = lo + int(np.argmax(y[lo:hi]))
+                # Window edge or array edge: the peak left the window / is not a local maximum
+                if p in (lo, hi - 1) or p in claimed or not (y[p] >= y[p - 1] and y[p] >= y[p + 1]):
+                    continue
+            claimed[p] = t[0]
+            t[1], t[2], t[3] = p, row, y[p]
+        
+        for p in detected:
+            if p not in claimed:
+                track_id = len(tracks)
+                tracks[track_id] = {'cycles': [], 'voltages': [], 'dqdvs': []}
+                open_tracks.append([track_id, p, row, y[p]])
+                claimed[p] = track_id
+        
+        idx = np.array(sorted(claimed), dtype=int)
+        track_ids = np.array([claimed[p] for p in idx], dtype=int)
+        for p, track_id in zip(idx, track_ids):
+            tracks[track_id]['cycles'].append(cycle)
+            tracks[track_id]['voltages'].append(voltage[p])
+            tracks[track_id]['dqdvs'].append(y[p])
+        peak_data[cycle] = {
+            'peak_indices': idx,
+            'peak_voltages': voltage[idx],
+            'peak_dqdvs': y[idx],
+            'prominences': peak_prominences(y, idx)[0] if len(idx) else np.array([]),
+            'widths': peak_widths(y, idx)[0] if len(idx) else np.array([]),
+            'track_ids': track_ids
+        }
+    return peak_data, tracks
+
+
+def compute_dqdv_batch(cycles, voltages, capacities, options=None):
+    """
+    Batch dQ/dV and peak tracking for all cycles (module level so it can run in a worker process).
+    
+    Args:
+        cycles: Cycle numbers
+        voltages, capacities: Lists of per-cycle arrays
+        options: Dictionary with n_points, voltage_range, method, window, polyorder and, for peaks,
+                 peaks (bool), prominence, width, height, distance, peak_range, max_shift, max_gap
+        
+    Returns:
+        Dictionary with 'cycles', 'voltage' (grid), 'dqdv' (matrix), 'peaks' and 'tracks'
+    """
+    options = options or {}
+    grid, capacity_matrix = resample_curves(list(zip(voltages, capacities)),
+                                            n_points=options.get('n_points', DEFAULT_GRID_POINTS),
+                                            voltage_range=options.get('voltage_range'))
+    dqdv = dqdv_matrix(grid, capacity_matrix, method=options.get('method', 'savgol'),
+                       window=options.get('window', DEFAULT_SG_WINDOW),
+                       polyorder=options.get('polyorder', DEFAULT_SG_POLYORDER))
+    result = {'cycles': list(cycles), 'voltage': grid, 'dqdv': dqdv, 'peaks': None, 'tracks': None}
+    if options.get('peaks', True):
+        result['peaks'], result['tracks'] = track_peaks(
+            grid, dqdv, list(cycles),
+            prominence=options.get('prominence', 0.1), width=options.get('width'),
+            height=options.get('height'), distance=options.get('distance'),
+            voltage_range=options.get('peak_range'),
+            max_shift=options.get('max_shift', DEFAULT_MAX_SHIFT),
+            max_gap=options.get('max_gap', DEFAULT_MAX_GAP))
+    return result
 
 
 class DataProcessor:
@@ -17,7 +201,124 @@ class DataProcessor:
     
     def __init__(self):
         """Initialize the data processor."""
-        pass
+        self._executor = None
+        self.peak_tracks = None
+    
+    def submit_dqdv_batch(self, curves, **options):
+        """
+        Run compute_dqdv_batch() in a worker process.
+        
+        Args:
+            curves: Dictionary {cycle: {'voltage': array, 'capacity': array}}
+            **options: Options for compute_dqdv_batch()
+            
+        Returns:
+            concurrent.futures.Future with the compute_dqdv_batch() result
+        """
+        if self._executor is None:
+            # spawn: the worker never inherits the Tk state of the GUI process
+            self._executor = ProcessPoolExecutor(max_workers=1,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        cycles = sorted(curves)
+        return self._executor.submit(compute_dqdv_batch, cycles,
+                                     [np.asarray(curves[c]['voltage']) for c in cycles],
+                                     [np.asarray(curves[c]['capacity']) for c in cycles], options)
+    
+    def shutdown(self):
+        """Stop the worker process (if started)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def load_results_file(self, file_path):
+        """
+        Load a results store (.npz, every cycle in one call) or a single-cycle CSV file.
+        
+        Args:
+            file_path: Path to the results store or CSV file
+            
+        Returns:
+            Dictionary {'type': 'dqdv' | 'charge_discharge', 'data': {cycle: {...}}}, where dQ/dV
+            data has 'voltage'/'dqdv' and charge data 'voltage'/'capacity' per cycle; None if the
+            file holds neither
+        """
+        if results_store.is_store(file_path):
+            store = results_store.load_store(file_path)
+            dqdv_kind = next((k for k in store.kinds if k.startswith('dqdv')), None)
+            if dqdv_kind is not None:
+                return {'type': 'dqdv', 'data': store.curves(dqdv_kind, ['voltage', 'dqdv'])}
+            if 'charge' in store.kinds:
+                return {'type': 'charge_discharge', 'data': store.curves('charge', ['voltage', 'capacity'])}
+            return None
+        
+        with open(file_path, 'r', newline='') as f:
+            header = [h.strip() for h in next(csv.reader(f))]
+        # Headers of the LDS scripts ('Voltage (V)') and of the ML examples ('Voltage')
+        names = [h.split(' (')[0] for h in header]
+        match = re.search(r'cycle_?(\d+)', os.path.basename(file_path))
+        cycle = int(match.group(1)) if match else 1
+        
+        def read(*columns):
+            data = np.loadtxt(file_path, delimiter=',', skiprows=1, ndmin=2,
+                              usecols=[names.index(c) for c in columns])
+            return {c.lower().replace('/', ''): data[:, i] for i, c in enumerate(columns)}
+        
+        if 'Voltage' in names and 'dQ/dV' in names:
+            return {'type': 'dqdv', 'data': {cycle: read('Voltage', 'dQ/dV')}}
+        if 'Voltage' in names and 'Capacity' in names:
+            return {'type': 'charge_discharge', 'data': {cycle: read('Voltage', 'Capacity')}}
+        return None
+    
+    def process_charge_discharge_data(self, curves, smoothing_factor=None, **options):
+        """
+        Calculate dQ/dV curves for all cycles.
+        
+        Args:
+            curves: Dictionary {cycle: {'voltage': array, 'capacity': array}}
+            smoothing_factor: Spline smoothing; when given, each cycle goes through calculate_dqdv()
+                              (per-cycle spline) instead of the batch engine
+            **options: Options for compute_dqdv_batch() (n_points, method, window, polyorder)
+            
+        Returns:
+            Dictionary {cycle: {'voltage': array, 'dqdv': array}}
+        """
+        if smoothing_factor is not None:
+            return {cycle: self.calculate_dqdv(np.asarray(d['voltage']), np.asarray(d['capacity']),
+                                               smoothing=smoothing_factor)
+                    for cycle, d in sorted(curves.items())}
+        cycles = sorted(curves)
+        result = compute_dqdv_batch(cycles, [curves[c]['voltage'] for c in cycles],
+                                    [curves[c]['capacity'] for c in cycles], dict(options, peaks=False))
+        return {cycle: {'voltage': result['voltage'], 'dqdv': result['dqdv'][i]}
+                for i, cycle in enumerate(cycles)}
+    
+    def process_dqdv_peaks(self, dqdv_data, prominence=0.1, width=None, height=None, distance=None,
+                           v_range=None, max_shift=DEFAULT_MAX_SHIFT, max_gap=DEFAULT_MAX_GAP):
+        """
+        Detect and track peaks across the cycles of dqdv_data.
+        
+        Args:
+            dqdv_data: Dictionary {cycle: {'voltage': array, 'dqdv': array}}
+            prominence, width, height, distance: Peak detection thresholds
+            v_range: Tuple of (min_voltage, max_voltage) to limit peak detection
+            max_shift: Maximum peak movement between consecutive cycles (V)
+            max_gap: Number of cycles a track may be missing before it is closed
+            
+        Returns:
+            Dictionary {cycle: peak data with 'track_ids'}; the tracks are kept in self.peak_tracks
+        """
+        cycles = sorted(dqdv_data)
+        grid = np.asarray(dqdv_data[cycles[0]]['voltage'])
+        if all(np.array_equal(dqdv_data[c]['voltage'], grid) for c in cycles):
+            rows = np.vstack([dqdv_data[c]['dqdv'] for c in cycles])
+        else:
+            # Curves on their own grids (e.g. loaded files): interpolate onto the first one
+            rows = np.vstack([self.interpolate_to_grid(dqdv_data[c]['voltage'], dqdv_data[c]['dqdv'], grid)
+                              for c in cycles])
+        peak_data, self.peak_tracks = track_peaks(grid, rows, cycles, prominence=prominence, width=width,
+                                                  height=height, distance=distance, voltage_range=v_range,
+                                                  max_shift=max_shift, max_gap=max_gap)
+        return peak_data
     
     def calculate_dqdv(self, voltage, capacity, smoothing=0.001, filter_window=None):
         """
@@ -0,0 +1,147 @@
+"""
+Headless command line interface for the battery simulation and analysis tool
+
+Runs the same SimulationCore / DataProcessor / MLAnalyzer code as the GUI without Tk or
+interactive prompts, so runs can be scripted and timed.
+
+Usage:
+  python headless.py simulate --cycles 100 --dt 1.0 --out results/sim.npz [--csv results/csv]
+  python headless.py dqdv results/sim.npz --out results/sim_dqdv.npz --peaks
+  python headless.py ml results/sim_dqdv.npz --components 3 --clusters 3 [--model pca_model.npz]
+  python headless.py bench [--suite full] [--update-baseline]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to the path to import the modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation_core import SimulationCore
+from data_processor import compute_dqdv_batch, DEFAULT_GRID_POINTS
+from ml_analyzer import MLAnalyzer
+import benchmark
+import results_store
+from streaming_ml import DEFAULT_CHUNK
+
+
+def cmd_simulate(args):
+    core = SimulationCore(cache_dir=args.cache_dir)
+    core.set_battery_params(args.capacity, args.c_rate, args.resistance)
+    core.set_degradation_params(args.A, args.B, args.C, args.D)
+    core.set_simulation_params(args.cycles, time_step=args.dt, v_max=args.v_max, v_min=args.v_min,
+                               end_current_ratio=args.end_current_ratio)
+    t0 = time.perf_counter()
+    results = core.run_simulation()
+    elapsed = time.perf_counter() - t0
+    stats = core.last_cache_stats
+    print(f"{len(results)}サイクルをシミュレーションしました: {elapsed:.2f}s "
+          f"(キャッシュ ヒット {stats['hits']} / ミス {stats['misses']})")
+    if results:
+        print(f"最終サイクルの容量維持率: {results[-1]['capacity_retention'] * 100:.2f}%")
+
+    out = args.out or os.path.join('results', f"sim_{time.strftime('%Y%m%d_%H%M%S')}.npz")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    core.save_results_store(results, out)
+    print(f"結果を {out} に保存しました。")
+    if args.csv:
+        written = results_store.export_csv(results_store.load_store(out), args.csv)
+        print(f"{len(written)} 個のCSVファイルを {args.csv} に保存しました。")
+    return 0
+
+
+def cmd_dqdv(args):
+    store = results_store.load_store(args.store)
+    if args.kind not in store.kinds:
+        print(f"{args.store} に {args.kind} の曲線がありません（{', '.join(store.kinds)}）")
+        return 1
+    curves = store.curves(args.kind, ('voltage', 'capacity'))
+    cycles = sorted(curves)
+    t0 = time.perf_counter()
+    result = compute_dqdv_batch(cycles, [curves[c]['voltage'] for c in cycles],
+                                [curves[c]['capacity'] for c in cycles],
+                                {'n_points': args.points, 'method': args.method, 'peaks': args.peaks,
+                                 'prominence': args.prominence})
+    print(f"{len(cycles)}サイクルのdQ/dVを計算しました: {time.perf_counter() - t0:.2f}s")
+    if args.peaks:
+        for track_id, track in result['tracks'].items():
+            print(f"  ピーク {track_id}: サイクル {track['cycles'][0]}-{track['cycles'][-1]}, "
+                  f"{track['voltages'][0]:.3f} V → {track['voltages'][-1]:.3f} V")
+
+    out = args.out or f"{os.path.splitext(args.store)[0]}_dqdv.npz"
+    grid = result['voltage']
+    dqdv_curves = {'dqdv': {'voltage': [grid] * len(cycles), 'dqdv': list(result['dqdv'])}}
+    results_store.save_store(out, cycles, dqdv_curves, {'cycle_type': [args.kind] * len(cycles)},
+                             {'source_files': [os.path.basename(args.store)], 'method': args.method})
+    print(f"dQ/dVデータを {out} に保存しました。")
+    return 0
+
+
+def cmd_ml(args):
+    t0 = time.perf_counter()
+    result = MLAnalyzer().run_streaming(args.store, n_components=args.components, n_clusters=args.clusters,
+                                        chunk_size=args.chunk_size, model_path=args.model)
+    print(f"{len(result['cycles'])}サイクルを解析しました: {time.perf_counter() - t0:.2f}s")
+    for i, var in enumerate(result['explained_variance_ratio']):
+        print(f"PC{i+1}: {var*100:.2f}%")
+    if result['labels'] is not None:
+        counts = np.bincount(result['labels'], minlength=args.clusters)
+        print("クラスタごとのサイクル数: " + ", ".join(f"{i}: {n}" for i, n in enumerate(counts)))
+    if args.model:
+        print(f"モデルを {args.model} に保存しました")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless battery simulation and analysis')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('simulate', help='run the degradation simulation and write a results store')
+    p.add_argument('--cycles', type=int, default=50, help='number of cycles')
+    p.add_argument('--dt', type=float, default=1.0, help='time step (s)')
+    p.add_argument('--capacity', type=float, default=3.0, help='initial capacity (Ah)')
+    p.add_argument('--resistance', type=float, default=0.05, help='initial resistance (Ohm)')
+    p.add_argument('--c-rate', type=float, default=0.5, help='C-rate')
+    p.add_argument('--A', type=float, default=0.1, help='capacity degradation A')
+    p.add_argument('--B', type=float, default=0.05, help='capacity degradation B')
+    p.add_argument('--C', type=float, default=0.05, help='resistance increase C')
+    p.add_argument('--D', type=float, default=1.0, help='resistance increase D')
+    p.add_argument('--v-max', type=float, default=4.1797, help='charge voltage limit (V)')
+    p.add_argument('--v-min', type=float, default=3.0519, help='discharge voltage limit (V)')
+    p.add_argument('--end-current-ratio', type=float, default=0.05, help='CV end current ratio')
+    p.add_argument('--cache-dir', default=None, help='on-disk cycle cache directory')
+    p.add_argument('--out', default=None, help='results store (default: results/sim_<time>.npz)')
+    p.add_argument('--csv', metavar='DIR', default=None, help='also export per-cycle CSV files to DIR')
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser('dqdv', help='batch dQ/dV (and peak tracking) of a results store')
+    p.add_argument('store', help='results store (.npz)')
+    p.add_argument('--kind', default='charge', help='curve kind (charge or discharge)')
+    p.add_argument('--points', type=int, default=DEFAULT_GRID_POINTS, help='voltage grid points')
+    p.add_argument('--method', choices=['savgol', 'diff'], default='savgol', help='derivative method')
+    p.add_argument('--peaks', action='store_true', help='detect and track peaks')
+    p.add_argument('--prominence', type=float, default=0.1, help='peak prominence')
+    p.add_argument('--out', default=None, help='dQ/dV store (default: <store>_dqdv.npz)')
+    p.set_defaults(func=cmd_dqdv)
+
+    p = sub.add_parser('ml', help='streaming PCA and clustering of a results store')
+    p.add_argument('store', help='results store (.npz)')
+    p.add_argument('--components', type=int, default=3, help='principal components')
+    p.add_argument('--clusters', type=int, default=3, help='clusters (0: no clustering)')
+    p.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK, help='cycles per chunk')
+    p.add_argument('--model', default=None, help='save the fitted model to this .npz')
+    p.set_defaults(func=cmd_ml)
+
+    p = sub.add_parser('bench', help='run the benchmark suite and compare with the baselines')
+    benchmark.add_arguments(p)
+    p.set_defaults(func=benchmark.run_from_args)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ from simulation_tab import SimulationTab
 from analysis_tab import AnalysisTab
 from ml_tab import MLTab
 from data_export_tab import DataExportTab
+from data_processor import DataProcessor
 
 # BatterySimulator クラスを追加でインポート
 try:
@@ -24,7 +25,7 @@ try:
 except ImportError:
     # 最低限のダミークラス（本来はsimulation_core.pyに用意）
     class BatterySimulator:
-        def __init__(self, initial_capacity=2.5, initial_resistance=0.05):
+        def __init__(self, initial_capacity=2.5, initial_resistance=0.05, cache_dir=None):
             self.initial_capacity = initial_capacity
             self.initial_resistance = initial_resistance
 
@@ -109,10 +110,15 @@ class BatterySimApp:
 
         # Initialize data storage
         self.simulation_results = None
+        
+        # Data processor (batch dQ/dV runs in its worker process)
+        self.processor = DataProcessor()
 
         # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
         # simulatorオブジェクト（初期パラメータ）を生成して保持
-        self.simulator = BatterySimulator(initial_capacity=2.5, initial_resistance=0.05)
+        # LIBCURVESIM_CYCLE_CACHE_DIR を指定するとサイクル計算結果をディスクにもキャッシュ
+        self.simulator = BatterySimulator(initial_capacity=2.5, initial_resistance=0.05,
+                                          cache_dir=os.environ.get("LIBCURVESIM_CYCLE_CACHE_DIR"))
         # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
 
         # Create the tabs
@@ -223,7 +229,8 @@ class BatterySimApp:
         
         Args:
             status_message (str): Message to display in the status bar during execution
-            work_function (callable): Function to execute in the background thread
+            work_function (callable): Function to execute in the background thread; a returned
+                string replaces "準備完了" as the final status message
         """
         import threading
         
@@ -235,11 +242,13 @@ class BatterySimApp:
                     self.root.after(0, lambda: self.update_status(status_message))
                 
                 # Execute the work function
-                work_function()
+                final_status = work_function()
+                if not isinstance(final_status, str):
+                    final_status = "準備完了"
                 
                 # Reset status bar when done
                 if hasattr(self, 'root') and self.root:
-                    self.root.after(0, lambda: self.update_status("準備完了"))
+                    self.root.after(0, lambda: self.update_status(final_status))
                 
             except Exception as e:
                 # Handle any errors that occur during background execution
@@ -261,6 +270,7 @@ def main():
     root = tk.Tk()
     app = BatterySimApp(root)
     root.mainloop()
+    app.processor.shutdown()
 
 
 if __name__ == "__main__":
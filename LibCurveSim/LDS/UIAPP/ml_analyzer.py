@@ -5,6 +5,9 @@ This module provides machine learning functionality for the battery simulation a
 It implements various machine learning models for analyzing battery data.
 """
 
+import os
+import sys
+
 import numpy as np
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
@@ -14,6 +17,10 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.svm import SVR
 
+# streaming_ml lives in the parent directory (LDS)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from streaming_ml import StreamingAnalyzer, DEFAULT_CHUNK
+
 # Try to import TensorFlow for neural network models
 try:
     import tensorflow as tf
@@ -171,6 +178,61 @@ class MLAnalyzer:
             'scaler': scaler if standardize else None
         }
     
+    def run_streaming(self, store_path, n_components=2, n_clusters=3, standardize=True,
+                      chunk_size=DEFAULT_CHUNK, model_path=None):
+        """
+        Run PCA (IncrementalPCA) and clustering (MiniBatchKMeans) on the dQ/dV curves of a
+        results store, reading chunk_size cycles at a time instead of building the full matrix.
+        
+        Args:
+            store_path: Results store (.npz)
+            n_components: Number of principal components
+            n_clusters: Number of clusters (0: no clustering)
+            standardize: Whether to standardize the data
+            chunk_size: Cycles per chunk
+            model_path: Save the fitted model to this .npz (see project_streaming())
+            
+        Returns:
+            Dictionary with the run_pca() and run_clustering() result keys plus 'cycles' and
+            'voltage'; 'model' is the StreamingAnalyzer
+        """
+        analyzer = StreamingAnalyzer(n_components=n_components, n_clusters=n_clusters,
+                                     standardize=standardize, chunk_size=chunk_size)
+        analyzer.fit(store_path, progress=None)
+        if model_path:
+            analyzer.save(model_path)
+        return self._streaming_results(analyzer, store_path)
+    
+    def project_streaming(self, store_path, model_path, chunk_size=DEFAULT_CHUNK):
+        """
+        Project the cycles of a results store with a model saved by run_streaming(), without refitting.
+        
+        Args:
+            store_path: Results store (.npz)
+            model_path: Saved StreamingAnalyzer model (.npz)
+            chunk_size: Cycles per chunk
+            
+        Returns:
+            Dictionary as returned by run_streaming()
+        """
+        analyzer = StreamingAnalyzer.load(model_path)
+        analyzer.chunk_size = chunk_size
+        return self._streaming_results(analyzer, store_path)
+    
+    def _streaming_results(self, analyzer, store_path):
+        projected = analyzer.transform(store_path)
+        centers = analyzer.cluster_centers
+        return {
+            'cycles': projected['cycles'],
+            'voltage': analyzer.voltage,
+            'principal_components': projected['principal_components'],
+            'explained_variance_ratio': analyzer.explained_variance_ratio,
+            'loadings': analyzer.loadings(),
+            'labels': projected['labels'],
+            'cluster_centers': centers * analyzer.scale + analyzer.scale_mean if centers is not None else None,
+            'model': analyzer,
+        }
+    
     def run_neural_network(self, X, y, hidden_units=[64, 32], dropout_rate=0.2, epochs=200,
                           batch_size=16, test_size=0.2, random_state=None, patience=30):
         """
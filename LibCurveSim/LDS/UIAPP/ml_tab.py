@@ -11,11 +11,16 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import numpy as np
 import os
+import sys
 import threading
 
 # Import font configuration for Japanese text support
 import font_config
 
+# results_store lives in the parent directory (LDS)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import results_store
+
 
 class MLTab:
     """
@@ -35,6 +40,7 @@ class MLTab:
         
         # Data storage
         self.ml_results = None
+        self.store_path = None
         self.selected_model = "pca"
         
         # Create frames
@@ -104,7 +110,7 @@ class MLTab:
         model_combo = ttk.Combobox(
             self.model_frame,
             textvariable=self.model_var,
-            values=["pca", "random_forest", "clustering", "neural_network", "svr"],
+            values=["pca", "random_forest", "clustering", "neural_network", "svr", "streaming"],
             state="readonly",
             width=15
         )
@@ -197,6 +203,40 @@ class MLTab:
         self.epsilon_var = tk.DoubleVar(value=0.1)
         ttk.Entry(self.svr_frame, textvariable=self.epsilon_var, width=5).grid(row=2, column=1, sticky=tk.W, pady=2)
         
+        # Streaming parameters (results store read chunk by chunk)
+        self.streaming_frame = ttk.Frame(self.params_frame)
+        
+        ttk.Label(self.streaming_frame, text="主成分数:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        self.stream_components_var = tk.IntVar(value=3)
+        ttk.Entry(self.streaming_frame, textvariable=self.stream_components_var, width=5).grid(row=0, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Label(self.streaming_frame, text="クラスタ数:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        self.stream_clusters_var = tk.IntVar(value=3)
+        ttk.Entry(self.streaming_frame, textvariable=self.stream_clusters_var, width=5).grid(row=1, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Label(self.streaming_frame, text="標準化:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        self.stream_standardize_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.streaming_frame, variable=self.stream_standardize_var).grid(row=2, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Label(self.streaming_frame, text="処理:").grid(row=3, column=0, sticky=tk.W, pady=2)
+        self.stream_mode_var = tk.StringVar(value="fit")
+        ttk.Combobox(
+            self.streaming_frame,
+            textvariable=self.stream_mode_var,
+            values=["fit", "project"],
+            state="readonly",
+            width=10
+        ).grid(row=3, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Label(self.streaming_frame, text="モデルファイル:").grid(row=4, column=0, sticky=tk.W, pady=2)
+        self.stream_model_path_var = tk.StringVar(value="")
+        ttk.Entry(self.streaming_frame, textvariable=self.stream_model_path_var, width=15).grid(row=4, column=1, sticky=tk.W, pady=2)
+        ttk.Button(
+            self.streaming_frame,
+            text="参照...",
+            command=self.browse_stream_model
+        ).grid(row=5, column=1, sticky=tk.W, pady=2)
+        
         # Show only the selected model's parameters
         self.show_selected_model_params()
     
@@ -244,6 +284,7 @@ class MLTab:
         self.clustering_frame.pack_forget()
         self.nn_frame.pack_forget()
         self.svr_frame.pack_forget()
+        self.streaming_frame.pack_forget()
         
         # Show the selected model's parameters
         if self.selected_model == "pca":
@@ -256,21 +297,57 @@ class MLTab:
             self.nn_frame.pack(fill=tk.X)
         elif self.selected_model == "svr":
             self.svr_frame.pack(fill=tk.X)
+        elif self.selected_model == "streaming":
+            self.streaming_frame.pack(fill=tk.X)
+    
+    def browse_stream_model(self):
+        """Choose the streaming model file (written by "fit", read by "project")."""
+        file_path = filedialog.asksaveasfilename(
+            title="モデルファイルを選択",
+            defaultextension=".npz",
+            filetypes=[("モデル", "*.npz"), ("すべてのファイル", "*.*")],
+            confirmoverwrite=False
+        )
+        if file_path:
+            self.stream_model_path_var.set(file_path)
     
     def load_data(self):
         """Load data from a file."""
         file_path = filedialog.askopenfilename(
             title="データファイルを開く",
-            filetypes=[("CSVファイル", "*.csv"), ("すべてのファイル", "*.*")]
+            filetypes=[("結果ストア", "*.npz"), ("CSVファイル", "*.csv"), ("すべてのファイル", "*.*")]
         )
         
         if file_path:
+            if self.selected_model == "streaming":
+                # Streaming reads the store chunk by chunk while running, so nothing is loaded here
+                self._select_store(file_path)
+                return
+            
             # Load data
             self.app.run_in_background(
                 f"ファイルを読み込み中: {os.path.basename(file_path)}",
                 lambda: self._load_data_thread(file_path)
             )
     
+    def _select_store(self, file_path):
+        """
+        Use a results store for streaming analysis.
+        
+        Args:
+            file_path: Path to the results store
+        """
+        if not results_store.is_store(file_path):
+            messagebox.showinfo("情報", "ストリーミング解析には結果ストア (.npz) を選択してください。")
+            return
+        try:
+            store = results_store.load_store(file_path)
+        except Exception as e:
+            messagebox.showerror("エラー", f"結果ストアを開けませんでした: {str(e)}")
+            return
+        self.store_path = file_path
+        self.data_info_var.set(f"結果ストア: {len(store)}サイクル")
+    
     def _load_data_thread(self, file_path):
         """
         Load data in a separate thread.
@@ -279,13 +356,16 @@ class MLTab:
             file_path: Path to the data file
         """
         try:
-            # Load data using data processor
-            data = self.app.processor.load_csv_file(file_path)
+            # Load data using data processor (a results store loads every cycle at once)
+            data = self.app.processor.load_results_file(file_path)
             
             if data is None:
                 messagebox.showerror("エラー", f"ファイルを読み込めませんでした: {file_path}")
                 return
             
+            # Keep the store for the streaming model as well
+            self.store_path = file_path if results_store.is_store(file_path) else None
+            
             # Process data based on type
             if data['type'] == 'dqdv':
                 # Store dQ/dV data
@@ -312,7 +392,14 @@ class MLTab:
     
     def run_ml(self):
         """Run machine learning analysis."""
-        if not hasattr(self, 'dqdv_data') or self.dqdv_data is None:
+        if self.selected_model == "streaming":
+            if self.store_path is None:
+                messagebox.showinfo("情報", "結果ストアが選択されていません。")
+                return
+            if self.stream_mode_var.get() == "project" and not os.path.isfile(self.stream_model_path_var.get()):
+                messagebox.showinfo("情報", "射影に使うモデルファイルを選択してください。")
+                return
+        elif not hasattr(self, 'dqdv_data') or self.dqdv_data is None:
             messagebox.showinfo("情報", "解析するデータがありません。")
             return
         
@@ -342,7 +429,7 @@ class MLTab:
                 # Prepare data
                 ml_data = self.app.analyzer.prepare_data_for_ml(self.dqdv_data, capacity_data)
                 
-            else:
+            elif self.selected_model != "streaming":
                 # For unsupervised learning, we don't need capacity data
                 ml_data = self.app.analyzer.prepare_data_for_ml(self.dqdv_data)
             
@@ -395,6 +482,9 @@ class MLTab:
                     C=self.c_var.get(),
                     epsilon=self.epsilon_var.get()
                 )
+                
+            elif self.selected_model == "streaming":
+                self.ml_results = self._run_streaming()
             
             # Update plot
             self.update_plot()
@@ -412,6 +502,33 @@ class MLTab:
             # Show error message
             messagebox.showerror("エラー", f"機械学習解析中にエラーが発生しました: {str(e)}")
     
+    def _run_streaming(self):
+        """
+        Run streaming PCA and clustering on the selected results store.
+        
+        Returns:
+            Dictionary as returned by MLAnalyzer.run_streaming(), plus the 'cycle_numbers' and
+            'voltage_grid' keys of the in-memory PCA results (used by the data export tab)
+        """
+        # Imported here: ml_analyzer tries to load TensorFlow
+        from ml_analyzer import MLAnalyzer
+        
+        analyzer = MLAnalyzer()
+        model_path = self.stream_model_path_var.get().strip() or None
+        if self.stream_mode_var.get() == "project":
+            results = analyzer.project_streaming(self.store_path, model_path)
+        else:
+            results = analyzer.run_streaming(
+                self.store_path,
+                n_components=self.stream_components_var.get(),
+                n_clusters=self.stream_clusters_var.get(),
+                standardize=self.stream_standardize_var.get(),
+                model_path=model_path
+            )
+        results['cycle_numbers'] = results['cycles']
+        results['voltage_grid'] = results['voltage']
+        return results
+    
     def update_plot(self):
         """Update the plot with the current ML results."""
         if self.ml_results is None:
@@ -431,6 +548,8 @@ class MLTab:
             self._plot_neural_network_results()
         elif self.selected_model == "svr":
             self._plot_svr_results()
+        elif self.selected_model == "streaming":
+            self._plot_streaming_results()
         
         # Update canvas
         self.fig.tight_layout()
@@ -623,6 +742,66 @@ class MLTab:
         ax.set_title(f'SVR Predictions (R² = {test_r2:.3f})')
         ax.grid(True)
     
+    def _plot_streaming_results(self):
+        """Plot streaming PCA and clustering results."""
+        # Create subplots
+        ax1 = self.fig.add_subplot(2, 2, 1)
+        ax2 = self.fig.add_subplot(2, 2, 2)
+        ax3 = self.fig.add_subplot(2, 2, 3)
+        ax4 = self.fig.add_subplot(2, 2, 4)
+        
+        # Plot explained variance
+        explained_variance = self.ml_results['explained_variance_ratio']
+        components = np.arange(1, len(explained_variance) + 1)
+        
+        ax1.bar(components, explained_variance)
+        ax1.plot(components, np.cumsum(explained_variance), 'ro-')
+        ax1.set_xlabel('Principal Component')
+        ax1.set_ylabel('Explained Variance Ratio')
+        ax1.set_title('Explained Variance by Component')
+        ax1.grid(True)
+        
+        # Plot the first two principal components, colored by cluster when clustering ran
+        # (no per-point cycle labels: a store can hold thousands of cycles)
+        principal_components = self.ml_results['principal_components']
+        labels = self.ml_results['labels']
+        y = principal_components[:, 1] if principal_components.shape[1] > 1 else np.zeros(len(principal_components))
+        
+        if labels is not None:
+            scatter = ax2.scatter(principal_components[:, 0], y, c=labels, cmap='tab10', s=20, alpha=0.8)
+            plt.colorbar(scatter, ax=ax2, label='Cluster')
+        else:
+            scatter = ax2.scatter(principal_components[:, 0], y, c=self.ml_results['cycles'],
+                                  cmap='viridis', s=20, alpha=0.8)
+            plt.colorbar(scatter, ax=ax2, label='Cycle Number')
+        
+        ax2.set_xlabel('Principal Component 1')
+        ax2.set_ylabel('Principal Component 2')
+        ax2.set_title('Streaming PCA: First Two Principal Components')
+        ax2.grid(True)
+        
+        # Plot loadings for PC1
+        voltage = self.ml_results['voltage']
+        loadings = self.ml_results['loadings']
+        
+        ax3.plot(voltage, loadings[:, 0])
+        ax3.set_xlabel('Voltage (V)')
+        ax3.set_ylabel('Loading')
+        ax3.set_title('Loadings for Principal Component 1')
+        ax3.grid(True)
+        
+        # Plot cluster centers as dQ/dV curves
+        cluster_centers = self.ml_results['cluster_centers']
+        if cluster_centers is not None:
+            for i, center in enumerate(cluster_centers):
+                ax4.plot(voltage, center, label=f'Cluster {i}')
+            ax4.legend()
+        
+        ax4.set_xlabel('Voltage (V)')
+        ax4.set_ylabel('dQ/dV')
+        ax4.set_title('Cluster Centers')
+        ax4.grid(True)
+    
     def reset_plots(self):
         """Reset plots."""
         # Clear figure
@@ -5,24 +5,154 @@ This module provides the core simulation functionality for the battery simulatio
 It implements the simulation of battery charge/discharge cycles and degradation.
 """
 
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
 import numpy as np
 from scipy.interpolate import interp1d, UnivariateSpline
 
+# cccv_engine and results_store live in the parent directory (LDS)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cccv_engine
+import results_store
+
 # OCV-SOC table from literature (same as in LibDegradationSim03.py)
 SOC_POINTS = np.linspace(0, 1, 11)
 OCV_POINTS = np.array([3.0519, 3.6594, 3.7167, 3.7611, 3.7915, 3.8275,
                        3.8772, 3.9401, 4.0128, 4.0923, 4.1797])
 
 
+class CycleCache:
+    """
+    Content-addressed cache of single-cycle charge/discharge results.
+    
+    A cycle depends only on (capacity_n, resistance_n, c_rate, v_max, v_min, end_current_ratio, dt),
+    the OCV table and the engine version, so the key is a hash of those values: a cycle is reused
+    whatever its cycle number, when the cycle count changes, or when a parameter that does not
+    affect it changes.
+    In memory it is an LRU of max_entries cycles; with cache_dir, entries are also written as .npz
+    files and reloaded after a restart.
+    """
+    
+    FIELDS = (('charge', 'soc'), ('charge', 'capacity'), ('charge', 'voltage'), ('charge', 'current'),
+              ('discharge', 'soc'), ('discharge', 'capacity'), ('discharge', 'voltage'))
+    
+    def __init__(self, max_entries=256, cache_dir=None, salt=''):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of cycles kept in memory
+            cache_dir: Directory for the on-disk cache (None: memory only)
+            salt: Extra key material (e.g. the OCV table) so different models never share entries
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.salt = salt
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+    def key(self, capacity, resistance, c_rate, v_max, v_min, end_current_ratio, dt):
+        """Hash of the cycle parameters (rounded to 12 significant digits)."""
+        values = (capacity, resistance, c_rate, v_max, v_min, end_current_ratio, dt)
+        text = self.salt + "|" + ",".join(f"{float(v):.12g}" for v in values)
+        return hashlib.sha1(text.encode()).hexdigest()
+    
+    def get(self, key):
+        """Return the cached entry for key (memory, then disk) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._load(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+        self._remember(key, entry)
+        return entry
+    
+    def put(self, key, entry):
+        """Store an entry ({'charge': {...}, 'discharge': {...}} of read-only arrays)."""
+        for side, name in self.FIELDS:
+            entry[side][name].setflags(write=False)  # shared between runs: never modified in place
+        self._remember(key, entry)
+        if self.cache_dir:
+            path = os.path.join(self.cache_dir, f"{key}.npz")
+            tmp = f"{path}.tmp.npz"
+            np.savez(tmp, **{f"{side}_{name}": entry[side][name] for side, name in self.FIELDS})
+            os.replace(tmp, path)
+    
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = os.path.join(self.cache_dir, f"{key}.npz")
+        try:
+            with np.load(path) as data:
+                entry = {'charge': {}, 'discharge': {}}
+                for side, name in self.FIELDS:
+                    arr = data[f"{side}_{name}"]
+                    arr.setflags(write=False)
+                    entry[side][name] = arr
+                return entry
+        except (OSError, KeyError, ValueError):
+            return None
+    
+    def stats(self):
+        """Cumulative hit/miss counts and the number of cycles held in memory."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'disk_hits': self.disk_hits,
+                    'entries': len(self._entries)}
+    
+    def clear(self):
+        """Drop the in-memory entries and reset the counters (files in cache_dir are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.disk_hits = 0
+
+
 class SimulationCore:
     """
     Core class for battery simulation.
     """
     
-    def __init__(self):
-        """Initialize the simulation core."""
+    def __init__(self, cache_entries=256, cache_dir=None):
+        """
+        Initialize the simulation core.
+        
+        Args:
+            cache_entries: Number of cycles kept in the in-memory cycle cache
+            cache_dir: Directory for the on-disk cycle cache (None: memory only)
+        """
         # Initialize OCV-SOC interpolation
         self.ocv_interp = interp1d(SOC_POINTS, OCV_POINTS, kind='linear', fill_value='extrapolate')
+        self.ocv_table = cccv_engine.OCVTable(SOC_POINTS, OCV_POINTS)
+        
+        # Cycle results cache (keyed by the cycle parameters, the OCV table and the engine version,
+        # so on-disk entries computed by an older engine are never reused)
+        table_salt = hashlib.sha1(np.concatenate((SOC_POINTS, OCV_POINTS)).tobytes()).hexdigest()
+        self.cycle_cache = CycleCache(cache_entries, cache_dir,
+                                      salt=f"v{cccv_engine.ENGINE_VERSION}|{table_salt}")
+        self.last_cache_stats = {'hits': 0, 'misses': 0}
         
         # Initialize parameters with default values
         self.initial_capacity = 3.0  # Ah
@@ -109,39 +239,13 @@ class SimulationCore:
             
         Returns:
             Tuple of (SOC history, capacity history, voltage history)
+            (vectorized in cccv_engine; the CV voltage is V_max)
         """
-        dt_h = self.time_step / 3600.0
-        I0 = self.c_rate * capacity
-        soc = 0.0
-        charged = 0.0
-        soc_hist, cap_hist, v_hist = [soc], [0.0], [self.ocv_from_soc(soc)]
-        I = I0
-        
-        # CC phase
-        while soc < 1.0:
-            V_oc = self.ocv_from_soc(soc)
-            V_term = V_oc + I * resistance
-            if V_term >= self.v_max:
-                break
-            soc += (I * dt_h) / capacity
-            charged += I * dt_h
-            soc_hist.append(soc)
-            cap_hist.append(charged)
-            v_hist.append(V_term)
-        
-        # CV phase
-        while soc < 1.0:
-            V_oc = self.ocv_from_soc(soc)
-            I = max((self.v_max - V_oc) / resistance, 0.0)
-            if I <= self.end_current_ratio * I0:
-                break
-            soc += (I * dt_h) / capacity
-            charged += I * dt_h
-            soc_hist.append(soc)
-            cap_hist.append(charged)
-            v_hist.append(V_oc + I * resistance)
-        
-        return np.array(soc_hist), np.array(cap_hist), np.array(v_hist)
+        res = cccv_engine.simulate_charge(capacity, self.c_rate, resistance, v_max=self.v_max,
+                                          end_current_ratio=self.end_current_ratio,
+                                          dt=self.time_step, table=self.ocv_table)
+        ch = res['charge']
+        return ch['soc'], ch['capacity'], ch['voltage']
     
     def simulate_discharge(self, capacity, resistance):
         """
@@ -154,24 +258,9 @@ class SimulationCore:
         Returns:
             Tuple of (SOC history, capacity history, voltage history)
         """
-        dt_h = self.time_step / 3600.0
-        I = self.c_rate * capacity
-        soc = 1.0
-        discharged = 0.0
-        soc_hist, cap_hist, v_hist = [soc], [0.0], [self.ocv_from_soc(soc)]
-        
-        while soc > 0.0:
-            V_oc = self.ocv_from_soc(soc)
-            V_term = V_oc - I * resistance
-            if V_term <= self.v_min:
-                break
-            soc -= (I * dt_h) / capacity
-            discharged += I * dt_h
-            soc_hist.append(soc)
-            cap_hist.append(discharged)
-            v_hist.append(V_term)
-        
-        return np.array(soc_hist), np.array(cap_hist), np.array(v_hist)
+        d = cccv_engine.simulate_discharge(capacity, self.c_rate, resistance, v_min=self.v_min,
+                                           dt=self.time_step, table=self.ocv_table)
+        return d['soc'], d['capacity'], d['voltage']
     
     def capacity_after_cycle(self, n):
         """
@@ -205,40 +294,80 @@ class SimulationCore:
         Returns:
             List of simulation results for each cycle
         """
-        results = []
+        cycles = np.arange(1, self.num_cycles + 1)
+        capacities = self.capacity_after_cycle(cycles)
+        resistances = self.resistance_after_cycle(cycles)
         
-        for n in range(1, self.num_cycles + 1):
-            # Calculate capacity and resistance for this cycle
-            capacity = self.capacity_after_cycle(n)
-            resistance = self.resistance_after_cycle(n)
-            
-            # Simulate charge and discharge
-            soc_c, cap_c, v_c = self.simulate_charge(capacity, resistance)
-            soc_d, cap_d, v_d = self.simulate_discharge(capacity, resistance)
-            
-            # Calculate capacity retention
-            capacity_retention = capacity / self.initial_capacity
+        # Cached cycles are reused; the rest go to the engine in one batched call
+        cache = self.cycle_cache
+        keys = [cache.key(c, r, self.c_rate, self.v_max, self.v_min, self.end_current_ratio, self.time_step)
+                for c, r in zip(capacities, resistances)]
+        entries = [cache.get(k) for k in keys]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing:
+            batch = cccv_engine.simulate_cycles(capacities[missing], resistances[missing], self.c_rate,
+                                                dt=self.time_step, v_max=self.v_max, v_min=self.v_min,
+                                                end_current_ratio=self.end_current_ratio,
+                                                table=self.ocv_table)
+            for i, res in zip(missing, batch):
+                ch, d = res['charge'], res['discharge']
+                entries[i] = {
+                    'charge': {'soc': ch['soc'], 'capacity': ch['capacity'],
+                               'voltage': ch['voltage'], 'current': ch['current']},
+                    'discharge': {'soc': d['soc'], 'capacity': d['capacity'], 'voltage': d['voltage']},
+                }
+                cache.put(keys[i], entries[i])
+        self.last_cache_stats = {'hits': len(entries) - len(missing), 'misses': len(missing)}
+        
+        results = []
+        for n, capacity, resistance, entry in zip(cycles, capacities, resistances, entries):
+            ch, d = entry['charge'], entry['discharge']
             
             # Store results
             results.append({
-                'cycle': n,
-                'capacity': capacity,
-                'resistance': resistance,
-                'capacity_retention': capacity_retention,
+                'cycle': int(n),
+                'capacity': float(capacity),
+                'resistance': float(resistance),
+                'capacity_retention': float(capacity / self.initial_capacity),
                 'charge': {
-                    'soc': soc_c,
-                    'capacity': cap_c,
-                    'voltage': v_c
+                    'soc': ch['soc'],
+                    'capacity': ch['capacity'],
+                    'voltage': ch['voltage'],
+                    'current': ch['current']
                 },
                 'discharge': {
-                    'soc': soc_d,
-                    'capacity': cap_d,
-                    'voltage': v_d
+                    'soc': d['soc'],
+                    'capacity': d['capacity'],
+                    'voltage': d['voltage']
                 }
             })
         
         return results
     
+    def save_results_store(self, results, path):
+        """
+        Write run_simulation() results to one results store file (see results_store).
+        
+        Args:
+            results: List returned by run_simulation()
+            path: Output .npz path
+            
+        Returns:
+            path
+        """
+        kinds = ('charge', 'discharge')
+        curves = {kind: {col: [r[kind][col] for r in results] for col in results[0][kind]}
+                  for kind in kinds} if results else {}
+        scalars = {name: [r[name] for r in results] for name in ('capacity', 'resistance', 'capacity_retention')}
+        meta = {
+            'initial_capacity': self.initial_capacity, 'initial_resistance': self.initial_resistance,
+            'c_rate': self.c_rate, 'A': self.capacity_degradation_a, 'B': self.capacity_degradation_b,
+            'C': self.resistance_increase_c, 'D': self.resistance_increase_d,
+            'time_step': self.time_step, 'v_max': self.v_max, 'v_min': self.v_min,
+            'end_current_ratio': self.end_current_ratio,
+        }
+        return results_store.save_store(path, [r['cycle'] for r in results], curves, scalars, meta)
+    
     def smooth_curve(self, capacity, voltage, smoothing=0.001):
         """
         Smooth a capacity-voltage curve.
@@ -254,4 +383,94 @@ class SimulationCore:
         spl = UnivariateSpline(capacity, voltage, s=smoothing)
         xs = np.linspace(capacity.min(), capacity.max(), 400)
         ys = spl(xs)
-        return xs, ys
\ No newline at end of file
+        return xs, ys
+
+class BatterySimulator:
+    """
+    Simulator interface used by the GUI (main_app / simulation_tab), backed by SimulationCore
+    and its cycle cache.
+    """
+    
+    def __init__(self, initial_capacity=2.5, initial_resistance=0.05, cache_dir=None):
+        """
+        Initialize the simulator.
+        
+        Args:
+            initial_capacity: Initial capacity in Ah
+            initial_resistance: Initial internal resistance in Ohm
+            cache_dir: Directory for the on-disk cycle cache (None: memory only)
+        """
+        self.core = SimulationCore(cache_dir=cache_dir)
+        self.initial_capacity = initial_capacity
+        self.initial_resistance = initial_resistance
+        
+        self.capacity_fade_A = self.core.capacity_degradation_a
+        self.capacity_fade_B = self.core.capacity_degradation_b
+        self.resistance_growth_C = self.core.resistance_increase_c
+        self.resistance_growth_D = self.core.resistance_increase_d
+        
+        self.c_rate = self.core.c_rate
+        self.v_max = self.core.v_max
+        self.v_min = self.core.v_min
+        self.end_current_ratio = self.core.end_current_ratio
+        self.dt = self.core.time_step
+    
+    def set_battery_parameters(self, capacity, resistance):
+        """Set battery parameters."""
+        self.initial_capacity = capacity
+        self.initial_resistance = resistance
+    
+    def set_degradation_parameters(self, capacity_fade_A, capacity_fade_B,
+                                   resistance_growth_C, resistance_growth_D):
+        """Set degradation parameters."""
+        self.capacity_fade_A = capacity_fade_A
+        self.capacity_fade_B = capacity_fade_B
+        self.resistance_growth_C = resistance_growth_C
+        self.resistance_growth_D = resistance_growth_D
+    
+    def set_simulation_parameters(self, c_rate, v_max, v_min, end_current_ratio, dt):
+        """Set simulation parameters."""
+        self.c_rate = c_rate
+        self.v_max = v_max
+        self.v_min = v_min
+        self.end_current_ratio = end_current_ratio
+        self.dt = dt
+    
+    def run_all_cycles(self, num_cycles):
+        """
+        Run the simulation for all cycles (cached cycles are reused).
+        
+        Returns:
+            Dictionary with 'cycles', 'capacity', 'resistance', 'voltage' and 'current'
+            (charge voltage/current per cycle) and 'cycle_results' (SimulationCore format)
+        """
+        core = self.core
+        core.set_battery_params(self.initial_capacity, self.c_rate, self.initial_resistance)
+        core.set_degradation_params(self.capacity_fade_A, self.capacity_fade_B,
+                                    self.resistance_growth_C, self.resistance_growth_D)
+        core.set_simulation_params(num_cycles, time_step=self.dt, v_max=self.v_max, v_min=self.v_min,
+                                   end_current_ratio=self.end_current_ratio)
+        cycle_results = core.run_simulation()
+        
+        return {
+            'cycles': [r['cycle'] for r in cycle_results],
+            'capacity': [r['capacity'] for r in cycle_results],
+            'resistance': [r['resistance'] for r in cycle_results],
+            'voltage': [r['charge']['voltage'] for r in cycle_results],
+            'current': [r['charge']['current'] for r in cycle_results],
+            'cycle_results': cycle_results,
+        }
+    
+    def calculate_capacity_retention(self, results):
+        """Calculate capacity retention (%) from results."""
+        if not results or 'capacity' not in results:
+            return []
+        initial_capacity = results['capacity'][0] if results['capacity'] else self.initial_capacity
+        return [cap / initial_capacity * 100 for cap in results['capacity']]
+    
+    def cache_status(self):
+        """Status bar text with the cycle cache hit/miss counts (last run and cumulative)."""
+        last = self.core.last_cache_stats
+        total = self.core.cycle_cache.stats()
+        return (f"サイクルキャッシュ: 今回 ヒット {last['hits']} / ミス {last['misses']}"
+                f"（累計 ヒット {total['hits']} / ミス {total['misses']}, 保持 {total['entries']}サイクル）")
@@ -234,6 +234,9 @@ class SimulationTab:
         
         Args:
             num_cycles: Number of cycles to simulate
+            
+        Returns:
+            Status bar message (cycle cache hit/miss counts when the simulator has a cache)
         """
         try:
             # Run simulation
@@ -251,6 +254,9 @@ class SimulationTab:
             # Show success message
             messagebox.showinfo("完了", f"{num_cycles}サイクルのシミュレーションが完了しました。")
             
+            if hasattr(self.app.simulator, 'cache_status'):
+                return self.app.simulator.cache_status()
+            
         except Exception as e:
             # Enable run button
             self.run_button.config(state=tk.NORMAL)
@@ -0,0 +1,96 @@
+"""
+Performance regression test for the simulation kernels.
+
+Runs the quick benchmark suite (benchmark.py) and fails when a case is slower or uses more
+peak memory than its stored baseline allows. Baselines are machine specific: refresh them with
+    python benchmark.py --update-baseline
+after an intended change or on a new machine.
+
+The timing check is opt-in (set LIBCURVESIM_BENCHMARK=1 or pass --benchmark), and it is
+skipped when the machine fingerprint differs from the one stored with the baselines.
+
+Usage:
+    python test_benchmarks.py --benchmark
+    LIBCURVESIM_BENCHMARK=1 python -m pytest test_benchmarks.py
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path to import the modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+
+BENCHMARK_ENV = 'LIBCURVESIM_BENCHMARK'
+
+
+def benchmark_skip_reason():
+    """Why the timing check does not run here (None when it should)."""
+    if os.environ.get(BENCHMARK_ENV) != '1':
+        return f"benchmark regressions are opt-in ({BENCHMARK_ENV}=1 or --benchmark)"
+    recorded = benchmark.load_baseline_machine()
+    current = benchmark.machine_info()
+    if recorded is not None and recorded != current:
+        return f"baselines were recorded on another machine ({recorded} != {current})"
+    return None
+
+
+def test_regression_check():
+    """find_regressions() flags slow, memory-hungry and failed cases only."""
+    print("\n=== Testing Regression Check ===")
+    baseline = {'a[c10-dt1]': {'seconds': 0.1, 'peak_mb': 10.0}}
+    ok = {'a[c10-dt1]': {'seconds': 0.14, 'peak_mb': 12.0, 'throughput': 1.0, 'unit': 'cycles'}}
+    slow = {'a[c10-dt1]': {'seconds': 0.3, 'peak_mb': 10.0, 'throughput': 1.0, 'unit': 'cycles'}}
+    big = {'a[c10-dt1]': {'seconds': 0.1, 'peak_mb': 20.0, 'throughput': 1.0, 'unit': 'cycles'}}
+    failed = {'a[c10-dt1]': {'unit': 'cycles', 'error': 'ValueError: x'}}
+    new = {'b[c10-dt1]': {'seconds': 9.9, 'peak_mb': 999.0, 'throughput': 1.0, 'unit': 'cycles'}}
+
+    assert benchmark.find_regressions(ok, baseline) == []
+    assert len(benchmark.find_regressions(slow, baseline)) == 1
+    assert len(benchmark.find_regressions(big, baseline)) == 1
+    assert len(benchmark.find_regressions(failed, baseline)) == 1
+    assert benchmark.find_regressions(new, baseline) == []
+    print("Regression check OK")
+
+
+def test_benchmark_regressions():
+    """Quick suite against the stored baselines."""
+    reason = benchmark_skip_reason()
+    if reason:
+        import pytest
+        pytest.skip(reason)
+    _check_benchmark_regressions()
+
+
+def _check_benchmark_regressions():
+    print("\n=== Testing Benchmark Regressions ===")
+    baseline = benchmark.load_baseline()
+    results = benchmark.run_suite('quick')
+    regressions = benchmark.find_regressions(results, baseline)
+    for msg in regressions:
+        print(f"  {msg}")
+    assert not regressions, f"{len(regressions)} benchmark regressions"
+    print(f"{len(results)} cases within the baselines")
+
+
+def main():
+    """Main function to run all tests."""
+    print("=== Battery Simulation and Analysis Tool - Benchmark Test ===")
+    try:
+        test_regression_check()
+        if '--benchmark' in sys.argv[1:]:
+            os.environ[BENCHMARK_ENV] = '1'
+        reason = benchmark_skip_reason()
+        if reason:
+            print(f"\nSkipping benchmark regressions: {reason}")
+        else:
+            _check_benchmark_regressions()
+    except AssertionError as e:
+        print(f"Benchmark test failed: {e}")
+        sys.exit(1)
+    print("\n=== All benchmark tests completed successfully ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ Test script for core functionality of the battery simulation and analysis tool.
 
 This script tests the core functionality of the application, including:
 - Simulation
+- Results store
+- Streaming PCA/clustering
 - Data processing (dQ/dV calculation and peak detection)
 - Machine learning
 
@@ -21,8 +23,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the core modules
 from simulation_core import SimulationCore
-from data_processor import DataProcessor
+from data_processor import DataProcessor, compute_dqdv_batch
 from ml_analyzer import MLAnalyzer
+import cccv_engine
+import results_store
 
 # Create a results directory if it doesn't exist
 RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_results")
@@ -123,6 +127,138 @@ def test_simulation():
     return results
 
 
+def test_engine_equivalence():
+    """Test the vectorized CC-CV engine against the reference step loops."""
+    print("\n=== Testing CC-CV Engine Equivalence ===")
+    
+    cycles = np.array([1, 5, 10])
+    capacities = 3.0 * (1 - 0.1 * (1 - np.exp(-0.05 * cycles)))
+    resistances = 0.05 * (1 + 0.05 * cycles)
+    
+    for c_rate, dt in ((0.5, 1.0), (2.0, 5.0)):
+        worst = cccv_engine.compare_with_reference(capacities, resistances, c_rate, dt=dt)
+        if worst['length_mismatch']:
+            print(f"ERROR: step counts differ from the reference at {c_rate}C, dt={dt}s")
+            return False
+        max_diff = max(v for k, v in worst.items() if k != 'length_mismatch')
+        print(f"{c_rate}C, dt={dt}s: max abs difference {max_diff:.2e}")
+        if max_diff > 1e-9:
+            print("ERROR: engine output differs from the reference")
+            return False
+    
+    print("Engine equivalence test completed successfully")
+    return True
+
+
+def test_cycle_cache():
+    """Test that the cycle cache reuses cycles across reruns and parameter changes."""
+    print("\n=== Testing Cycle Cache ===")
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        sim_core = SimulationCore(cache_dir=cache_dir)
+        sim_core.set_simulation_params(num_cycles=10)
+        first = sim_core.run_simulation()
+        if sim_core.last_cache_stats != {'hits': 0, 'misses': 10}:
+            print(f"ERROR: first run should miss every cycle, got {sim_core.last_cache_stats}")
+            return False
+        
+        # Same parameters, more cycles: the first 10 cycles are reused
+        sim_core.set_simulation_params(num_cycles=15)
+        longer = sim_core.run_simulation()
+        if sim_core.last_cache_stats != {'hits': 10, 'misses': 5}:
+            print(f"ERROR: expected 10 hits / 5 misses, got {sim_core.last_cache_stats}")
+            return False
+        if not np.array_equal(first[9]['charge']['voltage'], longer[9]['charge']['voltage']):
+            print("ERROR: cached cycle differs from the computed one")
+            return False
+        
+        # A new core with the same cache directory loads the cycles from disk
+        reloaded = SimulationCore(cache_dir=cache_dir)
+        reloaded.set_simulation_params(num_cycles=15)
+        reloaded.run_simulation()
+        if reloaded.cycle_cache.stats()['disk_hits'] != 15:
+            print(f"ERROR: expected 15 disk hits, got {reloaded.cycle_cache.stats()}")
+            return False
+    
+    print(f"Cache stats: {sim_core.cycle_cache.stats()}")
+    print("Cycle cache test completed successfully")
+    return True
+
+
+def test_results_store(simulation_results):
+    """Test that a results store round-trips every cycle and loads memory-mapped."""
+    print("\n=== Testing Results Store ===")
+    import tempfile
+    
+    sim_core = SimulationCore()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = sim_core.save_results_store(simulation_results, os.path.join(tmp_dir, "study.npz"))
+        store = results_store.load_store(path)
+        if not isinstance(store.column('charge', 'voltage'), np.memmap):
+            print("ERROR: store columns are not memory-mapped")
+            return False
+        if len(store) != len(simulation_results):
+            print(f"ERROR: expected {len(simulation_results)} rows, got {len(store)}")
+            return False
+        for i, result in enumerate(simulation_results):
+            for kind in ('charge', 'discharge'):
+                curve = store.curve(kind, i)
+                if any(not np.array_equal(curve[col], result[kind][col]) for col in result[kind]):
+                    print(f"ERROR: {kind} curve of cycle {result['cycle']} differs after reload")
+                    return False
+        
+        # The ML tab loads the whole study in one call
+        data = DataProcessor().load_results_file(path)
+        if data['type'] != 'charge_discharge' or len(data['data']) != len(simulation_results):
+            print(f"ERROR: unexpected load_results_file() result: {data['type']}")
+            return False
+        
+        written = results_store.export_csv(store, os.path.join(tmp_dir, "csv"), "study", kinds=['discharge'])
+        if len(written) != len(simulation_results) + 1:
+            print(f"ERROR: expected {len(simulation_results) + 1} CSV files, got {len(written)}")
+            return False
+    
+    print(f"Results store: {len(store)} cycles, kinds {store.kinds}")
+    print("Results store test completed successfully")
+    return True
+
+
+def test_streaming_ml(simulation_results):
+    """Test chunked PCA/clustering against the in-memory PCA and the saved-model projection."""
+    print("\n=== Testing Streaming PCA/Clustering ===")
+    import tempfile
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler
+    
+    analyzer = MLAnalyzer()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_path = SimulationCore().save_results_store(simulation_results, os.path.join(tmp_dir, "study.npz"))
+        model_path = os.path.join(tmp_dir, "model.npz")
+        streamed = analyzer.run_streaming(store_path, n_components=2, n_clusters=2, chunk_size=3,
+                                          model_path=model_path)
+        
+        # Same variance split as PCA on the full matrix
+        _, matrix, _ = results_store.dqdv_on_grid(results_store.load_store(store_path), 'charge', 3.0, 4.2, 500)
+        full = PCA(n_components=2).fit(StandardScaler().fit_transform(matrix))
+        if not np.allclose(streamed['explained_variance_ratio'], full.explained_variance_ratio_, atol=0.02):
+            print(f"ERROR: explained variance {streamed['explained_variance_ratio']} "
+                  f"differs from {full.explained_variance_ratio_}")
+            return False
+        
+        # A saved model projects without refitting
+        projected = analyzer.project_streaming(store_path, model_path)
+        if not (np.allclose(projected['principal_components'], streamed['principal_components'])
+                and np.array_equal(projected['labels'], streamed['labels'])):
+            print("ERROR: saved model projects differently")
+            return False
+    
+    print(f"Streaming PCA: explained variance {np.round(streamed['explained_variance_ratio'], 4)}, "
+          f"cluster sizes {np.bincount(streamed['labels'])}")
+    print("Streaming PCA/clustering test completed successfully")
+    return True
+
+
 def test_data_processing(simulation_results):
     """
     Test the data processing functionality.
@@ -220,6 +356,43 @@ def test_data_processing(simulation_results):
     return dqdv_data, peak_data
 
 
+def test_batch_dqdv(simulation_results):
+    """Test the batch dQ/dV engine and cross-cycle peak tracking."""
+    print("\n=== Testing Batch dQ/dV and Peak Tracking ===")
+    
+    cycles = [result['cycle'] for result in simulation_results]
+    batch = compute_dqdv_batch(
+        cycles,
+        [result['discharge']['voltage'] for result in simulation_results],
+        [result['discharge']['capacity'] for result in simulation_results],
+        {'prominence': 0.1}
+    )
+    
+    if batch['dqdv'].shape != (len(cycles), len(batch['voltage'])):
+        print(f"ERROR: unexpected dQ/dV matrix shape {batch['dqdv'].shape}")
+        return False
+    if not batch['tracks']:
+        print("ERROR: no peak tracks found")
+        return False
+    
+    # Every peak belongs to exactly one track, at most once per cycle
+    for track_id, track in batch['tracks'].items():
+        if len(track['cycles']) != len(set(track['cycles'])):
+            print(f"ERROR: track {track_id} appears twice in one cycle")
+            return False
+    n_peaks = sum(len(p['peak_voltages']) for p in batch['peaks'].values())
+    n_tracked = sum(len(t['cycles']) for t in batch['tracks'].values())
+    if n_peaks != n_tracked:
+        print(f"ERROR: {n_peaks} peaks but {n_tracked} tracked points")
+        return False
+    
+    longest = max(batch['tracks'].values(), key=lambda t: len(t['cycles']))
+    print(f"{len(batch['tracks'])} tracks; longest spans {len(longest['cycles'])} cycles "
+          f"({longest['voltages'][0]:.3f} V -> {longest['voltages'][-1]:.3f} V)")
+    print("Batch dQ/dV test completed successfully")
+    return True
+
+
 def test_machine_learning(dqdv_data):
     """
     Test the machine learning functionality.
@@ -365,12 +538,32 @@ def main():
         print("Simulation test failed")
         return
     
+    if not test_engine_equivalence():
+        print("Engine equivalence test failed")
+        return
+    
+    if not test_cycle_cache():
+        print("Cycle cache test failed")
+        return
+    
+    if not test_results_store(simulation_results):
+        print("Results store test failed")
+        return
+    
+    if not test_streaming_ml(simulation_results):
+        print("Streaming PCA/clustering test failed")
+        return
+    
     # Test data processing
     dqdv_data, peak_data = test_data_processing(simulation_results)
     if not dqdv_data or not peak_data:
         print("Data processing test failed")
         return
     
+    if not test_batch_dqdv(simulation_results):
+        print("Batch dQ/dV test failed")
+        return
+    
     # Test machine learning
     ml_success = test_machine_learning(dqdv_data)
     if not ml_success:
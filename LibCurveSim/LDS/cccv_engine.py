@@ -0,0 +1,386 @@
+"""
+Vectorized CC-CV charge / CC discharge engine
+
+The reference simulators (LibDegradationSim03_V3.py, UIAPP/simulation_core.py, Test01*.py,
+Test02*.py) step one time step at a time in Python and call a scipy interp1d on a scalar at
+every step. This module computes the same step sequences with NumPy:
+
+- CC phases: SOC advances by the same increment every step, so the SOC sequence is a
+  cumulative sum shared by every cycle with that increment; the stop step of each cycle is found
+  with searchsorted on the OCV sequence (plus an exact check of the neighbouring steps).
+- CV phase: inside one linear OCV segment the overpotential e = V_max - OCV decays
+  geometrically, e_k = e_0 * (1 - m * dt_h / (R * Q))^k, so whole segments are produced at once
+  and the number of steps in a segment is known from logarithms.
+- All cycles of a run are advanced together: one CC search over all cycles, then CV passes
+  over the cycles still charging (at most one pass per OCV segment crossed).
+
+Outputs match the reference loops to floating-point rounding (see compare_with_reference()).
+
+Usage:
+  python cccv_engine.py            # equivalence check + timing against the reference loops
+"""
+import time
+
+import numpy as np
+
+# OCV-SOC table from literature (same as LibDegradationSim03*.py)
+SOC_POINTS = np.linspace(0, 1, 11)
+OCV_POINTS = np.array([3.0519, 3.6594, 3.7167, 3.7611, 3.7915, 3.8275,
+                       3.8772, 3.9401, 4.0128, 4.0923, 4.1797])
+
+# Bumped whenever a change to the engine changes its results (invalidates persistent caches)
+ENGINE_VERSION = 1
+
+# Upper bound on steps materialized per cycle in one CV pass (longer segments take several passes)
+CV_CHUNK_MAX = 200_000
+
+
+class OCVTable:
+    """Piecewise-linear OCV(SOC) over SOC 0..1 (inputs are clipped like the reference ocv_from_soc)."""
+
+    def __init__(self, soc_points=SOC_POINTS, ocv_points=OCV_POINTS):
+        soc = np.asarray(soc_points, dtype=float)
+        ocv = np.asarray(ocv_points, dtype=float)
+        if soc.ndim != 1 or soc.shape != ocv.shape or len(soc) < 2:
+            raise ValueError("soc_points and ocv_points must be 1-D arrays of the same length (>= 2)")
+        if np.any(np.diff(soc) <= 0):
+            raise ValueError("soc_points must be strictly increasing")
+        if np.any(np.diff(ocv) < 0):
+            raise ValueError("ocv_points must be non-decreasing in SOC")
+        # interp1d(fill_value='extrapolate') semantics: extend the end segments to SOC 0 and 1
+        if soc[0] > 0.0:
+            ocv = np.concatenate(([ocv[0] + (0.0 - soc[0]) * (ocv[1] - ocv[0]) / (soc[1] - soc[0])], ocv))
+            soc = np.concatenate(([0.0], soc))
+        if soc[-1] < 1.0:
+            ocv = np.concatenate((ocv, [ocv[-1] + (1.0 - soc[-1]) * (ocv[-1] - ocv[-2]) / (soc[-1] - soc[-2])]))
+            soc = np.concatenate((soc, [1.0]))
+        self.soc = soc
+        self.ocv_points = ocv
+        self.slopes = np.diff(ocv) / np.diff(soc)
+
+    def ocv(self, soc):
+        return np.interp(np.clip(soc, 0.0, 1.0), self.soc, self.ocv_points)
+
+    def segment(self, soc):
+        """Index of the linear segment containing each SOC (the segment starting at a breakpoint)."""
+        return np.clip(np.searchsorted(self.soc, soc, side='right') - 1, 0, len(self.slopes) - 1)
+
+
+DEFAULT_TABLE = OCVTable()
+
+
+def _first_index(values, thresholds, exact, n):
+    """First k with exact(k) per cycle, for a predicate that is monotone along k.
+
+    `values` is the non-decreasing sequence searched for `thresholds`; exact(k) is re-evaluated
+    on the neighbouring steps so the result matches the reference comparison bit for bit.
+    """
+    k = np.searchsorted(values, thresholds, side='left')
+    for _ in range(4):
+        back = (k > 0) & exact(np.maximum(k - 1, 0))
+        k = np.where(back, k - 1, k)
+        fwd = (k < n) & ~exact(np.minimum(k, n - 1))
+        k = np.where(fwd, k + 1, k)
+        if not back.any() and not fwd.any():
+            break
+    return k
+
+
+def _sequence(start, step, count):
+    """start, start+step, ... accumulated one addition at a time like the reference loop."""
+    seq = np.full(count + 1, step)
+    seq[0] = start
+    return np.cumsum(seq)
+
+
+def _cc_charge(caps, resistances, c_rate, dt, v_max, table):
+    dt_h = dt / 3600.0
+    I0 = c_rate * caps
+    inc = (I0 * dt_h) / caps
+    stops = np.empty(len(caps), dtype=int)
+    socs = {}
+    for a in np.unique(inc):
+        idx = np.nonzero(inc == a)[0]
+        n = int(np.ceil(1.0 / a)) + 2
+        soc_seq = _sequence(0.0, a, n)
+        ocv_seq = table.ocv(soc_seq)
+        ir = I0[idx] * resistances[idx]
+        k_full = np.searchsorted(soc_seq, 1.0, side='left')
+        k_volt = _first_index(ocv_seq, v_max - ir,
+                              lambda k: ocv_seq[k] + ir >= v_max, len(soc_seq))
+        stops[idx] = np.minimum(k_full, k_volt)
+        for j in idx:
+            socs[j] = (soc_seq, ocv_seq)
+    return I0, socs, stops
+
+
+def _cv_charge(soc0, charged0, t0, caps, resistances, I0, dt, v_max, end_current_ratio, table):
+    """Batched CV phase; returns per-cycle lists of (soc, capacity, current, time) chunks."""
+    dt_h = dt / 3600.0
+    thr = end_current_ratio * I0
+    chunks = [[] for _ in range(len(caps))]
+    active = np.nonzero(soc0 < 1.0)[0]
+    soc0, charged0, t0 = soc0.copy(), charged0.copy(), t0.copy()
+
+    while len(active):
+        s0, R, Q = soc0[active], resistances[active], caps[active]
+        e0 = v_max - table.ocv(s0)
+        seg = table.segment(s0)
+        m = table.slopes[seg]
+        s_next = table.soc[seg + 1]
+        r = 1.0 - m * dt_h / (R * Q)
+
+        # Steps until the current threshold / the end of the segment (analytic, 0 < r < 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k_cur = np.where(e0 / R > thr[active], np.ceil(np.log(thr[active] * R / e0) / np.log(r)), 0.0)
+            rhs = 1.0 - m * (s_next - s0) / e0
+            k_seg = np.where(rhs > 0, np.ceil(np.log(rhs) / np.log(r)), np.inf)
+            flat = np.ceil((s_next - s0) / np.maximum(e0 / R * dt_h / Q, 1e-300))
+        est = np.where((r > 0) & (r < 1), np.minimum(k_cur, k_seg),
+                       np.where(r == 1, flat, 64.0))
+        est = np.where(np.isfinite(est), est, CV_CHUNK_MAX)
+        L = int(min(max(np.max(est), 0.0) + 2, CV_CHUNK_MAX))
+
+        k = np.arange(L + 1)
+        E = e0[:, None] * r[:, None] ** k[None, :]
+        I = np.maximum(E / R[:, None], 0.0)
+        step_ah = I * dt_h
+        soc_inc = step_ah / Q[:, None]
+        SOC = np.cumsum(np.concatenate((s0[:, None], soc_inc[:, :-1]), axis=1), axis=1)
+
+        valid = (SOC < 1.0) & (SOC <= s_next[:, None]) & (I > thr[active][:, None])
+        invalid_any = ~valid
+        n = np.where(invalid_any.any(axis=1), invalid_any.argmax(axis=1), L)
+
+        still = []
+        for row, c in enumerate(active):
+            nc = int(n[row])
+            if nc:
+                chunks[c].append((
+                    SOC[row, 1:nc + 1],
+                    np.cumsum(np.concatenate(([charged0[c]], step_ah[row, :nc])))[1:],
+                    I[row, :nc],
+                    _sequence(t0[c], dt, nc)[1:],
+                ))
+                charged0[c] = chunks[c][-1][1][-1]
+                t0[c] = chunks[c][-1][3][-1]
+            soc0[c] = SOC[row, nc]
+            # Leaving the segment (not by reaching SOC 1 or the end current) continues in the next pass
+            if nc == L or (SOC[row, nc] > s_next[row] and SOC[row, nc] < 1.0):
+                still.append(c)
+        active = np.array(still, dtype=int)
+    return chunks
+
+
+def simulate_cycles(capacities, resistances, c_rate, dt=1.0, v_max=4.1797, v_min=3.0519,
+                    end_current_ratio=0.05, discharge_c_rate=None, table=None, discharge=True):
+    """
+    Simulate CC-CV charge and CC discharge for many (capacity, resistance) pairs at once.
+
+    Returns a list with one dict per cycle:
+      'charge':    {'soc', 'capacity', 'voltage', 'current', 'time', 'phase'}
+      'cv_start_time', 'cv_start_capacity', 'cv_start_soc'
+      'discharge': {'soc', 'capacity', 'voltage', 'current'}   (when discharge=True)
+    """
+    table = table or DEFAULT_TABLE
+    caps = np.atleast_1d(np.asarray(capacities, dtype=float))
+    resistances = np.broadcast_to(np.asarray(resistances, dtype=float), caps.shape).astype(float)
+    dc_rate = c_rate if discharge_c_rate is None else discharge_c_rate
+    ocv0, ocv1 = float(table.ocv(0.0)), float(table.ocv(1.0))
+
+    # ---- CC charge (all cycles) ----
+    I0, socs, stops = _cc_charge(caps, resistances, c_rate, dt, v_max, table)
+    dt_h = dt / 3600.0
+    results = []
+    cc_end = np.empty(len(caps))
+    cc_charged = np.empty(len(caps))
+    cc_time = np.empty(len(caps))
+    for c in range(len(caps)):
+        K = int(stops[c])
+        soc_seq, ocv_seq = socs[c]
+        charged = _sequence(0.0, I0[c] * dt_h, K)
+        t = _sequence(0.0, dt, K)
+        results.append({'charge': {
+            'soc': soc_seq[:K + 1],
+            'capacity': charged,
+            'voltage': np.concatenate(([ocv0], ocv_seq[:K] + I0[c] * resistances[c])),
+            'current': np.full(K + 1, I0[c]),
+            'time': t,
+        }, 'cc_steps': K})
+        cc_end[c], cc_charged[c], cc_time[c] = soc_seq[K], charged[-1], t[-1]
+
+    # ---- CV charge (cycles still below SOC 1, batched per OCV segment) ----
+    cv_chunks = _cv_charge(cc_end, cc_charged, cc_time, caps, resistances, I0, dt, v_max,
+                           end_current_ratio, table)
+    for c, res in enumerate(results):
+        ch = res['charge']
+        K = res.pop('cc_steps')
+        res['cv_start_time'], res['cv_start_capacity'], res['cv_start_soc'] = cc_time[c], cc_charged[c], cc_end[c]
+        n_cv = sum(len(chunk[0]) for chunk in cv_chunks[c])
+        if n_cv:
+            ch['soc'] = np.concatenate([ch['soc']] + [chunk[0] for chunk in cv_chunks[c]])
+            ch['capacity'] = np.concatenate([ch['capacity']] + [chunk[1] for chunk in cv_chunks[c]])
+            ch['current'] = np.concatenate([ch['current']] + [chunk[2] for chunk in cv_chunks[c]])
+            ch['time'] = np.concatenate([ch['time']] + [chunk[3] for chunk in cv_chunks[c]])
+            ch['voltage'] = np.concatenate((ch['voltage'], np.full(n_cv, v_max)))
+        ch['phase'] = np.array(['CC'] * (K + 1) + ['CV'] * n_cv)
+
+    if not discharge:
+        return results
+
+    # ---- CC discharge (all cycles) ----
+    I_d = dc_rate * caps
+    inc = (I_d * dt_h) / caps
+    for a in np.unique(inc):
+        idx = np.nonzero(inc == a)[0]
+        n = int(np.ceil(1.0 / a)) + 2
+        soc_seq = _sequence(1.0, -a, n)
+        ocv_seq = table.ocv(soc_seq)
+        ir = I_d[idx] * resistances[idx]
+        k_empty = np.searchsorted(-soc_seq, 0.0, side='left')
+        k_volt = _first_index(-ocv_seq, -(v_min + ir),
+                              lambda k: ocv_seq[k] - ir <= v_min, len(soc_seq))
+        stops = np.minimum(k_empty, k_volt)
+        for j, c in enumerate(idx):
+            K = int(stops[j])
+            results[c]['discharge'] = {
+                'soc': soc_seq[:K + 1],
+                'capacity': _sequence(0.0, I_d[c] * dt_h, K),
+                'voltage': np.concatenate(([ocv1], ocv_seq[:K] - ir[j])),
+                'current': np.full(K + 1, I_d[c]),
+            }
+    return results
+
+
+def simulate_charge(capacity, c_rate, resistance, v_max=4.1797, end_current_ratio=0.05, dt=1.0, table=None):
+    """Single CC-CV charge; same dict layout as simulate_cycles()."""
+    res = simulate_cycles([capacity], [resistance], c_rate, dt=dt, v_max=v_max,
+                          end_current_ratio=end_current_ratio, table=table, discharge=False)[0]
+    return res
+
+
+def simulate_discharge(capacity, c_rate, resistance, v_min=3.0519, dt=1.0, table=None):
+    """Single CC discharge; returns {'soc', 'capacity', 'voltage', 'current'}."""
+    table = table or DEFAULT_TABLE
+    caps = np.array([float(capacity)])
+    dt_h = dt / 3600.0
+    I = c_rate * caps[0]
+    a = (I * dt_h) / caps[0]
+    soc_seq = _sequence(1.0, -a, int(np.ceil(1.0 / a)) + 2)
+    ocv_seq = table.ocv(soc_seq)
+    ir = np.array([I * resistance])
+    K = int(min(np.searchsorted(-soc_seq, 0.0, side='left'),
+                _first_index(-ocv_seq, -(v_min + ir), lambda k: ocv_seq[k] - ir <= v_min, len(soc_seq))[0]))
+    return {
+        'soc': soc_seq[:K + 1],
+        'capacity': _sequence(0.0, I * dt_h, K),
+        'voltage': np.concatenate(([float(table.ocv(1.0))], ocv_seq[:K] - ir[0])),
+        'current': np.full(K + 1, I),
+    }
+
+
+# ---- reference loops (the original per-step implementation, kept for verification) ----
+def reference_charge(capacity, c_rate, resistance, v_max=4.1797, end_current_ratio=0.05, dt=1.0,
+                     soc_points=SOC_POINTS, ocv_points=OCV_POINTS):
+    from scipy.interpolate import interp1d
+    ocv_interp = interp1d(soc_points, ocv_points, kind='linear', fill_value='extrapolate')
+
+    def ocv_from_soc(soc):
+        return float(ocv_interp(np.clip(soc, 0.0, 1.0)))
+
+    dt_h = dt / 3600.0
+    I0 = c_rate * capacity
+    soc, charged, t = 0.0, 0.0, 0.0
+    soc_hist, cap_hist, v_hist = [soc], [0.0], [ocv_from_soc(soc)]
+    i_hist, t_hist, phase_hist = [I0], [0.0], ['CC']
+    I = I0
+    while soc < 1.0:
+        V_term = ocv_from_soc(soc) + I * resistance
+        if V_term >= v_max:
+            break
+        soc += (I * dt_h) / capacity
+        charged += I * dt_h
+        t += dt
+        soc_hist.append(soc); cap_hist.append(charged); v_hist.append(V_term)
+        i_hist.append(I); t_hist.append(t); phase_hist.append('CC')
+    cv_start = (t, charged, soc)
+    while soc < 1.0:
+        V_oc = ocv_from_soc(soc)
+        I = max((v_max - V_oc) / resistance, 0.0)
+        if I <= end_current_ratio * I0:
+            break
+        soc += (I * dt_h) / capacity
+        charged += I * dt_h
+        t += dt
+        soc_hist.append(soc); cap_hist.append(charged); v_hist.append(v_max)
+        i_hist.append(I); t_hist.append(t); phase_hist.append('CV')
+    return ({'soc': np.array(soc_hist), 'capacity': np.array(cap_hist), 'voltage': np.array(v_hist),
+             'current': np.array(i_hist), 'time': np.array(t_hist), 'phase': np.array(phase_hist)},
+            cv_start)
+
+
+def reference_discharge(capacity, c_rate, resistance, v_min=3.0519, dt=1.0,
+                        soc_points=SOC_POINTS, ocv_points=OCV_POINTS):
+    from scipy.interpolate import interp1d
+    ocv_interp = interp1d(soc_points, ocv_points, kind='linear', fill_value='extrapolate')
+
+    def ocv_from_soc(soc):
+        return float(ocv_interp(np.clip(soc, 0.0, 1.0)))
+
+    dt_h = dt / 3600.0
+    I = c_rate * capacity
+    soc, discharged = 1.0, 0.0
+    soc_hist, cap_hist, v_hist, i_hist = [soc], [0.0], [ocv_from_soc(soc)], [I]
+    while soc > 0.0:
+        V_term = ocv_from_soc(soc) - I * resistance
+        if V_term <= v_min:
+            break
+        soc -= (I * dt_h) / capacity
+        discharged += I * dt_h
+        soc_hist.append(soc); cap_hist.append(discharged); v_hist.append(V_term); i_hist.append(I)
+    return {'soc': np.array(soc_hist), 'capacity': np.array(cap_hist), 'voltage': np.array(v_hist),
+            'current': np.array(i_hist)}
+
+
+def compare_with_reference(capacities, resistances, c_rate, dt=1.0, end_current_ratio=0.05, **kwargs):
+    """Max abs difference per output against the reference loops, plus step-count mismatches."""
+    fast = simulate_cycles(capacities, resistances, c_rate, dt=dt, end_current_ratio=end_current_ratio, **kwargs)
+    worst = {'length_mismatch': 0}
+    for res, cap, R in zip(fast, capacities, resistances):
+        ref_c, _ = reference_charge(cap, c_rate, R, end_current_ratio=end_current_ratio, dt=dt)
+        ref_d = reference_discharge(cap, c_rate, R, dt=dt)
+        for side, ref in (('charge', ref_c), ('discharge', ref_d)):
+            for key, ref_arr in ref.items():
+                arr = res[side][key]
+                if len(arr) != len(ref_arr):
+                    worst['length_mismatch'] += 1
+                    continue
+                if key == 'phase':
+                    diff = float(np.sum(arr != ref_arr))
+                else:
+                    diff = float(np.max(np.abs(arr - ref_arr))) if len(arr) else 0.0
+                name = f"{side}.{key}"
+                worst[name] = max(worst.get(name, 0.0), diff)
+    return worst
+
+
+def _degradation(n, Q0=3.0, A=0.1, B=0.05, R0=0.05, C=0.05, D=1.0):
+    return Q0 * (1 - A * (1 - np.exp(-B * n))), R0 * (1 + C * (n ** D))
+
+
+if __name__ == '__main__':
+    for c_rate, cycles in ((0.5, 50), (0.1, 10)):
+        n = np.arange(1, cycles + 1)
+        caps, res = _degradation(n)
+        t0 = time.perf_counter()
+        simulate_cycles(caps, res, c_rate)
+        t_fast = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for cap, R in zip(caps, res):
+            reference_charge(cap, c_rate, R)
+            reference_discharge(cap, c_rate, R)
+        t_ref = time.perf_counter() - t0
+        worst = compare_with_reference(caps, res, c_rate)
+        print(f"{c_rate}C x {cycles} cycles: reference {t_ref:.2f}s, engine {t_fast * 1000:.1f}ms "
+              f"({t_ref / t_fast:.0f}x)")
+        print("  max abs diff:", {k: f"{v:.2e}" if isinstance(v, float) else v for k, v in worst.items()})
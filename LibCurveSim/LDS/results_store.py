@@ -0,0 +1,391 @@
+"""
+Single-file columnar store for per-cycle simulation and analysis results
+
+- One uncompressed .npz holds every cycle: per-cycle scalars ('scalar.<name>'), and for each
+  curve kind (e.g. 'charge', 'discharge', 'dqdv') the concatenated columns ('<kind>.<column>')
+  plus '<kind>.offsets' (row i spans offsets[i]:offsets[i + 1]; empty when a row has no curve)
+- load_store() memory-maps the members in place (no copy, no parse), so a 1000-cycle study opens
+  in one call and only the cycles that are touched are read from disk
+- export_csv() writes the per-cycle CSV files of the older scripts for tools that still need them
+- dqdv_on_grid() / iter_dqdv_chunks(): dQ/dV of every row on one voltage grid (whole, or a chunk
+  of rows at a time), from a stored dQ/dV kind or derived from capacity-voltage curves;
+  interp_ragged() interpolates all rows of a chunk in one vectorized pass
+
+Usage:
+  python results_store.py results/sim_20250101_120000.npz            # summary
+  python results_store.py results/sim_20250101_120000.npz --csv results
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import struct
+import zipfile
+from datetime import datetime
+
+import numpy as np
+
+FORMAT_NAME = 'libcurvesim-results'
+FORMAT_VERSION = 1
+STORE_PATTERN = '*.npz'
+
+# CSV headers used by the per-cycle files of the LDS scripts
+COLUMN_HEADERS = {
+    'soc': 'SOC', 'capacity': 'Capacity (Ah)', 'voltage': 'Voltage (V)', 'current': 'Current (A)',
+    'time': 'Time (s)', 'phase': 'Phase', 'dqdv': 'dQ/dV (Ah/V)',
+}
+
+# Local file header of a zip member: fixed part, then file name and extra field
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+
+def save_store(path, cycles, curves, scalars=None, meta=None):
+    """
+    Write a results store.
+
+    Args:
+        path: Output .npz path
+        cycles: Cycle number of each row
+        curves: {kind: {column: list with one array per row}}; all columns of a kind must have
+                matching lengths row by row
+        scalars: {name: one value per row} (numbers or strings)
+        meta: JSON-serializable dict of study parameters
+
+    Returns:
+        path
+    """
+    cycles = np.asarray(cycles, dtype=np.int64)
+    n_rows = len(cycles)
+    members = {'cycle': cycles}
+    layout = {}
+    for kind, columns in curves.items():
+        if not columns:
+            continue
+        lengths = None
+        for name, rows in columns.items():
+            if len(rows) != n_rows:
+                raise ValueError(f"{kind}.{name}: {len(rows)} rows, expected {n_rows}")
+            row_lengths = np.array([len(r) for r in rows], dtype=np.int64)
+            if lengths is None:
+                lengths = row_lengths
+            elif not np.array_equal(lengths, row_lengths):
+                raise ValueError(f"{kind}.{name}: row lengths differ from the other {kind} columns")
+            members[f"{kind}.{name}"] = np.concatenate([np.asarray(r) for r in rows]) if n_rows else np.empty(0)
+        offsets = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        members[f"{kind}.offsets"] = offsets
+        layout[kind] = list(columns)
+    for name, values in (scalars or {}).items():
+        values = np.asarray(values)
+        if len(values) != n_rows:
+            raise ValueError(f"scalar {name}: {len(values)} rows, expected {n_rows}")
+        members[f"scalar.{name}"] = values
+    header = {'format': FORMAT_NAME, 'version': FORMAT_VERSION, 'kinds': layout,
+              'scalars': list(scalars or {}), 'created': datetime.now().isoformat(timespec='seconds'),
+              'meta': meta or {}}
+    # Uncompressed, so that every member can be memory-mapped
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, _header=np.array(json.dumps(header)), **members)
+    os.replace(tmp, path)
+    return path
+
+
+def _read_members(path, mmap):
+    """{member name: array}; stored members are memory-mapped when mmap is True."""
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as f:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                f.seek(info.header_offset)
+                fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+                f.seek(info.header_offset + _LOCAL_HEADER.size + fields[-2] + fields[-1])
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+                if not dtype.hasobject and int(np.prod(shape)) > 0:
+                    arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                             order='F' if fortran else 'C')
+                    continue
+            with zf.open(info) as member:
+                arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+    return arrays
+
+
+class ResultsStore:
+    """
+    Read access to a store written by save_store().
+
+    Curves come back as views into the (memory-mapped) columns; nothing is copied until the
+    caller does arithmetic on them.
+    """
+
+    def __init__(self, path, mmap=True):
+        """
+        Open a results store.
+
+        Args:
+            path: Store .npz path
+            mmap: Memory-map the columns (False reads everything into memory)
+        """
+        self.path = path
+        self._arrays = _read_members(path, mmap)
+        if '_header' not in self._arrays:
+            raise ValueError(f"{path} は結果ストアではありません")
+        header = json.loads(str(self._arrays.pop('_header')[()]))
+        if header.get('format') != FORMAT_NAME:
+            raise ValueError(f"{path} は結果ストアではありません")
+        if header.get('version', 0) > FORMAT_VERSION:
+            raise ValueError(f"{path}: 未対応のストア形式バージョン {header['version']}")
+        self.header = header
+        self.meta = header.get('meta', {})
+        self.cycles = self._arrays['cycle']
+        self.scalars = {name: self._arrays[f"scalar.{name}"] for name in header.get('scalars', [])}
+
+    def __len__(self):
+        return len(self.cycles)
+
+    @property
+    def kinds(self):
+        return list(self.header['kinds'])
+
+    def columns(self, kind):
+        return list(self.header['kinds'][kind])
+
+    def offsets(self, kind):
+        return self._arrays[f"{kind}.offsets"]
+
+    def column(self, kind, name):
+        """Concatenated column of every row."""
+        if name not in self.header['kinds'].get(kind, ()):
+            raise KeyError(f"{kind}.{name}")
+        return self._arrays[f"{kind}.{name}"]
+
+    def curve(self, kind, row, columns=None):
+        """{column: array view} of one row."""
+        offsets = self.offsets(kind)
+        lo, hi = offsets[row], offsets[row + 1]
+        return {name: self.column(kind, name)[lo:hi] for name in (columns or self.columns(kind))}
+
+    def curves(self, kind, columns=None):
+        """{cycle: {column: array view}} of every row with a non-empty curve (last row wins per cycle)."""
+        offsets = self.offsets(kind)
+        cols = {name: self.column(kind, name) for name in (columns or self.columns(kind))}
+        return {int(cycle): {name: col[offsets[i]:offsets[i + 1]] for name, col in cols.items()}
+                for i, cycle in enumerate(self.cycles) if offsets[i + 1] > offsets[i]}
+
+
+def load_store(path, mmap=True):
+    """Open a results store (see ResultsStore)."""
+    return ResultsStore(path, mmap=mmap)
+
+
+def is_store(path):
+    """True when path is a results store (checks the zip directory only)."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return '_header.npy' in zf.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def find_store_files(directory="results", pattern=STORE_PATTERN):
+    """Results stores in directory, oldest first."""
+    return sorted((p for p in glob.glob(os.path.join(directory, pattern)) if is_store(p)),
+                  key=os.path.getmtime)
+
+
+def curve_rows(store, kind, cycles=None):
+    """Row indices with a non-empty kind curve, optionally only those of the given cycle numbers."""
+    if kind not in store.kinds:
+        return []
+    offsets = store.offsets(kind)
+    wanted = None if cycles is None else {int(c) for c in cycles}
+    return [i for i, cycle in enumerate(store.cycles)
+            if offsets[i + 1] > offsets[i] and (wanted is None or int(cycle) in wanted)]
+
+
+def curve_frame(store, kind, row):
+    """{CSV column header: array} of one row, i.e. the columns of the matching per-cycle CSV file."""
+    return {COLUMN_HEADERS.get(name, name): np.asarray(values)
+            for name, values in store.curve(kind, row).items()}
+
+
+def interp_ragged(voltage, values, offsets, grid, outside=None):
+    """
+    Interpolate many curves onto one grid in a single vectorized pass.
+
+    Args:
+        voltage, values: Concatenated curves (row i spans offsets[i]:offsets[i + 1] - offsets[0])
+        offsets: Row boundaries
+        grid: Increasing query grid
+        outside: Value outside a curve's voltage span (None: hold the end values, as np.interp)
+
+    Returns:
+        Matrix (rows, len(grid)); rows with fewer than 2 distinct finite points are all zero.
+        Curves need not be sorted; repeated voltages (CV plateau) keep their first point.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_rows = len(offsets) - 1
+    out = np.zeros((n_rows, len(grid)))
+    row = np.repeat(np.arange(n_rows), np.diff(offsets))
+    v = np.asarray(voltage, dtype=float)
+    y = np.asarray(values, dtype=float)
+    valid = np.isfinite(v) & np.isfinite(y)
+    v, y, row = v[valid], y[valid], row[valid]
+    order = np.lexsort((v, row))
+    v, y, row = v[order], y[order], row[order]
+    keep = np.ones(len(v), dtype=bool)
+    keep[1:] = (np.diff(v) != 0) | (np.diff(row) != 0)
+    v, y, row = v[keep], y[keep], row[keep]
+    counts = np.bincount(row, minlength=n_rows)
+    ok = counts >= 2
+    if not ok.any():
+        return out
+    start = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    end = start + counts
+
+    # Shift every row into its own disjoint band so one searchsorted serves all rows
+    base = min(v[0] if len(v) else grid[0], grid[0])
+    band = max(v.max(), grid[-1]) - base + 1.0
+    key = (v - base) + row * band
+    rows = np.flatnonzero(ok)
+    query = (grid - base)[None, :] + (rows * band)[:, None]
+    j = np.searchsorted(key, query, side='right') - 1
+    lo, hi = start[rows][:, None], end[rows][:, None]
+    j = np.clip(j, lo, hi - 2)
+    v0, v1, y0, y1 = v[j], v[j + 1], y[j], y[j + 1]
+    result = y0 + (grid[None, :] - v0) * (y1 - y0) / (v1 - v0)
+    below, above = grid[None, :] < v[lo], grid[None, :] > v[hi - 1]
+    if outside is None:
+        result = np.where(below, y[lo], np.where(above, y[hi - 1], result))
+    else:
+        result[below | above] = outside
+    out[rows] = result
+    return out
+
+
+def iter_dqdv_chunks(store, kind, v_min=None, v_max=None, num_points=500, chunk_size=256):
+    """
+    dQ/dV of a kind on one voltage grid, chunk_size rows at a time.
+
+    Args:
+        store: ResultsStore
+        kind: A kind with 'voltage' and 'dqdv' columns (interpolated), or with 'voltage' and
+              'capacity' columns (dQ/dV by central differences of the resampled capacity)
+        v_min, v_max: Grid range (default: span of all curves)
+        num_points: Number of grid points
+        chunk_size: Rows per chunk; only one chunk of curves is read and held at a time
+
+    Yields:
+        Tuples of (voltage grid, dQ/dV matrix (rows with a curve, num_points), cycle numbers);
+        outside a curve's own voltage span dQ/dV is 0
+    """
+    has_dqdv = 'dqdv' in store.columns(kind)
+    voltage = store.column(kind, 'voltage')
+    values = store.column(kind, 'dqdv' if has_dqdv else 'capacity')
+    offsets = np.asarray(store.offsets(kind))
+    if v_min is None:
+        v_min = np.nanmin(voltage)
+    if v_max is None:
+        v_max = np.nanmax(voltage)
+    grid = np.linspace(v_min, v_max, num_points)
+    cycles = np.asarray(store.cycles)
+    for r0 in range(0, len(store), chunk_size):
+        r1 = min(r0 + chunk_size, len(store))
+        bounds = offsets[r0:r1 + 1]
+        present = np.flatnonzero(np.diff(bounds) > 0)
+        if not len(present):
+            continue
+        lo, hi = bounds[0], bounds[-1]
+        if has_dqdv:
+            matrix = interp_ragged(voltage[lo:hi], values[lo:hi], bounds - lo, grid, outside=0.0)
+        else:
+            matrix = np.gradient(interp_ragged(voltage[lo:hi], values[lo:hi], bounds - lo, grid), grid, axis=1)
+        yield grid, matrix[present], cycles[r0:r1][present]
+
+
+def dqdv_on_grid(store, kind, v_min=None, v_max=None, num_points=500):
+    """
+    dQ/dV of every row of a kind on one voltage grid (see iter_dqdv_chunks()).
+
+    Returns:
+        Tuple of (voltage grid, dQ/dV matrix (rows with a curve, num_points), cycle numbers)
+    """
+    chunks = list(iter_dqdv_chunks(store, kind, v_min, v_max, num_points))
+    if not chunks:
+        return np.linspace(v_min or 0.0, v_max or 0.0, num_points), np.zeros((0, num_points)), np.zeros(0, dtype=np.int64)
+    return chunks[0][0], np.vstack([c[1] for c in chunks]), np.concatenate([c[2] for c in chunks])
+
+
+def export_csv(store, directory="results", prefix="sim", kinds=None):
+    """
+    Write the per-cycle CSV files of the LDS scripts from a store.
+
+    Args:
+        store: ResultsStore (or path)
+        directory: Output directory
+        prefix: File name prefix
+        kinds: Kinds to export (default: all)
+
+    Returns:
+        List of written paths: {prefix}_cycle{n}_{kind}_{timestamp}.csv per row and kind, plus
+        {prefix}_summary_{timestamp}.csv when the store has scalars
+    """
+    if not isinstance(store, ResultsStore):
+        store = load_store(store)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs(directory, exist_ok=True)
+    unique_cycles = len(np.unique(store.cycles)) == len(store)
+    written = []
+    for kind in (kinds or store.kinds):
+        names = store.columns(kind)
+        header = [COLUMN_HEADERS.get(name, name) for name in names]
+        for i, cycle in enumerate(store.cycles):
+            data = store.curve(kind, i, names)
+            if len(data[names[0]]) == 0:
+                continue
+            suffix = "" if unique_cycles else f"_{i}"
+            path = os.path.join(directory, f"{prefix}_cycle{cycle}_{kind}{suffix}_{timestamp}.csv")
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(zip(*(data[name].tolist() for name in names)))
+            written.append(path)
+    if store.scalars:
+        path = os.path.join(directory, f"{prefix}_summary_{timestamp}.csv")
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Cycle'] + list(store.scalars))
+            writer.writerows(zip(store.cycles.tolist(), *(v.tolist() for v in store.scalars.values())))
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect a results store or export it to per-cycle CSV files')
+    parser.add_argument('path', help='results store (.npz)')
+    parser.add_argument('--csv', metavar='DIR', default=None, help='export per-cycle CSV files to DIR')
+    parser.add_argument('--prefix', default=None, help='CSV file name prefix (default: store name)')
+    args = parser.parse_args()
+
+    store = load_store(args.path)
+    print(f"{args.path}: {len(store)} 行 (サイクル {store.cycles.min()}-{store.cycles.max()})" if len(store)
+          else f"{args.path}: 0 行")
+    for kind in store.kinds:
+        print(f"  {kind}: {store.offsets(kind)[-1]} 点, 列 {', '.join(store.columns(kind))}")
+    if store.scalars:
+        print(f"  スカラー: {', '.join(store.scalars)}")
+    if store.meta:
+        print(f"  メタデータ: {json.dumps(store.meta, ensure_ascii=False)}")
+    if args.csv:
+        prefix = args.prefix or os.path.splitext(os.path.basename(args.path))[0]
+        written = export_csv(store, args.csv, prefix)
+        print(f"{len(written)} 個のCSVファイルを {args.csv} に保存しました。")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Out-of-core PCA and clustering of dQ/dV curves from a results store
+
+- StreamingAnalyzer.fit(store): reads the store chunk by chunk (results_store.iter_dqdv_chunks)
+  and never holds more than one chunk of the dQ/dV matrix; pass 1 fits the StandardScaler,
+  pass 2 fits IncrementalPCA and MiniBatchKMeans on the standardized chunks
+- transform(store) / transform_matrix(): PCA scores and cluster labels per cycle, also chunked
+- save() / load(): the fitted model is written as .npz (arrays plus a JSON config, no pickle);
+  a loaded model projects new cycles onto the same grid, scaling, components and clusters
+  without refitting
+
+Usage:
+  python streaming_ml.py results/sim_20250101_120000.npz --components 3 --clusters 3 --model pca_model.npz
+  python streaming_ml.py results/new_cycles.npz --load pca_model.npz
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+
+import results_store
+
+DEFAULT_CHUNK = 256
+MODEL_FORMAT = 'libcurvesim-streaming-model'
+
+
+def default_kind(store):
+    """Stored dQ/dV curves when present, else the charge curves."""
+    return next((k for k in store.kinds if k.startswith('dqdv')), 'charge')
+
+
+def _batches(chunks, min_rows):
+    """Merge chunks so every batch has at least min_rows rows (partial_fit needs them)."""
+    pending = None
+    for _, matrix, cycles in chunks:
+        if pending is None:
+            pending = (matrix, cycles)
+        elif len(pending[0]) < min_rows or len(matrix) < min_rows:
+            pending = (np.vstack([pending[0], matrix]), np.concatenate([pending[1], cycles]))
+        else:
+            yield pending
+            pending = (matrix, cycles)
+    if pending is not None:
+        yield pending
+
+
+class StreamingAnalyzer:
+    """
+    Chunked PCA (IncrementalPCA) and clustering (MiniBatchKMeans) of dQ/dV curves.
+    """
+
+    def __init__(self, n_components=3, n_clusters=3, v_min=3.0, v_max=4.2, num_points=500,
+                 standardize=True, chunk_size=DEFAULT_CHUNK, random_state=42):
+        """
+        Args:
+            n_components: Number of principal components
+            n_clusters: Number of clusters (0: no clustering)
+            v_min, v_max, num_points: Common voltage grid of the dQ/dV curves
+            standardize: Standardize every grid point before PCA/clustering
+            chunk_size: Cycles read per chunk
+            random_state: Seed of MiniBatchKMeans
+        """
+        self.n_components = n_components
+        self.n_clusters = n_clusters
+        self.v_min, self.v_max, self.num_points = v_min, v_max, num_points
+        self.standardize = standardize
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+        self.kind = None
+        # Fitted arrays (projection uses only these, so a loaded model behaves the same)
+        self.scale_mean = self.scale = None
+        self.components = self.pca_mean = None
+        self.explained_variance = self.explained_variance_ratio = None
+        self.cluster_centers = None
+        self.n_samples = 0
+
+    @property
+    def voltage(self):
+        return np.linspace(self.v_min, self.v_max, self.num_points)
+
+    def chunks(self, store, kind=None):
+        """dQ/dV chunks of a store on this model's grid."""
+        return results_store.iter_dqdv_chunks(store, kind or self.kind or default_kind(store), self.v_min,
+                                              self.v_max, self.num_points, self.chunk_size)
+
+    def fit(self, store, kind=None, progress=print):
+        """
+        Fit the scaler, PCA and clustering on every cycle of a store, one chunk at a time.
+
+        Args:
+            store: ResultsStore or path
+            kind: Curve kind (default: stored dQ/dV, else charge)
+            progress: Called with a status line after each pass (None: silent)
+
+        Returns:
+            self
+        """
+        if not isinstance(store, results_store.ResultsStore):
+            store = results_store.load_store(store)
+        self.kind = kind or default_kind(store)
+
+        scaler = StandardScaler()
+        self.n_samples = 0
+        for _, matrix, _ in self.chunks(store):
+            if self.standardize:
+                scaler.partial_fit(matrix)
+            self.n_samples += len(matrix)
+        if self.n_samples < max(self.n_components, self.n_clusters):
+            raise ValueError(f"{self.kind} のサイクル数（{self.n_samples}）が成分数・クラスタ数より少ないため学習できません")
+        if self.standardize:
+            self.scale_mean, self.scale = scaler.mean_, scaler.scale_
+        else:
+            self.scale_mean, self.scale = np.zeros(self.num_points), np.ones(self.num_points)
+        if progress:
+            progress(f"パス1: {self.n_samples}サイクルの標準化パラメータを計算しました")
+
+        ipca = IncrementalPCA(n_components=self.n_components)
+        kmeans = (MiniBatchKMeans(n_clusters=self.n_clusters, random_state=self.random_state, n_init=3)
+                  if self.n_clusters else None)
+        for matrix, _ in _batches(self.chunks(store), max(self.n_components, self.n_clusters)):
+            scaled = (matrix - self.scale_mean) / self.scale
+            ipca.partial_fit(scaled)
+            if kmeans is not None:
+                kmeans.partial_fit(scaled)
+        self.components, self.pca_mean = ipca.components_, ipca.mean_
+        self.explained_variance = ipca.explained_variance_
+        self.explained_variance_ratio = ipca.explained_variance_ratio_
+        self.cluster_centers = kmeans.cluster_centers_ if kmeans is not None else None
+        if progress:
+            progress(f"パス2: PCA（{self.n_components}成分）"
+                     + (f"とクラスタリング（{self.n_clusters}クラスタ）" if kmeans is not None else "")
+                     + "を学習しました")
+        return self
+
+    def transform_matrix(self, matrix):
+        """
+        Project dQ/dV rows on this model's grid.
+
+        Returns:
+            Tuple of (PCA scores (rows, n_components), cluster labels or None)
+        """
+        if self.components is None:
+            raise RuntimeError("モデルが学習されていません")
+        scaled = (np.asarray(matrix, dtype=float) - self.scale_mean) / self.scale
+        scores = (scaled - self.pca_mean) @ self.components.T
+        labels = None
+        if self.cluster_centers is not None:
+            d2 = ((scaled ** 2).sum(axis=1)[:, None] - 2.0 * scaled @ self.cluster_centers.T
+                  + (self.cluster_centers ** 2).sum(axis=1)[None, :])
+            labels = np.argmin(d2, axis=1)
+        return scores, labels
+
+    def transform(self, store, kind=None):
+        """
+        PCA scores and cluster labels of every cycle of a store, one chunk at a time.
+
+        Returns:
+            Dictionary with 'cycles', 'principal_components' and 'labels' (None without clustering)
+        """
+        if not isinstance(store, results_store.ResultsStore):
+            store = results_store.load_store(store)
+        cycles, scores, labels = [], [], []
+        for _, matrix, chunk_cycles in self.chunks(store, kind):
+            s, l = self.transform_matrix(matrix)
+            cycles.append(chunk_cycles)
+            scores.append(s)
+            labels.append(l)
+        if not cycles:
+            return {'cycles': np.zeros(0, dtype=np.int64),
+                    'principal_components': np.zeros((0, self.n_components)), 'labels': None}
+        return {
+            'cycles': np.concatenate(cycles),
+            'principal_components': np.vstack(scores),
+            'labels': np.concatenate(labels) if self.cluster_centers is not None else None,
+        }
+
+    def loadings(self):
+        """Component loadings (grid points x components), as in MLAnalyzer.run_pca()."""
+        return self.components.T * np.sqrt(self.explained_variance)
+
+    def save(self, path):
+        """Write the fitted model to .npz."""
+        if self.components is None:
+            raise RuntimeError("モデルが学習されていません")
+        config = {'format': MODEL_FORMAT, 'n_components': self.n_components, 'n_clusters': self.n_clusters,
+                  'v_min': float(self.v_min), 'v_max': float(self.v_max), 'num_points': self.num_points,
+                  'standardize': self.standardize, 'chunk_size': self.chunk_size, 'kind': self.kind,
+                  'n_samples': self.n_samples}
+        arrays = {'scale_mean': self.scale_mean, 'scale': self.scale, 'components': self.components,
+                  'pca_mean': self.pca_mean, 'explained_variance': self.explained_variance,
+                  'explained_variance_ratio': self.explained_variance_ratio}
+        if self.cluster_centers is not None:
+            arrays['cluster_centers'] = self.cluster_centers
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, _config=np.array(json.dumps(config)), **arrays)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Read a model written by save()."""
+        with np.load(path) as data:
+            config = json.loads(str(data['_config']))
+            if config.get('format') != MODEL_FORMAT:
+                raise ValueError(f"{path} はストリーミング解析モデルではありません")
+            model = cls(n_components=config['n_components'], n_clusters=config['n_clusters'],
+                        v_min=config['v_min'], v_max=config['v_max'], num_points=config['num_points'],
+                        standardize=config['standardize'], chunk_size=config['chunk_size'])
+            model.kind = config['kind']
+            model.n_samples = config['n_samples']
+            model.scale_mean, model.scale = data['scale_mean'], data['scale']
+            model.components, model.pca_mean = data['components'], data['pca_mean']
+            model.explained_variance = data['explained_variance']
+            model.explained_variance_ratio = data['explained_variance_ratio']
+            model.cluster_centers = data['cluster_centers'] if 'cluster_centers' in data else None
+        return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunked PCA/clustering of the dQ/dV curves in a results store')
+    parser.add_argument('store', help='results store (.npz)')
+    parser.add_argument('--components', type=int, default=3, help='principal components')
+    parser.add_argument('--clusters', type=int, default=3, help='clusters (0: no clustering)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK, help='cycles per chunk')
+    parser.add_argument('--kind', default=None, help='curve kind (default: stored dQ/dV, else charge)')
+    parser.add_argument('--model', default=None, help='save the fitted model to this .npz')
+    parser.add_argument('--load', default=None, help='project with a saved model instead of fitting')
+    args = parser.parse_args()
+
+    if args.load:
+        analyzer = StreamingAnalyzer.load(args.load)
+        analyzer.chunk_size = args.chunk_size
+        print(f"モデル {args.load} を読み込みました（学習済みサイクル数 {analyzer.n_samples}）")
+    else:
+        analyzer = StreamingAnalyzer(n_components=args.components, n_clusters=args.clusters,
+                                     chunk_size=args.chunk_size).fit(args.store, kind=args.kind)
+        for i, var in enumerate(analyzer.explained_variance_ratio):
+            print(f"PC{i+1}: {var*100:.2f}%")
+        if args.model:
+            analyzer.save(args.model)
+            print(f"モデルを {args.model} に保存しました")
+    result = analyzer.transform(args.store, kind=args.kind)
+    print(f"{len(result['cycles'])}サイクルを射影しました")
+    if result['labels'] is not None:
+        counts = np.bincount(result['labels'], minlength=analyzer.n_clusters)
+        print("クラスタごとのサイクル数: " + ", ".join(f"{i}: {n}" for i, n in enumerate(counts)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+Parallel parameter sweep for the degradation model
+
+- build_grid(): Cartesian product of parameter axes (Q0, R0, A, B, C, D, c_rate,
+  end_current_ratio, dt); every grid point is simulated for cycles 1..num_cycles
+- Identical (capacity, c_rate, resistance, dt, end_current_ratio) simulations are run once, however
+  many grid points share them (e.g. a C/D axis does not change capacities, an A/B axis does not
+  change resistances); an optional cache file keeps them across sweeps (ignored when it was written
+  for another OCV table or engine version)
+- Unique simulations are grouped by (c_rate, dt, end_current_ratio), cut into chunks and fanned out
+  over a ProcessPoolExecutor; each chunk is one batched cccv_engine.simulate_cycles() call
+- Results go to one columnar file, one row per (grid point, cycle): .npz (default) or
+  .parquet (needs pyarrow)
+
+Usage:
+  python sweep_runner.py --A 0.05 0.1 0.2 --C 0.02 0.05 --c-rate 0.2 0.5 1.0 --cycles 100 --out sweep.npz
+  python sweep_runner.py --c-rate 0.5 1.0 --cache sweep_cache.npz --workers 4
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import cccv_engine
+
+# Axis names and defaults (same defaults as LibDegradationSim03_TestCret_V3.py)
+AXES = {
+    'Q0': 3.0, 'R0': 0.05,
+    'A': 0.1, 'B': 0.05, 'C': 0.05, 'D': 1.0,
+    'c_rate': 0.5, 'end_current_ratio': 0.05, 'dt': 1.0,
+}
+# Simulation key columns; the memo matches keys rounded to KEY_DECIMALS
+KEY_COLUMNS = ('capacity', 'c_rate', 'resistance', 'dt', 'end_current_ratio', 'v_max', 'v_min')
+KEY_DECIMALS = 12
+METRICS = ('charge_ah', 'discharge_ah', 'cc_ah', 'cv_ah', 'cv_start_soc',
+           'charge_time_s', 'cv_time_s', 'discharge_wh')
+DEFAULT_CHUNK = 32
+PROGRESS_INTERVAL_SEC = 1.0
+
+
+def build_grid(**axes):
+    """Grid points (list of dicts) for the given axis values; missing axes use AXES defaults."""
+    unknown = set(axes) - set(AXES)
+    if unknown:
+        raise ValueError(f"unknown sweep axes: {sorted(unknown)}")
+    values = [list(np.atleast_1d(axes.get(name, default))) for name, default in AXES.items()]
+    return [dict(zip(AXES, combo)) for combo in itertools.product(*values)]
+
+
+def capacity_after_cycle(n, Q0=3.0, A=0.1, B=0.05):
+    return Q0 * (1 - A * (1 - np.exp(-B * n)))
+
+
+def resistance_after_cycle(n, R0=0.05, C=0.05, D=1.0):
+    return R0 * (1 + C * (n**D))
+
+
+def _simulate_chunk(c_rate, dt, end_current_ratio, v_max, v_min, capacities, resistances):
+    """Worker: one batched engine call, reduced to summary metrics (arrays of len(capacities))."""
+    results = cccv_engine.simulate_cycles(capacities, resistances, c_rate, dt=dt, v_max=v_max,
+                                          v_min=v_min, end_current_ratio=end_current_ratio)
+    out = {name: np.empty(len(results)) for name in METRICS}
+    for i, res in enumerate(results):
+        ch, d = res['charge'], res['discharge']
+        out['charge_ah'][i] = ch['capacity'][-1]
+        out['discharge_ah'][i] = d['capacity'][-1]
+        out['cc_ah'][i] = res['cv_start_capacity']
+        out['cv_ah'][i] = ch['capacity'][-1] - res['cv_start_capacity']
+        out['cv_start_soc'][i] = res['cv_start_soc']
+        out['charge_time_s'][i] = ch['time'][-1]
+        out['cv_time_s'][i] = ch['time'][-1] - res['cv_start_time']
+        # Terminal voltage recorded per step times the step charge
+        out['discharge_wh'][i] = np.sum(d['voltage'][1:]) * d['current'][0] * dt / 3600.0
+    return out
+
+
+def cache_salt(table=None):
+    """Cache header: OCV table and engine version the cached results were computed with."""
+    table = table or cccv_engine.DEFAULT_TABLE
+    digest = hashlib.sha1(np.concatenate((table.soc, table.ocv_points)).tobytes()).hexdigest()
+    return f"v{cccv_engine.ENGINE_VERSION}|{','.join(KEY_COLUMNS)}|{digest}"
+
+
+def _load_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with np.load(path) as data:
+        salt = str(data['salt']) if 'salt' in data.files else None
+        if salt != cache_salt():
+            print(f"キャッシュ {path} は別の条件（OCVテーブル・エンジン版・キー列）で作成されたため使用しません")
+            return {}
+        keys = data['keys']
+        cols = [data[name] for name in METRICS]
+    return {tuple(k): tuple(c[i] for c in cols) for i, k in enumerate(keys)}
+
+
+def _save_cache(path, cache):
+    keys = np.array(list(cache.keys()), dtype=float).reshape(-1, len(KEY_COLUMNS))
+    vals = np.array(list(cache.values()), dtype=float).reshape(-1, len(METRICS))
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, salt=np.array(cache_salt()), keys=keys,
+             **{name: vals[:, j] for j, name in enumerate(METRICS)})
+    os.replace(tmp, path)
+
+
+def print_progress(done, total, elapsed):
+    eta = elapsed / done * (total - done) if done else 0.0
+    print(f"  {done}/{total} シミュレーション完了 ({done / total * 100:.0f}%), "
+          f"経過 {elapsed:.1f}s, 残り約 {eta:.1f}s")
+
+
+def run_sweep(grid, num_cycles=50, out_path=None, workers=None, chunk_size=DEFAULT_CHUNK,
+              cache_path=None, v_max=4.1797, v_min=3.0519, progress=print_progress):
+    """
+    Simulate every grid point for cycles 1..num_cycles.
+
+    Returns a dict of columns (one row per grid point and cycle): 'point', 'cycle', the AXES
+    parameters, 'capacity', 'resistance', 'retention' and METRICS; also written to out_path
+    when given. workers=1 runs in-process; None uses every core.
+    """
+    t_start = time.perf_counter()
+    cycles = np.arange(1, num_cycles + 1)
+    n_rows = len(grid) * num_cycles
+    cols = {'point': np.repeat(np.arange(len(grid)), num_cycles), 'cycle': np.tile(cycles, len(grid))}
+    for name in AXES:
+        cols[name] = np.repeat([float(p[name]) for p in grid], num_cycles)
+    cols['capacity'] = capacity_after_cycle(cols['cycle'], cols['Q0'], cols['A'], cols['B'])
+    cols['resistance'] = resistance_after_cycle(cols['cycle'], cols['R0'], cols['C'], cols['D'])
+    cols['retention'] = cols['capacity'] / cols['Q0']
+
+    # ---- memoization: one simulation per distinct key ----
+    limits = {'v_max': np.full(n_rows, float(v_max)), 'v_min': np.full(n_rows, float(v_min))}
+    keys = np.round(np.column_stack([limits[k] if k in limits else cols[k] for k in KEY_COLUMNS]),
+                    KEY_DECIMALS)
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    cache = _load_cache(cache_path)
+    values = np.full((len(unique_keys), len(METRICS)), np.nan)
+    todo = []
+    for i, key in enumerate(map(tuple, unique_keys)):
+        hit = cache.get(key)
+        if hit is None:
+            todo.append(i)
+        else:
+            values[i] = hit
+    print(f"{n_rows} 行 / {len(unique_keys)} 種類のシミュレーション "
+          f"(キャッシュ済み {len(unique_keys) - len(todo)}, 実行 {len(todo)})")
+
+    # ---- chunks of unique simulations sharing (c_rate, dt, end_current_ratio) ----
+    todo = np.array(todo, dtype=int)
+    chunks = []
+    if len(todo):
+        group_cols = unique_keys[todo][:, [1, 3, 4]]
+        groups, group_idx = np.unique(group_cols, axis=0, return_inverse=True)
+        group_idx = group_idx.reshape(-1)
+        for g, (c_rate, dt, ecr) in enumerate(groups):
+            members = todo[group_idx == g]
+            for s in range(0, len(members), chunk_size):
+                idx = members[s:s + chunk_size]
+                chunks.append((idx, (c_rate, dt, ecr, v_max, v_min,
+                                     unique_keys[idx, 0], unique_keys[idx, 2])))
+
+    done, last_report = 0, 0.0
+
+    def collect(idx, metrics):
+        nonlocal done, last_report
+        values[idx] = np.column_stack([metrics[name] for name in METRICS])
+        done += len(idx)
+        elapsed = time.perf_counter() - t_start
+        # At most one progress line per PROGRESS_INTERVAL_SEC, plus the final one
+        if progress and (done == len(todo) or elapsed - last_report >= PROGRESS_INTERVAL_SEC):
+            last_report = elapsed
+            progress(done, len(todo), elapsed)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        for idx, args in chunks:
+            collect(idx, _simulate_chunk(*args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_simulate_chunk, *args): idx for idx, args in chunks}
+            for fut in as_completed(futures):
+                collect(futures[fut], fut.result())
+
+    if cache_path and len(todo):
+        for i in todo:
+            cache[tuple(unique_keys[i])] = tuple(values[i])
+        _save_cache(cache_path, cache)
+
+    for j, name in enumerate(METRICS):
+        cols[name] = values[inverse, j]
+    if out_path:
+        save_results(out_path, cols, meta={'num_cycles': num_cycles, 'v_max': v_max, 'v_min': v_min,
+                                           'grid_points': len(grid), 'simulations': int(len(todo))})
+    print(f"スイープ完了: {time.perf_counter() - t_start:.2f}s")
+    return cols
+
+
+def save_results(path, cols, meta=None):
+    """Write result columns to .parquet (pyarrow) or .npz (default)."""
+    meta_json = json.dumps(meta or {})
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet出力には pyarrow が必要です（pip install pyarrow）。.npz を指定してください。")
+        table = pa.table({k: np.asarray(v) for k, v in cols.items()})
+        table = table.replace_schema_metadata({'sweep': meta_json})
+        pq.write_table(table, path)
+    else:
+        np.savez_compressed(path, _meta=np.array(meta_json), **cols)
+    print(f"結果を {path} に保存しました。")
+    return path
+
+
+def load_results(path):
+    """Read a file written by save_results(); returns (columns dict, meta dict)."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {}).get(b'sweep', b'{}'))
+        return {name: table.column(name).to_numpy() for name in table.column_names}, meta
+    with np.load(path) as data:
+        meta = json.loads(str(data['_meta'])) if '_meta' in data else {}
+        return {k: data[k] for k in data.files if k != '_meta'}, meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel degradation parameter sweep')
+    for name, default in AXES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=float, nargs='+',
+                            default=[default], help=f"{name} values (default: {default})")
+    parser.add_argument('--cycles', type=int, default=50, help='cycles per grid point')
+    parser.add_argument('--out', default=None, help='output .npz or .parquet (default: results/sweep_<time>.npz)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK, help='simulations per task')
+    parser.add_argument('--cache', default=None, help='simulation cache .npz reused across sweeps')
+    args = parser.parse_args()
+
+    grid = build_grid(**{name: getattr(args, name) for name in AXES})
+    out = args.out
+    if out is None:
+        os.makedirs('results', exist_ok=True)
+        out = os.path.join('results', f"sweep_{time.strftime('%Y%m%d_%H%M%S')}.npz")
+    run_sweep(grid, num_cycles=args.cycles, out_path=out, workers=args.workers,
+              chunk_size=args.chunk_size, cache_path=args.cache)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,9 @@ from copy import deepcopy
 # Import font configuration for Japanese text support
 import font_config
 
+import scenario_runner
+from solution_data import decimate, plot_points, solution_results
+
 # PyBamm integration
 try:
     import pybamm
@@ -45,6 +48,8 @@ class AdvancedVariablesTab:
         self.original_parameter_values = None
         self.modified_parameters = set()
         self.simulation_results = None
+        self.batch_results = []
+        self.batch_cancel_event = None
         
         # Set up the UI
         self.setup_ui()
@@ -65,6 +70,11 @@ class AdvancedVariablesTab:
         # Parameter modification settings
         self.show_modified_only_var = tk.BooleanVar(value=False)
         
+        # Batch (multi-scenario) settings
+        self.batch_currents_var = tk.StringVar(value="0.5, 1.0, 2.0")
+        self.batch_temperatures_var = tk.StringVar(value="298.15")
+        self.batch_workers_var = tk.IntVar(value=os.cpu_count() or 1)
+        
     def get_available_presets(self):
         """Get list of available parameter presets."""
         if PYBAMM_AVAILABLE:
@@ -126,6 +136,7 @@ class AdvancedVariablesTab:
         self.setup_preset_management(left_frame)
         self.setup_parameter_modification(left_frame)
         self.setup_simulation_controls(left_frame)
+        self.setup_batch_controls(left_frame)
         
         # Set up plot area
         self.setup_plot_area()
@@ -272,6 +283,43 @@ class AdvancedVariablesTab:
             command=self.validate_parameters
         ).pack(side=tk.LEFT, padx=5)
     
+    def setup_batch_controls(self, parent):
+        """Set up the multi-scenario batch panel (presets x currents x temperatures)."""
+        batch_frame = ttk.LabelFrame(parent, text="一括シミュレーション", padding=10)
+        batch_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(batch_frame, text="プリセット:").grid(row=0, column=0, sticky=tk.NW, pady=2)
+        self.batch_preset_list = tk.Listbox(batch_frame, selectmode=tk.MULTIPLE, height=4, exportselection=False)
+        for preset in self.available_presets + list(self.custom_presets.keys()):
+            self.batch_preset_list.insert(tk.END, preset)
+        self.batch_preset_list.grid(row=0, column=1, sticky=tk.EW, padx=5, pady=2)
+        
+        ttk.Label(batch_frame, text="電流値 (A, カンマ区切り):").grid(row=1, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(batch_frame, textvariable=self.batch_currents_var, width=20).grid(row=1, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        ttk.Label(batch_frame, text="温度 (K, カンマ区切り):").grid(row=2, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(batch_frame, textvariable=self.batch_temperatures_var, width=20).grid(row=2, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        ttk.Label(batch_frame, text="並列プロセス数:").grid(row=3, column=0, sticky=tk.W, pady=2)
+        ttk.Spinbox(
+            batch_frame, textvariable=self.batch_workers_var,
+            from_=1, to=max(os.cpu_count() or 1, 1), increment=1, width=10
+        ).grid(row=3, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        button_frame = ttk.Frame(batch_frame)
+        button_frame.grid(row=4, column=0, columnspan=2, pady=5)
+        self.batch_run_button = ttk.Button(button_frame, text="一括実行", command=self.run_batch_simulation)
+        self.batch_run_button.pack(side=tk.LEFT, padx=5)
+        self.batch_cancel_button = ttk.Button(button_frame, text="中止", command=self.cancel_batch_simulation,
+                                              state=tk.DISABLED)
+        self.batch_cancel_button.pack(side=tk.LEFT, padx=5)
+        
+        self.batch_progress = ttk.Progressbar(batch_frame, mode="determinate")
+        self.batch_progress.grid(row=5, column=0, columnspan=2, sticky=tk.EW, pady=2)
+        self.batch_status = ttk.Label(batch_frame, text="")
+        self.batch_status.grid(row=6, column=0, columnspan=2, sticky=tk.W)
+        batch_frame.columnconfigure(1, weight=1)
+    
     def setup_plot_area(self):
         """Set up the enhanced plot area."""
         # Create figure and canvas
@@ -545,6 +593,8 @@ class AdvancedVariablesTab:
             
             if preset_combo:
                 preset_combo.configure(values=all_presets)
+            if preset_name not in self.batch_preset_list.get(0, tk.END):
+                self.batch_preset_list.insert(tk.END, preset_name)
             
             messagebox.showinfo("成功", f"プリセット '{preset_name}' を保存しました。")
             
@@ -583,6 +633,8 @@ class AdvancedVariablesTab:
                     if all_presets:
                         self.preset_var.set(all_presets[0])
                         self.load_parameter_preset()
+                if preset_name in self.batch_preset_list.get(0, tk.END):
+                    self.batch_preset_list.delete(self.batch_preset_list.get(0, tk.END).index(preset_name))
                 
                 messagebox.showinfo("成功", f"プリセット '{preset_name}' を削除しました。")
                 
@@ -873,17 +925,21 @@ def run_simulation(self):
     except tk.TclError:
         messagebox.showerror("エラー", "無効なシミュレーション設定です。")
 
+def signed_current(current_mode, current_value):
+    """Current with the sign of the selected mode."""
+    if current_mode == "discharge":
+        # Negative current for discharge
+        return -abs(current_value)
+    elif current_mode == "charge":
+        # Positive current for charge
+        return abs(current_value)
+    else:  # custom
+        return current_value
+
 def apply_current_settings(self, current_mode, current_value):
     """Apply current/charge/discharge settings to parameters."""
     try:
-        if current_mode == "discharge":
-            # Negative current for discharge
-            final_current = -abs(current_value)
-        elif current_mode == "charge":
-            # Positive current for charge
-            final_current = abs(current_value)
-        else:  # custom
-            final_current = current_value
+        final_current = signed_current(current_mode, current_value)
         
         # Update current parameter
         current_key = "Current function [A]"
@@ -1058,107 +1114,32 @@ def check_solution_convergence(self, solution):
         return False
 
 def extract_simulation_results(self, solution, model_type):
-    """Extract comprehensive simulation results."""
-    results = {
-        'time': solution.t,
-        'voltage': solution["Terminal voltage [V]"].data,
-        'current': solution["Current [A]"].data,
-        'model_type': model_type,
-        'solution': solution
-    }
-    
-    # Extract additional variables if available
+    """Simulation results whose variables are evaluated when a plot first reads them."""
+    # Linear capacity axis up to the nominal capacity when the solution has no usable capacity
     try:
-        # Capacity data
-        if "Discharge capacity [A.h]" in solution:
-            results['capacity'] = solution["Discharge capacity [A.h]"].data
-        else:
-            # Calculate capacity from current and time
-            current_data = results['current']
-            time_data = results['time']
-            capacity_data = np.cumsum(np.abs(current_data) * np.diff(np.concatenate([[0], time_data]))) / 3600
-            results['capacity'] = capacity_data
-        
-        # Temperature data
-        if "Cell temperature [K]" in solution:
-            results['temperature'] = solution["Cell temperature [K]"].data
-        
-        # Voltage components for detailed analysis
-        voltage_components = {}
-        component_vars = [
-            ("Open-circuit voltage [V]", 'ocv'),
-            ("Ohmic losses [V]", 'ohmic'),
-            ("Concentration overpotential [V]", 'concentration'),
-            ("Reaction overpotential [V]", 'reaction'),
-            ("X-averaged negative electrode open-circuit potential [V]", 'neg_ocv'),
-            ("X-averaged positive electrode open-circuit potential [V]", 'pos_ocv'),
-        ]
-        
-        for var_name, key in component_vars:
-            if var_name in solution:
-                voltage_components[key] = solution[var_name].data
-        
-        results['voltage_components'] = voltage_components
-        
-    except Exception as e:
-        print(f"Warning: Could not extract additional variables: {e}")
-        results['capacity'] = np.linspace(0, 2.5, len(results['time']))
-        results['voltage_components'] = {}
-    
+        capacity_fallback = float(self.current_parameter_values["Nominal cell capacity [A.h]"])
+    except (KeyError, TypeError, ValueError):
+        capacity_fallback = 2.5
+    results = solution_results(solution, capacity_fallback=capacity_fallback,
+                               variables={'temperature': "Cell temperature [K]"})
+    results['model_type'] = model_type
+    results['solution'] = solution
     return results
 
 def _enhanced_mock_simulation(self, time_hours, model_type):
     """Generate enhanced mock simulation data."""
-    n_points = int(time_hours * 100)
-    time = np.linspace(0, time_hours * 3600, n_points)
-    
     # Get current parameters for realistic mock data
     if hasattr(self.current_parameter_values, 'items'):
         param_dict = dict(self.current_parameter_values.items())
     else:
         param_dict = dict(self.current_parameter_values.params.items())
     
-    capacity = param_dict.get("Nominal cell capacity [A.h]", 2.5)
-    current_val = param_dict.get("Current function [A]", -1.0)
-    temperature = param_dict.get("Ambient temperature [K]", 298.15)
-    
-    # Generate realistic voltage curve based on current direction
-    if current_val < 0:  # Discharge
-        voltage = 4.2 - (4.2 - 3.0) * (time / (time_hours * 3600))
-        voltage += 0.1 * np.sin(time / 1000) * np.exp(-time / (time_hours * 1800))  # Add some dynamics
-    else:  # Charge
-        voltage = 3.0 + (4.2 - 3.0) * (time / (time_hours * 3600))
-        voltage += 0.05 * np.cos(time / 800) * (1 - np.exp(-time / 1000))
-    
-    # Current with some variation
-    current = np.ones(n_points) * current_val
-    current += 0.01 * current_val * np.sin(time / 500)  # Small variations
-    
-    # Capacity calculation
-    capacity_data = np.cumsum(np.abs(current) * np.diff(np.concatenate([[0], time]))) / 3600
-    
-    # Temperature variation
-    temp_data = np.ones(n_points) * temperature
-    temp_data += 5 * np.sin(time / 2000) * (np.abs(current) / 2.0)  # Heat generation
-    
-    # Mock voltage components
-    voltage_components = {
-        'ocv': voltage + 0.1 + 0.05 * np.sin(time / 1200),
-        'ohmic': -0.05 * np.abs(current) * (1 + 0.1 * np.sin(time / 600)),
-        'concentration': -0.03 * np.abs(current) * (time / (time_hours * 3600)),
-        'reaction': -0.04 * np.abs(current) * (1 + 0.2 * np.cos(time / 800)),
-    }
-    
-    return {
-        'time': time,
-        'voltage': voltage,
-        'current': current,
-        'capacity': capacity_data,
-        'temperature': temp_data,
-        'voltage_components': voltage_components,
-        'model_type': model_type,
-        'solution': None
-    }
+    return scenario_runner.mock_results(param_dict, time_hours, model_type)
+
+def plot_line(self, ax, x, y, *args, **kwargs):
+    """ax.plot() of a curve decimated to the canvas width."""
+    x_plot, y_plot = decimate(x, y, plot_points(self.canvas, self.fig))
+    return ax.plot(x_plot, y_plot, *args, **kwargs)
 
 def update_enhanced_plot(self):
     """Update plot with enhanced visualization options."""
@@ -1175,8 +1156,8 @@ def update_enhanced_plot(self):
         
         # Main voltage plot
         ax1 = self.fig.add_subplot(gs[0, :])
-        ax1.plot(self.simulation_results['time'] / 3600, self.simulation_results['voltage'], 
-                'b-', linewidth=2, label='Terminal Voltage')
+        self._plot_line(ax1, self.simulation_results['time'] / 3600, self.simulation_results['voltage'], 
+                        'b-', linewidth=2, label='Terminal Voltage')
         ax1.set_xlabel('時間 (h)')
         ax1.set_ylabel('電圧 (V)')
         ax1.set_title(f'電圧 vs 時間 ({self.simulation_results.get("model_type", "Unknown")}モデル)')
@@ -1185,8 +1166,8 @@ def update_enhanced_plot(self):
         
         # Current plot
         ax2 = self.fig.add_subplot(gs[1, 0])
-        ax2.plot(self.simulation_results['time'] / 3600, self.simulation_results['current'], 
-                'r-', linewidth=2)
+        self._plot_line(ax2, self.simulation_results['time'] / 3600, self.simulation_results['current'], 
+                        'r-', linewidth=2)
         ax2.set_xlabel('時間 (h)')
         ax2.set_ylabel('電流 (A)')
         ax2.set_title('電流')
@@ -1194,8 +1175,8 @@ def update_enhanced_plot(self):
         
         # Capacity plot
         ax3 = self.fig.add_subplot(gs[1, 1])
-        ax3.plot(self.simulation_results['time'] / 3600, self.simulation_results['capacity'], 
-                'g-', linewidth=2)
+        self._plot_line(ax3, self.simulation_results['time'] / 3600, self.simulation_results['capacity'], 
+                        'g-', linewidth=2)
         ax3.set_xlabel('時間 (h)')
         ax3.set_ylabel('容量 (A.h)')
         ax3.set_title('容量')
@@ -1204,8 +1185,8 @@ def update_enhanced_plot(self):
     else:
         # Simple single plot
         ax = self.fig.add_subplot(1, 1, 1)
-        ax.plot(self.simulation_results['time'] / 3600, self.simulation_results['voltage'], 
-               'b-', linewidth=2)
+        self._plot_line(ax, self.simulation_results['time'] / 3600, self.simulation_results['voltage'], 
+                        'b-', linewidth=2)
         ax.set_xlabel('時間 (h)')
         ax.set_ylabel('電圧 (V)')
         
@@ -1233,6 +1214,153 @@ def clear_plot(self):
     
     # Clear stored results
     self.simulation_results = None
+    self.batch_results = []
+
+def parse_value_list(text):
+    """Parse a comma/space separated list of numbers."""
+    values = [float(v) for v in text.replace(",", " ").split()]
+    if not values:
+        raise ValueError("値が入力されていません。")
+    return values
+
+def batch_parameter_overrides(self, presets):
+    """
+    Parameter overrides per preset for a batch: custom presets contribute their numeric values,
+    and the preset currently loaded in the tab contributes the parameters modified by the user.
+    """
+    overrides = {}
+    for preset in presets:
+        if preset in self.custom_presets:
+            overrides[preset] = {k: v for k, v in self.custom_presets[preset].items()
+                                 if isinstance(v, (int, float)) and not isinstance(v, bool)}
+    loaded = self.preset_var.get()
+    if loaded in presets and self.current_parameter_values is not None and self.modified_parameters:
+        modified = overrides.setdefault(loaded, {})
+        for key in self.modified_parameters:
+            value = self.current_parameter_values[key]
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                modified[key] = value
+    return overrides
+
+def run_batch_simulation(self):
+    """Run every preset x current x temperature scenario in a process pool."""
+    presets = [self.batch_preset_list.get(i) for i in self.batch_preset_list.curselection()]
+    if not presets:
+        presets = [self.preset_var.get()]
+    
+    try:
+        currents = [signed_current(self.current_mode_var.get(), c)
+                    for c in parse_value_list(self.batch_currents_var.get())]
+        temperatures = parse_value_list(self.batch_temperatures_var.get())
+        time_hours = self.time_hours_var.get()
+        model_type = self.model_var.get()
+        workers = max(1, self.batch_workers_var.get())
+    except (ValueError, tk.TclError) as e:
+        messagebox.showerror("エラー", f"一括シミュレーションの設定が無効です: {str(e)}")
+        return
+    
+    if time_hours <= 0:
+        messagebox.showerror("エラー", "シミュレーション時間は正の値を入力してください。")
+        return
+    if any(t < 200 or t > 400 for t in temperatures):
+        messagebox.showerror("エラー", "温度が無効な範囲です（200-400K）。")
+        return
+    
+    scenarios = scenario_runner.build_scenarios(presets, currents, temperatures,
+                                                self.batch_parameter_overrides(presets))
+    self.batch_results = []
+    self.batch_cancel_event = threading.Event()
+    self.batch_progress.configure(maximum=len(scenarios), value=0)
+    self.batch_status.config(text=f"0/{len(scenarios)} シナリオ完了")
+    self.batch_run_button.config(state=tk.DISABLED)
+    self.run_button.config(state=tk.DISABLED)
+    self.batch_cancel_button.config(state=tk.NORMAL)
+    
+    self.app.run_in_background(
+        f"一括シミュレーション実行中... ({len(scenarios)}シナリオ, {model_type}モデル)",
+        lambda: self._run_batch_thread(scenarios, time_hours, model_type, workers)
+    )
+
+def _run_batch_thread(self, scenarios, time_hours, model_type, workers):
+    """Background thread: run the batch and stream each finished scenario to the Tk thread."""
+    t0 = time.perf_counter()
+    total = len(scenarios)
+    
+    def on_result(index, results):
+        self.app.root.after(0, lambda: self.on_batch_result(results, total))
+    
+    try:
+        scenario_runner.run_batch(scenarios, time_hours, model_type, workers=workers,
+                                  on_result=on_result, cancel_event=self.batch_cancel_event)
+    finally:
+        elapsed = time.perf_counter() - t0
+        self.app.root.after(0, lambda: self.on_batch_finished(total, elapsed))
+
+def on_batch_result(self, results, total):
+    """Tk thread: record one finished scenario and redraw the overlay."""
+    self.batch_results.append(results)
+    done = len(self.batch_results)
+    failed = sum(1 for r in self.batch_results if r['error'])
+    self.batch_progress.configure(value=done)
+    status = f"{done}/{total} シナリオ完了"
+    if failed:
+        status += f"（失敗 {failed}）"
+    self.batch_status.config(text=status)
+    self.update_batch_plot()
+
+def on_batch_finished(self, total, elapsed):
+    """Tk thread: re-enable the controls and report failed scenarios."""
+    self.batch_run_button.config(state=tk.NORMAL)
+    self.run_button.config(state=tk.NORMAL)
+    self.batch_cancel_button.config(state=tk.DISABLED)
+    
+    done = len(self.batch_results)
+    failures = [r for r in self.batch_results if r['error']]
+    message = f"{done}/{total} シナリオが完了しました（{elapsed:.1f}秒）。"
+    if self.batch_cancel_event is not None and self.batch_cancel_event.is_set():
+        message = f"一括シミュレーションを中止しました。{message}"
+    if failures:
+        message += "\n\n失敗したシナリオ:\n" + "\n".join(
+            f"{r['scenario']['label']}: {r['error']}" for r in failures[:10])
+        messagebox.showwarning("一括シミュレーション", message)
+    else:
+        messagebox.showinfo("一括シミュレーション", message)
+
+def cancel_batch_simulation(self):
+    """Skip the scenarios that have not started yet."""
+    if self.batch_cancel_event is not None:
+        self.batch_cancel_event.set()
+        self.batch_status.config(text="中止しています...")
+        self.batch_cancel_button.config(state=tk.DISABLED)
+
+def update_batch_plot(self):
+    """Overlay voltage vs time and voltage vs capacity of every finished scenario."""
+    finished = [r for r in self.batch_results if not r['error']]
+    if not finished:
+        return
+    
+    self.fig.clear()
+    ax1 = self.fig.add_subplot(2, 1, 1)
+    ax2 = self.fig.add_subplot(2, 1, 2)
+    # Keep colours stable while results stream in out of order
+    finished.sort(key=lambda r: r['scenario']['label'])
+    for r in finished:
+        label = r['scenario']['label']
+        self._plot_line(ax1, r['time'] / 3600, r['voltage'], linewidth=1.5, label=label)
+        self._plot_line(ax2, r['capacity'], r['voltage'], linewidth=1.5, label=label)
+    
+    ax1.set_xlabel('時間 (h)')
+    ax1.set_ylabel('電圧 (V)')
+    ax1.set_title(f'電圧 vs 時間 ({finished[0].get("model_type", "Unknown")}モデル, {len(finished)}シナリオ)')
+    ax1.grid(True, alpha=0.3)
+    ax1.legend(fontsize=7)
+    ax2.set_xlabel('容量 (A.h)')
+    ax2.set_ylabel('電圧 (V)')
+    ax2.set_title('電圧 vs 容量')
+    ax2.grid(True, alpha=0.3)
+    
+    self.fig.tight_layout()
+    self.canvas.draw()
 
 # Add these methods to the AdvancedVariablesTab class
 AdvancedVariablesTab.run_simulation = run_simulation
@@ -1242,5 +1370,13 @@ AdvancedVariablesTab._run_enhanced_simulation_thread = _run_enhanced_simulation_
 AdvancedVariablesTab.check_solution_convergence = check_solution_convergence
 AdvancedVariablesTab.extract_simulation_results = extract_simulation_results
 AdvancedVariablesTab._enhanced_mock_simulation = _enhanced_mock_simulation
+AdvancedVariablesTab._plot_line = plot_line
 AdvancedVariablesTab.update_enhanced_plot = update_enhanced_plot
-AdvancedVariablesTab.clear_plot = clear_plot
\ No newline at end of file
+AdvancedVariablesTab.clear_plot = clear_plot
+AdvancedVariablesTab.batch_parameter_overrides = batch_parameter_overrides
+AdvancedVariablesTab.run_batch_simulation = run_batch_simulation
+AdvancedVariablesTab._run_batch_thread = _run_batch_thread
+AdvancedVariablesTab.on_batch_result = on_batch_result
+AdvancedVariablesTab.on_batch_finished = on_batch_finished
+AdvancedVariablesTab.cancel_batch_simulation = cancel_batch_simulation
+AdvancedVariablesTab.update_batch_plot = update_batch_plot
@@ -10,6 +10,9 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import os
 import sys
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
 
 # Add the current directory to the path to import the modules
@@ -18,6 +21,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Import font configuration for Japanese text support
 import font_config
 
+from solution_data import solution_results
+
 # Import the tab modules
 try:
     from simulation_tab import SimulationTab
@@ -124,14 +129,118 @@ except ImportError:
     pybamm = MockPyBamm()
 
 
+# Quantities passed to the solver as PyBaMM input parameters: changing them re-solves the cached
+# model instead of rebuilding and re-discretizing it
+INPUT_PARAMETERS = (
+    'Nominal cell capacity [A.h]',
+    'Current function [A]',
+    'Ambient temperature [K]',
+)
+PARAMETER_SET = "Chen2020"
+SOLVER_MODE = "safe"
+MODEL_CACHE_ENTRIES = 4
+# Model type -> constructor; shared with scenario_runner
+MODEL_TYPES = {
+    'DFN': pybamm.lithium_ion.DFN,
+    'SPM': pybamm.lithium_ion.SPM,
+    'SPMe': pybamm.lithium_ion.SPMe,
+}
+
+
+class ModelCache:
+    """
+    Built and discretized PyBaMM simulations, keyed by model type, structural options
+    (anything that changes the equations or the mesh), parameter set and fixed parameter
+    overrides. Least recently used entries are dropped beyond max_entries; DFN models are large.
+    """
+    
+    def __init__(self, max_entries=MODEL_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(model_type, model_options=None, parameter_set=PARAMETER_SET, solver_mode=SOLVER_MODE,
+            parameter_overrides=None):
+        return (model_type, tuple(sorted((model_options or {}).items())), parameter_set, solver_mode,
+                tuple(sorted((parameter_overrides or {}).items())))
+    
+    def get(self, key):
+        with self._lock:
+            sim = self._entries.get(key)
+            if sim is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return sim
+    
+    def put(self, key, sim):
+        with self._lock:
+            self._entries[key] = sim
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+def build_simulation(model_type, model_options=None, parameter_set=PARAMETER_SET, solver_mode=SOLVER_MODE,
+                     parameter_overrides=None):
+    """
+    Build and discretize a PyBaMM simulation whose INPUT_PARAMETERS are solver inputs.
+    
+    parameter_overrides are fixed values applied on top of parameter_set (entries for
+    INPUT_PARAMETERS are ignored; pass those to solve() as inputs).
+    
+    Returns:
+        Tuple of (pybamm.Simulation, {'build': s, 'discretize': s})
+    """
+    t0 = time.perf_counter()
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type: {model_type}")
+    model = MODEL_TYPES[model_type](options=dict(model_options or {}))
+    
+    parameter_values = pybamm.ParameterValues(parameter_set)
+    fixed = {name: value for name, value in (parameter_overrides or {}).items() if name not in INPUT_PARAMETERS}
+    if fixed:
+        parameter_values.update(fixed, check_already_exists=False)
+    parameter_values.update({name: "[input]" for name in INPUT_PARAMETERS})
+    
+    sim = pybamm.Simulation(
+        model,
+        parameter_values=parameter_values,
+        solver=pybamm.CasadiSolver(mode=solver_mode)
+    )
+    sim.set_parameters()
+    t1 = time.perf_counter()
+    
+    # Mesh and discretization; solve() reuses the built model from here on
+    sim.build()
+    t2 = time.perf_counter()
+    return sim, {'build': t1 - t0, 'discretize': t2 - t1}
+
+
 class PyBammSimulator:
     """
     PyBamm simulation wrapper class.
     Provides a simplified interface for running PyBamm simulations.
     """
     
-    def __init__(self):
-        """Initialize the PyBamm simulator."""
+    def __init__(self, model_cache=None):
+        """
+        Initialize the PyBamm simulator.
+        
+        Args:
+            model_cache: ModelCache shared between simulators (default: a new one)
+        """
         self.model = None
         self.solution = None
         self.parameters = {
@@ -141,6 +250,9 @@ class PyBammSimulator:
             'Upper voltage cut-off [V]': 4.2,
             'Ambient temperature [K]': 298.15
         }
+        self.model_cache = model_cache if model_cache is not None else ModelCache()
+        self.last_timings = None
+        self._run_lock = threading.Lock()
         
     def set_parameters(self, capacity=None, current=None, v_min=None, v_max=None, temperature=None):
         """
@@ -164,134 +276,80 @@ class PyBammSimulator:
         if temperature is not None:
             self.parameters['Ambient temperature [K]'] = temperature
     
-    def run_simulation(self, time_hours=1.0, model_type='DFN'):
+    def solver_inputs(self):
+        """Values of INPUT_PARAMETERS for the next solve."""
+        return {
+            'Nominal cell capacity [A.h]': float(self.parameters['Nominal cell capacity [A.h]']),
+            # For constant current discharge
+            'Current function [A]': abs(float(self.parameters['Current function [A]'])),
+            'Ambient temperature [K]': float(self.parameters['Ambient temperature [K]']),
+        }
+    
+    def timing_summary(self):
+        """Status text with the build / discretize / solve breakdown of the last run."""
+        t = self.last_timings
+        if t is None:
+            return ""
+        source = "キャッシュ済みモデルを再利用" if t['cached'] else "モデルを新規構築"
+        return (f"構築 {t['build']:.2f}s / 離散化 {t['discretize']:.2f}s / 求解 {t['solve']:.2f}s"
+                f"（{source}、キャッシュ {len(self.model_cache)}モデル）")
+    
+    def run_simulation(self, time_hours=1.0, model_type='DFN', model_options=None):
         """
         Run PyBamm simulation.
         
+        The built and discretized model is cached per (model type, model options); only the
+        solve step runs again when capacity, current or temperature change.
+        
         Args:
             time_hours: Simulation time in hours
             model_type: Model type ('DFN', 'SPM', 'SPMe')
+            model_options: PyBaMM model options dict (e.g. {'thermal': 'lumped'}); part of the cache key
             
         Returns:
-            dict: Simulation results containing time, voltage, current, capacity
+            Mapping of simulation results (time, voltage, current, capacity, voltage_components,
+            timings); solution variables are evaluated on first access (solution_data.LazyResults)
         """
         try:
             # Ensure time_hours is a float
             time_hours = float(time_hours)
             
-            # Create model
-            if model_type == 'DFN':
-                self.model = pybamm.lithium_ion.DFN()
-            elif model_type == 'SPM':
-                self.model = pybamm.lithium_ion.SPM()
-            elif model_type == 'SPMe':
-                self.model = pybamm.lithium_ion.SPMe()
-            else:
-                raise ValueError(f"Unknown model type: {model_type}")
-            
-            # Set up parameters with proper PyBamm parameter names
-            parameter_values = pybamm.ParameterValues("Chen2020")
-            
-            # Update parameters with proper names and values
-            if 'Nominal cell capacity [A.h]' in self.parameters:
-                parameter_values["Nominal cell capacity [A.h]"] = self.parameters['Nominal cell capacity [A.h]']
-            
-            if 'Current function [A]' in self.parameters:
-                # For constant current discharge
-                current_value = abs(float(self.parameters['Current function [A]']))
-                parameter_values.update({
-                    "Current function [A]": current_value
-                })
-            
-            if 'Ambient temperature [K]' in self.parameters:
-                parameter_values["Ambient temperature [K]"] = float(self.parameters['Ambient temperature [K]'])
-            
-            # Create simulation with proper solver
-            sim = pybamm.Simulation(
-                self.model, 
-                parameter_values=parameter_values,
-                solver=pybamm.CasadiSolver(mode="safe")
-            )
-            
-            # Run simulation with proper time evaluation
-            # Use fewer points to avoid memory issues
-            n_points = max(100, int(time_hours * 60))  # At least 100 points, or 60 per hour
-            t_eval = np.linspace(0, time_hours * 3600, n_points)
-            
-            self.solution = sim.solve(t_eval)
-            
-            # Extract results with error handling
-            results = {
-                'time': self.solution.t,
-                'voltage': self.solution["Terminal voltage [V]"].data,
-                'current': self.solution["Current [A]"].data,
-            }
-            
-            # Extract voltage components for detailed analysis
-            try:
-                voltage_components = {}
-                
-                # Open circuit voltage
-                if "Open-circuit voltage [V]" in self.solution:
-                    voltage_components['ocv'] = self.solution["Open-circuit voltage [V]"].data
-                
-                # Ohmic losses
-                if "Ohmic losses [V]" in self.solution:
-                    voltage_components['ohmic'] = self.solution["Ohmic losses [V]"].data
-                
-                # Concentration overpotential
-                if "Concentration overpotential [V]" in self.solution:
-                    voltage_components['concentration'] = self.solution["Concentration overpotential [V]"].data
-                
-                # Reaction overpotential
-                if "Reaction overpotential [V]" in self.solution:
-                    voltage_components['reaction'] = self.solution["Reaction overpotential [V]"].data
-                
-                # Electrode potentials
-                if "Negative electrode potential [V]" in self.solution:
-                    voltage_components['negative_electrode'] = self.solution["Negative electrode potential [V]"].data
-                if "Positive electrode potential [V]" in self.solution:
-                    voltage_components['positive_electrode'] = self.solution["Positive electrode potential [V]"].data
+            with self._run_lock:
+                key = ModelCache.key(model_type, model_options)
+                sim = self.model_cache.get(key)
+                timings = {'build': 0.0, 'discretize': 0.0, 'cached': sim is not None}
+                if sim is None:
+                    sim, build_timings = build_simulation(model_type, model_options)
+                    timings.update(build_timings)
+                    self.model_cache.put(key, sim)
+                self.model = sim.model
                 
-                # Try alternative variable names that might be available
-                alternative_vars = [
-                    ("X-averaged negative electrode open-circuit potential [V]", 'neg_ocv'),
-                    ("X-averaged positive electrode open-circuit potential [V]", 'pos_ocv'),
-                    ("X-averaged negative electrode reaction overpotential [V]", 'neg_reaction'),
-                    ("X-averaged positive electrode reaction overpotential [V]", 'pos_reaction'),
-                    ("X-averaged electrolyte ohmic losses [V]", 'electrolyte_ohmic'),
-                    ("X-averaged solid phase ohmic losses [V]", 'solid_ohmic'),
-                ]
+                # Run simulation with proper time evaluation
+                # Use fewer points to avoid memory issues
+                n_points = max(100, int(time_hours * 60))  # At least 100 points, or 60 per hour
+                t_eval = np.linspace(0, time_hours * 3600, n_points)
                 
-                for var_name, key in alternative_vars:
-                    if var_name in self.solution:
-                        voltage_components[key] = self.solution[var_name].data
-                
-                results['voltage_components'] = voltage_components
-                
-            except Exception as e:
-                print(f"Warning: Could not extract voltage components: {e}")
-                results['voltage_components'] = {}
+                t0 = time.perf_counter()
+                self.solution = sim.solve(t_eval, inputs=self.solver_inputs())
+                timings['solve'] = time.perf_counter() - t0
+                self.last_timings = timings
             
-            # Try to get capacity data
-            try:
-                if "Discharge capacity [A.h]" in self.solution:
-                    results['capacity'] = self.solution["Discharge capacity [A.h]"].data
-                else:
-                    # Calculate capacity from current and time
-                    current_data = results['current']
-                    time_data = results['time']
-                    capacity_data = np.cumsum(np.abs(current_data) * np.diff(np.concatenate([[0], time_data]))) / 3600
-                    results['capacity'] = capacity_data
-            except:
-                # Fallback capacity calculation
-                results['capacity'] = np.linspace(0, self.parameters.get('Nominal cell capacity [A.h]', 2.5), len(results['time']))
+            # Variables are evaluated when a plot or export first reads them; voltage and current
+            # are read here so a broken solution still falls back to mock data
+            results = solution_results(
+                self.solution,
+                capacity_fallback=self.parameters.get('Nominal cell capacity [A.h]', 2.5)
+            )
+            for key in ('voltage', 'current'):
+                results[key]
             
+            results['timings'] = dict(self.last_timings)
             return results
             
         except Exception as e:
             # Fallback to mock simulation for development
             print(f"PyBamm simulation failed, using mock data: {e}")
+            self.last_timings = None
             return self._mock_simulation(time_hours)
     
     def _mock_simulation(self, time_hours):
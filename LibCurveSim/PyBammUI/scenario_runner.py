@@ -0,0 +1,263 @@
+"""
+Batch runner for multi-scenario PyBaMM simulations
+
+- build_scenarios(): Cartesian product of presets x currents x temperatures
+- run_scenario(): one simulation, reduced to compact float32 arrays (time, voltage, current,
+  capacity, temperature); the pybamm Solution is dropped inside the worker so only the arrays
+  cross the process boundary and stay in memory
+- run_batch(): fans scenarios out over a ProcessPoolExecutor and calls on_result() for each
+  scenario as it finishes (the Advanced Variables tab forwards these to the Tk thread with after())
+
+Without pybamm the same pipeline runs on mock_results(), so the UI can be exercised offline.
+"""
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+try:
+    import pybamm
+    PYBAMM_AVAILABLE = True
+except ImportError:
+    PYBAMM_AVAILABLE = False
+
+# Base parameter set for custom presets (stored as full parameter dicts)
+DEFAULT_BASE_PRESET = "Chen2020"
+# (pybamm variable, result key); voltage and current are required, the rest are kept when present
+RESULT_VARIABLES = (
+    ("Terminal voltage [V]", 'voltage'),
+    ("Current [A]", 'current'),
+    ("Discharge capacity [A.h]", 'capacity'),
+    ("Cell temperature [K]", 'temperature'),
+)
+RESULT_DTYPE = np.float32
+
+
+def build_scenarios(presets, currents, temperatures, parameters=None):
+    """
+    Scenario list for every preset x current x temperature combination.
+
+    Args:
+        presets: Preset names
+        currents: Currents in A (sign as in the tab: negative for discharge)
+        temperatures: Ambient temperatures in K
+        parameters: Optional {preset: {parameter: value}} overrides applied before current/temperature
+
+    Returns:
+        list: Scenario dicts with 'preset', 'current', 'temperature', 'parameters' and 'label'
+    """
+    parameters = parameters or {}
+    scenarios = []
+    for preset, current, temperature in itertools.product(presets, currents, temperatures):
+        scenarios.append({
+            'preset': preset,
+            'current': float(current),
+            'temperature': float(temperature),
+            'parameters': dict(parameters.get(preset, {})),
+            'label': f"{preset} / {float(current):+.2f}A / {float(temperature):.2f}K",
+        })
+    return scenarios
+
+
+def scenario_parameters(scenario):
+    """Parameter overrides of a scenario, including its current and temperature."""
+    params = dict(scenario.get('parameters', {}))
+    params["Current function [A]"] = scenario['current']
+    params["Ambient temperature [K]"] = scenario['temperature']
+    return params
+
+
+def compact(results):
+    """Copy of results with every array as RESULT_DTYPE and no Solution object."""
+    out = {}
+    for key, value in results.items():
+        if key in ('solution', 'voltage_components'):
+            continue
+        out[key] = np.asarray(value, dtype=RESULT_DTYPE) if isinstance(value, np.ndarray) else value
+    return out
+
+
+def check_convergence(results):
+    """Same checks as the tab's check_solution_convergence(), on extracted arrays."""
+    voltage, current = results['voltage'], results['current']
+    if len(results['time']) < 10:
+        return False
+    if not (np.all(np.isfinite(voltage)) and np.all(np.isfinite(current))):
+        return False
+    if np.any(voltage < 0) or np.any(voltage > 10):
+        return False
+    return not np.any(np.abs(np.diff(voltage)) > 1.0)
+
+
+def mock_results(param_dict, time_hours, model_type):
+    """Mock simulation data generated from capacity, current and temperature parameters."""
+    n_points = int(time_hours * 100)
+    time_s = np.linspace(0, time_hours * 3600, n_points)
+
+    current_val = param_dict.get("Current function [A]", -1.0)
+    temperature = param_dict.get("Ambient temperature [K]", 298.15)
+
+    # Generate realistic voltage curve based on current direction
+    if current_val < 0:  # Discharge
+        voltage = 4.2 - (4.2 - 3.0) * (time_s / (time_hours * 3600))
+        voltage += 0.1 * np.sin(time_s / 1000) * np.exp(-time_s / (time_hours * 1800))  # Add some dynamics
+    else:  # Charge
+        voltage = 3.0 + (4.2 - 3.0) * (time_s / (time_hours * 3600))
+        voltage += 0.05 * np.cos(time_s / 800) * (1 - np.exp(-time_s / 1000))
+
+    # Current with some variation
+    current = np.ones(n_points) * current_val
+    current += 0.01 * current_val * np.sin(time_s / 500)  # Small variations
+
+    # Capacity calculation
+    capacity_data = np.cumsum(np.abs(current) * np.diff(np.concatenate([[0], time_s]))) / 3600
+
+    # Temperature variation
+    temp_data = np.ones(n_points) * temperature
+    temp_data += 5 * np.sin(time_s / 2000) * (np.abs(current) / 2.0)  # Heat generation
+
+    # Mock voltage components
+    voltage_components = {
+        'ocv': voltage + 0.1 + 0.05 * np.sin(time_s / 1200),
+        'ohmic': -0.05 * np.abs(current) * (1 + 0.1 * np.sin(time_s / 600)),
+        'concentration': -0.03 * np.abs(current) * (time_s / (time_hours * 3600)),
+        'reaction': -0.04 * np.abs(current) * (1 + 0.2 * np.cos(time_s / 800)),
+    }
+
+    return {
+        'time': time_s,
+        'voltage': voltage,
+        'current': current,
+        'capacity': capacity_data,
+        'temperature': temp_data,
+        'voltage_components': voltage_components,
+        'model_type': model_type,
+        'solution': None
+    }
+
+
+_model_cache = None  # per worker process; built on the first scenario it runs
+
+
+def _worker_model_cache():
+    global _model_cache
+    if _model_cache is None:
+        from main_app import ModelCache
+        _model_cache = ModelCache()
+    return _model_cache
+
+
+def _solve_pybamm(scenario, time_hours, model_type):
+    # Imported here: main_app imports the Advanced Variables tab, which imports this module
+    from main_app import INPUT_PARAMETERS, MODEL_TYPES, ModelCache, build_simulation
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type: {model_type}")
+    params = scenario_parameters(scenario)
+    overrides = {name: value for name, value in params.items() if name not in INPUT_PARAMETERS}
+
+    # The discretized model depends only on (model type, preset, fixed overrides); scenarios that
+    # differ in current or temperature re-solve the cached model with new inputs
+    cache = _worker_model_cache()
+    key = ModelCache.key(model_type, parameter_set=scenario['preset'], parameter_overrides=overrides)
+    entry = cache.get(key)
+    if entry is None:
+        try:
+            parameter_values = pybamm.ParameterValues(scenario['preset'])
+            parameter_set = scenario['preset']
+        except Exception:
+            parameter_values = pybamm.ParameterValues(DEFAULT_BASE_PRESET)
+            parameter_set = DEFAULT_BASE_PRESET
+        parameter_values.update(overrides, check_already_exists=False)
+        # Preset values for inputs the scenario does not set (nominal capacity)
+        defaults = {name: parameter_values[name] for name in INPUT_PARAMETERS}
+        sim, _ = build_simulation(model_type, parameter_set=parameter_set, parameter_overrides=overrides)
+        entry = (sim, defaults)
+        cache.put(key, entry)
+    sim, defaults = entry
+    # Current keeps the tab's sign, as before
+    inputs = {name: float(params.get(name, defaults[name])) for name in INPUT_PARAMETERS}
+
+    n_points = max(100, int(time_hours * 60))
+    solution = sim.solve(np.linspace(0, time_hours * 3600, n_points), inputs=inputs)
+
+    results = {'time': solution.t, 'model_type': model_type}
+    for name, key in RESULT_VARIABLES:
+        try:
+            results[key] = solution[name].data
+        except KeyError:
+            if key in ('voltage', 'current'):
+                raise
+    if 'capacity' not in results:
+        results['capacity'] = np.cumsum(np.abs(results['current'])
+                                        * np.diff(np.concatenate([[0], results['time']]))) / 3600
+    return results
+
+
+def run_scenario(scenario, time_hours, model_type):
+    """
+    Run one scenario (worker function; must stay importable at module level).
+
+    Returns:
+        dict: Compact results plus 'scenario', 'elapsed' and 'error' (None on success)
+    """
+    t0 = time.perf_counter()
+    try:
+        if PYBAMM_AVAILABLE:
+            results = _solve_pybamm(scenario, time_hours, model_type)
+        else:
+            results = mock_results(scenario_parameters(scenario), time_hours, model_type)
+        results = compact(results)
+        if not check_convergence(results):
+            raise ValueError("シミュレーションが収束しませんでした。パラメータを確認してください。")
+        results['error'] = None
+    except Exception as e:
+        results = {'error': str(e), 'model_type': model_type}
+    results['scenario'] = scenario
+    results['elapsed'] = time.perf_counter() - t0
+    return results
+
+
+def run_batch(scenarios, time_hours, model_type, workers=None, on_result=None, cancel_event=None):
+    """
+    Run scenarios in a process pool.
+
+    Args:
+        scenarios: Scenario dicts from build_scenarios()
+        time_hours: Simulation time in hours
+        model_type: Model type ('DFN', 'SPM', 'SPMe')
+        workers: Worker processes (default: all cores); 1 runs in-process
+        on_result: Called as on_result(index, results) when each scenario finishes, in completion order
+        cancel_event: threading.Event; when set, scenarios that have not started are skipped
+
+    Returns:
+        list: Results in scenario order (None for cancelled scenarios)
+    """
+    results = [None] * len(scenarios)
+
+    def collect(index, res):
+        results[index] = res
+        if on_result:
+            on_result(index, res)
+
+    workers = min(workers or os.cpu_count() or 1, max(len(scenarios), 1))
+    if workers == 1:
+        for i, scenario in enumerate(scenarios):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            collect(i, run_scenario(scenario, time_hours, model_type))
+        return results
+
+    # spawn: the parent runs Tk, which must not be forked into the workers
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(run_scenario, scenario, time_hours, model_type): i
+                   for i, scenario in enumerate(scenarios)}
+        for fut in as_completed(futures):
+            collect(futures[fut], fut.result())
+            if cancel_event is not None and cancel_event.is_set():
+                pool.shutdown(wait=True, cancel_futures=True)
+                break
+    return results
@@ -16,6 +16,8 @@ import time
 # Import font configuration for Japanese text support
 import font_config
 
+from solution_data import decimate, plot_points
+
 
 class SimulationTab:
     """
@@ -277,9 +279,11 @@ class SimulationTab:
             self.app.root.after(0, lambda: self.run_button.config(state=tk.NORMAL))
             
             # Show success message on main thread
-            self.app.root.after(0, lambda: messagebox.showinfo(
-                "完了", f"{time_hours:.1f}時間のシミュレーションが完了しました。"
-            ))
+            message = f"{time_hours:.1f}時間のシミュレーションが完了しました。"
+            timing = self.app.simulator.timing_summary()
+            if timing:
+                message += f"\n\n{timing}"
+            self.app.root.after(0, lambda: messagebox.showinfo("完了", message))
             
         except Exception as e:
             # Enable run button on main thread
@@ -323,12 +327,19 @@ class SimulationTab:
         self.fig.tight_layout()
         self.canvas.draw()
     
+    def _plot_line(self, ax, x, y, *args, **kwargs):
+        """
+        ax.plot() of a curve decimated to the canvas width, so long runs draw as fast as short ones.
+        """
+        x_plot, y_plot = decimate(x, y, plot_points(self.canvas, self.fig))
+        return ax.plot(x_plot, y_plot, *args, **kwargs)
+    
     def _plot_voltage_time(self):
         """Plot voltage vs time."""
         results = self.app.simulation_results
         
         ax = self.fig.add_subplot(1, 1, 1)
-        ax.plot(results['time'] / 3600, results['voltage'], 'b-', linewidth=2)
+        self._plot_line(ax, results['time'] / 3600, results['voltage'], 'b-', linewidth=2)
         ax.set_xlabel('時間 (h)')
         ax.set_ylabel('電圧 (V)')
         ax.set_title('電圧 vs 時間')
@@ -339,7 +350,7 @@ class SimulationTab:
         results = self.app.simulation_results
         
         ax = self.fig.add_subplot(1, 1, 1)
-        ax.plot(results['time'] / 3600, results['current'], 'r-', linewidth=2)
+        self._plot_line(ax, results['time'] / 3600, results['current'], 'r-', linewidth=2)
         ax.set_xlabel('時間 (h)')
         ax.set_ylabel('電流 (A)')
         ax.set_title('電流 vs 時間')
@@ -352,7 +363,7 @@ class SimulationTab:
         
         if results['capacity'] is not None:
             ax = self.fig.add_subplot(1, 1, 1)
-            ax.plot(results['capacity'], results['voltage'], 'g-', linewidth=2)
+            self._plot_line(ax, results['capacity'], results['voltage'], 'g-', linewidth=2)
             ax.set_xlabel('容量 (Ah)')
             ax.set_ylabel('電圧 (V)')
             ax.set_title('電圧 vs 容量')
@@ -370,7 +381,7 @@ class SimulationTab:
         power = results['voltage'] * results['current']
         
         ax = self.fig.add_subplot(1, 1, 1)
-        ax.plot(results['time'] / 3600, power, 'm-', linewidth=2)
+        self._plot_line(ax, results['time'] / 3600, power, 'm-', linewidth=2)
         ax.set_xlabel('時間 (h)')
         ax.set_ylabel('電力 (W)')
         ax.set_title('電力 vs 時間')
@@ -443,39 +454,39 @@ class SimulationTab:
             # Plot negative electrode components
             for component in negative_components:
                 if component in voltage_components:
-                    ax.plot(time_hours, voltage_components[component], 
-                           color=colors.get(component, 'blue'), 
-                           linewidth=2, linestyle='--',
-                           label=f'負極: {labels.get(component, component)}')
+                    self._plot_line(ax, time_hours, voltage_components[component], 
+                                       color=colors.get(component, 'blue'), 
+                                       linewidth=2, linestyle='--',
+                                       label=f'負極: {labels.get(component, component)}')
             
             # Plot positive electrode components
             for component in positive_components:
                 if component in voltage_components:
-                    ax.plot(time_hours, voltage_components[component], 
-                           color=colors.get(component, 'red'), 
-                           linewidth=2, linestyle='-.',
-                           label=f'正極: {labels.get(component, component)}')
+                    self._plot_line(ax, time_hours, voltage_components[component], 
+                                       color=colors.get(component, 'red'), 
+                                       linewidth=2, linestyle='-.',
+                                       label=f'正極: {labels.get(component, component)}')
             
             # Plot general components
             for component in general_components:
                 if component in voltage_components:
-                    ax.plot(time_hours, voltage_components[component], 
-                           color=colors.get(component, 'black'), 
-                           linewidth=2,
-                           label=labels.get(component, component))
+                    self._plot_line(ax, time_hours, voltage_components[component], 
+                                       color=colors.get(component, 'black'), 
+                                       linewidth=2,
+                                       label=labels.get(component, component))
         else:
             # Plot all components together
             ax.set_title('電圧成分')
             
             for component, data in voltage_components.items():
-                ax.plot(time_hours, data, 
-                       color=colors.get(component, 'black'), 
-                       linewidth=2,
-                       label=labels.get(component, component))
+                self._plot_line(ax, time_hours, data, 
+                                   color=colors.get(component, 'black'), 
+                                   linewidth=2,
+                                   label=labels.get(component, component))
         
         # Add terminal voltage for reference
-        ax.plot(time_hours, results['voltage'], 'k-', linewidth=3, 
-               label='端子電圧', alpha=0.7)
+        self._plot_line(ax, time_hours, results['voltage'], 'k-', linewidth=3, 
+                           label='端子電圧', alpha=0.7)
         
         ax.set_xlabel('時間 (h)')
         ax.set_ylabel('電圧 (V)')
@@ -0,0 +1,177 @@
+"""
+On-demand access to PyBaMM solution variables and decimation for plotting
+
+- LazyResults: mapping whose entries are computed on first access and cached for the lifetime of
+  the solution; simulation results hand this to the plot/export tabs instead of copying every
+  variable up front
+- solution_results(): results mapping of a pybamm Solution (time, voltage, current, capacity and
+  a nested LazyResults of voltage components), nothing is evaluated until a tab reads it
+- decimate(): min/max decimation of a curve to roughly the number of points a canvas can show
+"""
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Result key -> pybamm variable names (first available one is used)
+VOLTAGE_COMPONENTS = {
+    'ocv': ("Open-circuit voltage [V]",),
+    'ohmic': ("Ohmic losses [V]",),
+    'concentration': ("Concentration overpotential [V]",),
+    'reaction': ("Reaction overpotential [V]",),
+    'negative_electrode': ("Negative electrode potential [V]",),
+    'positive_electrode': ("Positive electrode potential [V]",),
+    'neg_ocv': ("X-averaged negative electrode open-circuit potential [V]",),
+    'pos_ocv': ("X-averaged positive electrode open-circuit potential [V]",),
+    'neg_reaction': ("X-averaged negative electrode reaction overpotential [V]",),
+    'pos_reaction': ("X-averaged positive electrode reaction overpotential [V]",),
+    'electrolyte_ohmic': ("X-averaged electrolyte ohmic losses [V]",),
+    'solid_ohmic': ("X-averaged solid phase ohmic losses [V]",),
+}
+# Points per pixel of canvas width kept by decimate() (min and max of each bucket)
+POINTS_PER_PIXEL = 2
+MIN_PLOT_POINTS = 200
+
+
+class LazyResults(MutableMapping):
+    """
+    Mapping of values and loaders; a loader runs on first access and its value is cached.
+    Membership and iteration do not run loaders.
+    """
+
+    def __init__(self, values=None, loaders=None):
+        self._values = dict(values or {})
+        self._loaders = dict(loaders or {})
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            loader = self._loaders.pop(key)  # KeyError for unknown keys
+            self._values[key] = loader()
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        self._loaders.pop(key, None)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if key in self._values:
+            del self._values[key]
+        else:
+            del self._loaders[key]
+
+    def __contains__(self, key):
+        return key in self._values or key in self._loaders
+
+    def __iter__(self):
+        yield from self._values
+        yield from list(self._loaders)
+
+    def __len__(self):
+        return len(self._values) + len(self._loaders)
+
+    def is_loaded(self, key):
+        """True when the value of key has already been computed."""
+        return key in self._values
+
+
+def available_variables(solution):
+    """Variable names the solved model defines, or None when the solution does not expose them."""
+    try:
+        return set(solution.all_models[0].variables.keys())
+    except (AttributeError, IndexError, TypeError):
+        return None
+
+
+def _variable_loader(solution, name):
+    return lambda: solution[name].data
+
+
+def solution_results(solution, capacity_fallback=None, components=VOLTAGE_COMPONENTS, variables=None):
+    """
+    Results mapping of a pybamm Solution with every variable evaluated on demand.
+
+    Args:
+        solution: pybamm Solution
+        capacity_fallback: Capacity in Ah for a linear capacity axis when neither
+            "Discharge capacity [A.h]" nor current integration is usable
+        components: Voltage component keys and candidate variable names
+        variables: Extra {result key: pybamm variable} entries, added when the model defines them
+
+    Returns:
+        LazyResults with 'time', 'voltage', 'current', 'capacity' and 'voltage_components'
+    """
+    available = available_variables(solution)
+
+    def has(name):
+        return available is None or name in available
+
+    loaders = {}
+    for key, names in components.items():
+        name = next((n for n in names if has(n)), None)
+        if name is not None:
+            loaders[key] = _variable_loader(solution, name)
+    voltage_components = LazyResults(loaders=loaders)
+
+    def capacity():
+        try:
+            if has("Discharge capacity [A.h]"):
+                return solution["Discharge capacity [A.h]"].data
+            # Calculate capacity from current and time
+            return np.cumsum(np.abs(results['current']) * np.diff(np.concatenate([[0], results['time']]))) / 3600
+        except Exception:
+            if capacity_fallback is None:
+                raise
+            return np.linspace(0, capacity_fallback, len(results['time']))
+
+    result_loaders = {
+        'voltage': _variable_loader(solution, "Terminal voltage [V]"),
+        'current': _variable_loader(solution, "Current [A]"),
+        'capacity': capacity,
+    }
+    for key, name in (variables or {}).items():
+        if available is not None and name in available:
+            result_loaders[key] = _variable_loader(solution, name)
+    results = LazyResults({'time': solution.t, 'voltage_components': voltage_components}, result_loaders)
+    if available is None:
+        # Without the model's variable list, drop components the solution cannot evaluate
+        for key in list(loaders):
+            try:
+                voltage_components[key]
+            except Exception:
+                del voltage_components[key]
+    return results
+
+
+def plot_points(canvas=None, fig=None):
+    """Number of points worth drawing on a canvas (POINTS_PER_PIXEL per pixel of width)."""
+    width = 0
+    if canvas is not None:
+        try:
+            width = canvas.get_tk_widget().winfo_width()
+        except Exception:
+            width = 0
+    if width <= 1 and fig is not None:
+        # Widget not mapped yet: use the figure size
+        width = fig.get_figwidth() * fig.dpi
+    return max(MIN_PLOT_POINTS, int(width * POINTS_PER_PIXEL))
+
+
+def decimate(x, y, max_points):
+    """
+    Reduce a curve to at most about max_points points, keeping the minimum and maximum of y in
+    every bucket so peaks and steps stay visible.
+
+    Returns:
+        Tuple of (x, y); the inputs themselves when they are already short enough
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    buckets = max(1, max_points // 2)
+    if n <= max_points or y.ndim != 1 or len(x) != n:
+        return x, y
+    size = -(-n // buckets)
+    padded = np.concatenate([y, np.full(size * buckets - n, y[-1])]).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    idx = np.concatenate([[0, n - 1], offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)])
+    idx = np.unique(np.minimum(idx, n - 1))
+    return x[idx], y[idx]
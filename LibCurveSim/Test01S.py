@@ -19,9 +19,14 @@ Main options:
   --no_show         Save results without displaying graphs
 """
 
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
+
+# Vectorized CC-CV engine shared with LDS (LDS/cccv_engine.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "LDS"))
+import cccv_engine
 from scipy.signal import savgol_filter
 
 # OCV-SOC table (SOC-OCV values from Table 2:contentReference[oaicite:2]{index=2})
@@ -29,12 +34,7 @@ _soc_points = np.array([0.0, 0.1, 0.2, 0.3, 0.4,
                         0.5, 0.6, 0.7, 0.8, 0.9, 1.0])
 _ocv_points = np.array([3.0519, 3.6594, 3.7167, 3.7611, 3.7915,
                         3.8275, 3.8772, 3.9401, 4.0128, 4.0923, 4.1797])
-_ocv_interp = interp1d(_soc_points, _ocv_points, kind="linear",
-                      fill_value="extrapolate")
-
-def ocv_from_soc(soc: float) -> float:
-    """Calculate open circuit voltage from SOC. SOC is limited to the range 0-1."""
-    return float(_ocv_interp(np.clip(soc, 0.0, 1.0)))
+_OCV_TABLE = cccv_engine.OCVTable(_soc_points, _ocv_points)
 
 def simulate_charge(capacity_ah: float = 3.0,
                     c_rate: float = 0.5,
@@ -50,39 +50,10 @@ def simulate_charge(capacity_ah: float = 3.0,
 
     Returns: SOC array, charged capacity array (Ah), voltage array (V)
     """
-    dt_hours = dt_seconds / 3600.0
-    I0 = c_rate * capacity_ah
-    soc = 0.0
-    delivered_capacity = 0.0
-    soc_history = [soc]
-    cap_history = [delivered_capacity]
-    volt_history = [ocv_from_soc(soc)]
-
-    # Constant current phase
-    I = I0
-    while soc < 1.0:
-        ocv = ocv_from_soc(soc)
-        terminal_v = ocv + I * resistance
-        if terminal_v >= v_max:
-            break
-        soc += (I * dt_hours) / capacity_ah
-        delivered_capacity += I * dt_hours
-        soc_history.append(soc)
-        cap_history.append(delivered_capacity)
-        volt_history.append(terminal_v)
-
-    # Constant voltage phase
-    while soc < 1.0:
-        ocv = ocv_from_soc(soc)
-        I = max((v_max - ocv) / resistance, 0.0)
-        if I <= end_current_ratio * I0:
-            break
-        soc += (I * dt_hours) / capacity_ah
-        delivered_capacity += I * dt_hours
-        soc_history.append(soc)
-        cap_history.append(delivered_capacity)
-        volt_history.append(v_max)
-    return np.array(soc_history), np.array(cap_history), np.array(volt_history)
+    res = cccv_engine.simulate_charge(capacity_ah, c_rate, resistance, v_max=v_max,
+                                      end_current_ratio=end_current_ratio, dt=dt_seconds,
+                                      table=_OCV_TABLE)["charge"]
+    return res["soc"], res["capacity"], res["voltage"]
 
 def simulate_discharge(capacity_ah: float = 3.0,
                        c_rate: float = 0.5,
@@ -96,26 +67,9 @@ def simulate_discharge(capacity_ah: float = 3.0,
 
     Returns: SOC array, discharged capacity array (Ah), voltage array (V)
     """
-    dt_hours = dt_seconds / 3600.0
-    I = c_rate * capacity_ah
-    soc = 1.0
-    delivered_capacity = 0.0
-    soc_history = [soc]
-    cap_history = [delivered_capacity]
-    volt_history = [ocv_from_soc(soc)]
-    while soc > 0.0:
-        ocv = ocv_from_soc(soc)
-        terminal_v = ocv - I * resistance
-        if terminal_v <= v_min:
-            break
-        soc -= (I * dt_hours) / capacity_ah
-        delivered_capacity += I * dt_hours
-        soc_history.append(soc)
-        cap_history.append(delivered_capacity)
-        volt_history.append(terminal_v)
-        if soc <= 0.0:
-            break
-    return np.array(soc_history), np.array(cap_history), np.array(volt_history)
+    res = cccv_engine.simulate_discharge(capacity_ah, c_rate, resistance, v_min=v_min,
+                                         dt=dt_seconds, table=_OCV_TABLE)
+    return res["soc"], res["capacity"], res["voltage"]
 
 def apply_smoothing(data, smoothing_level=5):
     """
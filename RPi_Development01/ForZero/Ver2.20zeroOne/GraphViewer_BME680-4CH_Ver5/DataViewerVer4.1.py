@@ -20,6 +20,19 @@ API:
 - GET /api/graphs?show_p1=true&show_p2=true&show_p3=true&show_p4=true
   温度・湿度・絶対湿度・気圧・ガス抵抗に加え、不快指数および簡易汚染指標を返します。
   返却データは常に「直近24時間」に限定されます（クエリのdaysは無視）。
+  timestamp は "YYYY-mm-dd HH:MM:SS" 文字列。&time_format=ms を付けると /api/graphs.bin と同じエポックms。
+
+- GET /api/graphs.bin?show_p1=true&...（画面はこちらを使用）
+  /api/graphs と同じ内容の列指向バイナリ（gzip対応クライアントには圧縮して送信）。送るのは測定列のみで、
+  不快指数・汚染指標は画面側で同じ式から計算します。リトルエンディアン:
+    "DVC2" | uint32 ヘッダ長 | JSONヘッダ {"devices": [{"id", "n", "t0", "columns": [{"key", "decimals", "nulls"}]}]}
+    （4バイト境界まで空白で埋める）
+    デバイスごとに: int32 ミリ秒差分[n]（t[i] = t0 + dt[0] + ... + dt[i]）、
+                    columns の順に int32 差分[n]（値[i] = (d[0] + ... + d[i]) / 10^decimals。センサー分解能
+                    COLUMN_DECIMALS で量子化）、nulls が true なら続けて欠損ビットマップ（LSB先頭、4バイト境界まで0埋め）。
+                    int32 配列は zigzag 符号化（0, -1, 1, -2, ... → 0, 1, 2, 3, ...）した上で、圧縮率向上のため
+                    バイト単位でシャッフル（全要素の第0バイト, 第1バイト, ...）
+  t0/t は現地時刻の壁時計をUTC扱いにしたエポックms（Plotly の date 軸でそのままの時刻表示）。
 
 - GET /download/series?device=P2&param=discomfort_index
   選択したデバイス・パラメータの時系列CSV（直近24時間）を返します（daysは無視）。
@@ -37,15 +50,27 @@ API:
 """
 
 import os
+import gzip
+import json
 import math
+import struct
 import argparse
 import logging
 import datetime
-from typing import Optional, Dict, Any
+import sys
+from typing import Optional, Dict, Any, List, Tuple
 
+import numpy as np
 import pandas as pd
 from flask import Flask, jsonify, render_template_string, request, send_from_directory, Response
 
+# csv_range_reader is shared with the P1 web interface (p1_softwareV4/web_interface/data)
+P1_DATA_MODULE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "p1_softwareV4", "web_interface", "data")
+if P1_DATA_MODULE_DIR not in sys.path:
+    sys.path.insert(0, P1_DATA_MODULE_DIR)
+from csv_range_reader import read_csv_since, parse_time_column
+
 # --------------------------------------------------------------------------------------
 # Configuration & Logging
 # --------------------------------------------------------------------------------------
@@ -167,6 +192,67 @@ INDEX_HTML = """
       { id: 'pollution_index3', label: 'Pollution Index 3 (T adjusted)' }
     ];
 
+    // Decode /api/graphs.bin into {dev: {timestamp: [...], param: [...]}} (null gaps)
+    function unshuffleInt32(buf, offset, n){
+      const bytes = new Uint8Array(buf, offset, n * 4);
+      const out = new Uint8Array(n * 4);
+      for (let b = 0; b < 4; b++) {
+        const base = b * n;
+        for (let i = 0; i < n; i++) out[i * 4 + b] = bytes[base + i];
+      }
+      const values = new Int32Array(out.buffer);
+      for (let i = 0; i < n; i++) values[i] = (values[i] >>> 1) ^ -(values[i] & 1);  // zigzag
+      return values;
+    }
+
+    // Same formulas as _compute_discomfort_index / _compute_pollution_indices (alpha = 0.02)
+    function addIndices(series){
+      const n = series.timestamp.length;
+      const T = series.temperature || new Array(n).fill(null);
+      const RH = series.humidity || new Array(n).fill(null);
+      const gr = series.gas_resistance || new Array(n).fill(null);
+      ['discomfort_index', 'pollution_index1', 'pollution_index2', 'pollution_index3'].forEach(k => series[k] = new Array(n));
+      for (let i = 0; i < n; i++) {
+        const t = T[i], rh = RH[i], base = (gr[i] === null || gr[i] === 0) ? null : 1e6 / gr[i];
+        series.discomfort_index[i] = (t === null || rh === null) ? null : t - 0.55 * (1 - rh / 100.0) * (t - 14.5);
+        series.pollution_index1[i] = base;
+        series.pollution_index2[i] = (base === null || rh === null) ? null : base * (1 + (rh - 50.0) / 100.0);
+        series.pollution_index3[i] = (base === null || t === null) ? null : base * Math.exp(0.02 * (t - 25.0));
+      }
+      return series;
+    }
+
+    function decodeColumnar(buf){
+      const headerLen = new DataView(buf).getUint32(4, true);
+      const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buf, 8, headerLen)));
+      let offset = 8 + headerLen;
+      const out = {};
+      header.devices.forEach(d => {
+        const deltas = unshuffleInt32(buf, offset, d.n);
+        offset += 4 * d.n;
+        const ts = new Array(d.n);
+        let t = d.t0;
+        for (let i = 0; i < d.n; i++) { t += deltas[i]; ts[i] = t; }
+        const series = { timestamp: ts };
+        d.columns.forEach(c => {
+          const steps = unshuffleInt32(buf, offset, d.n);
+          offset += 4 * d.n;
+          const scale = Math.pow(10, c.decimals);
+          const values = new Array(d.n);
+          let q = 0;
+          for (let i = 0; i < d.n; i++) { q += steps[i]; values[i] = q / scale; }
+          if (c.nulls) {
+            const mask = new Uint8Array(buf, offset, Math.ceil(d.n / 8));
+            offset += Math.ceil(d.n / 32) * 4;
+            for (let i = 0; i < d.n; i++) if (mask[i >> 3] & (1 << (i & 7))) values[i] = null;
+          }
+          series[c.key] = values;
+        });
+        out[d.id] = addIndices(series);
+      });
+      return out;
+    }
+
     function getSelectedDevices(){
       const devs = [];
       if (document.getElementById('p1').checked) devs.push('P1');
@@ -233,7 +319,10 @@ INDEX_HTML = """
       const show_p3 = document.getElementById('p3').checked;
       const show_p4 = document.getElementById('p4').checked;
 
-      $.get(`/api/graphs?show_p1=${show_p1}&show_p2=${show_p2}&show_p3=${show_p3}&show_p4=${show_p4}`, function(data) {
+      fetch(`/api/graphs.bin?show_p1=${show_p1}&show_p2=${show_p2}&show_p3=${show_p3}&show_p4=${show_p4}`)
+        .then(response => response.arrayBuffer())
+        .then(buf => {
+        const data = decodeColumnar(buf);
         paramMeta.forEach(p => {
           const traces = [];
           ['P1','P2','P3','P4'].forEach(dev => {
@@ -297,26 +386,21 @@ def _read_csv(csv_path: str, days: int) -> Optional[pd.DataFrame]:
         logger.warning(f"CSV not found: {csv_path}")
         return None
     try:
-        df = pd.read_csv(csv_path)
+        # Seek to the first row inside the window instead of parsing the whole file
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=days) if days and days > 0 else None
+        df = read_csv_since(csv_path, cutoff)
         if 'timestamp' not in df.columns:
             logger.warning(f"Missing 'timestamp' in {csv_path}")
             return None
-        # Parse timestamps (string or numeric epoch)
-        try:
-            if pd.api.types.is_numeric_dtype(df['timestamp']):
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', errors='coerce')
-            else:
-                df['timestamp'] = pd.to_datetime(df['timestamp'].astype(str), errors='coerce')
-        except Exception:
-            df['timestamp'] = pd.to_datetime(df['timestamp'].astype(str), errors='coerce')
+        # Parse timestamps (epoch column, fixed-format string or numeric epoch)
+        df['timestamp'] = parse_time_column(df)
         df = df.dropna(subset=['timestamp'])
         # Coerce numeric columns
         for col in ["temperature", "humidity", "pressure", "gas_resistance", "absolute_humidity"]:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         # Filter by days
-        if days and days > 0:
-            cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+        if cutoff is not None:
             df = df[df['timestamp'] >= cutoff]
         df = df.sort_values('timestamp')
         return df
@@ -361,26 +445,108 @@ def _compute_pollution_indices(df: pd.DataFrame, alpha: float = 0.02):
     return base, adj_rh, adj_T
 
 
-def build_series_with_indices(df: pd.DataFrame) -> Dict[str, Any]:
-    result = {
-        'timestamp': df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-        'temperature': df['temperature'].tolist() if 'temperature' in df else [],
-        'humidity': df['humidity'].tolist() if 'humidity' in df else [],
-        'absolute_humidity': df['absolute_humidity'].tolist() if 'absolute_humidity' in df else [],
-        'pressure': df['pressure'].tolist() if 'pressure' in df else [],
-        'gas_resistance': df['gas_resistance'].tolist() if 'gas_resistance' in df else [],
-    }
+def _wall_clock_ms(ts: pd.Series) -> pd.Series:
+    # Naive local datetimes as epoch milliseconds; Plotly shows them as the same wall-clock time
+    return ts.values.astype('datetime64[ms]').astype('int64')
+
+
+BASE_COLUMNS = ['temperature', 'humidity', 'absolute_humidity', 'pressure', 'gas_resistance']
+
+
+def _series_columns(df: pd.DataFrame) -> Dict[str, pd.Series]:
+    """Measured columns present in df plus the computed indices, as pandas Series."""
+    result = {col: df[col] for col in BASE_COLUMNS if col in df}
     # Compute discomfort index
-    di = _compute_discomfort_index(df)
-    result['discomfort_index'] = di.tolist()
+    result['discomfort_index'] = _compute_discomfort_index(df)
     # Compute pollution proxies
-    p1, p2, p3 = _compute_pollution_indices(df)
-    result['pollution_index1'] = p1.tolist()
-    result['pollution_index2'] = p2.tolist()
-    result['pollution_index3'] = p3.tolist()
+    result['pollution_index1'], result['pollution_index2'], result['pollution_index3'] = _compute_pollution_indices(df)
     return result
 
 
+def build_series_with_indices(df: pd.DataFrame, epoch_ms: bool = False) -> Dict[str, Any]:
+    """JSON series; timestamps as 'YYYY-mm-dd HH:MM:SS' strings, or wall-clock epoch ms if epoch_ms."""
+    if epoch_ms:
+        timestamps = _wall_clock_ms(df['timestamp']).tolist()
+    else:
+        timestamps = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    result: Dict[str, Any] = {'timestamp': timestamps}
+    columns = _series_columns(df)
+    for col in BASE_COLUMNS:
+        result[col] = columns.pop(col).tolist() if col in columns else []
+    for key, series in columns.items():
+        result[key] = series.tolist()
+    return result
+
+
+COLUMNAR_MAGIC = b'DVC2'
+# Decimal places sent per measured column (sensor/logger resolution; the CSVs hold 2 decimals).
+# The indices are not sent: the page derives them from these columns (see addIndices()).
+COLUMN_DECIMALS = {
+    'temperature': 2, 'humidity': 2, 'absolute_humidity': 2, 'pressure': 2, 'gas_resistance': 0,
+}
+_INT32_MAX = 2**31 - 1
+
+
+def _shuffle_int32(values: np.ndarray) -> bytes:
+    """Zigzag-encoded (0, -1, 1, -2, ... -> 0, 1, 2, 3, ...) and byte-shuffled little-endian int32."""
+    values = values.astype(np.int64)
+    zigzag = ((values << 1) ^ (values >> 63)).astype('<u4')
+    # Byte shuffle: grouping bytes of equal significance lets gzip find the redundancy
+    return zigzag.view(np.uint8).reshape(-1, 4).T.tobytes()
+
+
+def _quantize(values: np.ndarray, decimals: int) -> Tuple[np.ndarray, int]:
+    """Integer steps of 10**-decimals (NaN -> 0); decimals drops until every step fits in int32."""
+    finite = values[np.isfinite(values)]
+    peak = float(np.abs(finite).max()) if finite.size else 0.0
+    while peak * 10.0 ** decimals > _INT32_MAX:
+        decimals -= 1
+    steps = np.rint(np.nan_to_num(values) * 10.0 ** decimals).astype(np.int64)
+    return steps, decimals
+
+
+def build_columnar(df: pd.DataFrame) -> Tuple[Dict[str, Any], List[bytes]]:
+    """Header entry and little-endian buffers for one device (see /api/graphs.bin)."""
+    ms = _wall_clock_ms(df['timestamp'])
+    buffers = [_shuffle_int32(np.diff(ms, prepend=ms[0]))]
+    columns: List[Dict[str, Any]] = []
+    for key in [col for col in BASE_COLUMNS if col in df]:
+        arr = pd.to_numeric(df[key], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        nulls = np.isnan(arr)
+        # Gaps repeat the previous value so they cost a zero delta; the null bitmap restores them
+        filled = pd.Series(arr).ffill().to_numpy()
+        steps, decimals = _quantize(filled, COLUMN_DECIMALS[key])
+        deltas = np.diff(steps, prepend=0)
+        if np.abs(deltas).max(initial=0) > _INT32_MAX:
+            raise ValueError(f"{key}: 値の変化が大きすぎてint32差分で表せません")
+        buffers.append(_shuffle_int32(deltas))
+        if nulls.any():
+            buffers.append(np.packbits(nulls, bitorder='little').tobytes() + b'\0' * (-((len(arr) + 7) // 8) % 4))
+        columns.append({'key': key, 'decimals': decimals, 'nulls': bool(nulls.any())})
+    header = {'n': int(len(ms)), 't0': int(ms[0]), 'columns': columns}
+    return header, buffers
+
+
+def encode_columnar(frames: Dict[str, pd.DataFrame]) -> bytes:
+    devices = []
+    body: List[bytes] = []
+    for dev, df in frames.items():
+        header, buffers = build_columnar(df)
+        devices.append({'id': dev, **header})
+        body.extend(buffers)
+    header_bytes = json.dumps({'devices': devices}, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 4)  # keep the arrays 4-byte aligned
+    return b''.join([COLUMNAR_MAGIC, struct.pack('<I', len(header_bytes)), header_bytes] + body)
+
+
+def _compressed_response(body: bytes, mimetype: str) -> Response:
+    headers = {'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.headers.get('Accept-Encoding', '') and len(body) > 1024:
+        body = gzip.compress(body, compresslevel=1)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, mimetype=mimetype, headers=headers)
+
+
 # --------------------------------------------------------------------------------------
 # App Factory
 # --------------------------------------------------------------------------------------
@@ -392,38 +558,37 @@ def create_app(config: Dict[str, Any]) -> Flask:
     def index():
         return render_template_string(INDEX_HTML)
 
+    def _selected_frames() -> Dict[str, pd.DataFrame]:
+        days = 1  # 固定: 直近24時間
+        frames: Dict[str, pd.DataFrame] = {}
+        for dev in ['P1', 'P2', 'P3', 'P4']:
+            if request.args.get(f'show_{dev.lower()}', default='true').lower() != 'true':
+                continue
+            df = _read_csv(config.get(f'{dev.lower()}_path'), days)
+            if df is not None and not df.empty:
+                frames[dev] = df
+        return frames
+
     @app.route('/api/graphs')
     def api_graphs():
         try:
-            days = 1  # 固定: 直近24時間
-            show_p1 = request.args.get('show_p1', default='true').lower() == 'true'
-            show_p2 = request.args.get('show_p2', default='true').lower() == 'true'
-            show_p3 = request.args.get('show_p3', default='true').lower() == 'true'
-            show_p4 = request.args.get('show_p4', default='true').lower() == 'true'
-
-            result: Dict[str, Any] = {}
-            if show_p1:
-                df1 = _read_csv(config.get('p1_path'), days)
-                if df1 is not None and not df1.empty:
-                    result['P1'] = build_series_with_indices(df1)
-            if show_p2:
-                df2 = _read_csv(config.get('p2_path'), days)
-                if df2 is not None and not df2.empty:
-                    result['P2'] = build_series_with_indices(df2)
-            if show_p3:
-                df3 = _read_csv(config.get('p3_path'), days)
-                if df3 is not None and not df3.empty:
-                    result['P3'] = build_series_with_indices(df3)
-            if show_p4:
-                df4 = _read_csv(config.get('p4_path'), days)
-                if df4 is not None and not df4.empty:
-                    result['P4'] = build_series_with_indices(df4)
-
-            return jsonify(result)
+            # String timestamps unless the client asks for epoch milliseconds (time_format=ms)
+            epoch_ms = request.args.get('time_format', default='str').lower() == 'ms'
+            result = {dev: build_series_with_indices(df, epoch_ms) for dev, df in _selected_frames().items()}
+            body = json.dumps(result, separators=(',', ':')).encode('utf-8')
+            return _compressed_response(body, 'application/json')
         except Exception as e:
             logger.error(f"/api/graphs failed: {e}")
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/graphs.bin')
+    def api_graphs_bin():
+        try:
+            return _compressed_response(encode_columnar(_selected_frames()), 'application/octet-stream')
+        except Exception as e:
+            logger.error(f"/api/graphs.bin failed: {e}")
+            return jsonify({'error': str(e)}), 500
+
     # Download full fixed CSV endpoints (as-is)
     @app.route('/download/<device_id>')
     def download_device_csv(device_id: str):
@@ -468,10 +633,9 @@ def create_app(config: Dict[str, Any]) -> Flask:
                     series = df[param].tolist()
                 else:
                     return jsonify({'error': f'Unknown parameter: {param}'}), 400
-                timestamps = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
             else:
-                timestamps = series_map['timestamp']
                 series = series_map[param]
+            timestamps = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
 
             # Compose CSV payload in-memory
             import io
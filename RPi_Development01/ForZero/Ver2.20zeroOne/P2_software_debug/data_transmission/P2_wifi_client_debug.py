@@ -16,6 +16,8 @@ Features:
 - Data transmission with retry logic
 - Improved error handling for Thonny compatibility
 - Reduced USB/REPL disconnection issues
+- Allocation-free payload path: preallocated JSON buffer, memoryview send, readinto receive,
+  scheduled gc.collect() and a gc.mem_free() low-water report
 
 Usage:
     This file should be imported by main.py on the Pico 2W.
@@ -24,7 +26,6 @@ Usage:
 import time
 import network
 import socket
-import ujson
 import machine
 import gc
 from machine import Pin
@@ -42,6 +43,127 @@ DEBUG_VERBOSE = 3  # Very verbose output including all network parameters
 LOG_TO_FILE = False
 LOG_FILE = "/wifi_log.txt"
 
+# Payload buffer and memory management
+PAYLOAD_BUF_SIZE = 256      # Bytes; a full reading is ~200 bytes
+RESPONSE_BUF_SIZE = 64      # Server replies are {"status": "success"} or a short error
+GC_INTERVAL = 120           # Seconds between scheduled gc.collect() calls
+GC_LOW_FREE = 16 * 1024     # Collect early if free heap drops below this (bytes)
+MEM_REPORT_EVERY = 20       # Print the memory report every N transmissions
+
+# (key, decimals) in transmission order; decimals < 0 marks the device_id string
+PAYLOAD_FIELDS = (
+    ("device_id", -1),
+    ("timestamp", 0),
+    ("temperature", 2),
+    ("humidity", 2),
+    ("pressure", 2),
+    ("gas_resistance", 0),
+    ("altitude", 2),
+    ("co2", 0),
+    ("sensor_errors", 0),
+)
+_INF = float("inf")
+_POW10 = (1, 10, 100, 1000, 10000)
+_SUCCESS = b'"success"'
+
+
+def _buf_contains(buf, n, pattern):
+    """Return True if pattern occurs in buf[:n] (no slicing, no allocation)."""
+    m = len(pattern)
+    for i in range(n - m + 1):
+        j = 0
+        while j < m and buf[i + j] == pattern[j]:
+            j += 1
+        if j == m:
+            return True
+    return False
+
+
+class PayloadBuffer:
+    """Preallocated JSON encoder for sensor readings.
+
+    Keys are pre-encoded once; numbers are written digit by digit into a fixed
+    bytearray, so encoding a reading creates no str/bytes/dict objects.
+    Keys not listed in PAYLOAD_FIELDS are not transmitted.
+    """
+
+    def __init__(self, device_id, size=PAYLOAD_BUF_SIZE):
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.n = 0
+        self._digits = bytearray(12)
+        self._keys = [('"%s":' % key).encode() for key, _ in PAYLOAD_FIELDS]
+        self._device_id = ('"%s"' % device_id).encode()
+
+    def _put(self, b):
+        buf = self.buf
+        n = self.n
+        for i in range(len(b)):
+            buf[n + i] = b[i]
+        self.n = n + len(b)
+
+    def _put_byte(self, c):
+        self.buf[self.n] = c
+        self.n += 1
+
+    def _put_uint(self, v, min_width=1):
+        d = self._digits
+        k = 0
+        while v or k < min_width:
+            d[k] = 48 + v % 10
+            v //= 10
+            k += 1
+        buf = self.buf
+        n = self.n
+        while k:
+            k -= 1
+            buf[n] = d[k]
+            n += 1
+        self.n = n
+
+    def _put_number(self, v, decimals):
+        if v is None or v != v or v == _INF or v == -_INF:  # None, NaN or +/-inf: not valid JSON
+            self._put(b"null")
+            return
+        if decimals == 0 and isinstance(v, int):
+            iv = v
+        else:
+            scale = _POW10[decimals]
+            iv = int(v * scale + (0.5 if v >= 0 else -0.5))
+        if iv < 0:
+            self._put_byte(45)  # '-'
+            iv = -iv
+        if decimals <= 0:
+            self._put_uint(iv)
+            return
+        scale = _POW10[decimals]
+        self._put_uint(iv // scale)
+        self._put_byte(46)  # '.'
+        self._put_uint(iv % scale, decimals)
+
+    def encode(self, data):
+        """Encode data (dict) into the buffer and return a memoryview of the payload."""
+        self.n = 0
+        self._put_byte(123)  # '{'
+        first = True
+        keys = self._keys
+        for i in range(len(PAYLOAD_FIELDS)):
+            key, decimals = PAYLOAD_FIELDS[i]
+            if decimals >= 0:
+                v = data.get(key)
+                if v is None:
+                    continue
+            if not first:
+                self._put_byte(44)  # ','
+            first = False
+            self._put(keys[i])
+            if decimals < 0:
+                self._put(self._device_id)
+            else:
+                self._put_number(v, decimals)
+        self._put_byte(125)  # '}'
+        return self.mv[:self.n]
+
 class WiFiClient:
     """Class to manage WiFi connection and data transmission with enhanced debugging."""
 
@@ -74,6 +196,8 @@ class WiFiClient:
         self.connection_strategy = "standard"  # Options: standard, aggressive, conservative
         self.auto_reset = True  # Whether to auto-reset on connection failure
         self.log_to_file = LOG_TO_FILE
+        self._payload = PayloadBuffer(device_id)
+        self._rx = bytearray(RESPONSE_BUF_SIZE)
 
         # Initialize LED
         self.led.off()
@@ -472,11 +596,19 @@ class WiFiClient:
             return self.connect(max_retries=1, retry_delay=1, connection_timeout=connection_timeout)
         return True
 
+    def _read_response(self, sock):
+        """Read the server reply into the preallocated buffer; return byte count."""
+        try:
+            n = sock.readinto(self._rx)
+        except AttributeError:  # CPython sockets (desktop testing)
+            n = sock.recv_into(self._rx)
+        return n or 0
+
     def send_data(self, data, max_retries=5):
         """Send data to the server with retry.
 
         Args:
-            data (dict): Data to send (will be converted to JSON)
+            data (dict): Data to send; encoded into the preallocated payload buffer
             max_retries (int): Number of retry attempts (default: 5)
 
         Returns:
@@ -487,9 +619,15 @@ class WiFiClient:
             self._debug_print("Cannot send data: not connected to WiFi", DEBUG_BASIC)
             return False
 
-        # Add device ID to data
-        data["device_id"] = self.device_id
-        json_data = ujson.dumps(data)
+        # device_id is written by the encoder from self.device_id
+        try:
+            payload = self._payload.encode(data)
+        except Exception as e:
+            # e.g. a value too large for the buffer: skip this reading, keep the send loop alive
+            self._debug_print(f"Cannot encode data, skipped: {e}", DEBUG_BASIC)
+            return False
+        debug_basic = self.debug_level >= DEBUG_BASIC
+        debug_detailed = self.debug_level >= DEBUG_DETAILED
 
         # Initialize sock to None
         sock = None
@@ -497,40 +635,41 @@ class WiFiClient:
         # Retry loop
         for attempt in range(max_retries):
             try:
-                self._debug_print(f"Sending data attempt {attempt + 1}/{max_retries}...", DEBUG_BASIC)
+                if debug_basic:
+                    self._debug_print(f"Sending data attempt {attempt + 1}/{max_retries}...", DEBUG_BASIC)
 
                 # Create new socket for each attempt
                 sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 sock.settimeout(10)  # 10 seconds timeout
 
                 # Connect and send data
-                self._debug_print(f"Connecting to server {self.server_ip}:{self.server_port}...", DEBUG_DETAILED)
+                if debug_detailed:
+                    self._debug_print(f"Connecting to server {self.server_ip}:{self.server_port}...", DEBUG_DETAILED)
                 sock.connect((self.server_ip, self.server_port))
 
-                self._debug_print(f"Sending data: {json_data}", DEBUG_DETAILED)
-                sock.send(json_data.encode())
+                if debug_detailed:
+                    self._debug_print(f"Sending data: {bytes(payload)}", DEBUG_DETAILED)
+                sock.send(payload)
 
                 # Wait for response
-                self._debug_print("Waiting for response...", DEBUG_DETAILED)
-                response = sock.recv(1024)
+                if debug_detailed:
+                    self._debug_print("Waiting for response...", DEBUG_DETAILED)
+                n = self._read_response(sock)
 
                 # Close socket
                 sock.close()
                 sock = None
 
                 # Process response
-                if response:
-                    try:
-                        response_data = ujson.loads(response.decode())
-                        if response_data.get("status") == "success":
+                if n:
+                    if _buf_contains(self._rx, n, _SUCCESS):
+                        if debug_basic:
                             self._debug_print(f"Data sent successfully on attempt {attempt + 1}", DEBUG_BASIC)
-                            self._blink_led(1, 0.1)
-                            return True
-                        else:
-                            self._debug_print(f"Server error: {response_data.get('message', 'Unknown error')}", DEBUG_BASIC)
-                    except Exception as e:
-                        self._debug_print(f"Invalid response from server: {response}, Error: {e}", DEBUG_BASIC)
-                else:
+                        self._blink_led(1, 0.1)
+                        return True
+                    elif debug_basic:
+                        self._debug_print(f"Server error: {bytes(self._rx[:n])}", DEBUG_BASIC)
+                elif debug_basic:
                     self._debug_print("No response from server", DEBUG_BASIC)
 
             except Exception as e:
@@ -543,10 +682,9 @@ class WiFiClient:
                         sock.close()
                     except:
                         pass
+                    sock = None
 
-                # Force garbage collection
-                gc.collect()
-                # Allow background processing
+                # Allow background processing (gc.collect() runs on a schedule, see DataTransmitter)
                 machine.idle()
 
             # If this wasn't the last attempt, wait before retrying
@@ -554,6 +692,8 @@ class WiFiClient:
                 # Progressive backoff
                 retry_delay = 2 * (attempt + 1)  # 2s, 4s, 6s, 8s...
                 self._debug_print(f"Retrying in {retry_delay} seconds...", DEBUG_BASIC)
+                # Reclaim the failed attempt's socket before the next one
+                gc.collect()
                 time.sleep(retry_delay)
 
         self._debug_print(f"All {max_retries} retry attempts failed.", DEBUG_BASIC)
@@ -778,6 +918,53 @@ class DataTransmitter:
         self.debug_level = debug_level
         self.log_to_file = LOG_TO_FILE
 
+        # Reading slots reused every cycle (values overwritten, never reallocated)
+        self._data = {key: None for key, _ in PAYLOAD_FIELDS}
+        self._data["device_id"] = wifi_client.device_id
+
+        # Scheduled garbage collection and memory statistics
+        self.gc_interval = GC_INTERVAL
+        self.last_gc_time = time.time()
+        self.gc_runs = 0
+        self.mem_min_free = gc.mem_free() if hasattr(gc, "mem_free") else 0
+        self.mem_max_alloc = gc.mem_alloc() if hasattr(gc, "mem_alloc") else 0
+
+    def _update_mem_stats(self):
+        """Track the free-heap low-water mark (= usage high-water mark)."""
+        if not hasattr(gc, "mem_free"):
+            return
+        free = gc.mem_free()
+        alloc = gc.mem_alloc()
+        if free < self.mem_min_free:
+            self.mem_min_free = free
+        if alloc > self.mem_max_alloc:
+            self.mem_max_alloc = alloc
+
+    def maybe_collect_garbage(self, now=None):
+        """Run gc.collect() on schedule, or early when the heap runs low."""
+        if now is None:
+            now = time.time()
+        low = hasattr(gc, "mem_free") and gc.mem_free() < GC_LOW_FREE
+        if low or now - self.last_gc_time >= self.gc_interval:
+            self._update_mem_stats()
+            gc.collect()
+            self.gc_runs += 1
+            self.last_gc_time = now
+            return True
+        return False
+
+    def get_memory_report(self):
+        """Return heap statistics (bytes) collected since start-up."""
+        report = {
+            "min_free": self.mem_min_free,
+            "max_alloc": self.mem_max_alloc,
+            "gc_runs": self.gc_runs,
+        }
+        if hasattr(gc, "mem_free"):
+            report["free"] = gc.mem_free()
+            report["alloc"] = gc.mem_alloc()
+        return report
+
     def _debug_print(self, message, level=DEBUG_BASIC):
         """Print debug message if debug level is high enough.
 
@@ -818,6 +1005,66 @@ class DataTransmitter:
         self.sensors[name] = sensor
         self._debug_print(f"Added sensor: {name}", DEBUG_BASIC)
 
+    def _read_sensor(self, name, sensor, data):
+        """Read one sensor into the data slots. Returns True on success.
+
+        Debug strings are only formatted when the debug level asks for them.
+        """
+        debug = self.debug_level >= DEBUG_BASIC
+        try:
+            sensor_data = sensor.get_readings()
+            if debug:
+                self._debug_print(f"{name} readings: {sensor_data}", DEBUG_BASIC)
+            for key in sensor_data:
+                data[key] = sensor_data[key]
+            self.last_readings[name] = sensor_data
+            return True
+        except Exception as e:
+            if debug:
+                self._debug_print(f"Error getting {name} readings: {e}", DEBUG_BASIC)
+
+        # Fallback to direct access if get_readings() fails
+        try:
+            # Fallback reads are rare, so they may allocate; keep them as the last good reading
+            if name == "bme680":
+                sensor_data = {
+                    "temperature": sensor.temperature,
+                    "humidity": sensor.humidity,
+                    "pressure": sensor.pressure,
+                    "gas_resistance": sensor.gas
+                }
+                if debug:
+                    self._debug_print(f"BME680 readings (fallback): Temp={sensor_data['temperature']}°C, "
+                          f"Humidity={sensor_data['humidity']}%, "
+                          f"Pressure={sensor_data['pressure']}hPa, "
+                          f"Gas={sensor_data['gas_resistance']}Ω", DEBUG_BASIC)
+                self.last_readings[name] = sensor_data
+                for key in sensor_data:
+                    data[key] = sensor_data[key]
+                return False
+            if name == "mhz19c":
+                co2_value = sensor.read_co2()
+                if co2_value > 0:  # Only include valid readings
+                    if debug:
+                        self._debug_print(f"CO2 reading (fallback): {co2_value}ppm", DEBUG_BASIC)
+                    self.last_readings[name] = {"co2": co2_value}
+                    data["co2"] = co2_value
+                    return False
+                if debug:
+                    self._debug_print(f"Invalid CO2 reading: {co2_value}", DEBUG_BASIC)
+        except Exception as e2:
+            if debug:
+                self._debug_print(f"Error reading {name} sensor (fallback): {e2}", DEBUG_BASIC)
+
+        # Use last successful reading if available
+        last = self.last_readings.get(name)
+        if last:
+            if debug:
+                self._debug_print(f"Using last successful {name} reading", DEBUG_BASIC)
+            for key in last:
+                data[key] = last[key]
+        return False
+
     def collect_and_send_data(self):
         """Collect data from all sensors and send it to the server.
 
@@ -832,119 +1079,54 @@ class DataTransmitter:
         machine.idle()
 
         if time_since_last < self.transmission_interval:
-            # Not time yet
-            remaining = self.transmission_interval - time_since_last
-            if int(remaining) % 10 == 0:  # Log every 10 seconds
-                self._debug_print(f"Next transmission in {int(remaining)} seconds", DEBUG_DETAILED)
+            # Not time yet; use the idle time for scheduled garbage collection
+            self.maybe_collect_garbage(current_time)
+            if self.debug_level >= DEBUG_DETAILED:
+                remaining = self.transmission_interval - time_since_last
+                if int(remaining) % 10 == 0:  # Log every 10 seconds
+                    self._debug_print(f"Next transmission in {int(remaining)} seconds", DEBUG_DETAILED)
             return True
 
-        self._debug_print(f"Time to transmit data (interval: {self.transmission_interval}s)", DEBUG_BASIC)
+        if self.debug_level >= DEBUG_BASIC:
+            self._debug_print(f"Time to transmit data (interval: {self.transmission_interval}s)", DEBUG_BASIC)
 
-        # Collect data from all sensors
-        data = {}
+        # Reuse the preallocated slots; clear values from the previous cycle
+        data = self._data
+        for key, decimals in PAYLOAD_FIELDS:
+            if decimals >= 0:
+                data[key] = None
         sensor_errors = 0
 
-        for name, sensor in self.sensors.items():
-            try:
+        for name in self.sensors:
+            if self.debug_level >= DEBUG_BASIC:
                 self._debug_print(f"Reading {name} sensor...", DEBUG_BASIC)
-
-                # Allow background processing
-                machine.idle()
-
-                # Use get_readings() method for all sensors to match test_simulation.py approach
-                try:
-                    sensor_data = sensor.get_readings()
-                    self._debug_print(f"{name} readings: {sensor_data}", DEBUG_BASIC)
-                    
-                    # Store last successful reading
-                    self.last_readings[name] = sensor_data
-                    data.update(sensor_data)
-                except Exception as e:
-                    self._debug_print(f"Error getting {name} readings: {e}", DEBUG_BASIC)
-                    sensor_errors += 1
-                    
-                    # Fallback to direct property access for BME680 if get_readings() fails
-                    if name == "bme680":
-                        try:
-                            sensor_data = {
-                                "temperature": sensor.temperature,
-                                "humidity": sensor.humidity,
-                                "pressure": sensor.pressure,
-                                "gas_resistance": sensor.gas
-                            }
-                            self._debug_print(f"BME680 readings (fallback): Temp={sensor_data['temperature']}°C, "
-                                  f"Humidity={sensor_data['humidity']}%, "
-                                  f"Pressure={sensor_data['pressure']}hPa, "
-                                  f"Gas={sensor_data['gas_resistance']}Ω", DEBUG_BASIC)
-                            
-                            # Store last successful reading
-                            self.last_readings[name] = sensor_data
-                            data.update(sensor_data)
-                        except Exception as e2:
-                            self._debug_print(f"Error reading BME680 sensor (fallback): {e2}", DEBUG_BASIC)
-                            
-                            # Use last successful reading if available
-                            if name in self.last_readings:
-                                self._debug_print(f"Using last successful {name} reading", DEBUG_BASIC)
-                                data.update(self.last_readings[name])
-                    
-                    # Fallback to direct method for MH-Z19C if get_readings() fails
-                    elif name == "mhz19c":
-                        try:
-                            co2_value = sensor.read_co2()
-                            if co2_value > 0:  # Only include valid readings
-                                sensor_data = {"co2": co2_value}
-                                self._debug_print(f"CO2 reading (fallback): {co2_value}ppm", DEBUG_BASIC)
-                                # Store last successful reading
-                                self.last_readings[name] = sensor_data
-                                data.update(sensor_data)
-                            else:
-                                self._debug_print(f"Invalid CO2 reading: {co2_value}", DEBUG_BASIC)
-                                
-                                # Use last successful reading if available
-                                if name in self.last_readings:
-                                    self._debug_print(f"Using last successful {name} reading", DEBUG_BASIC)
-                                    data.update(self.last_readings[name])
-                        except Exception as e2:
-                            self._debug_print(f"Error reading MH-Z19C sensor (fallback): {e2}", DEBUG_BASIC)
-                            
-                            # Use last successful reading if available
-                            if name in self.last_readings:
-                                self._debug_print(f"Using last successful {name} reading", DEBUG_BASIC)
-                                data.update(self.last_readings[name])
-            except Exception as e:
-                self._debug_print(f"Error reading {name} sensor: {e}", DEBUG_BASIC)
+            # Allow background processing
+            machine.idle()
+            if not self._read_sensor(name, self.sensors[name], data):
                 sensor_errors += 1
 
-                # Use last successful reading if available
-                if name in self.last_readings:
-                    self._debug_print(f"Using last successful {name} reading", DEBUG_BASIC)
-                    data.update(self.last_readings[name])
-
-        # Add timestamp and device ID
+        # Add timestamp and sensor status (device_id is fixed in the slots)
         data["timestamp"] = current_time
-        data["device_id"] = self.wifi_client.device_id
-
-        # Add sensor status
         data["sensor_errors"] = sensor_errors
 
-        # Send data if we have any
-        if data:
-            self.transmission_attempts += 1
+        self.transmission_attempts += 1
+        if self.debug_level >= DEBUG_BASIC:
             self._debug_print(f"Sending data (attempt {self.transmission_attempts})...", DEBUG_BASIC)
-            success = self.wifi_client.send_data(data)
+        success = self.wifi_client.send_data(data)
+        self._update_mem_stats()
 
-            if success:
-                self.last_transmission_time = current_time
-                self.successful_transmissions += 1
+        if success:
+            self.last_transmission_time = current_time
+            self.successful_transmissions += 1
+            if self.debug_level >= DEBUG_BASIC:
                 self._debug_print(f"Data sent successfully. Total successful: {self.successful_transmissions}/{self.transmission_attempts}", DEBUG_BASIC)
-            else:
-                self._debug_print(f"Failed to send data. Success rate: {self.successful_transmissions}/{self.transmission_attempts}", DEBUG_BASIC)
+        elif self.debug_level >= DEBUG_BASIC:
+            self._debug_print(f"Failed to send data. Success rate: {self.successful_transmissions}/{self.transmission_attempts}", DEBUG_BASIC)
 
-            return success
-        else:
-            self._debug_print("No data to send", DEBUG_BASIC)
-            return False
+        if self.debug_level >= DEBUG_BASIC and self.transmission_attempts % MEM_REPORT_EVERY == 0:
+            self._debug_print(f"Memory report: {self.get_memory_report()}", DEBUG_BASIC)
+
+        return success
 
     def run(self, run_once=False):
         """Run the data transmitter.
@@ -1009,6 +1191,8 @@ if __name__ == "__main__":
         # Wait for CO2 sensor warmup
         print("Waiting for CO2 sensor warmup...")
         time.sleep(30)
+        # UART stays open; requests go out on a timer and read_co2() picks up the latest frame
+        co2_sensor.enable_pipelined(request_interval_ms=5000)
 
         # Initialize WiFi client with debug level
         client = WiFiClient(device_id="P2", debug_level=DEBUG_DETAILED, debug_mode=True)
@@ -12,6 +12,9 @@ Features:
 - CO2 concentration measurement
 - Sensor calibration functions
 - Error handling and diagnostics
+- Pipelined mode: UART stays open, 0x86 requests are issued on a timer and 9-byte
+  frames are parsed incrementally from a ring buffer (resync on 0xFF header);
+  read_co2()/get_latest() return the latest validated value without blocking
 
 Pin connections:
 - VCC (red) -> VBUS (5V, Pin 40)
@@ -27,6 +30,16 @@ import time
 import struct
 from machine import UART, Pin
 
+try:
+    import micropython
+    from machine import Timer
+except ImportError:  # Older firmware without Timer/schedule: poll() only
+    micropython = None
+    Timer = None
+
+RING_SIZE = 32          # Bytes; holds several 9-byte frames
+FRAME_LEN = 9
+
 class MHZ19C:
     """Driver for MH-Z19C CO2 sensor."""
     
@@ -52,6 +65,21 @@ class MHZ19C:
         self.debug = debug
         self.last_reading = 0
         self.last_reading_time = 0
+
+        # Pipelined mode state (see enable_pipelined)
+        self.pipelined = False
+        self.request_interval_ms = 5000
+        self._ring = bytearray(RING_SIZE)
+        self._ring_head = 0
+        self._ring_count = 0
+        self._rx_chunk = bytearray(16)
+        self._next_request_ms = 0
+        self._last_frame_ms = None
+        self._timer = None
+        self._paused = False
+        self._scheduled_ref = self._scheduled_request  # bound once, safe to pass from IRQ
+        self.frames_ok = 0
+        self.frames_bad = 0
         
         # Clear any pending data
         if self.uart.any():
@@ -86,6 +114,18 @@ class MHZ19C:
         Returns:
             bytes: Response bytes or None if error
         """
+        if self.pipelined:
+            # Blocking commands (calibration etc.) must not interleave with pipelined frames
+            self._paused = True
+            try:
+                return self._send_command_blocking(command, response_length)
+            finally:
+                self._ring_head = 0
+                self._ring_count = 0
+                self._paused = False
+        return self._send_command_blocking(command, response_length)
+
+    def _send_command_blocking(self, command, response_length=9):
         # Clear any pending data
         if self.uart.any():
             self.uart.read()
@@ -123,6 +163,10 @@ class MHZ19C:
         Returns:
             int: CO2 concentration in ppm, or 0 if error
         """
+        if self.pipelined:
+            self.poll()
+            return self.last_reading if self.last_reading > 0 else 0
+
         # Check if it's time to update (at least 5 seconds since last reading)
         current_time = time.time()
         if current_time - self.last_reading_time < 5:
@@ -143,6 +187,109 @@ class MHZ19C:
         
         return self.last_reading if self.last_reading > 0 else 0
     
+    # ----- Pipelined mode -----
+
+    def enable_pipelined(self, request_interval_ms=5000, use_timer=True):
+        """Switch to pipelined reads.
+
+        A 0x86 request is sent every request_interval_ms, either from a hardware
+        timer (via micropython.schedule) or from poll() when no timer is available.
+        Responses are parsed by poll() (called from read_co2()/get_latest()) in the
+        main context only; read_co2() never waits on the UART.
+        """
+        self.request_interval_ms = request_interval_ms
+        self._ring_head = 0
+        self._ring_count = 0
+        if self.uart.any():
+            self.uart.read()
+        self.pipelined = True
+        self._next_request_ms = time.ticks_ms()
+        if use_timer and Timer is not None and micropython is not None:
+            self._timer = Timer(period=request_interval_ms, mode=Timer.PERIODIC,
+                                callback=self._on_timer)
+        self._request()
+
+    def disable_pipelined(self):
+        """Return to blocking request/response reads."""
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        self.pipelined = False
+
+    def _on_timer(self, _timer):
+        # Hard/soft IRQ context: defer UART work to the scheduler
+        try:
+            micropython.schedule(self._scheduled_ref, 0)
+        except RuntimeError:
+            pass  # Schedule queue full; the next tick will retry
+
+    def _scheduled_request(self, _arg):
+        # Runs between main-loop bytecodes: only write the request. The ring buffer and
+        # frame state belong to the main context (poll()), so they are never touched here.
+        self._request()
+
+    def _request(self):
+        if self._paused:
+            return
+        self.uart.write(self.CMD_READ_CO2)
+        self._next_request_ms = time.ticks_add(time.ticks_ms(), self.request_interval_ms)
+
+    def poll(self):
+        """Non-blocking: send a due request (timer-less mode) and parse received bytes."""
+        if not self.pipelined or self._paused:
+            return
+        if self._timer is None and time.ticks_diff(time.ticks_ms(), self._next_request_ms) >= 0:
+            self._request()
+        while self.uart.any():
+            n = self.uart.readinto(self._rx_chunk)
+            if not n:
+                break
+            self._feed(self._rx_chunk, n)
+        self._parse_frames()
+
+    def _feed(self, chunk, n):
+        ring = self._ring
+        for i in range(n):
+            if self._ring_count == RING_SIZE:
+                # Overflow: drop the oldest byte
+                self._ring_head = (self._ring_head + 1) % RING_SIZE
+                self._ring_count -= 1
+            ring[(self._ring_head + self._ring_count) % RING_SIZE] = chunk[i]
+            self._ring_count += 1
+
+    def _parse_frames(self):
+        ring = self._ring
+        while self._ring_count >= FRAME_LEN:
+            h = self._ring_head
+            if ring[h] != 0xFF or ring[(h + 1) % RING_SIZE] != 0x86:
+                # Not a frame start: resynchronize on the next 0xFF
+                self._ring_head = (h + 1) % RING_SIZE
+                self._ring_count -= 1
+                continue
+            total = 0
+            for i in range(1, 8):
+                total += ring[(h + i) % RING_SIZE]
+            checksum = (0xFF - (total % 0x100) + 1) & 0xFF
+            if checksum != ring[(h + 8) % RING_SIZE]:
+                self.frames_bad += 1
+                self._ring_head = (h + 1) % RING_SIZE
+                self._ring_count -= 1
+                continue
+            co2 = (ring[(h + 2) % RING_SIZE] << 8) | ring[(h + 3) % RING_SIZE]
+            self._ring_head = (h + FRAME_LEN) % RING_SIZE
+            self._ring_count -= FRAME_LEN
+            self.frames_ok += 1
+            self.last_reading = co2
+            self.last_reading_time = time.time()
+            self._last_frame_ms = time.ticks_ms()
+
+    def get_latest(self):
+        """Return (co2_ppm, age_seconds) of the latest validated frame, or (0, None)."""
+        self.poll()
+        if self._last_frame_ms is None:
+            return 0, None
+        return self.last_reading, time.ticks_diff(time.ticks_ms(), self._last_frame_ms) / 1000
+
     def calibrate_zero(self):
         """Calibrate zero point (400ppm).
         
@@ -30,6 +30,7 @@ Usage:
 
 import os
 import sys
+import gzip
 import time
 import json
 import argparse
@@ -658,6 +659,15 @@ def get_device_data(device_id):
     else:
         return jsonify({"error": "No data available for this device"}), 404
 
+def _compressed_json(payload, status=200):
+    """JSON response, gzip-compressed when the client accepts it (graph JSON is large and repetitive)."""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    headers = {'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.headers.get('Accept-Encoding', '') and len(body) > 1024:
+        body = gzip.compress(body, compresslevel=1)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, status=status, mimetype='application/json', headers=headers)
+
 @app.route('/api/graphs')
 def get_graphs():
     """API endpoint to get graphs for all devices."""
@@ -679,7 +689,7 @@ def get_graphs():
         return jsonify(graphs), 400
 
     # Return the graphs
-    return jsonify(graphs)
+    return _compressed_json(graphs)
 
 @app.route('/api/export/<device_id>')
 def export_data(device_id):
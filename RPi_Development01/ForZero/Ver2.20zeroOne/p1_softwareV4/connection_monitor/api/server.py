@@ -8,6 +8,7 @@ import logging
 from flask import Flask
 
 from .routes import setup_api_routes
+from instrumentation import instrument_app
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +25,7 @@ def create_api_app(connection_data, lock):
     """
     app = Flask(__name__)
     setup_api_routes(app, connection_data, lock)
+    instrument_app(app, "monitor")
     return app
 
 def run_api_server(app, port):
@@ -15,6 +15,7 @@ from .measurements.signal_strength import get_signal_strength
 from .measurements.noise_level import get_noise_level
 from .measurements.ping import measure_ping, check_device_online
 from .api.server import create_api_app, run_api_server
+from instrumentation import STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -45,12 +46,14 @@ class WiFiMonitor:
     def _monitor_connections(self):
         """Monitor connections to all devices."""
         while self.running:
+            sweep_t0 = time.perf_counter()
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             noise_level = get_noise_level(self.config["interface"])
 
             for device_id in self.config["devices"]:
                 # Check if device is online
                 device_info = self.config["devices"][device_id]
+                probe_t0 = time.perf_counter()
                 online = check_device_online(device_id, device_info)
 
                 if online:
@@ -88,6 +91,8 @@ class WiFiMonitor:
                         "ping_time": None
                     }
 
+                STAGE_SECONDS.observe(time.perf_counter() - probe_t0, "monitor_probe")
+
                 # Update connection data
                 with self.lock:
                     self.connection_data[device_id]["history"].append(data_point)
@@ -101,6 +106,8 @@ class WiFiMonitor:
 
                 logger.info(f"Connection data for {device_id}: {data_point}")
 
+            STAGE_SECONDS.observe(time.perf_counter() - sweep_t0, "monitor_sweep")
+
             # Sleep until next monitoring interval
             time.sleep(self.config["monitor_interval"])
 
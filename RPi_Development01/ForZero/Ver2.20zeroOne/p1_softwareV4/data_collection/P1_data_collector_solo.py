@@ -12,6 +12,8 @@ Features:
 - Validates and processes received data (BME680 sensors only, no CO2 sensors in Ver2.0)
 - Calculates absolute humidity from temperature and humidity data
 - Stores data in separate directories (RawData_P4, RawData_P5, and RawData_P6)
+- Optionally samples the local P1 BME680 in-process (--local-p1) so P1 rows go through
+  the same writer and latest-data index as the remote nodes (RawData_P1)
 - Handles connection errors and data validation
 - Provides an API for other modules to access the collected data
 
@@ -21,7 +23,7 @@ Requirements:
 - pandas for data manipulation
 
 Usage:
-    python3 P1_data_collector_solo.py [--port PORT] [--data-dir DIR]
+    python3 P1_data_collector_solo.py [--port PORT] [--data-dir DIR] [--local-p1 [--local-p1-interval SEC]]
 """
 
 import os
@@ -55,6 +57,7 @@ if parent_dir not in sys.path:
 FALLBACK_DEFAULT_CONFIG = {
     "listen_port": 5000,
     "data_dir": "/var/lib(FromThonny)/raspap_solo/data",
+    "rawdata_p1_dir": "RawData_P1",
     # Add P2/P3 directories (in addition to existing P4+)
     "rawdata_p2_dir": "RawData_P2",
     "rawdata_p3_dir": "RawData_P3",
@@ -64,7 +67,15 @@ FALLBACK_DEFAULT_CONFIG = {
     "api_port": 5001,
     "max_file_size_mb": 10,
     "rotation_interval_days": 7,
-    "device_timeout_seconds": 120
+    "device_timeout_seconds": 120,
+    # Local P1 BME680 sampled in-process (see p1_bme680_reader_ver2.LocalBME680Sampler)
+    "local_p1": False,
+    "local_p1_interval": 30,
+    "local_p1_missed_policy": "skip",
+    # API server: 'prod' = Waitress thread pool (single process, the collector state lives here),
+    # falling back to the threaded dev server; 'dev' = Flask dev server
+    "api_serve_mode": "prod",
+    "api_threads": 8
 }
 
 FALLBACK_MONITOR_CONFIG = {
@@ -118,6 +129,10 @@ except ImportError as e:
     logger.error("Flask is required for the API server. Please install it with 'pip install flask'.")
     sys.exit(1)
 
+from wsgi_serving import serve_threaded
+from schema_validation import ValidationError, compile_schema
+from instrumentation import counter, instrument_app, timed, timer
+
 # Try to import WiFiMonitor for dynamic IP tracking
 try:
     from p1_software_solo405.connection_monitor.monitor import WiFiMonitor
@@ -128,6 +143,33 @@ except ImportError:
         logger.warning("Failed to import WiFiMonitor. Dynamic IP tracking will be disabled.")
         WiFiMonitor = None
 
+# Devices whose rows are stored by this collector (P1 = local BME680, when enabled)
+SUPPORTED_DEVICES = ["P1", "P2", "P3", "P4", "P5", "P6"]
+
+# Node reading schema, compiled once. Numbers must parse with float() (no unit stripping).
+# CO2 validation removed in Ver2.0 (BME680 only)
+VALIDATE_READING = compile_schema({
+    "device_id": {"type": "string", "choices": SUPPORTED_DEVICES},
+    "temperature": {"type": "number", "min": -40, "max": 85},
+    "humidity": {"type": "number", "min": 0, "max": 100},
+    "pressure": {"type": "number", "min": 300, "max": 1100},
+    "gas_resistance": {"type": "number"},
+}, units=False)
+
+INGEST_TOTAL = counter("p1_ingest_total", "Readings handled by the collector by outcome", ("result",))
+
+# CSV layout; timestamp_epoch (integer seconds) lets readers skip string date parsing
+EPOCH_COLUMN = "timestamp_epoch"
+CSV_HEADER = [
+    "timestamp", "device_id", "temperature", "humidity",
+    "pressure", "gas_resistance",
+    # "co2",  # CO2 column removed in Ver2.0 (BME680 only)
+    "absolute_humidity", EPOCH_COLUMN
+]
+
+# A node's own epoch 'timestamp' is used only if its clock is within this many seconds of P1
+DEVICE_CLOCK_TOLERANCE_S = 300
+
 class DataCollector:
     """Class to collect and store environmental data from sensor nodes."""
 
@@ -137,11 +179,13 @@ class DataCollector:
         self.devices = {}  # Store device information
         self.last_data = {}  # Store the last received data for each device
         self.lock = threading.Lock()  # Lock for thread-safe operations
+        self.write_lock = threading.Lock()  # Serializes CSV writes (client threads + local P1 sampler)
+        self.local_sampler = None
 
         # Ensure data directories exist
         os.makedirs(self.config["data_dir"], exist_ok=True)
         # Ensure P2/P3 directories as well as existing ones
-        for key in ["rawdata_p2_dir", "rawdata_p3_dir", "rawdata_p4_dir", "rawdata_p5_dir", "rawdata_p6_dir"]:
+        for key in ["rawdata_p1_dir", "rawdata_p2_dir", "rawdata_p3_dir", "rawdata_p4_dir", "rawdata_p5_dir", "rawdata_p6_dir"]:
             if key in self.config and self.config[key]:
                 os.makedirs(os.path.join(self.config["data_dir"], self.config[key]), exist_ok=True)
 
@@ -164,6 +208,7 @@ class DataCollector:
         # Start the API server
         self.api_app = Flask(__name__)
         self._setup_api_routes()
+        instrument_app(self.api_app, "collector")
         self.api_thread = threading.Thread(target=self._run_api)
         self.api_thread.daemon = True
 
@@ -181,9 +226,11 @@ class DataCollector:
         today = datetime.datetime.now().strftime("%Y-%m-%d")
 
         # Define supported devices (include P2/P3)
-        for device in ["P2", "P3", "P4", "P5", "P6"]:
+        for device in SUPPORTED_DEVICES:
             # Determine the appropriate directory for each device
-            if device == "P2":
+            if device == "P1":
+                device_dir = self.config.get("rawdata_p1_dir", "RawData_P1")
+            elif device == "P2":
                 device_dir = self.config["rawdata_p2_dir"]
             elif device == "P3":
                 device_dir = self.config["rawdata_p3_dir"]
@@ -194,55 +241,48 @@ class DataCollector:
             else:  # P6
                 device_dir = self.config["rawdata_p6_dir"]
 
-            # Date-based CSV file
+            # Date-based CSV file (header is written if the file is new)
             csv_path = os.path.join(self.config["data_dir"], device_dir, f"{device}_{today}.csv")
-            file_exists = os.path.exists(csv_path)
-
-            # Open file and create writer
-            self.csv_files[device] = open(csv_path, 'a', newline='')
-            self.csv_writers[device] = csv.writer(self.csv_files[device])
-
-            # Write header if file is new
-            if not file_exists:
-                self.csv_writers[device].writerow([
-                    "timestamp", "device_id", "temperature", "humidity", 
-                    "pressure", "gas_resistance", 
-                    # "co2",  # CO2 column removed in Ver2.0 (BME680 only)
-                    "absolute_humidity"
-                ])
-                self.csv_files[device].flush()
+            self.csv_files[device], self.csv_writers[device] = self._open_csv(csv_path)
 
             # Fixed CSV file
             fixed_csv_path = os.path.join(self.config["data_dir"], device_dir, f"{device}_fixed.csv")
-            fixed_file_exists = os.path.exists(fixed_csv_path)
-
-            # Open fixed file and create writer
-            self.fixed_csv_files[device] = open(fixed_csv_path, 'a', newline='')
-            self.fixed_csv_writers[device] = csv.writer(self.fixed_csv_files[device])
-
-            # Write header if fixed file is new
-            if not fixed_file_exists:
-                self.fixed_csv_writers[device].writerow([
-                    "timestamp", "device_id", "temperature", "humidity", 
-                    "pressure", "gas_resistance", 
-                    # "co2",  # CO2 column removed in Ver2.0 (BME680 only)
-                    "absolute_humidity"
-                ])
-                self.fixed_csv_files[device].flush()
+            self.fixed_csv_files[device], self.fixed_csv_writers[device] = self._open_csv(fixed_csv_path)
 
         logger.info(f"CSV files initialized for today ({today}) and fixed files")
 
+    def _open_csv(self, path):
+        """Open a CSV file for appending and write CSV_HEADER if it is new.
+
+        Returns (file, writer). The writer is a DictWriter keyed on the header the file
+        already has, so files written by older versions or by the standalone P1 reader
+        (e.g. with a co2 column, without timestamp_epoch) keep their own column layout.
+        """
+        header = CSV_HEADER
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'r', newline='') as f:
+                header = next(csv.reader(f), None) or CSV_HEADER
+            csv_file = open(path, 'a', newline='')
+            return csv_file, csv.DictWriter(csv_file, fieldnames=header, restval="", extrasaction="ignore")
+        csv_file = open(path, 'a', newline='')
+        writer = csv.DictWriter(csv_file, fieldnames=header, restval="", extrasaction="ignore")
+        writer.writeheader()
+        csv_file.flush()
+        return csv_file, writer
+
     def _rotate_csv_files(self):
         """Rotate CSV files based on date or size."""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
 
-        for device in ["P2", "P3", "P4", "P5", "P6"]:
+        for device in SUPPORTED_DEVICES:
             # Close current date-based file (if initialized)
             if device in self.csv_files:
                 self.csv_files[device].close()
 
             # Determine the appropriate directory for each device
-            if device == "P2":
+            if device == "P1":
+                device_dir = self.config.get("rawdata_p1_dir", "RawData_P1")
+            elif device == "P2":
                 device_dir = self.config["rawdata_p2_dir"]
             elif device == "P3":
                 device_dir = self.config["rawdata_p3_dir"]
@@ -257,43 +297,25 @@ class DataCollector:
             csv_path = os.path.join(self.config["data_dir"], device_dir, f"{device}_{today}.csv")
             file_exists = os.path.exists(csv_path)
 
-            self.csv_files[device] = open(csv_path, 'a', newline='')
-            self.csv_writers[device] = csv.writer(self.csv_files[device])
+            self.csv_files[device], self.csv_writers[device] = self._open_csv(csv_path)
 
-            # Write header if file is new
+            fixed_csv_path = os.path.join(self.config["data_dir"], device_dir, f"{device}_fixed.csv")
             if not file_exists:
-                self.csv_writers[device].writerow([
-                    "timestamp", "device_id", "temperature", "humidity", 
-                    "pressure", "gas_resistance", "co2", "absolute_humidity"
-                ])
-                self.csv_files[device].flush()
-
                 # Append today's data to fixed file
-                fixed_csv_path = os.path.join(self.config["data_dir"], device_dir, f"{device}_fixed.csv")
                 fixed_file_exists = os.path.exists(fixed_csv_path)
 
                 # Close the fixed file if it's open
                 if device in self.fixed_csv_files and self.fixed_csv_files[device]:
                     self.fixed_csv_files[device].close()
 
-                # Open the fixed file in append mode
-                self.fixed_csv_files[device] = open(fixed_csv_path, 'a', newline='')
-                self.fixed_csv_writers[device] = csv.writer(self.fixed_csv_files[device])
-
-                # Write header only if the fixed file is new
+                # Open the fixed file in append mode (header only if the fixed file is new)
+                self.fixed_csv_files[device], self.fixed_csv_writers[device] = self._open_csv(fixed_csv_path)
                 if not fixed_file_exists:
-                    self.fixed_csv_writers[device].writerow([
-                        "timestamp", "device_id", "temperature", "humidity", 
-                        "pressure", "gas_resistance", "co2", "absolute_humidity"
-                    ])
-                    self.fixed_csv_files[device].flush()
                     logger.info(f"Created new fixed file for {device} with headers")
             else:
                 # Reopen the fixed file in append mode if it was closed
                 if device not in self.fixed_csv_files or not self.fixed_csv_files[device]:
-                    fixed_csv_path = os.path.join(self.config["data_dir"], device_dir, f"{device}_fixed.csv")
-                    self.fixed_csv_files[device] = open(fixed_csv_path, 'a', newline='')
-                    self.fixed_csv_writers[device] = csv.writer(self.fixed_csv_files[device])
+                    self.fixed_csv_files[device], self.fixed_csv_writers[device] = self._open_csv(fixed_csv_path)
 
         logger.info(f"CSV files rotated for today ({today}) and fixed files updated")
 
@@ -349,65 +371,30 @@ class DataCollector:
             logger.error(f"Error calculating absolute humidity: {e}")
             return None
 
+    @timed("ingest_validate")
     def _validate_data(self, data):
-        """Validate the received data format and values."""
-        required_fields = [
-            "device_id", "temperature", "humidity", "pressure", 
-            "gas_resistance"
-        ]
-
-        # Check if all required fields are present
-        for field in required_fields:
-            if field not in data:
-                logger.warning(f"Missing required field: {field}")
-                return False
-
-        # Validate device_id
-        if data["device_id"] not in ["P2", "P3", "P4", "P5", "P6"]:
-            logger.warning(f"Invalid device_id: {data['device_id']}")
-            return False
-
-        # Validate numeric fields
-        numeric_fields = [
-            "temperature", "humidity", "pressure", 
-            "gas_resistance"
-        ]
-
-        # CO2 validation removed in Ver2.0 (BME680 only)
-        # if "co2" in data:
-        #     numeric_fields.append("co2")
-
-        for field in numeric_fields:
-            try:
-                float(data[field])
-            except (ValueError, TypeError):
-                logger.warning(f"Invalid value for {field}: {data[field]}")
-                return False
-
-        # Validate ranges
-        if not (-40 <= float(data["temperature"]) <= 85):
-            logger.warning(f"Temperature out of range: {data['temperature']}")
-            return False
-
-        if not (0 <= float(data["humidity"]) <= 100):
-            logger.warning(f"Humidity out of range: {data['humidity']}")
-            return False
-
-        if not (300 <= float(data["pressure"]) <= 1100):
-            logger.warning(f"Pressure out of range: {data['pressure']}")
+        """Validate the received data format and values (compiled schema, each field parsed once)."""
+        try:
+            VALIDATE_READING(data)
+        except ValidationError as e:
+            logger.warning(f"Invalid data: {e.details}")
             return False
+        return True
 
-        # CO2 validation removed in Ver2.0 (BME680 only)
-        # if "co2" in data and not (400 <= float(data["co2"]) <= 5000):
-        #     logger.warning(f"CO2 out of range: {data['co2']}")
-        #     return False
+    @timed("ingest_store")
+    def _store_data(self, data, acquired_at=None):
+        """Store the validated data in CSV file.
 
-        return True
+        acquired_at: optional datetime of acquisition (local P1 sampler); defaults to receive time.
+        """
+        with self.write_lock:
+            return self._store_data_locked(data, acquired_at)
 
-    def _store_data(self, data):
-        """Store the validated data in CSV file."""
+    def _store_data_locked(self, data, acquired_at=None):
         device_id = data["device_id"]
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        acquired_at = acquired_at or datetime.datetime.now()
+        timestamp = acquired_at.strftime("%Y-%m-%d %H:%M:%S")
+        timestamp_epoch = int(acquired_at.timestamp())
 
         # Check if we need to rotate files (new day)
         today = datetime.datetime.now().strftime("%Y-%m-%d")
@@ -421,24 +408,19 @@ class DataCollector:
             data["humidity"]
         )
 
-        # Prepare row data
-        row_data = [
-            timestamp,
-            device_id,
-            data["temperature"],
-            data["humidity"],
-            data["pressure"],
-            data["gas_resistance"]
-        ]
-
-        # CO2 data handling removed in Ver2.0 (BME680 only)
-        # if "co2" in data:
-        #     row_data.append(data["co2"])
-        # else:
-        #     row_data.append("")  # Empty value for CO2
-
-        # Add absolute humidity
-        row_data.append(absolute_humidity if absolute_humidity is not None else "")
+        # Row keyed by column name; each writer keeps only the columns of its file's header
+        row_data = {
+            "timestamp": timestamp,
+            "device_id": device_id,
+            "temperature": data["temperature"],
+            "humidity": data["humidity"],
+            "pressure": data["pressure"],
+            "gas_resistance": data["gas_resistance"],
+            # No CO2 sensor since Ver2.0 (BME680 only); stays empty in files that have the column
+            "co2": data.get("co2", ""),
+            "absolute_humidity": absolute_humidity if absolute_humidity is not None else "",
+            EPOCH_COLUMN: timestamp_epoch,
+        }
 
         # Write data to date-based CSV
         self.csv_writers[device_id].writerow(row_data)
@@ -467,6 +449,43 @@ class DataCollector:
         logger.info(f"Stored data from {device_id} at {timestamp}")
         return True
 
+    def _device_time(self, data):
+        """Acquisition time from a node's epoch 'timestamp', or None if missing or its clock is off."""
+        try:
+            epoch = float(data["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if abs(epoch - time.time()) > DEVICE_CLOCK_TOLERANCE_S:
+            return None
+        return datetime.datetime.fromtimestamp(epoch)
+
+    def ingest_local(self, data):
+        """Store a reading produced in-process (local P1 BME680) through the normal pipeline."""
+        data = dict(data)
+        acquired_at = None
+        if "timestamp" in data:
+            acquired_at = datetime.datetime.fromtimestamp(float(data.pop("timestamp")))
+        if not self._validate_data(data):
+            logger.warning(f"Discarded invalid local reading: {data}")
+            return False
+        return self._store_data(data, acquired_at=acquired_at)
+
+    def _start_local_sampler(self):
+        """Start the in-process P1 BME680 sampler if enabled in the configuration."""
+        if not self.config.get("local_p1"):
+            return
+        try:
+            from p1_bme680_reader_ver2 import LocalBME680Sampler
+        except ImportError:
+            from data_collection.p1_bme680_reader_ver2 import LocalBME680Sampler
+        self.local_sampler = LocalBME680Sampler(
+            self.ingest_local,
+            interval=self.config.get("local_p1_interval", 30),
+            missed_policy=self.config.get("local_p1_missed_policy", "skip"),
+        )
+        self.local_sampler.start()
+        logger.info("Local P1 BME680 sampler started (in-process)")
+
     def _handle_client(self, client_socket, addr):
         """Handle incoming client connection and data."""
         logger.info(f"Connection from {addr}")
@@ -491,7 +510,8 @@ class DataCollector:
             # Parse JSON data
             if data:
                 try:
-                    json_data = json.loads(data.decode('utf-8'))
+                    with timer("ingest_parse"):
+                        json_data = json.loads(data.decode('utf-8'))
                     logger.info(f"Received data: {json_data}")
 
                     # Validate data
@@ -504,15 +524,19 @@ class DataCollector:
                             except Exception as e:
                                 logger.error(f"Failed to update device IP in WiFi monitor: {e}")
 
-                        # Store data
-                        if self._store_data(json_data):
+                        # Store data (stamped with the node's acquisition time when its clock is sane)
+                        if self._store_data(json_data, acquired_at=self._device_time(json_data)):
+                            INGEST_TOTAL.inc("ok")
                             # Send acknowledgment
                             client_socket.sendall(b'{"status": "success"}')
                         else:
+                            INGEST_TOTAL.inc("store_error")
                             client_socket.sendall(b'{"status": "error", "message": "Failed to store data"}')
                     else:
+                        INGEST_TOTAL.inc("invalid")
                         client_socket.sendall(b'{"status": "error", "message": "Invalid data format"}')
                 except json.JSONDecodeError as e:
+                    INGEST_TOTAL.inc("parse_error")
                     logger.error(f"Failed to parse JSON data: {e}")
                     client_socket.sendall(b'{"status": "error", "message": "Invalid JSON format"}')
             else:
@@ -572,7 +596,7 @@ class DataCollector:
         @app.route('/api/data/device/<device_id>', methods=['GET'])
         def get_device_data(device_id):
             """Get the latest data for a specific device."""
-            if device_id not in ["P2", "P3", "P4", "P5", "P6"]:
+            if device_id not in SUPPORTED_DEVICES:
                 return jsonify({"error": "Invalid device ID"}), 400
 
             with self.lock:
@@ -584,11 +608,13 @@ class DataCollector:
         @app.route('/api/data/csv/<device_id>', methods=['GET'])
         def get_csv_data(device_id):
             """Get the path to the CSV file for a specific device."""
-            if device_id not in ["P2", "P3", "P4", "P5", "P6"]:
+            if device_id not in SUPPORTED_DEVICES:
                 return jsonify({"error": "Invalid device ID"}), 400
 
             today = datetime.datetime.now().strftime("%Y-%m-%d")
-            if device_id == "P2":
+            if device_id == "P1":
+                device_dir = self.config.get("rawdata_p1_dir", "RawData_P1")
+            elif device_id == "P2":
                 device_dir = self.config["rawdata_p2_dir"]
             elif device_id == "P3":
                 device_dir = self.config["rawdata_p3_dir"]
@@ -607,7 +633,11 @@ class DataCollector:
 
     def _run_api(self):
         """Run the API server."""
-        self.api_app.run(host='0.0.0.0', port=self.config["api_port"])
+        if self.config.get("api_serve_mode", "prod") == "prod":
+            serve_threaded(self.api_app, '0.0.0.0', self.config["api_port"],
+                           threads=self.config.get("api_threads", 8))
+        else:
+            self.api_app.run(host='0.0.0.0', port=self.config["api_port"], threaded=True)
 
     def start(self):
         """Start the data collector."""
@@ -624,6 +654,10 @@ class DataCollector:
 
             self.server_thread.start()
             self.api_thread.start()
+            try:
+                self._start_local_sampler()
+            except Exception as e:
+                logger.error(f"Failed to start local P1 sampler: {e}")
             logger.info("Data collector started")
 
             # Start a thread to clean up old files periodically
@@ -641,6 +675,10 @@ class DataCollector:
         if self.running:
             self.running = False
 
+            # Stop the local sampler before closing the files it writes to
+            if self.local_sampler is not None:
+                self.local_sampler.stop()
+
             # Close date-based CSV files
             for file in self.csv_files.values():
                 file.close()
@@ -665,6 +703,12 @@ def main():
     parser.add_argument('--port', type=int, help='Port to listen on')
     parser.add_argument('--data-dir', type=str, help='Directory to store data')
     parser.add_argument('--api-port', type=int, help='Port for the API server')
+    parser.add_argument('--local-p1', action='store_true', help='Sample the local P1 BME680 in-process')
+    parser.add_argument('--local-p1-interval', type=int, help='Local P1 sampling interval in seconds')
+    parser.add_argument('--local-p1-missed-policy', choices=['skip', 'catchup'],
+                        help='Local P1 missed-deadline policy')
+    parser.add_argument('--api-serve-mode', choices=['dev', 'prod'],
+                        help='API server: dev = Flask dev server, prod = Waitress (single process)')
     args = parser.parse_args()
 
     # Create configuration
@@ -679,6 +723,18 @@ def main():
     if args.api_port:
         config["api_port"] = args.api_port
 
+    if args.local_p1:
+        config["local_p1"] = True
+
+    if args.local_p1_interval:
+        config["local_p1_interval"] = args.local_p1_interval
+
+    if args.local_p1_missed_policy:
+        config["local_p1_missed_policy"] = args.local_p1_missed_policy
+
+    if args.api_serve_mode:
+        config["api_serve_mode"] = args.api_serve_mode
+
     # Create and start the data collector
     collector = DataCollector(config)
 
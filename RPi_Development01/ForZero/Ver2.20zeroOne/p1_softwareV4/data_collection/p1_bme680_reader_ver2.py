@@ -9,7 +9,11 @@ P1 BME680 Local Reader (Ver2)
 - Gas resistance calculation is aligned with the Pico (P2/P3/P4) logic
   (ported from OK2bme/Adafruit-style driver used on Pico nodes).
 - Sampling interval default is 30 seconds to match node behavior and stabilize heater effects.
-- Appends rows to:
+- Sampling runs on a monotonic-clock fixed-rate scheduler (no drift from read/write time),
+  with a configurable missed-deadline policy and jitter statistics.
+- Preferred deployment: run inside the data collector (P1_data_collector_solo.py --local-p1)
+  so P1 rows go through the collector's storage pipeline together with P2-P6.
+- Standalone mode (this script) appends rows to:
   - /var/lib(FromThonny)/raspap_solo/data/RawData_P1/P1_fixed.csv
   - /var/lib(FromThonny)/raspap_solo/data/RawData_P1/P1_YYYY-MM-DD.csv
 - Row format (header): timestamp,device_id,temperature,humidity,pressure,gas_resistance,co2,absolute_humidity
@@ -26,6 +30,10 @@ Wiring (default I2C bus 1):
 
 Usage:
   python3 p1_bme680_reader_ver2.py --interval 30
+  python3 P1_data_collector_solo.py --local-p1 --local-p1-interval 30   (in-process, recommended)
+
+Note: do not run standalone mode and the collector with --local-p1 at the same time;
+both would append to RawData_P1.
 """
 
 import os
@@ -35,6 +43,7 @@ import math
 import argparse
 import datetime
 import logging
+import threading
 
 try:
     from smbus2 import SMBus
@@ -279,10 +288,137 @@ def find_bme680():
     raise RuntimeError("Could not initialize BME680 at 0x76 or 0x77")
 
 
+MISSED_POLICIES = ("skip", "catchup")
+
+
+class FixedRateScheduler:
+    """Fixed-rate tick generator on the monotonic clock.
+
+    Deadlines are start + k * interval, so the period does not drift by the time spent
+    reading the sensor or storing the row. When a deadline is missed by more than one
+    period the policy decides what happens:
+      - "skip":    drop the missed ticks and resume on the next future deadline (default)
+      - "catchup": fire the missed ticks back-to-back until on schedule again
+    Jitter (actual - scheduled wake-up) is accumulated for reporting.
+    """
+
+    def __init__(self, interval, missed_policy="skip", stop_event=None):
+        if missed_policy not in MISSED_POLICIES:
+            raise ValueError(f"missed_policy must be one of {MISSED_POLICIES}")
+        self.interval = max(0.01, float(interval))
+        self.missed_policy = missed_policy
+        self.stop_event = stop_event or threading.Event()
+        self.ticks = 0
+        self.missed = 0
+        self._jitter_sum = 0.0
+        self._jitter_sq_sum = 0.0
+        self._jitter_max = 0.0
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _record_jitter(self, jitter):
+        self.ticks += 1
+        self._jitter_sum += jitter
+        self._jitter_sq_sum += jitter * jitter
+        if jitter > self._jitter_max:
+            self._jitter_max = jitter
+
+    def run(self, callback):
+        """Call callback() at every deadline until stop() is called."""
+        start = time.monotonic()
+        k = 0
+        while not self.stop_event.is_set():
+            deadline = start + k * self.interval
+            delay = deadline - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+            self._record_jitter(time.monotonic() - deadline)
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Scheduled task error: {e}")
+            k += 1
+            behind = int((time.monotonic() - (start + k * self.interval)) // self.interval)
+            if behind > 0:
+                self.missed += behind
+                if self.missed_policy == "skip":
+                    k += behind
+                logger.warning(f"Missed {behind} deadline(s) (policy={self.missed_policy})")
+
+    def stats(self):
+        """Jitter statistics in milliseconds."""
+        n = self.ticks
+        if n == 0:
+            return {"ticks": 0, "missed": self.missed, "mean_ms": 0.0, "std_ms": 0.0, "max_ms": 0.0}
+        mean = self._jitter_sum / n
+        var = max(0.0, self._jitter_sq_sum / n - mean * mean)
+        return {
+            "ticks": n,
+            "missed": self.missed,
+            "mean_ms": round(mean * 1000.0, 3),
+            "std_ms": round(math.sqrt(var) * 1000.0, 3),
+            "max_ms": round(self._jitter_max * 1000.0, 3),
+        }
+
+
+class LocalBME680Sampler:
+    """Reads the local BME680 at a fixed rate and hands each sample to a sink.
+
+    The sink receives a dict in the same shape the collector receives from the Pico
+    nodes (device_id, temperature, humidity, pressure, gas_resistance, timestamp).
+    """
+
+    def __init__(self, sink, interval=30, missed_policy="skip", sensor=None, stats_every=20):
+        self.sink = sink
+        self.sensor = sensor
+        self.scheduler = FixedRateScheduler(interval, missed_policy)
+        self.stats_every = max(1, int(stats_every))
+        self.thread = None
+
+    def _sample(self):
+        if self.sensor is None:
+            self.sensor = find_bme680()
+        ts = datetime.datetime.now()
+        try:
+            t, h, p, g = self.sensor.read_all()
+        except Exception:
+            # Force re-detection on the next tick (bus glitch, sensor reset)
+            self.sensor = None
+            raise
+        self.sink({
+            "device_id": DEVICE_ID,
+            "timestamp": ts.timestamp(),
+            "temperature": round(t, 2),
+            "humidity": round(h, 2),
+            "pressure": round(p, 2),
+            "gas_resistance": int(g),
+        })
+        if self.scheduler.ticks % self.stats_every == 0:
+            logger.info(f"P1 sampler jitter: {self.scheduler.stats()}")
+
+    def run(self):
+        logger.info(f"Starting P1 BME680 sampler (interval={self.scheduler.interval}s, "
+                    f"policy={self.scheduler.missed_policy})")
+        self.scheduler.run(self._sample)
+        logger.info(f"P1 BME680 sampler stopped: {self.scheduler.stats()}")
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="p1-bme680", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self, timeout=5):
+        self.scheduler.stop()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+
 def main():
     parser = argparse.ArgumentParser(description='P1 BME680 Local Reader (Ver2)')
     parser.add_argument('--data-dir', default=DATA_DIR, help='Base data directory')
     parser.add_argument('--interval', type=int, default=30, help='Read interval seconds (default 30)')
+    parser.add_argument('--missed-policy', choices=MISSED_POLICIES, default='skip',
+                        help='What to do when a deadline is missed (default skip)')
     args = parser.parse_args()
 
     base_dir = args.data_dir
@@ -295,18 +431,23 @@ def main():
         logger.error(f"Failed to initialize BME680: {e}")
         return 1
 
-    logger.info("Starting P1 BME680 reader loop (Ver2)")
-    while True:
-        try:
-            ts = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            t, h, p, g = sensor.read_all()
-            ah = calc_absolute_humidity(t, h)
-            row = [ts, DEVICE_ID, f"{t:.2f}", f"{h:.2f}", f"{p:.2f}", str(int(g)), "", f"{ah:.2f}"]
-            write_row(base_dir, raw_dir, row)
-            logger.info(f"P1 wrote: T={t:.2f}C RH={h:.2f}% AH={ah:.2f}g/m3 P={p:.2f}hPa Gas={g:.0f}Ω")
-        except Exception as e:
-            logger.error(f"Read/store error: {e}")
-        time.sleep(max(1, args.interval))
+    def store(sample):
+        t, h = sample["temperature"], sample["humidity"]
+        p, g = sample["pressure"], sample["gas_resistance"]
+        ts = datetime.datetime.fromtimestamp(sample["timestamp"]).strftime('%Y-%m-%d %H:%M:%S')
+        ah = calc_absolute_humidity(t, h)
+        row = [ts, DEVICE_ID, f"{t:.2f}", f"{h:.2f}", f"{p:.2f}", str(int(g)), "", f"{ah:.2f}"]
+        write_row(base_dir, raw_dir, row)
+        logger.info(f"P1 wrote: T={t:.2f}C RH={h:.2f}% AH={ah:.2f}g/m3 P={p:.2f}hPa Gas={g:.0f}Ω")
+
+    logger.info("Starting P1 BME680 reader loop (Ver2, standalone CSV mode)")
+    sampler = LocalBME680Sampler(store, interval=max(1, args.interval),
+                                 missed_policy=args.missed_policy, sensor=sensor)
+    try:
+        sampler.run()
+    except KeyboardInterrupt:
+        logger.info(f"Stopped. Jitter stats: {sampler.scheduler.stats()}")
+    return 0
 
 
 if __name__ == '__main__':
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSV layout test for P1_data_collector_solo
+
+Rows appended by the collector must follow the header of the file they land in: a day file
+started by the standalone P1 reader has a co2 column and no timestamp_epoch, and the collector
+must not shift absolute_humidity into the co2 column.
+
+Usage (run as a script; the package __init__ imports a module that is not in this tree):
+    python3 test_collector_csv.py
+"""
+
+import csv
+import datetime
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import P1_data_collector_solo as collector_module
+
+STANDALONE_HEADER = ["timestamp", "device_id", "temperature", "humidity", "pressure",
+                     "gas_resistance", "co2", "absolute_humidity"]
+
+READING = {"device_id": "P1", "temperature": 25.0, "humidity": 50.0,
+           "pressure": 1013.25, "gas_resistance": 120000}
+
+
+def _collector(data_dir):
+    """DataCollector with only its CSV state initialized (no servers, no WiFi monitor)."""
+    config = dict(collector_module.DEFAULT_CONFIG)
+    config["data_dir"] = data_dir
+    collector = collector_module.DataCollector.__new__(collector_module.DataCollector)
+    collector.config = config
+    collector.last_data = {}
+    collector.lock = collector_module.threading.Lock()
+    collector.write_lock = collector_module.threading.Lock()
+    for key in ("rawdata_p1_dir", "rawdata_p2_dir", "rawdata_p3_dir",
+                "rawdata_p4_dir", "rawdata_p5_dir", "rawdata_p6_dir"):
+        os.makedirs(os.path.join(data_dir, config[key]), exist_ok=True)
+    collector._init_csv_files()
+    return collector
+
+
+def _close(collector):
+    for f in list(collector.csv_files.values()) + list(collector.fixed_csv_files.values()):
+        f.close()
+
+
+def _read(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_append_to_standalone_header():
+    """Collector rows appended to an 8-column standalone file keep co2 empty."""
+    print("\n=== Testing append to standalone P1 file ===")
+    with tempfile.TemporaryDirectory() as data_dir:
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        p1_dir = os.path.join(data_dir, collector_module.DEFAULT_CONFIG["rawdata_p1_dir"])
+        os.makedirs(p1_dir)
+        day_path = os.path.join(p1_dir, f"P1_{today}.csv")
+        with open(day_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(STANDALONE_HEADER)
+            writer.writerow([f"{today} 00:00:00", "P1", 24.0, 45.0, 1012.0, 110000, "", 9.8])
+
+        collector = _collector(data_dir)
+        try:
+            assert collector._store_data(dict(READING))
+        finally:
+            _close(collector)
+
+        rows = _read(day_path)
+        assert rows[0] == STANDALONE_HEADER
+        assert all(len(row) == len(STANDALONE_HEADER) for row in rows)
+        row = dict(zip(STANDALONE_HEADER, rows[-1]))
+        assert row["co2"] == ""
+        assert float(row["absolute_humidity"]) > 0
+        assert float(row["gas_resistance"]) == 120000
+    print("Standalone header kept OK")
+
+
+def test_new_file_uses_collector_header():
+    """A new day file gets CSV_HEADER, including timestamp_epoch."""
+    print("\n=== Testing new collector file ===")
+    with tempfile.TemporaryDirectory() as data_dir:
+        collector = _collector(data_dir)
+        try:
+            assert collector._store_data(dict(READING))
+            day_path = collector.csv_files["P1"].name
+        finally:
+            _close(collector)
+
+        rows = _read(day_path)
+        assert rows[0] == collector_module.CSV_HEADER
+        row = dict(zip(rows[0], rows[1]))
+        assert "co2" not in row
+        assert int(row[collector_module.EPOCH_COLUMN]) > 0
+    print("Collector header OK")
+
+
+def main():
+    """Main function to run all tests."""
+    print("=== P1 Data Collector - CSV Layout Test ===")
+    try:
+        test_append_to_standalone_header()
+        test_new_file_uses_collector_header()
+    except AssertionError as e:
+        print(f"CSV layout test failed: {e}")
+        sys.exit(1)
+    print("\n=== All CSV layout tests completed successfully ===")
+
+
+if __name__ == "__main__":
+    main()
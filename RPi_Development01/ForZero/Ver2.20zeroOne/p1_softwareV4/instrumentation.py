@@ -0,0 +1,312 @@
+"""
+Lightweight Prometheus-style instrumentation shared by the P1 collector, web app and WiFi monitor
+
+- timer(stage) / timed(stage): hot-path stage timings in the p1_stage_seconds histogram
+  (ingest_parse, ingest_validate, ingest_store, csv_read, csv_parse, csv_filter,
+   graph_build, graph_serialize, monitor_sweep, monitor_probe)
+- counter() / histogram(): labelled metrics; Histogram.observe() and Counter.inc()
+- instrument_app(app, name): per-route request latency (p1_http_request_seconds) and a
+  Prometheus text endpoint at /metrics
+- Disabled with P1_METRICS=0 (or configure(enabled=False) before the app is built): timers
+  return a shared no-op context, counters return immediately and no request hooks are installed
+- Multi-process servers (Gunicorn workers): pass multiprocess_dir so each process publishes a
+  snapshot at most once per second (trailing requests are flushed by a timer) and /metrics sums
+  the snapshots of live processes
+"""
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("P1_METRICS", "1") != "0"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PUBLISH_INTERVAL_SEC = 1.0
+
+_lock = threading.Lock()
+_metrics = {}
+
+
+def configure(enabled=None):
+    """Override the P1_METRICS environment switch; call before instrument_app()."""
+    global ENABLED
+    if enabled is not None:
+        ENABLED = bool(enabled)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        if not ENABLED:
+            return
+        with _lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+
+    def snapshot(self):
+        return {json.dumps(k): v for k, v in self.values.items()}
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}  # labels -> [count per bucket..., +Inf count, sum]
+
+    def observe(self, value, *labelvalues):
+        if not ENABLED:
+            return
+        idx = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            slot = self.values.get(labelvalues)
+            if slot is None:
+                slot = self.values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            slot[idx] += 1
+            slot[-1] += value
+
+    def snapshot(self):
+        return {json.dumps(k): list(v) for k, v in self.values.items()}
+
+
+def _register(metric):
+    with _lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        _metrics[metric.name] = metric
+        return metric
+
+
+def counter(name, help_text, labelnames=()):
+    return _register(Counter(name, help_text, labelnames))
+
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, help_text, labelnames, buckets))
+
+
+STAGE_SECONDS = histogram("p1_stage_seconds", "Time spent in instrumented hot-path stages", ("stage",))
+HTTP_SECONDS = histogram("p1_http_request_seconds", "HTTP request latency per route",
+                         ("app", "route", "method", "status"))
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.t0, self.stage)
+        return False
+
+
+def timer(stage):
+    """Context manager timing one stage; a shared no-op when instrumentation is disabled."""
+    return _StageTimer(stage) if ENABLED else _NULL_TIMER
+
+
+def timed(stage):
+    """Decorator form of timer()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - t0, stage)
+        return wrapper
+    return decorate
+
+
+# ---- exposition ----
+def _snapshot():
+    with _lock:
+        return {name: m.snapshot() for name, m in _metrics.items()}
+
+
+def _merge(total, snap):
+    for name, series in snap.items():
+        dest = total.setdefault(name, {})
+        for key, value in series.items():
+            if key not in dest:
+                dest[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                dest[key] = [a + b for a, b in zip(dest[key], value)]
+            else:
+                dest[key] += value
+    return total
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class _Publisher:
+    """Writes this process's snapshot to <dir>/<pid>.json and merges the live ones."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.last = 0.0
+        self._pending = False
+        self._plock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Created once per server start (before Gunicorn forks): drop snapshots of a previous run
+        for fname in os.listdir(directory):
+            if fname.endswith(".json"):
+                os.remove(os.path.join(directory, fname))
+
+    def publish(self):
+        """Write now if the interval has passed, else schedule one deferred write."""
+        with self._plock:
+            if self._pending:
+                return
+            delay = PUBLISH_INTERVAL_SEC - (time.monotonic() - self.last)
+            if delay > 0:
+                self._pending = True
+                flush = threading.Timer(delay, self._flush)
+                flush.daemon = True
+                flush.start()
+                return
+        self._write()
+
+    def _flush(self):
+        with self._plock:
+            self._pending = False
+        try:
+            self._write()
+        except OSError as e:
+            logger.warning(f"Metrics publish failed: {e}")
+
+    def _write(self):
+        self.last = time.monotonic()
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(_snapshot(), f)
+        os.replace(tmp, path)
+
+    def collect(self):
+        self._write()
+        total = {}
+        for fname in os.listdir(self.directory):
+            if not fname.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, fname)
+            try:
+                pid = int(fname[:-5])
+            except ValueError:
+                continue
+            if not _pid_alive(pid):
+                # Exited worker: its requests leave the totals like a counter reset
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    _merge(total, json.load(f))
+            except (OSError, ValueError):
+                continue
+        return total
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render_text(snapshot=None):
+    """Prometheus text exposition format (version 0.0.4)."""
+    snapshot = _snapshot() if snapshot is None else snapshot
+    lines = []
+    for name, metric in sorted(_metrics.items()):
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(snapshot.get(name, {}).items()):
+            labels = json.loads(key)
+            if metric.kind == "counter":
+                lines.append(f"{name}{_fmt_labels(metric.labelnames, labels)} {value}")
+                continue
+            cumulative = 0
+            for le, n in zip(metric.buckets + ("+Inf",), value[:-1]):
+                cumulative += n
+                le_label = f'le="{le}"'
+                lines.append(f"{name}_bucket{_fmt_labels(metric.labelnames, labels, le_label)} {cumulative}")
+            lines.append(f"{name}_sum{_fmt_labels(metric.labelnames, labels)} {value[-1]}")
+            lines.append(f"{name}_count{_fmt_labels(metric.labelnames, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def instrument_app(app, name, path="/metrics", multiprocess_dir=None):
+    """Add per-route latency histograms and a Prometheus text endpoint to a Flask app."""
+    if not ENABLED:
+        return app
+    from flask import Response, g, request
+
+    publisher = _Publisher(multiprocess_dir) if multiprocess_dir else None
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(response):
+        t0 = g.pop("_metrics_t0", None)
+        if t0 is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            HTTP_SECONDS.observe(time.perf_counter() - t0, name, route, request.method, str(response.status_code))
+        if publisher is not None:
+            try:
+                publisher.publish()
+            except OSError as e:
+                logger.warning(f"Metrics publish failed: {e}")
+        return response
+
+    def metrics_endpoint():
+        snapshot = publisher.collect() if publisher is not None else None
+        return Response(render_text(snapshot), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule(path, "prometheus_metrics", metrics_endpoint)
+    return app
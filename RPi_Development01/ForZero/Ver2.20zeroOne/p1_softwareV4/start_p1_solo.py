@@ -81,7 +81,12 @@ DEFAULT_CONFIG = {
     "memory_threshold": 80,  # Memory usage threshold (percentage)
     "cpu_threshold": 80,  # CPU usage threshold (percentage)
     "system_check_interval": 60,  # System resource check interval (seconds)
-    "process_monitor_interval": 30  # Process monitoring interval (seconds)
+    "process_monitor_interval": 30,  # Process monitoring interval (seconds)
+    "local_p1": False,  # Sample the local P1 BME680 inside the data collector
+    "local_p1_interval": 30,  # Local P1 sampling interval (seconds)
+    "web_serve_mode": "prod",  # Web interface: 'prod' = Gunicorn workers (falls back to Waitress/dev server), 'dev'
+    "web_workers": 2,
+    "web_threads": 4
 }
 
 # Global variables to store process objects and their restart information
@@ -135,6 +140,8 @@ def start_data_collector(config):
             "--data-dir", config["data_dir"],
             "--api-port", str(config["api_port"])
         ]
+        if config.get("local_p1"):
+            cmd += ["--local-p1", "--local-p1-interval", str(config["local_p1_interval"])]
 
         # Start the process
         process = subprocess.Popen(cmd)
@@ -167,7 +174,10 @@ def start_web_interface(config):
         cmd = [
             VENV_PYTHON, WEB_INTERFACE_SCRIPT,
             "--port", str(config["web_port"]),
-            "--data-dir", config["data_dir"]
+            "--data-dir", config["data_dir"],
+            "--serve-mode", config["web_serve_mode"],
+            "--workers", str(config["web_workers"]),
+            "--threads", str(config["web_threads"])
         ]
 
         # Set environment variables
@@ -417,6 +427,16 @@ def main():
                         help=f"Monitoring interval in seconds (default: {DEFAULT_CONFIG['monitor_interval']})")
     parser.add_argument("--interface", type=str, default=DEFAULT_CONFIG["interface"],
                         help=f"WiFi interface to monitor (default: {DEFAULT_CONFIG['interface']})")
+    parser.add_argument("--local-p1", action="store_true",
+                        help="Sample the local P1 BME680 inside the data collector (writes RawData_P1)")
+    parser.add_argument("--local-p1-interval", type=int, default=DEFAULT_CONFIG["local_p1_interval"],
+                        help=f"Local P1 sampling interval in seconds (default: {DEFAULT_CONFIG['local_p1_interval']})")
+    parser.add_argument("--web-serve-mode", choices=["dev", "prod"], default=DEFAULT_CONFIG["web_serve_mode"],
+                        help=f"Web interface server (default: {DEFAULT_CONFIG['web_serve_mode']})")
+    parser.add_argument("--web-workers", type=int, default=DEFAULT_CONFIG["web_workers"],
+                        help=f"Web interface worker processes in prod mode (default: {DEFAULT_CONFIG['web_workers']})")
+    parser.add_argument("--web-threads", type=int, default=DEFAULT_CONFIG["web_threads"],
+                        help=f"Threads per web interface worker in prod mode (default: {DEFAULT_CONFIG['web_threads']})")
     parser.add_argument("--create-service", action="store_true",
                         help="Create systemd service for auto-starting on boot")
 
@@ -430,6 +450,11 @@ def main():
     config["monitor_port"] = args.monitor_port
     config["monitor_interval"] = args.monitor_interval
     config["interface"] = args.interface
+    config["local_p1"] = args.local_p1
+    config["local_p1_interval"] = args.local_p1_interval
+    config["web_serve_mode"] = args.web_serve_mode
+    config["web_workers"] = args.web_workers
+    config["web_threads"] = args.web_threads
 
     # Check if running as root
     check_root()
@@ -30,6 +30,7 @@ import json
 import argparse
 import logging
 import datetime
+import tempfile
 import threading
 from pathlib import Path
 import pandas as pd
@@ -52,6 +53,14 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
+# csv_range_reader is imported from data/ directly (the package __init__ pulls in DataManager)
+data_module_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+if data_module_dir not in sys.path:
+    sys.path.insert(0, data_module_dir)
+from csv_range_reader import read_csv_since, parse_time_column
+from wsgi_serving import serve
+from instrumentation import instrument_app, timer
+
 # Default configuration
 DEFAULT_CONFIG = {
     "web_port": 80,
@@ -62,7 +71,12 @@ DEFAULT_CONFIG = {
     "rawdata_p4_dir": "RawData_P4",
     "refresh_interval": 10,  # seconds
     "data_api_url": "http://localhost:5001/api/data/latest",
-    "connection_api_url": "http://localhost:5002/api/connection/status"
+    "connection_api_url": "http://localhost:5002/api/connection/status",
+    # 'dev' = Flask dev server; 'prod' = Gunicorn gthread workers (Waitress fallback).
+    # Handlers only read CSVs, so several worker processes are safe.
+    "serve_mode": "dev",
+    "workers": 2,
+    "threads": 4
 }
 
 class DataVisualizer:
@@ -73,6 +87,11 @@ class DataVisualizer:
         self.config = config or DEFAULT_CONFIG
         self.app = Flask(__name__)
         self._setup_routes()
+        # Gunicorn workers are separate processes: /metrics sums their published snapshots
+        metrics_dir = None
+        if self.config.get("serve_mode") == "prod" and self.config.get("workers", 1) > 1:
+            metrics_dir = os.path.join(tempfile.gettempdir(), f"p1_web_metrics_{self.config['web_port']}")
+        instrument_app(self.app, "web", multiprocess_dir=metrics_dir)
     
     def _read_fixed_csv(self, device_id, days=1):
         """Read fixed CSV for a device (P1–P4) and return a processed DataFrame or None."""
@@ -89,29 +108,26 @@ class DataVisualizer:
             logger.warning(f"CSV not found for {device_id}: {csv_path}")
             return None
         try:
-            df = pd.read_csv(csv_path)
-            if 'timestamp' in df.columns:
-                # handle numeric or string timestamps robustly
-                try:
-                    if pd.api.types.is_numeric_dtype(df['timestamp']):
-                        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', errors='coerce')
-                    else:
-                        df['timestamp'] = pd.to_datetime(df['timestamp'].astype(str), errors='coerce')
-                except Exception:
-                    df['timestamp'] = pd.to_datetime(df['timestamp'].astype(str), errors='coerce')
-            else:
+            # Seek to the first row inside the window instead of parsing the whole file
+            cutoff = datetime.datetime.now() - datetime.timedelta(days=days) if days and days > 0 else None
+            with timer("csv_read"):
+                df = read_csv_since(csv_path, cutoff)
+            if 'timestamp' not in df.columns:
                 logger.warning(f"timestamp column missing in {csv_path}")
                 return None
-            df = df.dropna(subset=['timestamp'])
-            # Coerce numeric columns
-            for col in ["temperature", "humidity", "pressure", "gas_resistance", "absolute_humidity"]:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            # Filter by days
-            if days and days > 0:
-                cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
-                df = df[df['timestamp'] >= cutoff]
-            df = df.sort_values('timestamp')
+            with timer("csv_parse"):
+                # epoch column, fixed-format string or numeric epoch (no per-row format inference)
+                df['timestamp'] = parse_time_column(df)
+                df = df.dropna(subset=['timestamp'])
+                # Coerce numeric columns
+                for col in ["temperature", "humidity", "pressure", "gas_resistance", "absolute_humidity"]:
+                    if col in df.columns:
+                        df[col] = pd.to_numeric(df[col], errors='coerce')
+            with timer("csv_filter"):
+                # Filter by days
+                if cutoff is not None:
+                    df = df[df['timestamp'] >= cutoff]
+                df = df.sort_values('timestamp')
             return df
         except Exception as e:
             logger.error(f"Error reading CSV for {device_id}: {e}")
@@ -274,15 +290,17 @@ class DataVisualizer:
                     df = self._read_fixed_csv(dev, days=days)
                     if df is None or df.empty:
                         continue
-                    result[dev] = {
-                        'timestamp': df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-                        'temperature': df['temperature'].tolist() if 'temperature' in df else [],
-                        'humidity': df['humidity'].tolist() if 'humidity' in df else [],
-                        'absolute_humidity': df['absolute_humidity'].tolist() if 'absolute_humidity' in df else [],
-                        'pressure': df['pressure'].tolist() if 'pressure' in df else [],
-                        'gas_resistance': df['gas_resistance'].tolist() if 'gas_resistance' in df else []
-                    }
-                return jsonify(result)
+                    with timer("graph_build"):
+                        result[dev] = {
+                            'timestamp': df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+                            'temperature': df['temperature'].tolist() if 'temperature' in df else [],
+                            'humidity': df['humidity'].tolist() if 'humidity' in df else [],
+                            'absolute_humidity': df['absolute_humidity'].tolist() if 'absolute_humidity' in df else [],
+                            'pressure': df['pressure'].tolist() if 'pressure' in df else [],
+                            'gas_resistance': df['gas_resistance'].tolist() if 'gas_resistance' in df else []
+                        }
+                with timer("graph_serialize"):
+                    return jsonify(result)
             except Exception as e:
                 logger.error(f"Error generating graph data: {e}")
                 return jsonify({'error': str(e)}), 500
@@ -340,7 +358,11 @@ class DataVisualizer:
     def run(self, host='0.0.0.0', port=None, debug=False):
         """Run the Flask application."""
         port = port or self.config["web_port"]
-        self.app.run(host=host, port=port, debug=debug)
+        if debug or self.config.get("serve_mode", "dev") != "prod":
+            self.app.run(host=host, port=port, debug=debug, threaded=True)
+            return
+        serve(self.app, host, port, mode="prod",
+              workers=self.config.get("workers", 2), threads=self.config.get("threads", 4))
 
 # HTML template for the main page
 HTML_TEMPLATE = """
@@ -533,6 +555,9 @@ def main():
     parser.add_argument('--port', type=int, help='Port to listen on')
     parser.add_argument('--data-dir', type=str, help='Directory to store data')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--serve-mode', choices=['dev', 'prod'], help='dev: Flask dev server, prod: Gunicorn/Waitress')
+    parser.add_argument('--workers', type=int, help='Worker processes in prod mode')
+    parser.add_argument('--threads', type=int, help='Threads per worker in prod mode')
     args = parser.parse_args()
     
     config = DEFAULT_CONFIG.copy()
@@ -543,6 +568,15 @@ def main():
     if args.data_dir:
         config["data_dir"] = args.data_dir
     
+    if args.serve_mode:
+        config["serve_mode"] = args.serve_mode
+    
+    if args.workers:
+        config["workers"] = args.workers
+    
+    if args.threads:
+        config["threads"] = args.threads
+    
     visualizer = DataVisualizer(config)
     visualizer.run(debug=args.debug)
 
@@ -11,6 +11,8 @@ import datetime
 import pandas as pd
 import requests
 
+from p1_software_solo405.web_interface.data.csv_range_reader import read_csv_since, parse_time_column
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -138,11 +140,11 @@ class DataManager:
             if os.path.exists(fixed_csv_path):
                 logger.info(f"Fixed CSV file found for {device_id}: {fixed_csv_path}")
                 try:
-                    df = pd.read_csv(fixed_csv_path)
-                    logger.info(f"Read {len(df)} rows from fixed CSV file for {device_id}")
+                    df = read_csv_since(fixed_csv_path, cutoff_date)
+                    logger.info(f"Read {len(df)} rows since cutoff from fixed CSV file for {device_id}")
                     if not df.empty:
                         # Convert timestamp to datetime
-                        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+                        df['timestamp'] = parse_time_column(df)
                         logger.info(f"Converted timestamp to datetime for {device_id}")
 
                         # Filter by date
@@ -176,7 +178,7 @@ class DataManager:
                 if os.path.exists(csv_path):
                     logger.info(f"Date-based CSV file found for {device_id}: {csv_path}")
                     try:
-                        df = pd.read_csv(csv_path)
+                        df = read_csv_since(csv_path, cutoff_date)
                         logger.info(f"Read {len(df)} rows from date-based CSV file for {device_id} on {date_str}")
                         if not df.empty:
                             dfs.append(df)
@@ -192,7 +194,7 @@ class DataManager:
                 logger.info(f"Combined dataframe has {len(df)} rows for {device_id}")
 
                 # Convert timestamp to datetime
-                df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+                df['timestamp'] = parse_time_column(df)
                 logger.info(f"Converted timestamp to datetime for {device_id}")
 
                 # Filter by date
@@ -0,0 +1,131 @@
+"""
+Production serving helpers for the Flask apps
+
+- serve():          'dev' = Flask dev server (threaded); 'prod' = Gunicorn (gthread workers) when
+                    available, else Waitress (single process, thread pool), else the dev server
+- serve_threaded(): single-process server for apps whose state lives in the calling process
+                    (e.g. an API thread inside a collector); Waitress or the threaded dev server
+- ConcurrencyLimit: WSGI middleware answering 503 when too many requests are in flight,
+                    so a burst is rejected quickly instead of queueing behind slow handlers
+Gunicorn and Waitress are optional; install with `pip install gunicorn waitress`.
+
+Copy of HomeRaspMod/ModVer/wsgi_serving.py, kept here because the P1 tree is deployed on its own;
+change the original and copy it over.
+"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _ReleasingIterable:
+    """Response body wrapper that frees the request slot once the server closes the response."""
+
+    def __init__(self, iterable, release):
+        self.iterable = iterable
+        self._release = release
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+    def close(self):
+        try:
+            if hasattr(self.iterable, 'close'):
+                self.iterable.close()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+class ConcurrencyLimit:
+    """Reject requests with 503 once `max_inflight` are being handled by this process."""
+
+    def __init__(self, wsgi_app, max_inflight: int, retry_after: int = 1):
+        self.wsgi_app = wsgi_app
+        self.max_inflight = max_inflight
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_inflight)
+
+    def __call__(self, environ, start_response):
+        if not self._slots.acquire(blocking=False):
+            start_response('503 Service Unavailable', [
+                ('Content-Type', 'application/json'),
+                ('Retry-After', str(self.retry_after)),
+            ])
+            return [b'{"error": "server busy"}']
+        try:
+            return _ReleasingIterable(self.wsgi_app(environ, start_response), self._slots.release)
+        except BaseException:
+            self._slots.release()
+            raise
+
+
+def _serve_gunicorn(app, host: str, port: int, workers: int, threads: int, keepalive: int,
+                    max_connections: int, backlog: int, timeout: int, post_fork=None) -> bool:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        return False
+
+    options = {
+        'bind': f'{host}:{port}',
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': threads,
+        'keepalive': keepalive,
+        'worker_connections': max_connections,
+        'backlog': backlog,
+        'timeout': timeout,
+        'graceful_timeout': timeout,
+    }
+    if post_fork is not None:
+        options['post_fork'] = post_fork
+
+    class _Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    logger.info(f"Serving with Gunicorn on {host}:{port} "
+                f"(workers={workers}, threads={threads}, keepalive={keepalive}s, worker_connections={max_connections})")
+    _Application().run()
+    return True
+
+
+def serve_threaded(app, host: str, port: int, threads: int = 8, max_connections: int = 100,
+                   keepalive: int = 5) -> None:
+    """Single-process server; blocks, so call it from the thread that should own the server."""
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        waitress_serve = None
+    if waitress_serve is not None:
+        logger.info(f"Serving with Waitress on {host}:{port} (threads={threads}, connection_limit={max_connections})")
+        waitress_serve(app, host=host, port=port, threads=threads, connection_limit=max_connections,
+                       channel_timeout=max(keepalive, 5))
+        return
+    from werkzeug.serving import make_server
+    logger.warning("Waitress not installed; using the threaded development server with a concurrency limit")
+    server = make_server(host, port, ConcurrencyLimit(app, max_connections), threaded=True)
+    server.serve_forever()
+
+
+def serve(app, host: str, port: int, mode: str = 'dev', workers: int = 2, threads: int = 4,
+          keepalive: int = 5, max_connections: int = 100, backlog: int = 64, timeout: int = 30,
+          post_fork=None) -> None:
+    """Run `app` in the given mode; see the module docstring for the fallback order."""
+    if mode == 'prod':
+        if os.name == 'posix' and threading.current_thread() is threading.main_thread():
+            if _serve_gunicorn(app, host, port, workers, threads, keepalive, max_connections,
+                               backlog, timeout, post_fork):
+                return
+            logger.warning("Gunicorn not installed; falling back to Waitress (single process)")
+        serve_threaded(app, host, port, threads=workers * threads, max_connections=max_connections,
+                       keepalive=keepalive)
+        return
+    app.run(host=host, port=port, threaded=True)
@@ -16,11 +16,19 @@ Options:
     --p3-path PATH    Path to P3 CSV data file (default: /var/lib(FromThonny)/raspap_solo/data/RawData_P3/P3_fixed.csv)
     --port PORT       Port for the web server (default: 8050)
     --interval MINS   Refresh interval in minutes (default: 5)
+
+Output (output/):
+    plotly-<version>.min.js(.gz)  Shared Plotly bundle, written once and served gzip-compressed
+    <name>.html                   Small page shells that load the bundle and fetch <name>.json
+    <name>.json                   Figure data, regenerated only when an input CSV changed
+All files are written atomically (temp file + rename).
 """
 
 import os
 import sys
+import gzip
 import time
+import tempfile
 import argparse
 import logging
 import datetime
@@ -30,7 +38,11 @@ import pandas as pd
 import plotly.graph_objs as go
 import plotly.io as pio
 from plotly.subplots import make_subplots
-from flask import Flask, render_template_string, send_from_directory
+import plotly
+from plotly.offline import get_plotlyjs
+from flask import Flask, render_template_string, send_from_directory, request
+
+from csv_range_reader import read_csv_since, parse_time_column
 
 # Configure logging
 logging.basicConfig(
@@ -50,6 +62,32 @@ DEFAULT_P3_PATH = "/var/lib(FromThonny)/raspap_solo/data/RawData_P3/P3_fixed.csv
 DEFAULT_PORT = 8050
 DEFAULT_INTERVAL = 5  # minutes
 
+OUTPUT_DIR = "output"
+PARAMETERS = ["temperature", "humidity", "absolute_humidity", "co2", "pressure", "gas_resistance"]
+PLOTLY_ASSET = f"plotly-{plotly.__version__}.min.js"
+
+# Page shell per graph; the figure itself is fetched from <name>.json
+GRAPH_SHELL_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <script src="__PLOTLY_ASSET__"></script>
+    <style>html, body { margin: 0; height: 100%; } #graph { width: 100%; height: 100%; }</style>
+</head>
+<body>
+    <div id="graph"></div>
+    <script>
+        fetch('__NAME__.json', {cache: 'no-cache'})
+            .then(function(response) { return response.json(); })
+            .then(function(fig) { Plotly.newPlot('graph', fig.data, fig.layout, {responsive: true}); });
+    </script>
+</body>
+</html>
+"""
+
+# (path, size, mtime) of the inputs used for the last successful update
+_last_input_signature = None
+
 # HTML template with auto-refresh
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -219,9 +257,10 @@ def read_csv_data(csv_path, days=1):
         return None
 
     try:
-        # Read CSV file
-        logger.info(f"Reading CSV file: {csv_path}")
-        df = pd.read_csv(csv_path)
+        # Read only the rows inside the time range (bisection on byte offsets)
+        cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days) if days > 0 else None
+        logger.info(f"Reading CSV file: {csv_path} (since {cutoff_date})")
+        df = read_csv_since(csv_path, cutoff_date)
 
         # Log initial data types and sample data
         logger.info(f"CSV columns and types: {df.dtypes}")
@@ -232,14 +271,8 @@ def read_csv_data(csv_path, days=1):
         if 'timestamp' in df.columns:
             logger.info(f"Original timestamp dtype: {df['timestamp'].dtype}")
 
-            # Check if timestamp is numeric (int64 or float64)
-            if df['timestamp'].dtype == 'int64' or df['timestamp'].dtype == 'float64':
-                logger.info("Detected numeric timestamp format (seconds since epoch)")
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', errors='coerce')
-            else:
-                # Convert to string first to handle any format safely
-                logger.info("Detected string timestamp format")
-                df['timestamp'] = pd.to_datetime(df['timestamp'].astype(str), errors='coerce')
+            # Epoch column if present, else fixed-format strings / numeric epoch (no per-row inference)
+            df['timestamp'] = parse_time_column(df)
 
             logger.info(f"Converted timestamp dtype: {df['timestamp'].dtype}")
             logger.info(f"Timestamp range: {df['timestamp'].min()} to {df['timestamp'].max()}")
@@ -272,8 +305,7 @@ def read_csv_data(csv_path, days=1):
                     logger.info(f"Column '{col}' range: {df[col].min()} to {df[col].max()}")
 
         # Filter data for the specified time range
-        if days > 0:
-            cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days)
+        if cutoff_date is not None:
             before_count = len(df)
             df = df[df['timestamp'] >= cutoff_date]
             logger.info(f"Filtered data for last {days} days: {before_count} -> {len(df)} rows")
@@ -595,13 +627,67 @@ def create_dashboard(df_p1, df_p2, df_p3, show_p1=True, show_p2=True, show_p3=Tr
 
     return fig
 
+def _atomic_write(path, data):
+    """Write bytes to path via a temp file in the same directory and rename it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates the file 0600; the published page must be readable by the web server
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def ensure_static_assets(output_dir):
+    """Write the shared Plotly bundle (plain + gzip) and the page shells if missing."""
+    asset_path = os.path.join(output_dir, PLOTLY_ASSET)
+    if not os.path.exists(asset_path) or not os.path.exists(asset_path + ".gz"):
+        logger.info(f"Writing shared Plotly bundle: {asset_path}")
+        js = get_plotlyjs().encode("utf-8")
+        _atomic_write(asset_path, js)
+        _atomic_write(asset_path + ".gz", gzip.compress(js, compresslevel=9))
+
+    for name in ["dashboard"] + PARAMETERS:
+        shell = GRAPH_SHELL_TEMPLATE.replace("__PLOTLY_ASSET__", PLOTLY_ASSET).replace("__NAME__", name)
+        shell = shell.encode("utf-8")
+        shell_path = os.path.join(output_dir, f"{name}.html")
+        try:
+            with open(shell_path, "rb") as f:
+                if f.read() == shell:
+                    continue
+        except OSError:
+            pass
+        _atomic_write(shell_path, shell)
+
+def _input_signature(args):
+    """Identify the current inputs by path, size and mtime (plus the display options)."""
+    signature = [args.days, args.show_p1, args.show_p2, args.show_p3]
+    for path, show in ((args.p1_path, args.show_p1), (args.p2_path, args.show_p2), (args.p3_path, args.show_p3)):
+        try:
+            st = os.stat(path) if show else None
+        except OSError:
+            st = None
+        signature.append((path, st.st_size, st.st_mtime_ns) if st else (path, None))
+    return tuple(signature)
+
 def update_graphs(args):
-    """Update graphs with fresh data."""
-    logger.info("Updating graphs...")
+    """Update graphs with fresh data (skipped when the input files are unchanged)."""
+    global _last_input_signature
 
     # Create output directory if it doesn't exist
-    output_dir = "output"
+    output_dir = OUTPUT_DIR
     os.makedirs(output_dir, exist_ok=True)
+    ensure_static_assets(output_dir)
+
+    signature = _input_signature(args)
+    if signature == _last_input_signature and os.path.exists(os.path.join(output_dir, "dashboard.json")):
+        logger.info("Input files unchanged since the last update; skipping regeneration")
+        return True
+
+    logger.info("Updating graphs...")
 
     # Read data
     logger.info(f"Reading P1 data from: {args.p1_path}")
@@ -622,22 +708,21 @@ def update_graphs(args):
     logger.info("Creating dashboard")
     dashboard = create_dashboard(df_p1, df_p2, df_p3, args.show_p1, args.show_p2, args.show_p3)
 
-    # Save dashboard
-    dashboard_path = os.path.join(output_dir, "dashboard.html")
+    # Save dashboard data (the page shell loads it)
+    dashboard_path = os.path.join(output_dir, "dashboard.json")
     logger.info(f"Saving dashboard to: {dashboard_path}")
-    dashboard.write_html(dashboard_path)
+    _atomic_write(dashboard_path, dashboard.to_json().encode("utf-8"))
 
     # Create individual graphs
-    parameters = ["temperature", "humidity", "absolute_humidity", "co2", "pressure", "gas_resistance"]
-
-    for param in parameters:
+    for param in PARAMETERS:
         logger.info(f"Creating graph for {param}")
         graph = generate_graph(param, df_p1, df_p2, df_p3, args.show_p1, args.show_p2, args.show_p3)
         if graph:
-            graph_path = os.path.join(output_dir, f"{param}.html")
+            graph_path = os.path.join(output_dir, f"{param}.json")
             logger.info(f"Saving {param} graph to: {graph_path}")
-            graph.write_html(graph_path)
+            _atomic_write(graph_path, graph.to_json().encode("utf-8"))
 
+    _last_input_signature = signature
     logger.info("Graphs updated successfully")
     return True
 
@@ -671,7 +756,7 @@ def start_web_server(args):
         "gas_resistance": "Gas Resistance (Ω)"
     }
 
-    parameters = ["temperature", "humidity", "absolute_humidity", "co2", "pressure", "gas_resistance"]
+    parameters = PARAMETERS
 
     @app.route('/')
     def index():
@@ -693,8 +778,19 @@ def start_web_server(args):
 
     @app.route('/<path:filename>')
     def serve_file(filename):
-        """Serve static files from the output directory."""
-        return send_from_directory('output', filename)
+        """Serve static files from the output directory (the Plotly bundle pre-compressed)."""
+        # Same directory update_graphs() writes to (relative paths would resolve against the app root)
+        output_dir = os.path.abspath(OUTPUT_DIR)
+        if filename == PLOTLY_ASSET:
+            # Versioned file name, so browsers may cache it for a long time
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = send_from_directory(output_dir, filename + '.gz',
+                                               mimetype='application/javascript', max_age=30 * 86400)
+                response.headers['Content-Encoding'] = 'gzip'
+                response.headers['Vary'] = 'Accept-Encoding'
+                return response
+            return send_from_directory(output_dir, filename, max_age=30 * 86400)
+        return send_from_directory(output_dir, filename)
 
     @app.route('/download/p1')
     def download_p1():
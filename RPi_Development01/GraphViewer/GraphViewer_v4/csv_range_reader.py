@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Time-range CSV reader for the P1..P4 fixed CSV files
+
+- The collector appends rows in time order, so the first row at or after a cutoff
+  can be found by bisecting byte offsets instead of parsing the whole file
+- Each probe reads a single line; only the tail from the found offset is parsed
+- The first column is the timestamp ("%Y-%m-%d %H:%M:%S" or numeric epoch seconds)
+- Unparseable probe lines are skipped; if nothing can be located the whole file is read
+- Callers still filter by timestamp afterwards, so a few out-of-order rows are harmless
+- parse_time_column() converts the time column without per-row format inference:
+  timestamp_epoch (integer seconds) when present, else the fixed string format
+
+Copy of RPi_Development01/ForZero/Ver2.20zeroOne/p1_softwareV4/web_interface/data/csv_range_reader.py,
+kept here because GraphViewer_v4 is deployed on its own; change the original and copy it over.
+"""
+
+import os
+import io
+import csv
+import datetime
+import logging
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+EPOCH_COLUMN = "timestamp_epoch"
+
+# Upper bound on consecutive unparseable lines skipped by a single probe
+_MAX_SKIP_LINES = 64
+
+
+def _parse_first_field(line: bytes) -> Optional[datetime.datetime]:
+    """Return the timestamp of a CSV data line, or None if it cannot be parsed."""
+    field = line.split(b",", 1)[0].strip().strip(b'"').decode("ascii", "ignore")
+    if not field:
+        return None
+    try:
+        return datetime.datetime.strptime(field[:19], TIMESTAMP_FORMAT)
+    except ValueError:
+        pass
+    try:
+        # Same convention as pd.to_datetime(..., unit='s'): naive UTC
+        epoch = float(field)
+        return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).replace(tzinfo=None)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def _probe(f, pos: int, data_start: int, size: int) -> Tuple[int, Optional[datetime.datetime]]:
+    """Timestamp of the first parseable line starting at or after byte `pos`.
+
+    Returns (line_start, timestamp); timestamp is None at EOF.
+    """
+    if pos <= data_start:
+        f.seek(data_start)
+    else:
+        # Finish the line that contains pos-1 so we land on a line boundary
+        f.seek(pos - 1)
+        f.readline()
+    for _ in range(_MAX_SKIP_LINES):
+        start = f.tell()
+        if start >= size:
+            return size, None
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            # Partial last line (collector may be appending right now)
+            return size, None
+        ts = _parse_first_field(line)
+        if ts is not None:
+            return start, ts
+    return f.tell(), None
+
+
+def find_offset(csv_path: str, cutoff: datetime.datetime) -> Tuple[List[str], int]:
+    """Return (header_columns, byte_offset) of the first row with timestamp >= cutoff."""
+    size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as f:
+        header_line = f.readline()
+        columns = next(csv.reader([header_line.decode("utf-8-sig").strip()]), [])
+        data_start = f.tell()
+
+        lo, hi = data_start, size
+        probes = 0
+        while lo < hi:
+            mid = (lo + hi) // 2
+            _start, ts = _probe(f, mid, data_start, size)
+            probes += 1
+            if ts is None or ts >= cutoff:
+                hi = mid
+            else:
+                lo = mid + 1
+        offset, _ts = _probe(f, lo, data_start, size)
+    logger.debug(f"{csv_path}: cutoff {cutoff} -> offset {offset}/{size} ({probes} probes)")
+    return columns, offset
+
+
+def read_csv_since(csv_path: str, cutoff: Optional[datetime.datetime]) -> pd.DataFrame:
+    """Read only the rows of `csv_path` at or after `cutoff` (all rows if cutoff is None).
+
+    The result has the same columns and dtype inference as pd.read_csv(csv_path).
+    """
+    if cutoff is None:
+        return pd.read_csv(csv_path)
+    try:
+        columns, offset = find_offset(csv_path, cutoff)
+    except Exception as e:
+        logger.warning(f"Range lookup failed for {csv_path}, reading whole file: {e}")
+        return pd.read_csv(csv_path)
+    if not columns:
+        return pd.read_csv(csv_path)
+
+    with open(csv_path, "rb") as f:
+        f.seek(offset)
+        tail = f.read()
+    if not tail.strip():
+        return pd.DataFrame(columns=columns)
+    return pd.read_csv(io.BytesIO(tail), header=None, names=columns)
+
+
+def parse_timestamps(values: pd.Series) -> pd.Series:
+    """Vectorized timestamp parsing (numeric epoch seconds or TIMESTAMP_FORMAT strings).
+
+    Only rows that do not match the fixed format fall back to pandas' format inference.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_datetime(values, unit='s', errors='coerce')
+    text = values.astype(str)
+    parsed = pd.to_datetime(text, format=TIMESTAMP_FORMAT, errors='coerce')
+    bad = parsed.isna() & values.notna()
+    if bad.any():
+        parsed[bad] = pd.to_datetime(text[bad], errors='coerce')
+    return parsed
+
+
+def _epoch_to_local(epoch: pd.Series) -> pd.Series:
+    """Epoch seconds -> naive local datetimes (same wall clock as the timestamp strings)."""
+    local_tz = datetime.datetime.now().astimezone().tzinfo
+    utc = pd.to_datetime(epoch, unit='s', utc=True, errors='coerce')
+    return utc.dt.tz_convert(local_tz).dt.tz_localize(None)
+
+
+def parse_time_column(df: pd.DataFrame) -> pd.Series:
+    """Datetime series for df's rows, preferring the epoch column over string parsing."""
+    if EPOCH_COLUMN in df.columns:
+        parsed = _epoch_to_local(pd.to_numeric(df[EPOCH_COLUMN], errors='coerce'))
+        missing = parsed.isna()
+        if missing.any() and 'timestamp' in df.columns:
+            # Rows written before the epoch column existed
+            parsed[missing] = parse_timestamps(df.loc[missing, 'timestamp'])
+        return parsed
+    return parse_timestamps(df['timestamp'])
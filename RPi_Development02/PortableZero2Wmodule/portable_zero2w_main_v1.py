@@ -5,12 +5,13 @@ Portable Zero2W Environmental Monitor Ver.1
 - MH-Z19(B/C) on /dev/serial0
 - Console output, CSV logging (daily + total), basic analytics
 - Auto-recovery: per-sensor reinit/retry with backoff
+- Concurrent acquisition: one worker thread per sensor, fixed-rate logging cadence
 """
 from __future__ import annotations
 import os
 import sys
-import time
 import signal
+import threading
 import argparse
 import datetime as dt
 from typing import Optional
@@ -22,15 +23,15 @@ if MODULE_DIR not in sys.path:
 
 from sensors.bme680_reader_v1 import BME680Reader
 from sensors.mhz19_reader_v1 import MHZ19Reader
+from sensors.acquisition_v1 import FixedRateScheduler, SensorWorker
 from utils.calculations_v1 import absolute_humidity_gm3, discomfort_index, pollution_index_from_gas
 from utils.csv_logger_v1 import CSVLogger
 
-RUNNING = True
+STOP = threading.Event()
 
 def _signal_handler(signum, frame):
-    global RUNNING
     print(f"\n[INFO] Signal {signum} received. Shutting down...")
-    RUNNING = False
+    STOP.set()
 
 
 def parse_args():
@@ -40,11 +41,26 @@ def parse_args():
     p.add_argument("--i2c-addr", type=lambda x: int(x, 0), default=0x77, help="BME680 I2C address (default: 0x77)")
     p.add_argument("--warmup", type=float, default=30.0, help="MH-Z19 warmup time in seconds (default: 30)")
     p.add_argument("--print-every", type=int, default=1, help="Print every N samples (default: 1)")
+    p.add_argument("--stale-after", type=float, default=None,
+                   help="Drop sensor values older than this many seconds (default: 2x interval)")
+    p.add_argument("--mhz-mode", choices=["pipelined", "polled"], default="pipelined",
+                   help="MH-Z19 access: pipelined background reads (default) or blocking request/response")
+    p.add_argument("--flush-rows", type=int, default=6, help="Flush CSV buffers every N rows (default: 6)")
+    p.add_argument("--flush-interval", type=float, default=60.0, help="Flush CSV buffers at least every N seconds (default: 60)")
     return p.parse_args()
 
 
+def _fmt_s(value: Optional[float]) -> str:
+    return f"{value:.2f}s" if isinstance(value, (int, float)) else "-"
+
+
+def _acq_iso(wall_time: Optional[dt.datetime]) -> str:
+    return wall_time.isoformat(timespec="milliseconds") if wall_time is not None else ""
+
+
 def main():
     args = parse_args()
+    stale_after = args.stale_after if args.stale_after is not None else 2.0 * args.interval
 
     # Signal handlers
     signal.signal(signal.SIGINT, _signal_handler)
@@ -57,70 +73,42 @@ def main():
     # Initialize components
     bme = BME680Reader(i2c_addr=args.i2c_addr)
     mhz = MHZ19Reader(port="/dev/serial0", baudrate=9600, timeout=1.0, retries=3)
-    logger = CSVLogger(base_dir=args.data_dir)
-
-    bme_ok = False
-    mhz_ok = False
-    next_bme_retry = 0.0
-    next_mhz_retry = 0.0
-    bme_backoff = 1.0
-    mhz_backoff = 1.0
+    logger = CSVLogger(base_dir=args.data_dir, flush_rows=args.flush_rows, flush_interval_s=args.flush_interval)
 
     # Warmup for MH-Z19 if requested
     if args.warmup > 0:
         print(f"[INFO] Warming up MH-Z19 for {args.warmup:.0f}s...")
-        t0 = time.time()
-        while RUNNING and time.time() - t0 < args.warmup:
-            time.sleep(0.5)
+        STOP.wait(args.warmup)
+
+    # One worker per sensor; a slow or failing sensor never delays the other or the logger
+    bme_worker = SensorWorker("BME680", lambda: bme.read(max_wait_s=2.0), args.interval, STOP,
+                              open_fn=bme.initialize)
+    if args.mhz_mode == "pipelined":
+        # Port stays open; the reader thread requests on its own timer, the worker only picks up the latest
+        # frame together with the time it arrived (no frame yet = not ready, not a failure)
+        mhz_request_s = max(1.0, min(5.0, args.interval / 2.0))
+        mhz_worker = SensorWorker("MH-Z19", lambda: mhz.read_latest(max_age_s=stale_after), args.interval, STOP,
+                                  open_fn=lambda: mhz.start_background(request_interval=mhz_request_s))
+    else:
+        mhz_worker = SensorWorker("MH-Z19", mhz.read_co2, args.interval, STOP,
+                                  open_fn=mhz.open, close_fn=mhz.close)
+    bme_worker.start()
+    mhz_worker.start()
 
     sample_count = 0
+    scheduler = FixedRateScheduler(args.interval, STOP)
 
-    while RUNNING:
-        loop_start = time.time()
+    for _tick, lateness in scheduler.ticks():
         ts = dt.datetime.now()
         epoch = int(ts.timestamp())
 
-        # Read BME680
-        temp_c = rh = press_hpa = gas_ohm = None
-        try:
-            if not bme_ok and time.time() >= next_bme_retry:
-                print("[INFO] (Re)initializing BME680...")
-                bme.initialize()
-                bme_ok = True
-                bme_backoff = 1.0
-            if bme_ok:
-                res = bme.read(max_wait_s=2.0)
-                if res is None:
-                    raise RuntimeError("BME680 timeout")
-                temp_c, rh, press_hpa, gas_ohm = res
-        except Exception as e:
-            print(f"[WARN] BME680 read failed: {e}")
-            bme_ok = False
-            next_bme_retry = time.time() + bme_backoff
-            bme_backoff = min(bme_backoff * 2.0, 60.0)
+        bme_val, bme_ok, bme_lat, bme_age, bme_time = bme_worker.snapshot(stale_after)
+        co2, mhz_ok, mhz_lat, mhz_age, mhz_time = mhz_worker.snapshot(stale_after)
 
-        # Read MH-Z19
-        co2_ppm: Optional[int] = None
-        try:
-            if not mhz_ok and time.time() >= next_mhz_retry:
-                print("[INFO] (Re)opening MH-Z19 serial port...")
-                mhz.open()
-                mhz_ok = True
-                mhz_backoff = 1.0
-            if mhz_ok:
-                co2 = mhz.read_co2()
-                if co2 is None:
-                    raise RuntimeError("MH-Z19 timeout/invalid")
-                co2_ppm = int(co2)
-        except Exception as e:
-            print(f"[WARN] MH-Z19 read failed: {e}")
-            mhz_ok = False
-            try:
-                mhz.close()
-            except Exception:
-                pass
-            next_mhz_retry = time.time() + mhz_backoff
-            mhz_backoff = min(mhz_backoff * 2.0, 60.0)
+        temp_c = rh = press_hpa = gas_ohm = None
+        if bme_val is not None:
+            temp_c, rh, press_hpa, gas_ohm = bme_val
+        co2_ppm: Optional[int] = int(co2) if co2 is not None else None
 
         # Analytics
         abs_h = absolute_humidity_gm3(temp_c, rh) if (temp_c is not None and rh is not None) else float("nan")
@@ -142,6 +130,11 @@ def main():
             "discomfort_index": round(di, 2) if isinstance(di, (int, float)) else "",
             "bme680_ok": bme_ok,
             "mhz19_ok": mhz_ok,
+            # Acquisition time of each sensor's latest reading and its age at this tick
+            "bme680_time_iso": _acq_iso(bme_time),
+            "bme680_age_s": round(bme_age, 3) if isinstance(bme_age, float) else "",
+            "mhz19_time_iso": _acq_iso(mhz_time),
+            "mhz19_age_s": round(mhz_age, 3) if isinstance(mhz_age, float) else "",
         }
         try:
             logger.log(row)
@@ -156,20 +149,20 @@ def main():
                 f"T={row['temperature_c']}C RH={row['humidity_percent']}% AH={row['absolute_humidity_gm3']}g/m3 "
                 f"P={row['pressure_hpa']}hPa Gas={row['gas_resistance_ohm']}Ω CO2={row['co2_ppm']}ppm "
                 f"DI={row['discomfort_index']} AQI*={row['pollution_index']}({row['pollution_level']}) "
-                f"BME={'OK' if bme_ok else 'NG'} MHZ={'OK' if mhz_ok else 'NG'}"
+                f"BME={'OK' if bme_ok else 'NG'}(lat={_fmt_s(bme_lat)} age={_fmt_s(bme_age)}) "
+                f"MHZ={'OK' if mhz_ok else 'NG'}(lat={_fmt_s(mhz_lat)} age={_fmt_s(mhz_age)}) "
+                f"jitter={lateness * 1000:.1f}ms missed={scheduler.missed}"
             )
 
-        # Sleep for the remainder of interval
-        elapsed = time.time() - loop_start
-        to_sleep = max(0.0, args.interval - elapsed)
-        # Allow signals to be processed
-        end = time.time() + to_sleep
-        while RUNNING and time.time() < end:
-            time.sleep(min(0.2, end - time.time()))
-
-    # Cleanup
+    # Cleanup: let workers leave their current read before closing devices
+    for w in (bme_worker, mhz_worker):
+        w.join(timeout=5.0)
+    try:
+        logger.close()
+    except Exception as e:
+        print(f"[ERROR] CSV close failed: {e}")
     try:
-        mhz.close()
+        mhz.stop_background()
     except Exception:
         pass
     try:
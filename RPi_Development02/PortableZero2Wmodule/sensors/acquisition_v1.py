@@ -0,0 +1,177 @@
+"""
+Concurrent sensor acquisition for Portable Zero2W module Ver.1
+- One background worker thread per sensor, each with its own (re)open/backoff logic
+- Latest-value slot per sensor (reading + acquisition timestamp + read latency)
+- Fixed-rate scheduler on the monotonic clock so the logging cadence does not drift
+  when a sensor is slow (e.g. MH-Z19 retries/reopen can take several seconds)
+"""
+from __future__ import annotations
+import time
+import threading
+import datetime as dt
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+
+class SensorNotReady(Exception):
+    """Raised by a read_fn when the sensor has produced no data yet (e.g. first frame pending).
+
+    Not a failure: no warning, no reopen, no backoff.
+    """
+
+
+class Reading:
+    """Immutable snapshot of one sensor acquisition."""
+    __slots__ = ("value", "wall_time", "mono_time", "latency_s")
+
+    def __init__(self, value: Any, wall_time: dt.datetime, mono_time: float, latency_s: float):
+        self.value = value
+        self.wall_time = wall_time  # wall clock at acquisition (end of read)
+        self.mono_time = mono_time  # time.monotonic() at acquisition
+        self.latency_s = latency_s  # duration of the read call
+
+    def age(self, now_mono: Optional[float] = None) -> float:
+        """Staleness in seconds relative to now (monotonic)."""
+        if now_mono is None:
+            now_mono = time.monotonic()
+        return max(0.0, now_mono - self.mono_time)
+
+
+class LatestSlot:
+    """Single-value slot holding the most recent Reading. Writers overwrite, readers never block long."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reading: Optional[Reading] = None
+        self.ok = False
+
+    def put(self, reading: Reading) -> None:
+        with self._lock:
+            self._reading = reading
+            self.ok = True
+
+    def mark_failed(self) -> None:
+        with self._lock:
+            self.ok = False
+
+    def get(self) -> Tuple[Optional[Reading], bool]:
+        with self._lock:
+            return self._reading, self.ok
+
+
+class FixedRateScheduler:
+    """Yields ticks at start + k*interval on the monotonic clock.
+
+    If a tick is missed by more than one interval (e.g. system stall), the missed
+    ticks are skipped rather than fired back-to-back, and the count is recorded.
+    """
+
+    def __init__(self, interval: float, stop_event: threading.Event):
+        self.interval = max(0.01, float(interval))
+        self.stop_event = stop_event
+        self.missed = 0
+
+    def ticks(self) -> Iterator[Tuple[int, float]]:
+        """Yield (tick_index, lateness_s) until stop_event is set."""
+        start = time.monotonic()
+        k = 0
+        while not self.stop_event.is_set():
+            deadline = start + k * self.interval
+            delay = deadline - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                return
+            lateness = time.monotonic() - deadline
+            yield k, lateness
+            # Advance to the next deadline in the future; count skipped ticks
+            k += 1
+            behind = int((time.monotonic() - (start + k * self.interval)) // self.interval)
+            if behind > 0:
+                self.missed += behind
+                k += behind
+
+
+class SensorWorker(threading.Thread):
+    """Polls one sensor at a fixed rate and publishes into a LatestSlot.
+
+    open_fn:  called when the sensor is not ready (initialize / open port)
+    read_fn:  returns a value or None (None is treated as a failed read), or a
+              (value, wall_time, mono_time) tuple when the value carries its own acquisition
+              time (cached frames); may raise SensorNotReady before the first value exists
+    close_fn: called after a failure before the next reopen
+    """
+
+    def __init__(
+        self,
+        name: str,
+        read_fn: Callable[[], Any],
+        interval: float,
+        stop_event: threading.Event,
+        open_fn: Optional[Callable[[], None]] = None,
+        close_fn: Optional[Callable[[], None]] = None,
+        max_backoff: float = 60.0,
+    ):
+        super().__init__(name=f"sensor-{name}", daemon=True)
+        self.sensor_name = name
+        self.read_fn = read_fn
+        self.open_fn = open_fn
+        self.close_fn = close_fn
+        self.interval = interval
+        self.stop_event = stop_event
+        self.max_backoff = max_backoff
+        self.slot = LatestSlot()
+        self.failures = 0
+
+    def run(self) -> None:
+        ready = False
+        backoff = 1.0
+        next_retry = 0.0
+        scheduler = FixedRateScheduler(self.interval, self.stop_event)
+        for _tick, _lateness in scheduler.ticks():
+            try:
+                if not ready:
+                    if time.monotonic() < next_retry:
+                        continue
+                    if self.open_fn is not None:
+                        print(f"[INFO] (Re)initializing {self.sensor_name}...")
+                        self.open_fn()
+                    ready = True
+                    backoff = 1.0
+                t0 = time.monotonic()
+                try:
+                    value = self.read_fn()
+                except SensorNotReady:
+                    continue
+                t1 = time.monotonic()
+                if value is None:
+                    raise RuntimeError(f"{self.sensor_name} timeout/invalid")
+                if isinstance(value, tuple):
+                    value, wall_time, mono_time = value
+                    self.slot.put(Reading(value, wall_time, mono_time, t1 - t0))
+                else:
+                    self.slot.put(Reading(value, dt.datetime.now(), t1, t1 - t0))
+            except Exception as e:
+                print(f"[WARN] {self.sensor_name} read failed: {e}")
+                self.failures += 1
+                self.slot.mark_failed()
+                ready = False
+                if self.close_fn is not None:
+                    try:
+                        self.close_fn()
+                    except Exception:
+                        pass
+                next_retry = time.monotonic() + backoff
+                backoff = min(backoff * 2.0, self.max_backoff)
+
+    def snapshot(
+        self, max_age_s: float
+    ) -> Tuple[Any, bool, Optional[float], Optional[float], Optional[dt.datetime]]:
+        """Return (value_or_None, ok, latency_s, age_s, wall_time).
+
+        Values older than max_age_s are dropped; age_s and wall_time still describe the last
+        acquisition so the staleness can be logged.
+        """
+        reading, ok = self.slot.get()
+        if reading is None:
+            return None, False, None, None, None
+        age = reading.age()
+        value = reading.value if age <= max_age_s else None
+        return value, ok and value is not None, reading.latency_s, age, reading.wall_time
@@ -3,10 +3,21 @@ MH-Z19 (B / C) CO2 sensor reader for Raspberry Pi Zero 2W (Ver.1)
 - Uses /dev/serial0 via pyserial
 - Implements request 0xFF 0x01 0x86, parses 9-byte response with checksum
 - Retries and port auto-reopen to enhance robustness against contention/errors
+- Background (pipelined) mode: port stays open, 0x86 is sent on a timer and 9-byte frames
+  are parsed incrementally with resync on the 0xFF header; latest() never blocks
 """
 from __future__ import annotations
 import time
-from typing import Optional
+import threading
+import datetime as dt
+from typing import Optional, Tuple
+
+from .acquisition_v1 import SensorNotReady
+
+CMD_READ_CO2 = bytes([0xFF, 0x01, 0x86, 0, 0, 0, 0, 0, 0x79])
+FRAME_LEN = 9
+# Read timeout of the background loop: bounds request-timing jitter and stop latency
+BG_READ_TIMEOUT_S = 0.2
 
 class MHZ19Reader:
     def __init__(self, port: str = "/dev/serial0", baudrate: int = 9600, timeout: float = 1.0, retries: int = 3):
@@ -15,8 +26,18 @@ class MHZ19Reader:
         self.timeout = timeout
         self.retries = retries
         self._ser: Optional[object] = None
+        # Background mode state
+        self._bg_thread: Optional[threading.Thread] = None
+        self._bg_stop = threading.Event()
+        self._lock = threading.Lock()
+        self._latest: Optional[int] = None
+        self._latest_mono = 0.0
+        self._latest_wall: Optional[dt.datetime] = None
+        self.frames_ok = 0
+        self.frames_bad = 0
 
-    def open(self) -> None:
+    def open(self, timeout: Optional[float] = None) -> None:
+        """Open the port (no-op if open). timeout overrides self.timeout for a new port."""
         if self._ser is not None:
             try:
                 # hasattr guard for runtime without pyserial
@@ -28,7 +49,8 @@ class MHZ19Reader:
             import serial  # type: ignore
         except Exception as e:
             raise RuntimeError("pyserial is required for MH-Z19. Please install with: pip install pyserial") from e
-        self._ser = serial.Serial(self.port_name, self.baudrate, timeout=self.timeout)
+        self._ser = serial.Serial(self.port_name, self.baudrate,
+                                  timeout=self.timeout if timeout is None else timeout)
         # Sensor warmup might be required; handled by main if needed
 
     def close(self) -> None:
@@ -46,7 +68,7 @@ class MHZ19Reader:
         return (0xFF - (sum(response[1:8]) & 0xFF) + 1) & 0xFF
 
     def read_co2(self) -> Optional[int]:
-        cmd = bytes([0xFF, 0x01, 0x86, 0, 0, 0, 0, 0, 0x79])
+        cmd = CMD_READ_CO2
         for attempt in range(self.retries):
             try:
                 self.open()
@@ -73,3 +95,104 @@ class MHZ19Reader:
                 time.sleep(0.5)
                 continue
         return None
+
+    # ----- Background (pipelined) mode -----
+
+    @classmethod
+    def _parse_frames(cls, buf: bytearray) -> Tuple[Optional[int], int, int]:
+        """Consume complete frames from buf in place.
+
+        Returns (last_valid_co2, ok_count, bad_count). Bytes before a 0xFF 0x86 header and
+        frames with a bad checksum are dropped one byte at a time to resynchronize.
+        """
+        co2 = None
+        ok = bad = 0
+        while len(buf) >= FRAME_LEN:
+            start = buf.find(b"\xff\x86")
+            if start < 0:
+                # Keep a trailing 0xFF: it may be the first byte of the next frame
+                del buf[:len(buf) - 1 if buf[-1] == 0xFF else len(buf)]
+                break
+            if start:
+                del buf[:start]
+                continue
+            if cls._checksum(buf) != buf[8]:
+                bad += 1
+                del buf[:1]
+                continue
+            co2 = buf[2] * 256 + buf[3]
+            ok += 1
+            del buf[:FRAME_LEN]
+        return co2, ok, bad
+
+    def start_background(self, request_interval: float = 5.0) -> None:
+        """Keep the port open and poll the sensor from a daemon thread."""
+        if self._bg_thread is not None and self._bg_thread.is_alive():
+            return
+        self._bg_stop.clear()
+        self._bg_thread = threading.Thread(
+            target=self._background_loop, args=(request_interval,), name="mhz19-reader", daemon=True
+        )
+        self._bg_thread.start()
+
+    def stop_background(self, timeout: float = 2.0) -> None:
+        self._bg_stop.set()
+        if self._bg_thread is not None:
+            self._bg_thread.join(timeout=timeout)
+            self._bg_thread = None
+        self.close()
+
+    def _background_loop(self, request_interval: float) -> None:
+        buf = bytearray()
+        backoff = 1.0
+        next_request = 0.0
+        while not self._bg_stop.is_set():
+            try:
+                self.open(timeout=BG_READ_TIMEOUT_S)
+                assert self._ser is not None
+                now = time.monotonic()
+                if now >= next_request:
+                    self._ser.write(CMD_READ_CO2)
+                    next_request = now + request_interval
+                # Blocks at most BG_READ_TIMEOUT_S (set once when the port was opened)
+                chunk = self._ser.read(max(1, getattr(self._ser, "in_waiting", 0) or 1))
+                if chunk:
+                    buf += chunk
+                    co2, ok, bad = self._parse_frames(buf)
+                    self.frames_bad += bad
+                    if co2 is not None:
+                        with self._lock:
+                            self._latest = co2
+                            self._latest_mono = time.monotonic()
+                            self._latest_wall = dt.datetime.now()
+                        self.frames_ok += ok
+                backoff = 1.0
+            except Exception:
+                # Only a real port error closes the port; resync handles garbage bytes
+                self.close()
+                buf.clear()
+                if self._bg_stop.wait(backoff):
+                    break
+                backoff = min(backoff * 2.0, 30.0)
+                next_request = 0.0
+
+    def latest(self) -> Tuple[Optional[int], Optional[float]]:
+        """Return (co2_ppm, age_seconds) of the latest valid frame without blocking."""
+        with self._lock:
+            if self._latest is None:
+                return None, None
+            return self._latest, time.monotonic() - self._latest_mono
+
+    def read_latest(self, max_age_s: float = 15.0) -> Optional[Tuple[int, dt.datetime, float]]:
+        """(co2_ppm, wall_time, mono_time) of the latest valid frame, stamped when it arrived.
+
+        Returns None if that frame is older than max_age_s; raises SensorNotReady if no frame
+        has arrived yet.
+        """
+        with self._lock:
+            co2, wall, mono = self._latest, self._latest_wall, self._latest_mono
+        if co2 is None or wall is None:
+            raise SensorNotReady("no MH-Z19 frame yet")
+        if time.monotonic() - mono > max_age_s:
+            return None
+        return co2, wall, mono
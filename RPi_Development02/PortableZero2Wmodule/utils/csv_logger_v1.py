@@ -1,16 +1,20 @@
 """
 CSV streaming logger for Portable Zero2W module Ver.1
 - Writes to daily file (YYYY-MM-DD.csv) and total file (total.csv)
-- Ensures header exists
-- Rotates total.csv if size exceeds a threshold
+- Ensures header exists (checked once when a file is opened, not per row); a file written
+  with a different header is renamed aside instead of being appended to
+- Rotates total.csv if size exceeds a threshold (size tracked in memory, no stat per row)
+- Keeps both handles open; the daily file is switched only when the date changes
+- Rows are buffered and flushed by a row-count / time policy to spare the SD card
 - Minimal memory footprint (line-by-line)
 """
 from __future__ import annotations
+import io
 import os
 import csv
 import time
 import datetime as dt
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, TextIO
 
 DEFAULT_FIELDS: List[str] = [
     "timestamp_iso",
@@ -26,46 +30,159 @@ DEFAULT_FIELDS: List[str] = [
     "discomfort_index",
     "bme680_ok",
     "mhz19_ok",
+    "bme680_time_iso",
+    "bme680_age_s",
+    "mhz19_time_iso",
+    "mhz19_age_s",
 ]
 
+# Userspace buffer per handle; large enough to hold several minutes of rows
+_FILE_BUFFER_BYTES = 64 * 1024
+
 
 class CSVLogger:
-    def __init__(self, base_dir: str = "data", total_max_bytes: int = 10 * 1024 * 1024, fields: Optional[List[str]] = None):
+    """Append rows to the daily and total CSV files.
+
+    flush_rows:       flush to the OS after this many buffered rows (1 = every row)
+    flush_interval_s: flush at least this often, even if fewer rows are pending
+    fsync:            also fsync on each flush (safer on power loss, more SD wear)
+    """
+
+    def __init__(
+        self,
+        base_dir: str = "data",
+        total_max_bytes: int = 10 * 1024 * 1024,
+        fields: Optional[List[str]] = None,
+        flush_rows: int = 6,
+        flush_interval_s: float = 60.0,
+        fsync: bool = False,
+    ):
         self.base_dir = base_dir
         self.daily_dir = os.path.join(base_dir, "daily")
         self.total_path = os.path.join(base_dir, "total.csv")
         self.total_max_bytes = total_max_bytes
         self.fields = fields or DEFAULT_FIELDS
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_interval_s = max(0.0, float(flush_interval_s))
+        self.fsync = fsync
         os.makedirs(self.daily_dir, exist_ok=True)
         os.makedirs(self.base_dir, exist_ok=True)
 
-    def _ensure_header(self, path: str) -> None:
-        if not os.path.exists(path) or os.path.getsize(path) == 0:
-            with open(path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=self.fields)
-                writer.writeheader()
+        self._daily_fh: Optional[TextIO] = None
+        self._daily_day_end = 0.0  # epoch seconds of the next local midnight
+        self._total_fh: Optional[TextIO] = None
+        self._total_bytes = 0
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+
+        # Rows are formatted once into this buffer, then written to both files
+        self._line_buf = io.StringIO()
+        self._line_writer = csv.writer(self._line_buf)
+        self._header_line = self._format(self.fields)
+
+    def _format(self, values: List[object]) -> str:
+        self._line_buf.seek(0)
+        self._line_buf.truncate()
+        self._line_writer.writerow(values)
+        return self._line_buf.getvalue()
+
+    def _set_aside_if_header_differs(self, path: str) -> None:
+        try:
+            with open(path, "r", newline="", encoding="utf-8") as f:
+                first = f.readline()
+        except FileNotFoundError:
+            return
+        if not first or first == self._header_line:
+            return
+        root, ext = os.path.splitext(path)
+        ts = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.replace(path, f"{root}_old_{ts}{ext}")
+
+    def _open_with_header(self, path: str) -> TextIO:
+        self._set_aside_if_header_differs(path)
+        f = open(path, "a", newline="", encoding="utf-8", buffering=_FILE_BUFFER_BYTES)
+        # Append mode positions at EOF; one seek at open replaces the per-row stat
+        if f.seek(0, os.SEEK_END) == 0:
+            f.write(self._header_line)
+        return f
+
+    def _switch_daily_if_needed(self, now: float) -> None:
+        if self._daily_fh is not None and now < self._daily_day_end:
+            return
+        if self._daily_fh is not None:
+            self._close_handle(self._daily_fh)
+        today = dt.datetime.fromtimestamp(now).date()
+        daily_path = os.path.join(self.daily_dir, f"{today.strftime('%Y-%m-%d')}.csv")
+        self._daily_fh = self._open_with_header(daily_path)
+        midnight = dt.datetime.combine(today + dt.timedelta(days=1), dt.time())
+        self._daily_day_end = midnight.timestamp()
+
+    def _open_total(self) -> None:
+        self._total_fh = self._open_with_header(self.total_path)
+        self._total_bytes = self._total_fh.tell()
 
     def _rotate_total_if_needed(self) -> None:
-        if os.path.exists(self.total_path) and os.path.getsize(self.total_path) > self.total_max_bytes:
-            ts = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-            rotated = os.path.join(self.base_dir, f"total_{ts}.csv")
-            os.replace(self.total_path, rotated)
+        if self._total_bytes <= self.total_max_bytes:
+            return
+        if self._total_fh is not None:
+            self._close_handle(self._total_fh)
+            self._total_fh = None
+        ts = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+        rotated = os.path.join(self.base_dir, f"total_{ts}.csv")
+        os.replace(self.total_path, rotated)
+        self._open_total()
+
+    def _close_handle(self, f: TextIO) -> None:
+        try:
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        finally:
+            f.close()
 
     def log(self, row: Dict[str, object]) -> None:
-        # Fill missing fields with empty
-        record = {k: row.get(k, "") for k in self.fields}
-        today = dt.datetime.now().strftime("%Y-%m-%d")
-        daily_path = os.path.join(self.daily_dir, f"{today}.csv")
+        now = time.time()
+        self._switch_daily_if_needed(now)
+        if self._total_fh is None:
+            self._open_total()
 
-        # Daily file
-        self._ensure_header(daily_path)
-        with open(daily_path, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=self.fields)
-            writer.writerow(record)
+        # Fill missing fields with empty
+        line = self._format([row.get(k, "") for k in self.fields])
+        if self._daily_fh is None or self._total_fh is None:
+            raise RuntimeError("CSV files are not open")
+        self._daily_fh.write(line)
+        self._total_fh.write(line)
+        self._total_bytes += len(line.encode("utf-8"))
+        self._pending_rows += 1
 
-        # Total file with rotation
+        mono = time.monotonic()
+        if self._pending_rows >= self.flush_rows or mono - self._last_flush >= self.flush_interval_s:
+            self.flush()
         self._rotate_total_if_needed()
-        self._ensure_header(self.total_path)
-        with open(self.total_path, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=self.fields)
-            writer.writerow(record)
+
+    def flush(self) -> None:
+        for f in (self._daily_fh, self._total_fh):
+            if f is None:
+                continue
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        for attr in ("_daily_fh", "_total_fh"):
+            f = getattr(self, attr)
+            if f is None:
+                continue
+            try:
+                self._close_handle(f)
+            finally:
+                setattr(self, attr, None)
+        self._pending_rows = 0
+
+    def __enter__(self) -> "CSVLogger":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()